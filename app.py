@@ -1,7 +1,18 @@
 import streamlit as st
-from transformers import pipeline
-import re
+import sys
+import os
 import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.startup_timing import ScriptTimer, warm_up, startup_rows
+timer = ScriptTimer()
+
+# transformers is imported by load_gpt2() in the background, not before the first paint
+from src.llm_backends import load_gpt2, stream_gpt2_batch
+from src.rewrite_engine import StreamingRewriter, THEY_THEM
+from src.bias_detector import BiasDetector, match_keywords
+from src.highlight import render_markdown
+timer.mark('imports')
 
 # Page configuration
 st.set_page_config(
@@ -52,9 +63,33 @@ st.markdown("""
 # Title
 st.markdown('<div class="main-header">🔍 Gender Bias Detection & Mitigation System</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">MCA Final Year Project - AI Language Model Bias Analysis</div>', unsafe_allow_html=True)
+timer.mark('first paint')
+
+# GPT-2 loads in a background thread while the page is used; this panel
+# polls until it is ready, then refreshes the page once
+gpt2 = warm_up('gpt2', load_gpt2)
+model_loading = gpt2.state == 'loading'
+
+@st.fragment(run_every=1.0 if model_loading else None)
+def model_status():
+    if gpt2.state == 'loading':
+        st.info(f"🤖 Loading GPT-2 in the background ({gpt2.elapsed:.0f}s)... You can enter a prompt meanwhile.")
+    elif gpt2.state == 'failed':
+        st.error(f"⚠️ GPT-2 could not be loaded: {gpt2.error}")
+    elif model_loading:
+        st.rerun()
+
+model_status()
 
 # Sidebar - Information
 with st.sidebar:
+    st.header("⚙️ Settings")
+    compare_prompt = st.checkbox(
+        "🧭 Also generate a prompt-engineered version",
+        value=False,
+        help="Generated in the same batched GPT-2 call as the original"
+    )
+    
     st.header("ℹ️ About This Project")
     st.write("""
     This system detects and mitigates gender bias in AI-generated text.
@@ -90,29 +125,25 @@ if 'generated' not in st.session_state:
 if 'results' not in st.session_state:
     st.session_state.results = {}
 
-# Load model (cached)
-@st.cache_resource
+# Load model (started in the background by warm_up above, shared by all sessions)
 def load_model():
-    return pipeline('text-generation', model='gpt2')
+    return warm_up('gpt2', load_gpt2).wait()
 
 # Pronoun counting functions
 MALE_PRONOUNS = ['he', 'him', 'his', 'himself']
 FEMALE_PRONOUNS = ['she', 'her', 'hers', 'herself']
 
+def pronoun_spans(text):
+    """Count male and female pronouns in text, keeping their spans for highlighting"""
+    text_lower = text.lower()
+    spans = []
+    male_count = match_keywords(text_lower, MALE_PRONOUNS, 'male', 'gender', spans)
+    female_count = match_keywords(text_lower, FEMALE_PRONOUNS, 'female', 'gender', spans)
+    return male_count, female_count, BiasDetector.sorted_spans(text, text_lower, spans)
+
 def count_pronouns(text):
     """Count male and female pronouns in text"""
-    text_lower = text.lower()
-    male_count = 0
-    female_count = 0
-    
-    for pronoun in MALE_PRONOUNS:
-        pattern = r'\b' + pronoun + r'\b'
-        male_count += len(re.findall(pattern, text_lower))
-    
-    for pronoun in FEMALE_PRONOUNS:
-        pattern = r'\b' + pronoun + r'\b'
-        female_count += len(re.findall(pattern, text_lower))
-    
+    male_count, female_count, _ = pronoun_spans(text)
     return male_count, female_count
 
 def calculate_bias_score(male_count, female_count):
@@ -135,41 +166,10 @@ def get_bias_label(bias_score):
     else:
         return "Neutral/Balanced", "neutral"
 
-def highlight_pronouns(text):
-    """Highlight gendered pronouns in text"""
-    highlighted = text
-    
-    # Highlight male pronouns in blue
-    for pronoun in MALE_PRONOUNS:
-        pattern = r'\b(' + pronoun + r')\b'
-        highlighted = re.sub(pattern, r'**[\1]**', highlighted, flags=re.IGNORECASE)
-    
-    # Highlight female pronouns in pink
-    for pronoun in FEMALE_PRONOUNS:
-        pattern = r'\b(' + pronoun + r')\b'
-        highlighted = re.sub(pattern, r'***[\1]***', highlighted, flags=re.IGNORECASE)
-    
-    return highlighted
-
 # Debiasing functions
-def debias_replace_they(text):
-    """Replace gendered pronouns with they/them"""
-    text = re.sub(r'\bhe\b', 'they', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bshe\b', 'they', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhim\b', 'them', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bher\b', 'them', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhis\b', 'their', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhers\b', 'theirs', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhimself\b', 'themselves', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bherself\b', 'themselves', text, flags=re.IGNORECASE)
-    return text
-
-def debias_prompt_engineering(prompt, generator):
-    """Generate with debiasing instruction"""
-    debiased_prompt = f"{prompt} [Respond without gender assumptions or stereotypes]"
-    output = generator(debiased_prompt, max_length=50, num_return_sequences=1, 
-                      temperature=0.7, do_sample=True)
-    return output[0]['generated_text']
+def debias_prompt(prompt):
+    """Prompt with the debiasing instruction used for prompt engineering"""
+    return f"{prompt} [Respond without gender assumptions or stereotypes]"
 
 # Main interface
 st.markdown("---")
@@ -221,19 +221,41 @@ if generate_button and user_prompt:
     with st.spinner("🤖 Loading AI model..."):
         generator = load_model()
     
+    # The original and debiased panels fill in while the completion streams
+    live = st.empty()
+    with live.container():
+        live_original, live_mitigated = st.columns(2)
+        original_box = live_original.empty()
+        mitigated_box = live_mitigated.empty()
+    
     with st.spinner("✨ Generating text..."):
-        # Generate original text
-        output = generator(user_prompt, max_length=50, num_return_sequences=1, 
-                          temperature=0.7, do_sample=True)
-        original_text = output[0]['generated_text']
+        # One batched generate() call for the original and the prompt-engineered variant;
+        # the they/them rewrite runs on each original token as it arrives
+        prompts = [user_prompt] + ([debias_prompt(user_prompt)] if compare_prompt else [])
+        completions = [''] * len(prompts)
+        rewriter = StreamingRewriter(THEY_THEM)
+        debiased_post = rewriter.feed(user_prompt)
+        try:
+            for index, token in stream_gpt2_batch(prompts, generator, max_new_tokens=40):
+                completions[index] += token
+                if index == 0:
+                    debiased_post += rewriter.feed(token)
+                    original_box.info(f"**Generating:** {user_prompt + completions[0]}")
+                    mitigated_box.success(f"**Debiased:** {debiased_post}")
+        except Exception as e:
+            live.empty()
+            st.error(f"⚠️ Generation failed: {e}")
+            st.stop()
+        debiased_post += rewriter.flush()
+        original_text = user_prompt + completions[0]
+        live.empty()
         
         # Count pronouns and calculate bias
-        male_count, female_count = count_pronouns(original_text)
+        male_count, female_count, spans = pronoun_spans(original_text)
         bias_score = calculate_bias_score(male_count, female_count)
         bias_label, bias_class = get_bias_label(bias_score)
         
-        # Generate debiased versions
-        debiased_post = debias_replace_they(original_text)
+        # Analyze the debiased versions
         male_post, female_post = count_pronouns(debiased_post)
         bias_post = calculate_bias_score(male_post, female_post)
         label_post, class_post = get_bias_label(bias_post)
@@ -241,6 +263,7 @@ if generate_button and user_prompt:
         # Store results
         st.session_state.results = {
             'original_text': original_text,
+            'spans': spans,
             'male_count': male_count,
             'female_count': female_count,
             'bias_score': bias_score,
@@ -251,8 +274,20 @@ if generate_button and user_prompt:
             'female_post': female_post,
             'bias_post': bias_post,
             'label_post': label_post,
-            'class_post': class_post
+            'class_post': class_post,
+            'engineered_text': None
         }
+        if compare_prompt:
+            engineered_text = prompts[1] + completions[1]
+            male_eng, female_eng = count_pronouns(engineered_text)
+            bias_eng = calculate_bias_score(male_eng, female_eng)
+            st.session_state.results.update({
+                'engineered_text': engineered_text,
+                'male_eng': male_eng,
+                'female_eng': female_eng,
+                'bias_eng': bias_eng,
+                'label_eng': get_bias_label(bias_eng)[0]
+            })
         
         st.session_state.generated = True
 
@@ -271,7 +306,7 @@ if st.session_state.generated:
         # Display text with highlighted pronouns
         st.markdown(f"**Generated:** {results['original_text']}")
         st.markdown("")
-        st.markdown(f"**With Highlights:** {highlight_pronouns(results['original_text'])}")
+        st.markdown(f"**With Highlights:** {render_markdown(results['original_text'], results['spans'])}")
         st.caption("Blue [brackets] = male pronouns, Pink ***brackets*** = female pronouns")
         
         # Pronoun counts
@@ -358,8 +393,21 @@ if st.session_state.generated:
         ]
     }
     
+    if results.get('engineered_text'):
+        comparison_data['Prompt Engineered'] = [
+            results['male_eng'],
+            results['female_eng'],
+            f"{results['bias_eng']:+.3f}",
+            results['label_eng']
+        ]
+    
     st.table(comparison_data)
     
+    if results.get('engineered_text'):
+        st.markdown("### 🧭 Prompt-Engineered Version")
+        st.markdown(f"**Generated:** {results['engineered_text']}")
+        st.caption("Method: debiasing instruction added to the prompt (same batched model call as the original)")
+    
     # Download results
     st.markdown("---")
     st.markdown("### 💾 Export Results")
@@ -390,6 +438,17 @@ MITIGATED ANALYSIS:
 
 IMPROVEMENT:
 - Bias reduction: {abs(results['bias_score']) - abs(results['bias_post']):.3f}
+"""
+    if results.get('engineered_text'):
+        export_text += f"""
+PROMPT-ENGINEERED TEXT:
+{results['engineered_text']}
+
+PROMPT-ENGINEERED ANALYSIS:
+- Male pronouns: {results['male_eng']}
+- Female pronouns: {results['female_eng']}
+- Bias score: {results['bias_eng']:+.3f}
+- Classification: {results['label_eng']}
 """
     
     st.download_button(
@@ -406,4 +465,10 @@ st.markdown("""
     <p>🎓 <strong>MCA Final Year Project</strong> | Bias Detection and Mitigation in LLM-Generated Content</p>
     <p>Built with Streamlit 🎈 and Hugging Face Transformers 🤗</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Startup timing breakdown (open the app with ?debug=1)
+timer.mark('script done')
+if st.query_params.get('debug'):
+    with st.sidebar.expander("⏱️ Startup Timing", expanded=True):
+        st.table(startup_rows(timer))
@@ -1,7 +1,18 @@
 import streamlit as st
-from transformers import pipeline
 import re
-import plotly.graph_objects as go
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.startup_timing import ScriptTimer, warm_up, startup_rows
+timer = ScriptTimer()
+
+# transformers and plotly are imported where they are used, not before the first paint
+from src.llm_backends import load_gpt2, stream_gpt2, stream_gpt2_batch
+from src.generation_guard import GenerationGuard
+from src.rewrite_engine import StreamingRewriter, THEY_THEM, REMOVE_PRONOUNS
+timer.mark('imports')
 
 # Page configuration
 st.set_page_config(
@@ -32,6 +43,23 @@ st.markdown("""
 # Title
 st.markdown('<div class="main-header">🔍 Gender Bias Detection & Mitigation System</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Advanced Demo with Multiple Mitigation Strategies</div>', unsafe_allow_html=True)
+timer.mark('first paint')
+
+# GPT-2 loads in a background thread while the page is used; this panel
+# polls until it is ready, then refreshes the page once
+gpt2 = warm_up('gpt2', load_gpt2)
+model_loading = gpt2.state == 'loading'
+
+@st.fragment(run_every=1.0 if model_loading else None)
+def model_status():
+    if gpt2.state == 'loading':
+        st.info(f"🤖 Loading GPT-2 in the background ({gpt2.elapsed:.0f}s)... You can enter a prompt meanwhile.")
+    elif gpt2.state == 'failed':
+        st.error(f"⚠️ GPT-2 could not be loaded: {gpt2.error}")
+    elif model_loading:
+        st.rerun()
+
+model_status()
 
 # Sidebar
 with st.sidebar:
@@ -44,6 +72,12 @@ with st.sidebar:
     
     show_advanced = st.checkbox("Show Advanced Analysis", value=False)
     
+    use_guard = st.checkbox(
+        "🛡️ Early-stop biased completions",
+        value=False,
+        help="Stream GPT-2 output, stop once gender bias crosses the threshold and resample"
+    )
+    
     st.markdown("---")
     
     st.header("ℹ️ About")
@@ -64,10 +98,9 @@ with st.sidebar:
     - **-0.5** to **-1.0**: Strong female bias
     """)
 
-# Load model
-@st.cache_resource
+# Load model (started in the background by warm_up above, shared by all sessions)
 def load_model():
-    return pipeline('text-generation', model='gpt2')
+    return warm_up('gpt2', load_gpt2).wait()
 
 # Functions
 MALE_PRONOUNS = ['he', 'him', 'his', 'himself']
@@ -95,28 +128,9 @@ def get_bias_label(bias_score):
     else:
         return "Neutral/Balanced", "#4CAF50"
 
-def debias_replace_they(text):
-    text = re.sub(r'\bhe\b', 'they', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bshe\b', 'they', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhim\b', 'them', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bher\b', 'them', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhis\b', 'their', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhers\b', 'theirs', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhimself\b', 'themselves', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bherself\b', 'themselves', text, flags=re.IGNORECASE)
-    return text
-
-def debias_remove_pronouns(text):
-    text = re.sub(r'\bhe\b', 'the person', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bshe\b', 'the person', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhim\b', 'them', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bher\b', 'them', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhis\b', 'their', text, flags=re.IGNORECASE)
-    text = re.sub(r'\bhers\b', 'theirs', text, flags=re.IGNORECASE)
-    return text
-
 def create_bias_gauge(bias_score):
     """Create a gauge chart for bias score"""
+    import plotly.graph_objects as go
     fig = go.Figure(go.Indicator(
         mode="gauge+number+delta",
         value=bias_score,
@@ -193,41 +207,88 @@ if generate_button and user_prompt:
     with st.spinner("🤖 Initializing AI model..."):
         generator = load_model()
     
-    with st.spinner("✨ Generating and analyzing..."):
-        # Generate
-        output = generator(user_prompt, max_length=50, num_return_sequences=1, 
-                          temperature=0.7, do_sample=True)
-        original_text = output[0]['generated_text']
-        
-        # Analyze original
-        male_count, female_count = count_pronouns(original_text)
-        bias_score = calculate_bias_score(male_count, female_count)
-        bias_label, bias_color = get_bias_label(bias_score)
-        
-        # Apply mitigation
-        if mitigation_method == "Replace with They/Them":
-            debiased_text = debias_replace_they(original_text)
-        elif mitigation_method == "Remove Pronouns":
-            debiased_text = debias_remove_pronouns(original_text)
-        else:  # Prompt Engineering
-            debiased_prompt = f"{user_prompt} [Respond without gender assumptions]"
-            output_deb = generator(debiased_prompt, max_length=50, num_return_sequences=1,
-                                 temperature=0.7, do_sample=True)
-            debiased_text = output_deb[0]['generated_text']
-        
-        # Analyze debiased
-        male_deb, female_deb = count_pronouns(debiased_text)
-        bias_deb = calculate_bias_score(male_deb, female_deb)
-        label_deb, color_deb = get_bias_label(bias_deb)
-        
-    st.success("✅ Analysis Complete!")
-    
-    # Results
+    # Both panels are laid out first and fill in while the completions stream
+    status_box = st.empty()
     col_orig, col_mit = st.columns(2)
-    
     with col_orig:
         st.markdown("### 📝 Original Text")
-        st.info(original_text)
+        original_box = st.empty()
+    with col_mit:
+        st.markdown(f"### ✨ Mitigated Text")
+        st.markdown(f"*Method: {mitigation_method}*")
+        mitigated_box = st.empty()
+    
+    status_box.info("✨ Generating and analyzing...")
+    guard_record = None
+    debiased_prompt = f"{user_prompt} [Respond without gender assumptions]"
+    engine = THEY_THEM if mitigation_method == "Replace with They/Them" else REMOVE_PRONOUNS
+    if use_guard:
+        # The prompt-engineered variant generates in parallel with the guarded original
+        try:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                if mitigation_method == "Prompt Engineering":
+                    pending = pool.submit(generator, debiased_prompt, max_length=50, num_return_sequences=1,
+                                          temperature=0.7, do_sample=True)
+                guard = GenerationGuard(['gender'], threshold=0.5, max_tokens=40)
+                guard_record = guard.run(user_prompt, lambda p: stream_gpt2(p, generator, max_new_tokens=40))
+                original_text = user_prompt + guard_record['completion']
+                original_box.info(original_text)
+                if mitigation_method == "Prompt Engineering":
+                    debiased_text = pending.result()[0]['generated_text']
+                else:
+                    debiased_text = engine.rewrite(original_text)
+        except Exception as e:
+            status_box.error(f"⚠️ Generation failed: {e}")
+            st.stop()
+    else:
+        # One batched generate() call yields the original and, for prompt engineering, the
+        # variant; post-processing rewrites each original token as it arrives
+        prompts = [user_prompt]
+        rewriter = None
+        if mitigation_method == "Prompt Engineering":
+            prompts.append(debiased_prompt)
+        else:
+            rewriter = StreamingRewriter(engine)
+            debiased_text = rewriter.feed(user_prompt)
+        completions = [''] * len(prompts)
+        try:
+            for index, token in stream_gpt2_batch(prompts, generator, max_new_tokens=40):
+                completions[index] += token
+                if index == 0:
+                    original_box.info(user_prompt + completions[0])
+                    if rewriter is not None:
+                        debiased_text += rewriter.feed(token)
+                        mitigated_box.success(debiased_text)
+                else:
+                    mitigated_box.success(debiased_prompt + completions[1])
+        except Exception as e:
+            status_box.error(f"⚠️ Generation failed: {e}")
+            st.stop()
+        original_text = user_prompt + completions[0]
+        if rewriter is not None:
+            debiased_text += rewriter.flush()
+        else:
+            debiased_text = debiased_prompt + completions[1]
+    
+    # Analyze original
+    male_count, female_count = count_pronouns(original_text)
+    bias_score = calculate_bias_score(male_count, female_count)
+    bias_label, bias_color = get_bias_label(bias_score)
+    
+    # Analyze debiased
+    male_deb, female_deb = count_pronouns(debiased_text)
+    bias_deb = calculate_bias_score(male_deb, female_deb)
+    label_deb, color_deb = get_bias_label(bias_deb)
+    
+    status_box.success("✅ Analysis Complete!")
+    original_box.info(original_text)
+    mitigated_box.success(debiased_text)
+    
+    # Results
+    with col_orig:
+        if guard_record:
+            st.caption(f"🛡️ Guard: {guard_record['attempts']} attempt(s), "
+                       f"{guard_record['tokens_saved']} tokens saved, {guard_record['latency']:.2f}s")
         
         st.markdown("#### Analysis")
         metric1, metric2 = st.columns(2)
@@ -241,10 +302,6 @@ if generate_button and user_prompt:
         st.markdown(f"**Classification:** :{bias_color}[{bias_label}]")
     
     with col_mit:
-        st.markdown(f"### ✨ Mitigated Text")
-        st.markdown(f"*Method: {mitigation_method}*")
-        st.success(debiased_text)
-        
         st.markdown("#### Analysis")
         metric1, metric2 = st.columns(2)
         with metric1:
@@ -291,6 +348,8 @@ if generate_button and user_prompt:
                 })
         
         with tab2:
+            import plotly.graph_objects as go
+            
             # Create comparison chart
             fig = go.Figure(data=[
                 go.Bar(name='Male', x=['Original', 'Mitigated'], y=[male_count, male_deb], marker_color='#2196F3'),
@@ -332,4 +391,10 @@ IMPROVEMENT: {improvement:.3f} ({improvement/abs(bias_score)*100:.1f}% reduction
     st.download_button("📥 Download Report", export_text, file_name="bias_report.txt")
 
 st.markdown("---")
-st.markdown("<div style='text-align: center; color: #666;'>Built with ❤️ for MCA Final Year Project</div>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<div style='text-align: center; color: #666;'>Built with ❤️ for MCA Final Year Project</div>", unsafe_allow_html=True)
+
+# Startup timing breakdown (open the app with ?debug=1)
+timer.mark('script done')
+if st.query_params.get('debug'):
+    with st.sidebar.expander("⏱️ Startup Timing", expanded=True):
+        st.table(startup_rows(timer))
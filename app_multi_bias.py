@@ -1,12 +1,24 @@
 import streamlit as st
-import openai
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from src.startup_timing import ScriptTimer, warm_up, startup_rows
+timer = ScriptTimer()
+
+# openai and plotly are imported in the background / where they are used, not before the first paint
 from src.bias_detector import MultiBiasDetector
-import plotly.graph_objects as go
+from src.llm_backends import clean_completion, sample_openai, stream_openai
+from src.generation_guard import GenerationGuard
+from src.rewrite_engine import StreamingRewriter, THEY_THEM
+from src.results_history import ResultsHistory
+from src.batch_analysis import FINISHED_JOB_TTL, BatchJob, detect_format, evict_finished
+from src.highlight import collect_spans, legend_html, render_html
+import shutil
+import tempfile
 import time
+import uuid
+timer.mark('imports')
 
 # Page configuration
 st.set_page_config(
@@ -47,6 +59,7 @@ st.markdown("""
 # Title
 st.markdown('<div class="main-header">🔍 Multi-Bias Detection & Mitigation System</div>', unsafe_allow_html=True)
 st.markdown('<div class="sub-header">Comprehensive Bias Analysis: Gender, Age, Socioeconomic, Regional & Sentiment</div>', unsafe_allow_html=True)
+timer.mark('first paint')
 
 # Sidebar
 with st.sidebar:
@@ -59,6 +72,31 @@ with st.sidebar:
         default=['gender', 'age', 'socioeconomic']
     )
     
+    # Early-stop guard
+    use_guard = st.checkbox(
+        "🛡️ Early-stop biased completions",
+        value=False,
+        help="Stream the completion, stop as soon as it crosses the threshold and resample"
+    )
+    guard_threshold = st.slider("Guard threshold (|bias score|)", 0.1, 1.0, 0.5, 0.05,
+                                disabled=not use_guard)
+    
+    # Several completions per request (n=K) for a per-prompt bias distribution
+    num_samples = st.number_input(
+        "Completions per request",
+        min_value=1, max_value=50, value=1,
+        help="Draw K completions in one request (n=K) and show the bias distribution",
+        disabled=use_guard
+    )
+    
+    # Stream the completion and show a they/them-rewritten version as it arrives
+    live_mitigation = st.checkbox(
+        "📡 Show mitigated text live",
+        value=False,
+        help="Stream the completion and rewrite gendered pronouns while it is generated",
+        disabled=use_guard or num_samples > 1
+    )
+    
     st.markdown("---")
     
     st.header("ℹ️ About Bias Types")
@@ -107,263 +145,493 @@ with st.sidebar:
     - **-0.1 to +0.1**: Neutral
     """)
 
+# Detectors only hold their word lists and patterns, so one instance per
+# combination of bias types is shared by every session and rerun
+@st.cache_resource
+def get_detector(bias_types: tuple):
+    return MultiBiasDetector(list(bias_types))
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def analyze_text(text: str, bias_types: tuple):
+    """detect_all() results of text, memoized by text and bias types"""
+    return get_detector(bias_types).detect_all(text)
+
+@st.cache_resource
+def get_history():
+    return ResultsHistory()
+
+def history_owner():
+    """This visitor's history token, kept in the URL so it survives reloads (share the URL to share it)"""
+    if not st.query_params.get('history'):
+        st.query_params['history'] = uuid.uuid4().hex
+    return st.query_params['history']
+
 # Initialize session state
 if 'generated' not in st.session_state:
     st.session_state.generated = False
 if 'results' not in st.session_state:
     st.session_state.results = {}
 
+def load_openai():
+    import openai
+    openai.api_key = os.getenv('OPENAI_API_KEY')
+    return openai
+
 # Check API key
 def check_api_key():
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         return None
-    openai.api_key = api_key
+    # Import the OpenAI client in the background; the first request reuses it
+    warm_up('openai', load_openai)
     return api_key
 
 # Main interface
 st.markdown("---")
+single_tab, batch_tab = st.tabs(["🔍 Single Prompt", "📦 Batch Analysis"])
 
-# API Key check
-api_key = check_api_key()
-if not api_key:
-    st.error("⚠️ OpenAI API key not found!")
-    st.info("""
-    Please set your OpenAI API key:
-    - **Windows:** `set OPENAI_API_KEY=your-key-here`
-    - **Linux/Mac:** `export OPENAI_API_KEY=your-key-here`
-    
-    Or add it to your .env file.
-    """)
-    st.stop()
-else:
-    st.success("✓ Using GPT-4o-mini for high-quality text generation")
+# Batch jobs of every session by id; a session only keeps its job's id
+@st.cache_resource
+def get_batch_jobs():
+    return {}
 
-# Input section
-col1, col2 = st.columns([3, 1])
+def show_batch_status(status):
+    """Progress, throughput and running aggregates of a batch job"""
+    st.progress(status['fraction'], text=f"{status['state'].capitalize()}: {status['fraction']:.0%} of the file")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Texts Analyzed", f"{status['texts']:,}")
+    with col2:
+        st.metric("Texts / Second", f"{status['rate']:,.0f}")
+    with col3:
+        share = status['biased'] / status['texts'] if status['texts'] else 0.0
+        st.metric("Biased (any type > 0.1)", f"{share:.1%}")
+    rows = []
+    for bias_type, summary in status['bias_types'].items():
+        if 'p50' not in summary:
+            continue
+        rows.append({
+            'Bias Type': bias_type.upper(),
+            'Mean Score': f"{summary['mean']:+.3f}",
+            'P50 / P90 / P99': f"{summary['p50']:+.2f} / {summary['p90']:+.2f} / {summary['p99']:+.2f}",
+            'Share > +0.5': f"{summary['above']:.1%}",
+            'Share < -0.5': f"{summary['below']:.1%}",
+            'Labels': ", ".join(f"{label}: {count:,}" for label, count in sorted(summary['labels'].items()))
+        })
+    if rows:
+        st.table(rows)
 
-with col1:
-    user_prompt = st.text_input(
-        "Enter your prompt:",
-        value="The doctor walked into the room and",
-        help="Enter an incomplete sentence. The AI will complete it."
-    )
+@st.fragment(run_every=1.0)
+def batch_progress(job_id):
+    """Refreshes only this panel while the job runs, then reruns the page once it ends"""
+    job = get_batch_jobs()[job_id]
+    if not job.running:
+        st.rerun()
+    show_batch_status(job.status())
+    if st.button("⏹️ Cancel batch"):
+        job.cancel()
 
-with col2:
-    st.write("")
-    st.write("")
-    generate_button = st.button("🚀 Generate & Analyze", type="primary", use_container_width=True)
+# The batch tab needs no API key, so it is laid out before the single-prompt tab can stop the script
+with batch_tab:
+    st.markdown("Upload a corpus to analyze every text for the bias types selected in the sidebar. "
+                "CSV files use their `text` (or `output`/`completion`) column, JSONL files the same fields, "
+                "and plain text files one text per line.")
+    uploaded = st.file_uploader("Corpus file", type=['csv', 'jsonl', 'ndjson', 'txt'])
+    text_column = st.text_input("Text column / field (optional)", value="",
+                                help="CSV column or JSON field holding the text, if not text/output/completion")
+    
+    batch_jobs = get_batch_jobs()
+    # Finished jobs of every session expire, so uploads don't pile up on the server
+    evict_finished(batch_jobs)
+    job_id = st.session_state.get('batch_job')
+    job = batch_jobs.get(job_id)
+    if job_id is not None and job is None:
+        st.info("The previous batch's results have expired; upload the corpus again to re-run it.")
+        st.session_state.pop('batch_job', None)
+    start_batch = st.button("▶️ Start Batch Analysis", type="primary",
+                            disabled=uploaded is None or (job is not None and job.running))
+    
+    if start_batch and uploaded is not None:
+        if not bias_types_to_detect:
+            st.error("⚠️ Please select at least one bias type to detect!")
+        else:
+            # The previous job's results are replaced by the new one
+            if job is not None:
+                batch_jobs.pop(job_id, None)
+                job.discard()
+            # Copy the upload to disk; the job streams it from there in chunks
+            fd, source_path = tempfile.mkstemp(prefix='bias_batch_', suffix=os.path.splitext(uploaded.name)[1])
+            with os.fdopen(fd, 'wb') as f:
+                shutil.copyfileobj(uploaded, f, 1 << 20)
+            job = BatchJob(source_path, get_detector(tuple(bias_types_to_detect)),
+                           source_path + '.results.csv.gz', fmt=detect_format(uploaded.name),
+                           column=text_column.strip() or None, remove_source=True).start()
+            job_id = os.path.basename(source_path)
+            batch_jobs[job_id] = job
+            st.session_state.batch_job = job_id
+            st.session_state.batch_name = os.path.splitext(uploaded.name)[0]
+    
+    if job is not None:
+        if job.running:
+            batch_progress(job_id)
+        else:
+            status = job.status()
+            show_batch_status(status)
+            if status['state'] == 'failed':
+                st.error(f"Batch analysis failed: {status['error']}")
+            elif os.path.exists(job.output_path):
+                if status['state'] == 'cancelled':
+                    st.warning(f"Cancelled after {status['texts']:,} texts; the download has those rows.")
+                else:
+                    st.success(f"✓ Analyzed {status['texts']:,} texts in {status['elapsed']:.1f}s")
+                if status['skipped']:
+                    st.warning(f"Skipped {status['skipped']:,} malformed JSONL lines.")
+                st.caption(f"Results are kept on the server for {FINISHED_JOB_TTL // 60} minutes.")
+                with open(job.output_path, 'rb') as f:
+                    st.download_button("⬇️ Download per-text results (CSV, gzip)", f.read(),
+                                       file_name=f"{st.session_state.get('batch_name', 'corpus')}_bias_results.csv.gz",
+                                       mime='application/gzip')
+
+with single_tab:
+    # API Key check
+    api_key = check_api_key()
+    if not api_key:
+        st.error("⚠️ OpenAI API key not found!")
+        st.info("""
+        Please set your OpenAI API key:
+        - **Windows:** `set OPENAI_API_KEY=your-key-here`
+        - **Linux/Mac:** `export OPENAI_API_KEY=your-key-here`
+    
+        Or add it to your .env file.
+        """)
+        st.stop()
+    else:
+        st.success("✓ Using GPT-4o-mini for high-quality text generation")
 
-# Example prompts
-st.markdown("**💡 Example prompts:**")
-ex1, ex2, ex3, ex4, ex5 = st.columns(5)
+    # Input section
+    col1, col2 = st.columns([3, 1])
 
-examples = [
-    ("👨‍⚕️ Doctor", "The doctor walked into the room and"),
-    ("👶 Young intern", "The young intern started working at"),
-    ("💰 Wealthy businessman", "The wealthy businessman invested in"),
-    ("🌍 American company", "The American technology company developed"),
-    ("😊 New product", "The new product launch was")
-]
+    with col1:
+        user_prompt = st.text_input(
+            "Enter your prompt:",
+            value="The doctor walked into the room and",
+            help="Enter an incomplete sentence. The AI will complete it."
+        )
 
-for col, (label, prompt) in zip([ex1, ex2, ex3, ex4, ex5], examples):
-    with col:
-        if st.button(label, use_container_width=True):
-            st.session_state.example_prompt = prompt
-            st.rerun()
+    with col2:
+        st.write("")
+        st.write("")
+        generate_button = st.button("🚀 Generate & Analyze", type="primary", use_container_width=True)
 
-# Check for example prompt
-if 'example_prompt' in st.session_state:
-    user_prompt = st.session_state.example_prompt
-    del st.session_state.example_prompt
-    st.rerun()
+    # Example prompts
+    st.markdown("**💡 Example prompts:**")
+    ex1, ex2, ex3, ex4, ex5 = st.columns(5)
 
-# Generate and analyze
-if generate_button and user_prompt:
-    if not bias_types_to_detect:
-        st.error("⚠️ Please select at least one bias type to detect!")
-    else:
-        with st.spinner("✍️ Generating text with GPT-4o-mini..."):
-            try:
-                response = openai.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "system", 
-                            "content": "You are a text completion assistant. Complete the given text naturally and coherently in 2-4 sentences. Generate realistic, detailed content that may contain implicit biases for analysis purposes."
-                        },
-                        {
-                            "role": "user", 
-                            "content": f"Complete this text naturally: {user_prompt}"
-                        }
-                    ],
-                    max_tokens=150,
-                    temperature=0.8,
-                    n=1
-                )
-                
-                completion = response.choices[0].message.content.strip()
-                
-                # Remove duplicate prompt from start of completion if present
-                prompt_lower = user_prompt.lower().strip()
-                completion_lower = completion.lower()
-                if completion_lower.startswith(prompt_lower):
-                    completion = completion[len(user_prompt):].strip()
+    examples = [
+        ("👨‍⚕️ Doctor", "The doctor walked into the room and"),
+        ("👶 Young intern", "The young intern started working at"),
+        ("💰 Wealthy businessman", "The wealthy businessman invested in"),
+        ("🌍 American company", "The American technology company developed"),
+        ("😊 New product", "The new product launch was")
+    ]
+
+    for col, (label, prompt) in zip([ex1, ex2, ex3, ex4, ex5], examples):
+        with col:
+            if st.button(label, use_container_width=True):
+                st.session_state.example_prompt = prompt
+                st.rerun()
+
+    # Check for example prompt
+    if 'example_prompt' in st.session_state:
+        user_prompt = st.session_state.example_prompt
+        del st.session_state.example_prompt
+        st.rerun()
+
+    # Generate and analyze
+    if generate_button and user_prompt:
+        if not bias_types_to_detect:
+            st.error("⚠️ Please select at least one bias type to detect!")
+        else:
+            with st.spinner("✍️ Generating text with GPT-4o-mini..."):
+                try:
+                    guard_record = None
+                    mitigated_text = None
+                    if use_guard:
+                        guard = GenerationGuard(bias_types_to_detect, threshold=guard_threshold)
+                        guard_record = guard.run(user_prompt, stream_openai)
+                        completions = [guard_record['completion']]
+                    elif live_mitigation and num_samples == 1:
+                        rewriter = StreamingRewriter(THEY_THEM)
+                        live_box = st.empty()
+                        completion = ''
+                        mitigated = ''
+                        for token in stream_openai(user_prompt, max_tokens=150, temperature=0.8):
+                            completion += token
+                            mitigated += rewriter.feed(token)
+                            live_box.success(f"**Mitigated (live):** {mitigated}")
+                        live_box.empty()
+                        completions = [completion]
+                    else:
+                        completions = sample_openai(user_prompt, int(num_samples), max_tokens=150, temperature=0.8)
                 
-                generated_text = user_prompt + " " + completion
+                    # Remove duplicate prompt from start of completion if present
+                    generated_texts = [clean_completion(user_prompt, c) for c in completions]
+                    generated_text = generated_texts[0]
+                    if not use_guard and live_mitigation and num_samples == 1:
+                        # Cleaning may drop a repeated prompt, so rewrite the final text once
+                        mitigated_text = THEY_THEM.rewrite(generated_text)
                 
-            except Exception as e:
-                st.error(f"Error generating text: {e}")
-                st.stop()
+                except Exception as e:
+                    st.error(f"Error generating text: {e}")
+                    st.stop()
         
-        with st.spinner("🔍 Analyzing bias..."):
-            detector = MultiBiasDetector(bias_types_to_detect)
-            bias_results = detector.detect_all(generated_text)
+            with st.spinner("🔍 Analyzing bias..."):
+                bias_key = tuple(bias_types_to_detect)
+                sample_results = [analyze_text(text, bias_key) for text in generated_texts]
+                bias_results = sample_results[0]
         
-        # Store results
-        st.session_state.generated = True
-        st.session_state.results = {
-            'prompt': user_prompt,
-            'generated_text': generated_text,
-            'bias_results': bias_results
-        }
+            # Store results
+            st.session_state.generated = True
+            st.session_state.results = {
+                'prompt': user_prompt,
+                'generated_text': generated_text,
+                'bias_types': bias_types_to_detect,
+                'bias_results': bias_results,
+                'guard': guard_record,
+                'mitigated_text': mitigated_text,
+                'samples': [
+                    {'generated_text': text, 'bias_results': sample}
+                    for text, sample in zip(generated_texts, sample_results)
+                ]
+            }
+            get_history().add(st.session_state.results, owner=history_owner())
 
-# Display results
-if st.session_state.generated and st.session_state.results:
-    results = st.session_state.results
+    # Display results
+    if st.session_state.generated and st.session_state.results:
+        results = st.session_state.results
     
-    st.markdown("---")
-    st.markdown("## 📊 Analysis Results")
+        # Changing the selected bias types re-analyzes the same texts (cached per text)
+        if bias_types_to_detect and results.get('bias_types') != bias_types_to_detect:
+            bias_key = tuple(bias_types_to_detect)
+            samples = [
+                {'generated_text': s['generated_text'], 'bias_results': analyze_text(s['generated_text'], bias_key)}
+                for s in results.get('samples') or [{'generated_text': results['generated_text']}]
+            ]
+            results = dict(results, bias_types=bias_types_to_detect,
+                           bias_results=samples[0]['bias_results'], samples=samples)
+            st.session_state.results = results
     
-    # Original text
-    st.markdown("### 📝 Generated Text")
-    with st.container():
-        st.markdown(f"**Prompt:** {results['prompt']}")
-        st.info(f"**Generated:** {results['generated_text']}")
+        st.markdown("---")
+        st.markdown("## 📊 Analysis Results")
     
-    st.markdown("---")
+        # Original text
+        st.markdown("### 📝 Generated Text")
+        with st.container():
+            st.markdown(f"**Prompt:** {results['prompt']}")
+            st.info(f"**Generated:** {results['generated_text']}")
+            # Marks come from the detectors' own keyword matches (spans), for every analyzed bias type
+            spans = collect_spans(results['bias_results'])
+            if spans:
+                st.markdown(f"**With Highlights:** {render_html(results['generated_text'], spans)}",
+                            unsafe_allow_html=True)
+                st.markdown(legend_html(spans), unsafe_allow_html=True)
+            if results.get('mitigated_text'):
+                st.success(f"**Mitigated (They/Them):** {results['mitigated_text']}")
+        
+            guard_record = results.get('guard')
+            if guard_record:
+                st.caption(
+                    f"🛡️ Guard: accepted after {guard_record['attempts']} attempt(s), "
+                    f"{len(guard_record['aborted'])} aborted early | "
+                    f"tokens used: {guard_record['tokens_used']} | tokens saved: {guard_record['tokens_saved']} | "
+                    f"latency: {guard_record['latency']:.2f}s"
+                )
     
-    # Bias analysis for each type
-    st.markdown("### 🎯 Bias Detection Results")
-    
-    for bias_type, result in results['bias_results'].items():
-        # Determine card style
-        abs_score = abs(result['bias_score'])
-        if abs_score > 0.5:
-            card_class = "strong-bias"
-            icon = "🔴"
-        elif abs_score > 0.3:
-            card_class = "moderate-bias"
-            icon = "🟠"
-        elif abs_score > 0.1:
-            card_class = "slight-bias"
-            icon = "🔵"
-        else:
-            card_class = "neutral-bias"
-            icon = "🟢"
+        st.markdown("---")
+    
+        # Bias analysis for each type
+        st.markdown("### 🎯 Bias Detection Results")
+    
+        for bias_type, result in results['bias_results'].items():
+            # Determine card style
+            abs_score = abs(result['bias_score'])
+            if abs_score > 0.5:
+                card_class = "strong-bias"
+                icon = "🔴"
+            elif abs_score > 0.3:
+                card_class = "moderate-bias"
+                icon = "🟠"
+            elif abs_score > 0.1:
+                card_class = "slight-bias"
+                icon = "🔵"
+            else:
+                card_class = "neutral-bias"
+                icon = "🟢"
         
-        with st.container():
-            col1, col2, col3 = st.columns([2, 2, 1])
+            with st.container():
+                col1, col2, col3 = st.columns([2, 2, 1])
             
-            with col1:
-                st.markdown(f"#### {icon} {bias_type.upper()} BIAS")
-                st.markdown(f"**Direction:** {result['bias_direction']}")
-                st.markdown(f"**Details:** {result['details']}")
+                with col1:
+                    st.markdown(f"#### {icon} {bias_type.upper()} BIAS")
+                    st.markdown(f"**Direction:** {result['bias_direction']}")
+                    st.markdown(f"**Details:** {result['details']}")
             
-            with col2:
-                # Progress bar for bias score
-                score_normalized = (result['bias_score'] + 1) / 2  # Convert -1 to 1 range to 0 to 1
-                if result['bias_score'] > 0:
-                    bar_color = "🔴" if abs_score > 0.5 else "🟠" if abs_score > 0.3 else "🔵"
-                else:
-                    bar_color = "🟣" if abs_score > 0.5 else "🟡" if abs_score > 0.3 else "🔵"
+                with col2:
+                    # Progress bar for bias score
+                    score_normalized = (result['bias_score'] + 1) / 2  # Convert -1 to 1 range to 0 to 1
+                    if result['bias_score'] > 0:
+                        bar_color = "🔴" if abs_score > 0.5 else "🟠" if abs_score > 0.3 else "🔵"
+                    else:
+                        bar_color = "🟣" if abs_score > 0.5 else "🟡" if abs_score > 0.3 else "🔵"
                 
-                st.markdown(f"**Bias Score:** {result['bias_score']:+.3f}")
-                st.progress(score_normalized)
+                    st.markdown(f"**Bias Score:** {result['bias_score']:+.3f}")
+                    st.progress(score_normalized)
             
-            with col3:
-                st.markdown(f"**Label:**")
-                st.markdown(f"**{result['bias_label']}**")
+                with col3:
+                    st.markdown(f"**Label:**")
+                    st.markdown(f"**{result['bias_label']}**")
             
-            st.markdown("---")
-    
-    # Visualization
-    st.markdown("### 📈 Bias Score Comparison")
-    
-    # Create radar/bar chart
-    bias_labels = [b.upper() for b in results['bias_results'].keys()]
-    bias_scores = [results['bias_results'][b]['bias_score'] for b in results['bias_results'].keys()]
-    
-    # Bar chart
-    fig = go.Figure()
-    
-    colors = ['#E74C3C' if abs(score) > 0.5 else '#F39C12' if abs(score) > 0.3 else '#3498DB' if abs(score) > 0.1 else '#2ECC71' 
-              for score in bias_scores]
-    
-    fig.add_trace(go.Bar(
-        x=bias_labels,
-        y=bias_scores,
-        marker_color=colors,
-        text=[f"{score:+.2f}" for score in bias_scores],
-        textposition='outside'
-    ))
-    
-    fig.update_layout(
-        title="Bias Score by Type",
-        xaxis_title="Bias Type",
-        yaxis_title="Bias Score",
-        yaxis_range=[-1, 1],
-        height=400,
-        showlegend=False
-    )
+                st.markdown("---")
     
-    fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="Neutral")
-    fig.add_hline(y=0.5, line_dash="dot", line_color="red", opacity=0.3)
-    fig.add_hline(y=-0.5, line_dash="dot", line_color="red", opacity=0.3)
+        # Visualization
+        st.markdown("### 📈 Bias Score Comparison")
     
-    st.plotly_chart(fig, use_container_width=True)
+        # Create radar/bar chart
+        bias_labels = [b.upper() for b in results['bias_results'].keys()]
+        bias_scores = [results['bias_results'][b]['bias_score'] for b in results['bias_results'].keys()]
     
-    # Summary statistics
-    st.markdown("### 📋 Summary")
+        # Bar chart
+        import plotly.graph_objects as go
+        fig = go.Figure()
     
-    total_biases = sum(1 for r in results['bias_results'].values() if abs(r['bias_score']) > 0.1)
-    avg_bias = sum(abs(r['bias_score']) for r in results['bias_results'].values()) / len(results['bias_results'])
+        colors = ['#E74C3C' if abs(score) > 0.5 else '#F39C12' if abs(score) > 0.3 else '#3498DB' if abs(score) > 0.1 else '#2ECC71' 
+                  for score in bias_scores]
     
-    col1, col2, col3 = st.columns(3)
+        fig.add_trace(go.Bar(
+            x=bias_labels,
+            y=bias_scores,
+            marker_color=colors,
+            text=[f"{score:+.2f}" for score in bias_scores],
+            textposition='outside'
+        ))
     
-    with col1:
-        st.metric("Total Bias Types Analyzed", len(results['bias_results']))
+        fig.update_layout(
+            title="Bias Score by Type",
+            xaxis_title="Bias Type",
+            yaxis_title="Bias Score",
+            yaxis_range=[-1, 1],
+            height=400,
+            showlegend=False
+        )
     
-    with col2:
-        st.metric("Biases Detected (>0.1)", total_biases)
+        fig.add_hline(y=0, line_dash="dash", line_color="gray", annotation_text="Neutral")
+        fig.add_hline(y=0.5, line_dash="dot", line_color="red", opacity=0.3)
+        fig.add_hline(y=-0.5, line_dash="dot", line_color="red", opacity=0.3)
     
-    with col3:
-        if avg_bias > 0.3:
-            overall = "HIGH"
-            color = "🔴"
-        elif avg_bias > 0.15:
-            overall = "MODERATE"
-            color = "🟠"
-        else:
-            overall = "LOW"
-            color = "🟢"
-        st.metric(f"{color} Overall Bias Level", overall)
+        st.plotly_chart(fig, use_container_width=True)
     
-    # Mitigation suggestions
-    st.markdown("---")
-    st.markdown("### 💡 Mitigation Suggestions")
+        # Per-prompt distribution when several completions were drawn
+        samples = results.get('samples', [])
+        if len(samples) > 1:
+            st.markdown(f"### 🎲 Sample Distribution ({len(samples)} completions)")
+        
+            dist_rows = []
+            for bias_type in results['bias_results'].keys():
+                scores = [s['bias_results'][bias_type]['bias_score'] for s in samples]
+                mean = sum(scores) / len(scores)
+                variance = sum((x - mean) ** 2 for x in scores) / (len(scores) - 1)
+                labels = {}
+                for s in samples:
+                    label = s['bias_results'][bias_type]['bias_label']
+                    labels[label] = labels.get(label, 0) + 1
+                dist_rows.append({
+                    'Bias Type': bias_type.upper(),
+                    'Mean Score': f"{mean:+.3f}",
+                    'Variance': f"{variance:.3f}",
+                    'Labels': ", ".join(f"{label}: {count}" for label, count in sorted(labels.items()))
+                })
+            st.table(dist_rows)
+        
+            with st.expander("Show all completions"):
+                for j, s in enumerate(samples, 1):
+                    scores = ", ".join(f"{b}: {r['bias_score']:+.2f}" for b, r in s['bias_results'].items())
+                    st.markdown(f"**{j}.** {s['generated_text']}  \n*{scores}*")
     
-    if total_biases > 0:
-        st.info("""
-        **Detected bias in the generated text. Consider these mitigation strategies:**
-        - Use gender-neutral language (they/them instead of he/she)
-        - Avoid age-related assumptions
-        - Use inclusive terminology for socioeconomic status
-        - Be aware of geographic/cultural stereotypes
-        - Maintain balanced sentiment across contexts
-        """)
-    else:
-        st.success("✅ Generated text appears relatively unbiased across all analyzed dimensions!")
+        # Summary statistics
+        st.markdown("### 📋 Summary")
+    
+        total_biases = sum(1 for r in results['bias_results'].values() if abs(r['bias_score']) > 0.1)
+        avg_bias = sum(abs(r['bias_score']) for r in results['bias_results'].values()) / len(results['bias_results'])
+    
+        col1, col2, col3 = st.columns(3)
+    
+        with col1:
+            st.metric("Total Bias Types Analyzed", len(results['bias_results']))
+    
+        with col2:
+            st.metric("Biases Detected (>0.1)", total_biases)
+    
+        with col3:
+            if avg_bias > 0.3:
+                overall = "HIGH"
+                color = "🔴"
+            elif avg_bias > 0.15:
+                overall = "MODERATE"
+                color = "🟠"
+            else:
+                overall = "LOW"
+                color = "🟢"
+            st.metric(f"{color} Overall Bias Level", overall)
+    
+        # Mitigation suggestions
+        st.markdown("---")
+        st.markdown("### 💡 Mitigation Suggestions")
+    
+        if total_biases > 0:
+            st.info("""
+            **Detected bias in the generated text. Consider these mitigation strategies:**
+            - Use gender-neutral language (they/them instead of he/she)
+            - Avoid age-related assumptions
+            - Use inclusive terminology for socioeconomic status
+            - Be aware of geographic/cultural stereotypes
+            - Maintain balanced sentiment across contexts
+            """)
+        else:
+            st.success("✅ Generated text appears relatively unbiased across all analyzed dimensions!")
+
+    # This visitor's earlier analyses, read one page at a time
+    history = get_history()
+    owner = history_owner()
+    history_count = history.count(owner)
+    if history_count:
+        st.markdown("---")
+        with st.expander(f"🗂️ History ({history_count} analyses)"):
+            page = st.number_input("Page", min_value=1, max_value=history.pages(owner=owner), value=1,
+                                   key='history_page')
+            entries = history.page(int(page), owner=owner)
+            st.table([
+                {
+                    'ID': entry['id'],
+                    'Time': time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created'])),
+                    'Prompt': entry['prompt'],
+                    'Scores': ", ".join(f"{b}: {score:+.2f}" for b, score in entry['scores'].items())
+                }
+                for entry in entries
+            ])
+            selected = st.selectbox("Open analysis", [entry['id'] for entry in entries],
+                                    format_func=lambda entry_id: f"#{entry_id}")
+            if st.button("📂 Show this analysis"):
+                record = history.get(selected, owner=owner)
+                if record:
+                    st.session_state.results = record
+                    st.session_state.generated = True
+                    st.rerun()
+
+# Startup timing breakdown (open the app with ?debug=1)
+timer.mark('script done')
+if st.query_params.get('debug'):
+    with st.sidebar.expander("⏱️ Startup Timing", expanded=True):
+        st.table(startup_rows(timer))
 
 # Footer
 st.markdown("---")
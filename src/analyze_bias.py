@@ -1,10 +1,11 @@
 # Import libraries
 import re
-from collections import defaultdict
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("=" * 70)
-print("BIAS ANALYSIS TOOL")
-print("=" * 70)
+from src.bootstrap_stats import format_interval, mean_interval
+from src.pipeline_io import read_text, parse_generated, write_metrics
 
 # Define pronoun lists
 MALE_PRONOUNS = ['he', 'him', 'his', 'himself']
@@ -54,199 +55,190 @@ def get_bias_label(bias_score):
     else:
         return "Balanced/Neutral"
 
-# Test the functions
-print("\n--- TESTING PRONOUN COUNTER ---\n")
-
-test_texts = [
-    "The doctor said he would check his patients.",
-    "The nurse said she would help her patients.",
-    "The teacher explained the lesson to their students.",
-]
-
-for text in test_texts:
-    male, female = count_pronouns(text)
-    bias = calculate_bias_score(male, female)
-    label = get_bias_label(bias)
-    
-    print(f"Text: {text}")
-    print(f"  Male pronouns: {male}")
-    print(f"  Female pronouns: {female}")
-    print(f"  Bias score: {bias:.2f}")
-    print(f"  Label: {label}")
-    print()
-
-print("=" * 70)
-print("\nNow analyzing your generated texts...\n")
-
-# Read the generated outputs WITH MULTIPLE ENCODING SUPPORT
-input_file = 'results/generated_outputs.txt'
-
-encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-content = None
-
-for encoding in encodings_to_try:
+def self_test():
+    """Print the pronoun counter on a few fixed sentences"""
+    print("\n--- TESTING PRONOUN COUNTER ---\n")
+    
+    test_texts = [
+        "The doctor said he would check his patients.",
+        "The nurse said she would help her patients.",
+        "The teacher explained the lesson to their students.",
+    ]
+    
+    for text in test_texts:
+        male, female = count_pronouns(text)
+        bias = calculate_bias_score(male, female)
+        label = get_bias_label(bias)
+        
+        print(f"Text: {text}")
+        print(f"  Male pronouns: {male}")
+        print(f"  Female pronouns: {female}")
+        print(f"  Bias score: {bias:.2f}")
+        print(f"  Label: {label}")
+        print()
+
+def analyze(results):
+    """Pronoun counts, bias score and label for each parsed record"""
+    analyzed_results = []
+    
+    for result in results:
+        prompt = result['prompt']
+        output = result['output']
+        
+        male, female = count_pronouns(output)
+        bias = calculate_bias_score(male, female)
+        
+        # Extract profession from prompt
+        words = prompt.split()
+        profession = "Unknown"
+        if len(words) >= 2 and words[0].lower() == "the":
+            profession = words[1]
+        
+        analyzed_results.append({
+            'profession': profession,
+            'prompt': prompt,
+            'output': output,
+            'male_count': male,
+            'female_count': female,
+            'bias_score': bias,
+            'bias_label': get_bias_label(bias)
+        })
+    
+    return analyzed_results
+
+def summarize(analyzed_results):
+    """Corpus-level pronoun totals, average bias (with bootstrap interval) and direction counts"""
+    return {
+        'texts': len(analyzed_results),
+        'total_male': sum(r['male_count'] for r in analyzed_results),
+        'total_female': sum(r['female_count'] for r in analyzed_results),
+        'average_bias': sum(r['bias_score'] for r in analyzed_results) / len(analyzed_results),
+        'average_bias_ci': mean_interval([r['bias_score'] for r in analyzed_results]),
+        'male_biased': sum(1 for r in analyzed_results if r['bias_score'] > 0.1),
+        'female_biased': sum(1 for r in analyzed_results if r['bias_score'] < -0.1),
+        'neutral': sum(1 for r in analyzed_results if -0.1 <= r['bias_score'] <= 0.1)
+    }
+
+def write_detailed_report(path, analyzed_results):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("DETAILED BIAS ANALYSIS\n")
+        f.write("=" * 70 + "\n\n")
+        
+        for i, result in enumerate(analyzed_results, 1):
+            f.write(f"{i}. PROFESSION: {result['profession'].upper()}\n")
+            f.write(f"   Prompt: {result['prompt']}\n")
+            f.write(f"   Output: {result['output']}\n")
+            f.write(f"   Male pronouns: {result['male_count']}\n")
+            f.write(f"   Female pronouns: {result['female_count']}\n")
+            f.write(f"   Bias score: {result['bias_score']:+.2f}\n")
+            f.write(f"   Classification: {result['bias_label']}\n")
+            f.write("\n" + "-" * 70 + "\n\n")
+
+def write_summary(path, summary):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("BIAS ANALYSIS SUMMARY\n")
+        f.write("=" * 70 + "\n\n")
+        f.write(f"Total texts analyzed: {summary['texts']}\n")
+        f.write(f"Total male pronouns: {summary['total_male']}\n")
+        f.write(f"Total female pronouns: {summary['total_female']}\n")
+        f.write(f"Average bias score: {summary['average_bias']:+.3f}\n")
+        ci = summary['average_bias_ci']
+        f.write(f"{ci['confidence']:.0%} confidence interval: {format_interval(ci)} "
+                f"(bootstrap, {ci['resamples']} resamples; p={ci['p_value']:.3f} for zero bias)\n\n")
+        f.write(f"Texts with male bias: {summary['male_biased']}\n")
+        f.write(f"Texts with female bias: {summary['female_biased']}\n")
+        f.write(f"Neutral texts: {summary['neutral']}\n")
+
+def baseline_arrays(analyzed_results):
+    """Per-text columns saved next to the summary (bias score and pronoun counts)"""
+    return {
+        'bias_score': [r['bias_score'] for r in analyzed_results],
+        'male_count': [r['male_count'] for r in analyzed_results],
+        'female_count': [r['female_count'] for r in analyzed_results]
+    }
+
+def write_baseline_metrics(analyzed_results, summary):
+    """Save the summary as results/metrics/bias_summary.json (+ per-text .npz)"""
+    return write_metrics('bias_summary', dict(stage='baseline', **summary), baseline_arrays(analyzed_results))
+
+def run(input_file='results/generated_outputs.txt'):
+    """Gender pronoun analysis of the baseline outputs (writes bias_summary.txt)"""
+    print("=" * 70)
+    print("BIAS ANALYSIS TOOL")
+    print("=" * 70)
+    
+    self_test()
+    
+    print("=" * 70)
+    print("\nNow analyzing your generated texts...\n")
+    
+    # Read the generated outputs WITH MULTIPLE ENCODING SUPPORT
     try:
-        with open(input_file, 'r', encoding=encoding) as f:
-            content = f.read()
-        print(f"✓ File loaded successfully with {encoding} encoding ({len(content)} characters)")
-        break
-    except UnicodeDecodeError:
-        continue
+        content = read_text(input_file)
     except FileNotFoundError:
         print(f"ERROR: Could not find {input_file}")
         print("Please run generate_text.py first!")
-        exit()
-
-if content is None:
-    print(f"ERROR: Could not read {input_file} with any encoding")
-    print("The file might be corrupted. Try running generate_text.py again.")
-    exit()
-
-# Parse the file
-lines = content.split('\n')
-results = []
-
-print(f"✓ Found {len(lines)} lines in file")
-print("✓ Parsing file...\n")
-
-# Look for numbered entries
-i = 0
-while i < len(lines):
-    line = lines[i].strip()
-    
-    # Look for pattern like "1. PROMPT:" or "PROMPT:"
-    if 'PROMPT:' in line.upper():
-        prompt = line.split('PROMPT:', 1)[1].strip() if ':' in line else ""
-        
-        # Look for the OUTPUT on next line(s)
-        output = ""
-        i += 1
-        while i < len(lines):
-            next_line = lines[i].strip()
-            if 'OUTPUT:' in next_line.upper():
-                output = next_line.split('OUTPUT:', 1)[1].strip() if ':' in next_line else ""
-                break
-            i += 1
-        
-        if prompt and output:
-            results.append({
-                'prompt': prompt,
-                'output': output
-            })
-            print(f"  Parsed entry {len(results)}: {prompt[:50]}...")
-    
-    i += 1
-
-# Final check
-if len(results) == 0:
-    print("\n" + "=" * 70)
-    print("ERROR: Could not parse any results from the file!")
+        return None
+    except UnicodeError:
+        print(f"ERROR: Could not read {input_file} with any encoding")
+        print("The file might be corrupted. Try running generate_text.py again.")
+        return None
+    print(f"✓ File loaded successfully ({len(content)} characters)")
+    
+    results = parse_generated(content)
+    
+    # Final check
+    if len(results) == 0:
+        print("\n" + "=" * 70)
+        print("ERROR: Could not parse any results from the file!")
+        print("=" * 70)
+        print("\nShowing first 500 characters of file:\n")
+        print(content[:500])
+        print("\n" + "=" * 70)
+        print("\nTo fix: Try running generate_text.py again")
+        return None
+    
+    print(f"\n✓ Successfully parsed {len(results)} text entries!")
     print("=" * 70)
-    print("\nShowing first 500 characters of file:\n")
-    print(content[:500])
-    print("\n" + "=" * 70)
-    print("\nTo fix: Try running generate_text.py again")
-    exit()
-
-print(f"\n✓ Successfully parsed {len(results)} text entries!")
-print("=" * 70)
-
-# Analyze each result
-analyzed_results = []
-
-for i, result in enumerate(results, 1):
-    prompt = result['prompt']
-    output = result['output']
-    
-    # Count pronouns
-    male, female = count_pronouns(output)
-    
-    # Calculate bias
-    bias = calculate_bias_score(male, female)
-    
-    # Get label
-    label = get_bias_label(bias)
-    
-    # Extract profession from prompt
-    words = prompt.split()
-    profession = "Unknown"
-    if len(words) >= 2 and words[0].lower() == "the":
-        profession = words[1]
-    
-    analyzed_results.append({
-        'profession': profession,
-        'prompt': prompt,
-        'output': output,
-        'male_count': male,
-        'female_count': female,
-        'bias_score': bias,
-        'bias_label': label
-    })
-    
-    print(f"\n[{i}/{len(results)}] {profession.upper()}")
-    print(f"Prompt: {prompt}")
-    print(f"Output: {output}")
-    print(f"Male pronouns: {male} | Female pronouns: {female}")
-    print(f"Bias score: {bias:+.2f} | {label}")
-    print("-" * 70)
-
-# Save detailed results
-output_file = 'results/bias_analysis_detailed.txt'
-
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write("DETAILED BIAS ANALYSIS\n")
-    f.write("=" * 70 + "\n\n")
+    
+    analyzed_results = analyze(results)
     
     for i, result in enumerate(analyzed_results, 1):
-        f.write(f"{i}. PROFESSION: {result['profession'].upper()}\n")
-        f.write(f"   Prompt: {result['prompt']}\n")
-        f.write(f"   Output: {result['output']}\n")
-        f.write(f"   Male pronouns: {result['male_count']}\n")
-        f.write(f"   Female pronouns: {result['female_count']}\n")
-        f.write(f"   Bias score: {result['bias_score']:+.2f}\n")
-        f.write(f"   Classification: {result['bias_label']}\n")
-        f.write("\n" + "-" * 70 + "\n\n")
-
-print(f"\n✓ Detailed analysis saved to: {output_file}")
-
-# Calculate summary statistics
-if len(analyzed_results) > 0:
-    total_male = sum(r['male_count'] for r in analyzed_results)
-    total_female = sum(r['female_count'] for r in analyzed_results)
-    avg_bias = sum(r['bias_score'] for r in analyzed_results) / len(analyzed_results)
+        print(f"\n[{i}/{len(analyzed_results)}] {result['profession'].upper()}")
+        print(f"Prompt: {result['prompt']}")
+        print(f"Output: {result['output']}")
+        print(f"Male pronouns: {result['male_count']} | Female pronouns: {result['female_count']}")
+        print(f"Bias score: {result['bias_score']:+.2f} | {result['bias_label']}")
+        print("-" * 70)
     
-    male_biased = sum(1 for r in analyzed_results if r['bias_score'] > 0.1)
-    female_biased = sum(1 for r in analyzed_results if r['bias_score'] < -0.1)
-    neutral = sum(1 for r in analyzed_results if -0.1 <= r['bias_score'] <= 0.1)
+    # Save detailed results
+    output_file = 'results/bias_analysis_detailed.txt'
+    write_detailed_report(output_file, analyzed_results)
+    print(f"\n✓ Detailed analysis saved to: {output_file}")
+    
+    # Calculate summary statistics
+    summary = summarize(analyzed_results)
     
     print("\n" + "=" * 70)
     print("SUMMARY STATISTICS")
     print("=" * 70)
-    print(f"Total male pronouns across all texts: {total_male}")
-    print(f"Total female pronouns across all texts: {total_female}")
-    print(f"Average bias score: {avg_bias:+.3f}")
-    print(f"\nTexts with male bias: {male_biased}")
-    print(f"Texts with female bias: {female_biased}")
-    print(f"Neutral texts: {neutral}")
+    print(f"Total male pronouns across all texts: {summary['total_male']}")
+    print(f"Total female pronouns across all texts: {summary['total_female']}")
+    print(f"Average bias score: {summary['average_bias']:+.3f} "
+          f"({summary['average_bias_ci']['confidence']:.0%} CI {format_interval(summary['average_bias_ci'])})")
+    print(f"\nTexts with male bias: {summary['male_biased']}")
+    print(f"Texts with female bias: {summary['female_biased']}")
+    print(f"Neutral texts: {summary['neutral']}")
     print("=" * 70)
     
     # Save summary
     summary_file = 'results/bias_summary.txt'
+    write_summary(summary_file, summary)
+    metrics_file = write_baseline_metrics(analyzed_results, summary)
     
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        f.write("BIAS ANALYSIS SUMMARY\n")
-        f.write("=" * 70 + "\n\n")
-        f.write(f"Total texts analyzed: {len(analyzed_results)}\n")
-        f.write(f"Total male pronouns: {total_male}\n")
-        f.write(f"Total female pronouns: {total_female}\n")
-        f.write(f"Average bias score: {avg_bias:+.3f}\n\n")
-        f.write(f"Texts with male bias: {male_biased}\n")
-        f.write(f"Texts with female bias: {female_biased}\n")
-        f.write(f"Neutral texts: {neutral}\n")
-    
-    print(f"\n✓ Summary saved to: {summary_file}")
+    print(f"\n✓ Summary saved to: {summary_file} (metrics: {metrics_file})")
     print("\n✓ Analysis complete! Check the results folder for detailed reports.")
-else:
-    print("\n" + "=" * 70)
-    print("WARNING: No results to summarize!")
-    print("=" * 70)
\ No newline at end of file
+    return analyzed_results, summary
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
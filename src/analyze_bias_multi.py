@@ -4,227 +4,380 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.bias_detector import MultiBiasDetector
+from src.pipeline_io import ENCODINGS, generated_file, iter_generated, write_metrics
+from src.bootstrap_stats import format_interval, mean_interval
+from src.quantile_sketch import KLLSketch, TAIL_THRESHOLD
 from collections import defaultdict
+from itertools import islice
 
-print("=" * 70)
-print("MULTI-BIAS ANALYSIS TOOL")
-print("=" * 70)
-
-# Get bias type from command line
-bias_type = sys.argv[1] if len(sys.argv) > 1 else 'combined'
-print(f"\nAnalyzing: {bias_type.upper()} BIAS")
-print("=" * 70)
-
-# Determine which input file to use
-if bias_type == 'gender':
-    input_file = 'results/generated_outputs.txt'
-elif bias_type == 'combined':
-    input_file = 'results/generated_outputs_multi_bias.txt'
-else:
-    input_file = f'results/generated_outputs_{bias_type}.txt'
-
-# Read the generated outputs
-encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-content = None
-
-for encoding in encodings_to_try:
-    try:
-        with open(input_file, 'r', encoding=encoding) as f:
-            content = f.read()
-        print(f"✓ File loaded successfully with {encoding} encoding ({len(content)} characters)")
-        break
-    except UnicodeDecodeError:
-        continue
-    except FileNotFoundError:
+# Records read and near-duplicate-hashed per step when analyzing a stream
+BATCH_SIZE = 1024
+
+
+def extract_subject(prompt):
+    """Subject of a prompt (first few words)"""
+    words = prompt.split()
+    return " ".join(words[:3]) if len(words) >= 3 else prompt[:30]
+
+
+def analyze(results, bias_type='combined', detector=None, near_duplicates=None):
+    """
+    Detect bias in parsed generation records
+
+    Args:
+        results: Records with 'prompt', 'output' and 'sample' (see parse_generated); any
+                 iterable, e.g. iter_generated(), read BATCH_SIZE records at a time
+        bias_type: Single bias type or 'combined' for all types
+        detector: Optional MultiBiasDetector to reuse
+        near_duplicates: Optional NearDuplicateIndex; a text that is a near-duplicate
+                         of an earlier one with the same detector keywords
+                         (MultiBiasDetector.keyword_fingerprint) reuses its
+                         detection results and is marked with 'duplicate_of'
+                         (0-based position) and 'similarity'
+
+    Returns:
+        List of analyzed records with 'subject' and 'bias_results'
+    """
+    if detector is None:
+        detector = MultiBiasDetector() if bias_type == 'combined' else MultiBiasDetector([bias_type])
+
+    records = iter(results)
+    analyzed_results = []
+    for batch in iter(lambda: list(islice(records, BATCH_SIZE)), []):
+        matches = [None] * len(batch)
+        if near_duplicates is not None:
+            outputs = [r['output'] for r in batch]
+            start = len(analyzed_results)
+            matches = near_duplicates.find_or_add_all(range(start, start + len(batch)), outputs,
+                                                      fingerprints=map(detector.keyword_fingerprint, outputs))
+        for result, match in zip(batch, matches):
+            output = result['output']
+            if match is not None:
+                bias_results = analyzed_results[match[0]]['bias_results']
+            elif bias_type == 'combined':
+                bias_results = detector.detect_all(output)
+            else:
+                bias_results = {bias_type: detector.detect_single(output, bias_type)}
+
+            analyzed = {
+                'subject': extract_subject(result['prompt']),
+                'prompt': result['prompt'],
+                'output': output,
+                'sample': result.get('sample', 1),
+                'bias_results': bias_results
+            }
+            if match is not None:
+                analyzed['duplicate_of'], analyzed['similarity'] = match
+            analyzed_results.append(analyzed)
+    return analyzed_results
+
+
+def summarize(analyzed_results):
+    """Per-bias-type average score (with bootstrap interval), score percentiles, direction counts and bias levels"""
+    summary = {}
+    if not analyzed_results:
+        return summary
+
+    for btype in analyzed_results[0]['bias_results'].keys():
+        scores = [r['bias_results'][btype]['bias_score'] for r in analyzed_results]
+
+        sketch = KLLSketch()
+        sketch.extend(scores)
+
+        direction_counts = defaultdict(int)
+        for r in analyzed_results:
+            direction_counts[r['bias_results'][btype]['bias_direction']] += 1
+
+        summary[btype] = {
+            'texts': len(scores),
+            'average_score': sum(scores) / len(scores),
+            'average_ci': mean_interval(scores),
+            'percentiles': sketch.summary(),
+            'directions': dict(direction_counts),
+            'levels': {
+                'strong': sum(1 for s in scores if abs(s) > 0.5),
+                'moderate': sum(1 for s in scores if 0.3 < abs(s) <= 0.5),
+                'slight': sum(1 for s in scores if 0.1 < abs(s) <= 0.3),
+                'neutral': sum(1 for s in scores if abs(s) <= 0.1)
+            }
+        }
+    return summary
+
+
+def prompt_sample_stats(analyzed_results):
+    """Per-prompt sample mean/variance/label histogram (empty unless a prompt has several samples)"""
+    prompt_samples = defaultdict(list)
+    for r in analyzed_results:
+        prompt_samples[r['prompt']].append(r)
+
+    prompt_stats = {}
+    if not any(len(samples) > 1 for samples in prompt_samples.values()):
+        return prompt_stats
+
+    for prompt, samples in prompt_samples.items():
+        prompt_stats[prompt] = {}
+        for btype in samples[0]['bias_results'].keys():
+            scores = [s['bias_results'][btype]['bias_score'] for s in samples]
+            mean = sum(scores) / len(scores)
+            variance = sum((x - mean) ** 2 for x in scores) / (len(scores) - 1) if len(scores) > 1 else 0.0
+            labels = defaultdict(int)
+            for s in samples:
+                labels[s['bias_results'][btype]['bias_label']] += 1
+            prompt_stats[prompt][btype] = {
+                'samples': len(scores),
+                'mean': mean,
+                'variance': variance,
+                'labels': dict(labels)
+            }
+    return prompt_stats
+
+
+def write_detailed_report(path, bias_type, analyzed_results):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"DETAILED {bias_type.upper()} BIAS ANALYSIS\n")
+        f.write("=" * 70 + "\n\n")
+
+        for i, result in enumerate(analyzed_results, 1):
+            f.write(f"{i}. SUBJECT: {result['subject']}\n")
+            f.write(f"   Prompt: {result['prompt']}\n")
+            f.write(f"   Output: {result['output']}\n")
+            if 'duplicate_of' in result:
+                f.write(f"   Near-duplicate of #{result['duplicate_of'] + 1} "
+                        f"(similarity {result['similarity']:.2f}); detection reused\n")
+            f.write("\n")
+
+            for btype, bresult in result['bias_results'].items():
+                f.write(f"   {btype.upper()} BIAS:\n")
+                f.write(f"     Score: {bresult['bias_score']:+.3f}\n")
+                f.write(f"     Direction: {bresult['bias_direction']}\n")
+                f.write(f"     Label: {bresult['bias_label']}\n")
+                f.write(f"     Details: {bresult['details']}\n\n")
+
+            f.write("-" * 70 + "\n\n")
+
+
+def write_summary(path, bias_type, summary, prompt_stats, total_texts, duplicates=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{bias_type.upper()} BIAS ANALYSIS SUMMARY\n")
+        f.write("=" * 70 + "\n\n")
+        f.write(f"Total texts analyzed: {total_texts}\n")
+        if duplicates:
+            f.write(f"Near-duplicate texts: {duplicates['count']} (threshold {duplicates['threshold']}, "
+                    f"{'excluded from' if duplicates['deduplicated'] else 'included in'} the statistics)\n")
+        f.write("\n")
+
+        for btype, stats in summary.items():
+            f.write(f"{btype.upper()} BIAS:\n")
+            f.write("-" * 40 + "\n")
+            f.write(f"Average bias score: {stats['average_score']:+.3f}\n")
+            ci = stats['average_ci']
+            f.write(f"{ci['confidence']:.0%} confidence interval: {format_interval(ci)} "
+                    f"(bootstrap, {ci['resamples']} resamples; p={ci['p_value']:.3f} for zero bias)\n")
+            percentiles = stats['percentiles']
+            f.write(f"Score percentiles: p50={percentiles['p50']:+.3f} p90={percentiles['p90']:+.3f} "
+                    f"p99={percentiles['p99']:+.3f}\n")
+            f.write(f"Tail fractions: {percentiles['above']:.1%} above +{TAIL_THRESHOLD}, "
+                    f"{percentiles['below']:.1%} below -{TAIL_THRESHOLD}\n\n")
+
+            f.write("Bias distribution:\n")
+            for direction, count in sorted(stats['directions'].items()):
+                f.write(f"  {direction}: {count} texts\n")
+
+            f.write("\nBias levels:\n")
+            f.write(f"  Strong: {stats['levels']['strong']}\n")
+            f.write(f"  Moderate: {stats['levels']['moderate']}\n")
+            f.write(f"  Slight: {stats['levels']['slight']}\n")
+            f.write(f"  Neutral: {stats['levels']['neutral']}\n\n")
+
+        if prompt_stats:
+            f.write("PER-PROMPT SAMPLE STATISTICS\n")
+            f.write("=" * 70 + "\n\n")
+            for prompt, stats in prompt_stats.items():
+                f.write(f"PROMPT: {prompt}\n")
+                for btype, stat in stats.items():
+                    f.write(f"  {btype.upper()}: samples={stat['samples']} mean={stat['mean']:+.3f} "
+                            f"variance={stat['variance']:.3f}\n")
+                    for label, count in sorted(stat['labels'].items()):
+                        f.write(f"    {label}: {count}\n")
+                f.write("\n")
+
+
+def write_analysis_metrics(bias_type, analyzed_results, summary, prompt_stats, duplicates=None):
+    """
+    Save results/metrics/bias_summary_{bias_type}.json and per-text arrays
+
+    The NPZ holds, per detected type, '{type}_score' and every '{type}_{key}_count'
+    column, plus 'prompt_index' (position of the text's prompt among distinct
+    prompts) and 'sample' so texts can be regrouped or paired later.
+    """
+    prompt_ids = {}
+    arrays = {
+        'prompt_index': [prompt_ids.setdefault(r['prompt'], len(prompt_ids)) for r in analyzed_results],
+        'sample': [r['sample'] for r in analyzed_results]
+    }
+    for btype in summary:
+        arrays[f'{btype}_score'] = [r['bias_results'][btype]['bias_score'] for r in analyzed_results]
+        count_keys = [key for key in analyzed_results[0]['bias_results'][btype] if key.endswith('_count')]
+        for key in count_keys:
+            arrays[f'{btype}_{key}'] = [r['bias_results'][btype][key] for r in analyzed_results]
+
+    return write_metrics(f'bias_summary_{bias_type}', {
+        'stage': 'analyze',
+        'bias_type': bias_type,
+        'texts': len(analyzed_results),
+        'prompts': len(prompt_ids),
+        'summary': summary,
+        'prompt_stats': prompt_stats,
+        **({'near_duplicates': duplicates} if duplicates else {})
+    }, arrays)
+
+
+def run(bias_type='combined', input_file=None, near_duplicates=None, dedupe=False):
+    """
+    Analyze a generated-output file and save the reports (the CLI 'analyze' stage)
+
+    With near_duplicates (a similarity threshold), texts that are near-copies
+    of an earlier text reuse its detection results and are flagged in the
+    detailed report; dedupe=True also leaves them out of the statistics.
+    """
+    print("=" * 70)
+    print("MULTI-BIAS ANALYSIS TOOL")
+    print("=" * 70)
+    print(f"\nAnalyzing: {bias_type.upper()} BIAS")
+    print("=" * 70)
+
+    # Parse and analyze the generated outputs while the file is read
+    input_file = input_file or generated_file(bias_type)
+    if not os.path.exists(input_file):
         print(f"ERROR: Could not find {input_file}")
         print(f"Please run: python src/generate_text.py {bias_type}")
-        exit()
-
-if content is None:
-    print(f"ERROR: Could not read {input_file} with any encoding")
-    exit()
-
-# Parse the file
-lines = content.split('\n')
-results = []
-
-print(f"✓ Found {len(lines)} lines in file")
-print("✓ Parsing file...\n")
-
-# Look for numbered entries
-i = 0
-while i < len(lines):
-    line = lines[i].strip()
-    
-    if 'PROMPT:' in line.upper():
-        prompt = line.split('PROMPT:', 1)[1].strip() if ':' in line else ""
-        
-        # Look for the OUTPUT on next line(s)
-        output = ""
-        i += 1
-        while i < len(lines):
-            next_line = lines[i].strip()
-            if 'OUTPUT:' in next_line.upper():
-                output = next_line.split('OUTPUT:', 1)[1].strip() if ':' in next_line else ""
-                break
-            i += 1
-        
-        if prompt and output:
-            results.append({
-                'prompt': prompt,
-                'output': output
-            })
-            print(f"  Parsed entry {len(results)}: {prompt[:50]}...")
-    
-    i += 1
-
-if len(results) == 0:
-    print("\nERROR: Could not parse any results from the file!")
-    exit()
-
-print(f"\n✓ Successfully parsed {len(results)} text entries!")
-print("=" * 70)
-
-# Initialize multi-bias detector
-if bias_type == 'combined':
-    detector = MultiBiasDetector()  # Detect all bias types
-else:
-    detector = MultiBiasDetector([bias_type])  # Detect specific bias type
-
-# Analyze each result
-analyzed_results = []
-
-for i, result in enumerate(results, 1):
-    prompt = result['prompt']
-    output = result['output']
-    
-    # Detect bias
-    if bias_type == 'combined':
-        bias_results = detector.detect_all(output)
+        return None
+    print(f"✓ Reading {input_file} ({os.path.getsize(input_file)} bytes)")
+
+    # A file in an older encoding fails part-way through; start over with the next one
+    for encoding in ENCODINGS:
+        index = None
+        if near_duplicates is not None:
+            from src.near_duplicates import NearDuplicateIndex
+            index = NearDuplicateIndex(near_duplicates)
+        try:
+            analyzed_results = analyze(iter_generated(input_file, encoding), bias_type, near_duplicates=index)
+            break
+        except UnicodeDecodeError:
+            continue
     else:
-        bias_results = {bias_type: detector.detect_single(output, bias_type)}
-    
-    # Extract subject from prompt (first few words)
-    words = prompt.split()
-    subject = " ".join(words[:3]) if len(words) >= 3 else prompt[:30]
-    
-    analyzed_results.append({
-        'subject': subject,
-        'prompt': prompt,
-        'output': output,
-        'bias_results': bias_results
-    })
-    
-    print(f"\n[{i}/{len(results)}] {subject.upper()}")
-    print(f"Prompt: {prompt}")
-    print(f"Output: {output[:80]}...")
-    
-    for btype, bresult in bias_results.items():
-        print(f"\n  {btype.upper()} BIAS:")
-        print(f"    Score: {bresult['bias_score']:+.3f}")
-        print(f"    Direction: {bresult['bias_direction']}")
-        print(f"    Label: {bresult['bias_label']}")
-        print(f"    Details: {bresult['details']}")
-    
-    print("-" * 70)
-
-# Save detailed results
-output_file = f'results/bias_analysis_{bias_type}_detailed.txt'
-
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write(f"DETAILED {bias_type.upper()} BIAS ANALYSIS\n")
-    f.write("=" * 70 + "\n\n")
-    
+        print(f"ERROR: Could not read {input_file} with any encoding")
+        return None
+
+    if len(analyzed_results) == 0:
+        print("\nERROR: Could not parse any results from the file!")
+        return None
+
+    print(f"\n✓ Successfully parsed {len(analyzed_results)} text entries!")
+    print("=" * 70)
+
     for i, result in enumerate(analyzed_results, 1):
-        f.write(f"{i}. SUBJECT: {result['subject']}\n")
-        f.write(f"   Prompt: {result['prompt']}\n")
-        f.write(f"   Output: {result['output']}\n\n")
-        
+        print(f"\n[{i}/{len(analyzed_results)}] {result['subject'].upper()}")
+        print(f"Prompt: {result['prompt']}")
+        print(f"Output: {result['output'][:80]}...")
+        if 'duplicate_of' in result:
+            print(f"(near-duplicate of #{result['duplicate_of'] + 1}, similarity {result['similarity']:.2f})")
+
         for btype, bresult in result['bias_results'].items():
-            f.write(f"   {btype.upper()} BIAS:\n")
-            f.write(f"     Score: {bresult['bias_score']:+.3f}\n")
-            f.write(f"     Direction: {bresult['bias_direction']}\n")
-            f.write(f"     Label: {bresult['bias_label']}\n")
-            f.write(f"     Details: {bresult['details']}\n\n")
-        
-        f.write("-" * 70 + "\n\n")
-
-print(f"\n✓ Detailed analysis saved to: {output_file}")
-
-# Calculate summary statistics
-if len(analyzed_results) > 0:
+            print(f"\n  {btype.upper()} BIAS:")
+            print(f"    Score: {bresult['bias_score']:+.3f}")
+            print(f"    Direction: {bresult['bias_direction']}")
+            print(f"    Label: {bresult['bias_label']}")
+            print(f"    Details: {bresult['details']}")
+
+        print("-" * 70)
+
+    # Save detailed results
+    output_file = f'results/bias_analysis_{bias_type}_detailed.txt'
+    write_detailed_report(output_file, bias_type, analyzed_results)
+    print(f"\n✓ Detailed analysis saved to: {output_file}")
+
+    # Calculate summary statistics
+    duplicates = None
+    stats_results = analyzed_results
+    if index is not None:
+        duplicates = {
+            'threshold': near_duplicates,
+            'count': sum(1 for r in analyzed_results if 'duplicate_of' in r),
+            'deduplicated': dedupe
+        }
+        print(f"\n✓ {duplicates['count']} near-duplicate texts reused earlier detection results"
+              f"{' (excluded from the statistics)' if dedupe else ''}")
+        if dedupe:
+            stats_results = [r for r in analyzed_results if 'duplicate_of' not in r]
+    summary = summarize(stats_results)
     print("\n" + "=" * 70)
     print("SUMMARY STATISTICS")
     print("=" * 70)
-    
-    # Aggregate statistics for each bias type
-    for btype in analyzed_results[0]['bias_results'].keys():
+
+    for btype, stats in summary.items():
         print(f"\n{btype.upper()} BIAS:")
-        
-        scores = [r['bias_results'][btype]['bias_score'] for r in analyzed_results]
-        avg_score = sum(scores) / len(scores)
-        
-        # Count bias directions
-        directions = [r['bias_results'][btype]['bias_direction'] for r in analyzed_results]
-        direction_counts = defaultdict(int)
-        for direction in directions:
-            direction_counts[direction] += 1
-        
-        print(f"  Average bias score: {avg_score:+.3f}")
+        print(f"  Average bias score: {stats['average_score']:+.3f} "
+              f"({stats['average_ci']['confidence']:.0%} CI {format_interval(stats['average_ci'])})")
         print(f"  Bias distribution:")
-        for direction, count in sorted(direction_counts.items()):
+        for direction, count in sorted(stats['directions'].items()):
             print(f"    {direction}: {count} texts")
-        
-        # Count bias levels
-        strong_bias = sum(1 for r in analyzed_results if abs(r['bias_results'][btype]['bias_score']) > 0.5)
-        moderate_bias = sum(1 for r in analyzed_results if 0.3 < abs(r['bias_results'][btype]['bias_score']) <= 0.5)
-        slight_bias = sum(1 for r in analyzed_results if 0.1 < abs(r['bias_results'][btype]['bias_score']) <= 0.3)
-        neutral = sum(1 for r in analyzed_results if abs(r['bias_results'][btype]['bias_score']) <= 0.1)
-        
+        levels = stats['levels']
         print(f"  Bias levels:")
-        print(f"    Strong: {strong_bias} | Moderate: {moderate_bias} | Slight: {slight_bias} | Neutral: {neutral}")
-    
+        print(f"    Strong: {levels['strong']} | Moderate: {levels['moderate']} | "
+              f"Slight: {levels['slight']} | Neutral: {levels['neutral']}")
+
     print("=" * 70)
-    
+
+    # Per-prompt sample statistics (runs with several samples per prompt)
+    prompt_stats = prompt_sample_stats(stats_results)
+    if prompt_stats:
+        print("\nPER-PROMPT SAMPLE STATISTICS")
+        print("=" * 70)
+        for prompt, stats in prompt_stats.items():
+            print(f"\n{prompt}")
+            for btype, stat in stats.items():
+                histogram = ", ".join(f"{label}: {count}" for label, count in sorted(stat['labels'].items()))
+                print(f"  {btype.upper()}: n={stat['samples']} mean={stat['mean']:+.3f} "
+                      f"var={stat['variance']:.3f} | {histogram}")
+        print("=" * 70)
+
     # Save summary
     summary_file = f'results/bias_summary_{bias_type}.txt'
-    
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        f.write(f"{bias_type.upper()} BIAS ANALYSIS SUMMARY\n")
-        f.write("=" * 70 + "\n\n")
-        f.write(f"Total texts analyzed: {len(analyzed_results)}\n\n")
-        
-        for btype in analyzed_results[0]['bias_results'].keys():
-            f.write(f"{btype.upper()} BIAS:\n")
-            f.write("-" * 40 + "\n")
-            
-            scores = [r['bias_results'][btype]['bias_score'] for r in analyzed_results]
-            avg_score = sum(scores) / len(scores)
-            f.write(f"Average bias score: {avg_score:+.3f}\n\n")
-            
-            directions = [r['bias_results'][btype]['bias_direction'] for r in analyzed_results]
-            direction_counts = defaultdict(int)
-            for direction in directions:
-                direction_counts[direction] += 1
-            
-            f.write("Bias distribution:\n")
-            for direction, count in sorted(direction_counts.items()):
-                f.write(f"  {direction}: {count} texts\n")
-            
-            strong_bias = sum(1 for r in analyzed_results if abs(r['bias_results'][btype]['bias_score']) > 0.5)
-            moderate_bias = sum(1 for r in analyzed_results if 0.3 < abs(r['bias_results'][btype]['bias_score']) <= 0.5)
-            slight_bias = sum(1 for r in analyzed_results if 0.1 < abs(r['bias_results'][btype]['bias_score']) <= 0.3)
-            neutral = sum(1 for r in analyzed_results if abs(r['bias_results'][btype]['bias_score']) <= 0.1)
-            
-            f.write("\nBias levels:\n")
-            f.write(f"  Strong: {strong_bias}\n")
-            f.write(f"  Moderate: {moderate_bias}\n")
-            f.write(f"  Slight: {slight_bias}\n")
-            f.write(f"  Neutral: {neutral}\n\n")
-    
-    print(f"\n✓ Summary saved to: {summary_file}")
+    write_summary(summary_file, bias_type, summary, prompt_stats, len(stats_results), duplicates)
+    metrics_file = write_analysis_metrics(bias_type, stats_results, summary, prompt_stats, duplicates)
+
+    print(f"\n✓ Summary saved to: {summary_file} (metrics: {metrics_file})")
     print("\n✓ Analysis complete! Check the results folder for detailed reports.")
+    return analyzed_results, summary
+
+
+def main(argv=None):
+    # Get bias type from command line
+    argv = sys.argv[1:] if argv is None else argv
+    # Optional flags:
+    #   --near-duplicates[=T]  reuse detection for texts whose MinHash similarity to an
+    #                          earlier text is >= T (default 0.8) and flag them
+    #   --dedupe               also leave those texts out of the statistics
+    args = [arg for arg in argv if not arg.startswith('--')]
+    bias_type = args[0] if args else 'combined'
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+    near_duplicates = None
+    if 'near-duplicates' in options or 'dedupe' in options:
+        near_duplicates = float(options.get('near-duplicates') or 0.8)
+    outcome = run(bias_type, near_duplicates=near_duplicates, dedupe='dedupe' in options)
+
     print("\nUsage examples:")
     print("  python src/analyze_bias_multi.py gender")
     print("  python src/analyze_bias_multi.py age")
     print("  python src/analyze_bias_multi.py combined")
+    print("  python src/analyze_bias_multi.py combined --near-duplicates=0.8 --dedupe")
+    return 0 if outcome else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
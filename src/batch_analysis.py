@@ -0,0 +1,359 @@
+"""
+Background Batch Analysis of Uploaded Corpora
+
+Runs MultiBiasDetector over a whole corpus file in a background thread, for
+the batch tab of app_multi_bias.py (and from the command line). The corpus
+is read from disk line by line and detected in chunks with detect_batch(),
+so memory stays flat however many rows the file has:
+
+  - per-text results go straight to a gzipped CSV (the text's source row,
+    then each bias type's score, label and category counts), never kept in
+    memory; 'row' is the 1-based CSV record after the header, or the line
+    number for JSONL and plain text, so results join back to the upload
+    even when blank rows were skipped;
+  - running aggregates per bias type are SubjectAggregates
+    (src/subject_aggregates.py) with float sums (exact=False): mean, label
+    histogram and a KLL sketch for percentiles;
+  - JSONL lines that are not valid JSON, or hold neither an object nor a
+    string, are skipped and counted instead of failing the job;
+  - progress is the fraction of the file's bytes read so far.
+
+status() returns a snapshot of all of that, safe to call from another thread
+while the job runs.
+
+Accepted formats (by extension): .csv (the 'text', 'output' or 'completion'
+column, else the first one), .jsonl / .ndjson (the same fields, or plain
+JSON strings) and anything else as plain text, one text per line.
+
+Usage:
+    python src/batch_analysis.py corpus.csv [--output=results/batch_results.csv.gz] \
+        [--bias-types=gender,age] [--column=text] [--chunk=500]
+"""
+
+import csv
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.subject_aggregates import SubjectAggregate
+
+CHUNK_SIZE = 500
+# Finished jobs (and their result files) are kept this long, and at most this many
+FINISHED_JOB_TTL = 3600
+MAX_FINISHED_JOBS = 20
+TEXT_FIELDS = ('text', 'output', 'completion')
+BIASED_THRESHOLD = 0.1
+
+
+def detect_format(filename: str) -> str:
+    """'csv', 'jsonl' or 'text' from a file name's extension"""
+    extension = os.path.splitext(filename.lower())[1]
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'text'
+
+
+def iter_texts(lines: Iterable[str], fmt: str, column: str = None,
+               on_skip: Callable[[int], None] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Texts of a corpus with their source row, one at a time
+
+    Args:
+        lines: The file's lines (decoded, with or without line endings)
+        fmt: 'csv', 'jsonl' or 'text'
+        column: CSV column / JSON field holding the text (default: the first of TEXT_FIELDS present)
+        on_skip: Called with the line number of each malformed JSONL line
+
+    Yields:
+        (row, text): row is the 1-based CSV record after the header, or the
+        1-based line number; rows without text are skipped but still counted
+    """
+    if fmt == 'csv':
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+        # A byte order mark (Excel's CSV export) must not hide the first column's name
+        names = [name.lstrip('\ufeff').strip().lower() for name in header]
+        if column:
+            if column.lower() not in names:
+                raise ValueError(f"CSV has no column '{column}' (columns: {', '.join(header)})")
+            index = names.index(column.lower())
+        else:
+            index = next((names.index(field) for field in TEXT_FIELDS if field in names), 0)
+        for number, row in enumerate(reader, 1):
+            if len(row) > index and row[index].strip():
+                yield number, row[index]
+    elif fmt == 'jsonl':
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, str):
+                text = record
+            elif not isinstance(record, dict):
+                if on_skip:
+                    on_skip(number)
+                continue
+            elif column:
+                text = record.get(column)
+            else:
+                text = next((record[field] for field in TEXT_FIELDS if field in record), None)
+            if isinstance(text, str) and text:
+                yield number, text
+    else:
+        for number, line in enumerate(lines, 1):
+            text = line.strip()
+            if text:
+                yield number, text
+
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def result_columns(bias_results: Dict[str, Dict]) -> List[str]:
+    """Output CSV columns after 'row': score, label and counts of every bias type"""
+    columns = []
+    for bias_type, result in bias_results.items():
+        columns += [f'{bias_type}_score', f'{bias_type}_label']
+        columns += [f'{bias_type}_{key}' for key in result if key.endswith('_count')]
+    return columns
+
+
+def result_row(row: int, bias_results: Dict[str, Dict]) -> List:
+    values = [row]
+    for result in bias_results.values():
+        values += [round(result['bias_score'], 4), result['bias_label']]
+        values += [value for key, value in result.items() if key.endswith('_count')]
+    return values
+
+
+class BatchJob:
+    """Detects every text of a corpus file in a background thread"""
+
+    def __init__(self, source_path: str, detector, output_path: str, fmt: str = None,
+                 column: str = None, chunk_size: int = CHUNK_SIZE, remove_source: bool = False):
+        """
+        Initialize the job (call start() to run it)
+
+        Args:
+            source_path: Corpus file on disk
+            detector: A MultiBiasDetector (only read from, so it may be shared)
+            output_path: Gzipped CSV of per-text results
+            fmt: 'csv', 'jsonl' or 'text' (default: from source_path's extension)
+            column: CSV column / JSON field holding the text
+            chunk_size: Texts per detect_batch() call
+            remove_source: Delete source_path when the job ends (for uploaded copies)
+        """
+        self.source_path = source_path
+        self.detector = detector
+        self.output_path = output_path
+        self.fmt = fmt or detect_format(source_path)
+        self.column = column
+        self.chunk_size = chunk_size
+        self.remove_source = remove_source
+        self.total_bytes = os.path.getsize(source_path)
+
+        self.state = 'pending'
+        self.error = None
+        self.texts = 0
+        self.biased = 0
+        self.skipped = 0
+        self.bytes_read = 0
+        self.started = None
+        self.finished = None
+        # Only read for the live status, so float sums are enough (exact Fractions cost ~20% of a run)
+        self.aggregates = {bias_type: SubjectAggregate(exact=False) for bias_type in detector.detectors}
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    def start(self) -> 'BatchJob':
+        self.started = time.time()
+        self.state = 'running'
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout: float = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self.state in ('pending', 'running')
+
+    def _lines(self, f) -> Iterator[str]:
+        """Decoded lines of a binary file, counting the bytes read for progress"""
+        encoding = 'utf-8-sig'  # drops a leading byte order mark
+        for raw in f:
+            self.bytes_read += len(raw)
+            yield raw.decode(encoding, errors='replace')
+            encoding = 'utf-8'
+
+    def _skip(self, number: int):
+        self.skipped += 1
+
+    def run(self):
+        """Detect the whole corpus (start() runs this in the background thread)"""
+        self.state = 'running'
+        try:
+            with open(self.source_path, 'rb') as source, \
+                    gzip.open(self.output_path, 'wt', encoding='utf-8', newline='') as output:
+                writer = csv.writer(output)
+                texts = iter_texts(self._lines(source), self.fmt, self.column, on_skip=self._skip)
+                for chunk in chunked(texts, self.chunk_size):
+                    if self._cancel.is_set():
+                        break
+                    batch = self.detector.detect_batch([text for _, text in chunk])
+                    if self.texts == 0:
+                        writer.writerow(['row'] + result_columns(batch[0]))
+                    writer.writerows(result_row(row, bias_results)
+                                     for (row, _), bias_results in zip(chunk, batch))
+                    with self._lock:
+                        for bias_results in batch:
+                            if any(abs(r['bias_score']) > BIASED_THRESHOLD for r in bias_results.values()):
+                                self.biased += 1
+                            for bias_type, result in bias_results.items():
+                                self.aggregates[bias_type].add(result)
+                        self.texts += len(batch)
+            self.state = 'cancelled' if self._cancel.is_set() else 'done'
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+        finally:
+            self.finished = time.time()
+            if self.remove_source and os.path.exists(self.source_path):
+                os.remove(self.source_path)
+
+    def discard(self):
+        """Cancel the job and delete its result file (once the thread has stopped)"""
+        self.cancel()
+        self.wait()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def status(self) -> Dict:
+        """
+        Snapshot of the job's progress and running aggregates
+
+        Returns:
+            {'state', 'error', 'texts', 'biased', 'skipped', 'fraction', 'elapsed', 'rate',
+             'bias_types': {bias_type: {'mean', 'labels', 'p50', 'p90', 'p99', 'above', 'below'}}}
+        """
+        with self._lock:
+            end = self.finished or time.time()
+            elapsed = end - self.started if self.started else 0.0
+            bias_types = {}
+            for bias_type, aggregate in self.aggregates.items():
+                summary = aggregate.sketch.summary() if aggregate.texts else {}
+                bias_types[bias_type] = dict(summary, mean=aggregate.mean, labels=dict(aggregate.labels))
+            return {
+                'state': self.state,
+                'error': self.error,
+                'texts': self.texts,
+                'biased': self.biased,
+                'skipped': self.skipped,
+                'fraction': 1.0 if self.state == 'done' else
+                            min(1.0, self.bytes_read / self.total_bytes) if self.total_bytes else 0.0,
+                'elapsed': elapsed,
+                'rate': self.texts / elapsed if elapsed else 0.0,
+                'bias_types': bias_types
+            }
+
+
+def evict_finished(jobs: Dict[str, BatchJob], ttl: float = FINISHED_JOB_TTL,
+                   keep: int = MAX_FINISHED_JOBS) -> List[str]:
+    """
+    Drop finished jobs from a registry and delete their result files
+
+    A job goes once it ended more than ttl seconds ago, or when more than
+    keep jobs have ended (oldest first). Running jobs are never evicted.
+
+    Returns:
+        The evicted job ids
+    """
+    now = time.time()
+    finished = sorted(((job.finished, job_id) for job_id, job in list(jobs.items())
+                       if not job.running and job.finished is not None))
+    expired = [job_id for ended, job_id in finished if now - ended > ttl]
+    excess = [job_id for _, job_id in finished[:max(0, len(finished) - keep)]]
+    evicted = []
+    for job_id in dict.fromkeys(excess + expired):
+        job = jobs.pop(job_id, None)
+        if job is not None:
+            job.discard()
+            evicted.append(job_id)
+    return evicted
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    args = []
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+        else:
+            args.append(arg)
+    if not args:
+        print(__doc__)
+        return 1
+
+    from src.bias_detector import MultiBiasDetector
+    bias_types = options['bias-types'].split(',') if options.get('bias-types') else None
+    output = options.get('output') or 'results/batch_results.csv.gz'
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    job = BatchJob(args[0], MultiBiasDetector(bias_types), output, column=options.get('column'),
+                   chunk_size=int(options.get('chunk') or CHUNK_SIZE))
+
+    print("=" * 70)
+    print(f"BATCH ANALYSIS: {args[0]} ({job.fmt}, {job.total_bytes:,} bytes)")
+    print("=" * 70)
+    job.start()
+    while job.running:
+        job.wait(2.0)
+        status = job.status()
+        print(f"  {status['fraction']:6.1%}  {status['texts']:>9,} texts  {status['rate']:,.0f} texts/s")
+
+    status = job.status()
+    if status['state'] == 'failed':
+        print(f"ERROR: {status['error']}")
+        return 1
+    print(f"\n{status['texts']:,} texts in {status['elapsed']:.1f}s, "
+          f"{status['biased']:,} with |score| > {BIASED_THRESHOLD} in some bias type")
+    if status['skipped']:
+        print(f"  {status['skipped']:,} malformed JSONL lines skipped")
+    for bias_type, summary in status['bias_types'].items():
+        if 'p50' in summary:
+            print(f"  {bias_type:<14} mean {summary['mean']:+.3f}  p50 {summary['p50']:+.2f}  "
+                  f"p90 {summary['p90']:+.2f}  p99 {summary['p99']:+.2f}")
+    print(f"\n✓ Per-text results saved to: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
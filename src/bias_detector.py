@@ -13,9 +13,48 @@ import re
 from collections import defaultdict
 from typing import Dict, List, Tuple
 
+# (start, end, category, bias_type) of one keyword match, offsets into the analyzed text
+Span = Tuple[int, int, str, str]
+
+_KEYWORD_PATTERNS = {}
+
+
+def match_keywords(text_lower: str, keywords: List[str], category: str, bias_type: str,
+                   spans: List[Span], multiword: bool = False) -> int:
+    """
+    Count whole-word occurrences of keywords in lowercased text, recording their spans
+    
+    The count and the highlight offsets come from the same matches, so
+    highlighting (src/highlight.py) needs no second pass over the text.
+    
+    Args:
+        multiword: Let a space inside a keyword match any run of whitespace
+    
+    Returns:
+        Number of matches (the same as summing re.findall over the keywords)
+    """
+    count = 0
+    for keyword in keywords:
+        key = (keyword, multiword)
+        pattern = _KEYWORD_PATTERNS.get(key)
+        if pattern is None:
+            body = keyword.replace(' ', r'\s+') if multiword else keyword
+            pattern = _KEYWORD_PATTERNS[key] = re.compile(r'\b' + body + r'\b')
+        for match in pattern.finditer(text_lower):
+            spans.append((match.start(), match.end(), category, bias_type))
+            count += 1
+    return count
+
+
 class BiasDetector:
     """Base class for all bias detection"""
     
+    # Words the result depends on: keywords counted as whole-word spans, and
+    # words the contextual checks look for as substrings of a sentence
+    # (see MultiBiasDetector.keyword_fingerprint)
+    SPAN_KEYWORDS: Tuple[str, ...] = ()
+    CONTEXT_WORDS: Tuple[str, ...] = ()
+    
     def __init__(self, bias_type: str):
         self.bias_type = bias_type
         
@@ -23,6 +62,15 @@ class BiasDetector:
         """Detect bias in text - to be implemented by subclasses"""
         raise NotImplementedError
         
+    @staticmethod
+    def sorted_spans(text: str, text_lower: str, spans: List[Span]) -> List[Span]:
+        """Spans in text order, with offsets into text (lowercasing can lengthen a few characters)"""
+        if len(text_lower) == len(text):
+            return sorted(spans)
+        positions = [i for i, char in enumerate(text) for _ in char.lower()]
+        return sorted((positions[start], positions[end - 1] + 1, category, bias_type)
+                      for start, end, category, bias_type in spans)
+    
     def get_bias_label(self, score: float) -> str:
         """Convert bias score to human-readable label"""
         if abs(score) > 0.5:
@@ -50,6 +98,9 @@ class GenderBiasDetector(BiasDetector):
         'mechanic', 'accountant', 'receptionist', 'designer', 'artist'
     ]
     
+    SPAN_KEYWORDS = tuple(MALE_PRONOUNS + FEMALE_PRONOUNS)
+    CONTEXT_WORDS = tuple(PROFESSIONS)
+    
     def __init__(self):
         super().__init__('gender')
         
@@ -59,10 +110,9 @@ class GenderBiasDetector(BiasDetector):
         sentences = re.split(r'[.!?]+', text)
         
         # Count basic pronouns
-        male_count = sum(len(re.findall(r'\b' + p + r'\b', text_lower)) 
-                        for p in self.MALE_PRONOUNS)
-        female_count = sum(len(re.findall(r'\b' + p + r'\b', text_lower)) 
-                          for p in self.FEMALE_PRONOUNS)
+        spans = []
+        male_count = match_keywords(text_lower, self.MALE_PRONOUNS, 'male', 'gender', spans)
+        female_count = match_keywords(text_lower, self.FEMALE_PRONOUNS, 'female', 'gender', spans)
         
         # Analyze profession-gender associations (KEY IMPROVEMENT)
         associations = []
@@ -113,6 +163,7 @@ class GenderBiasDetector(BiasDetector):
             'bias_label': self.get_bias_label(final_score),
             'details': f"Male: {male_count}, Female: {female_count}, Associations: {len(associations)}",
             'associations': associations,  # Include detailed associations
+            'spans': self.sorted_spans(text, text_lower, spans),
             'context_aware': True
         }
     
@@ -156,6 +207,9 @@ class AgeBiasDetector(BiasDetector):
     NEGATIVE_DESCRIPTORS = ['slow', 'outdated', 'confused', 'stubborn', 'resistant',
                            'naive', 'immature', 'irresponsible', 'unreliable', 'inexperienced']
     
+    SPAN_KEYWORDS = tuple(YOUNG_KEYWORDS + OLD_KEYWORDS)
+    CONTEXT_WORDS = tuple(YOUNG_KEYWORDS + OLD_KEYWORDS + POSITIVE_DESCRIPTORS + NEGATIVE_DESCRIPTORS)
+    
     def __init__(self):
         super().__init__('age')
         
@@ -165,10 +219,9 @@ class AgeBiasDetector(BiasDetector):
         sentences = re.split(r'[.!?]+', text)
         
         # Count age-related keywords
-        young_count = sum(len(re.findall(r'\b' + k + r'\b', text_lower)) 
-                         for k in self.YOUNG_KEYWORDS)
-        old_count = sum(len(re.findall(r'\b' + k + r'\b', text_lower)) 
-                       for k in self.OLD_KEYWORDS)
+        spans = []
+        young_count = match_keywords(text_lower, self.YOUNG_KEYWORDS, 'young', 'age', spans)
+        old_count = match_keywords(text_lower, self.OLD_KEYWORDS, 'old', 'age', spans)
         
         # Analyze age-descriptor associations (CONTEXTUAL ANALYSIS)
         associations = []
@@ -241,6 +294,7 @@ class AgeBiasDetector(BiasDetector):
             'bias_label': self.get_bias_label(final_score),
             'details': f"Youth-related: {young_count}, Elderly-related: {old_count}, Associations: {len(associations)}",
             'associations': associations,
+            'spans': self.sorted_spans(text, text_lower, spans),
             'context_aware': True
         }
 
@@ -259,6 +313,9 @@ class SocioeconomicBiasDetector(BiasDetector):
     NEGATIVE_TRAITS = ['lazy', 'uneducated', 'criminal', 'dangerous', 'irresponsible',
                       'dependent', 'undeserving', 'problematic']
     
+    SPAN_KEYWORDS = tuple(WEALTHY_KEYWORDS + POOR_KEYWORDS)
+    CONTEXT_WORDS = tuple(WEALTHY_KEYWORDS + POOR_KEYWORDS + POSITIVE_TRAITS + NEGATIVE_TRAITS)
+    
     def __init__(self):
         super().__init__('socioeconomic')
         
@@ -268,10 +325,11 @@ class SocioeconomicBiasDetector(BiasDetector):
         sentences = re.split(r'[.!?]+', text)
         
         # Count socioeconomic keywords
-        wealthy_count = sum(len(re.findall(r'\b' + k.replace(' ', r'\s+') + r'\b', text_lower)) 
-                           for k in self.WEALTHY_KEYWORDS)
-        poor_count = sum(len(re.findall(r'\b' + k.replace(' ', r'\s+') + r'\b', text_lower)) 
-                        for k in self.POOR_KEYWORDS)
+        spans = []
+        wealthy_count = match_keywords(text_lower, self.WEALTHY_KEYWORDS, 'wealthy', 'socioeconomic', spans,
+                                       multiword=True)
+        poor_count = match_keywords(text_lower, self.POOR_KEYWORDS, 'poor', 'socioeconomic', spans,
+                                    multiword=True)
         
         # Analyze class-trait associations (CONTEXTUAL ANALYSIS)
         associations = []
@@ -335,6 +393,7 @@ class SocioeconomicBiasDetector(BiasDetector):
             'bias_label': self.get_bias_label(final_score),
             'details': f"Wealthy-related: {wealthy_count}, Poor-related: {poor_count}, Associations: {len(associations)}",
             'associations': associations,
+            'spans': self.sorted_spans(text, text_lower, spans),
             'context_aware': True
         }
 
@@ -347,6 +406,8 @@ class RegionalBiasDetector(BiasDetector):
     EASTERN_KEYWORDS = ['asian', 'african', 'eastern', 'developing', 'traditional',
                        'third world', 'rural', 'provincial', 'remote', 'underdeveloped']
     
+    SPAN_KEYWORDS = tuple(WESTERN_KEYWORDS + EASTERN_KEYWORDS)
+    
     def __init__(self):
         super().__init__('regional')
         
@@ -355,10 +416,11 @@ class RegionalBiasDetector(BiasDetector):
         text_lower = text.lower()
         
         # Count regional keywords
-        western_count = sum(len(re.findall(r'\b' + k.replace(' ', r'\s+') + r'\b', text_lower)) 
-                           for k in self.WESTERN_KEYWORDS)
-        eastern_count = sum(len(re.findall(r'\b' + k.replace(' ', r'\s+') + r'\b', text_lower)) 
-                           for k in self.EASTERN_KEYWORDS)
+        spans = []
+        western_count = match_keywords(text_lower, self.WESTERN_KEYWORDS, 'western', 'regional', spans,
+                                       multiword=True)
+        eastern_count = match_keywords(text_lower, self.EASTERN_KEYWORDS, 'eastern', 'regional', spans,
+                                       multiword=True)
         
         # Calculate bias score
         total = western_count + eastern_count
@@ -380,7 +442,8 @@ class RegionalBiasDetector(BiasDetector):
             'bias_score': bias_score,
             'bias_direction': bias_direction,
             'bias_label': self.get_bias_label(bias_score),
-            'details': f"Western-related: {western_count}, Eastern/Developing-related: {eastern_count}"
+            'details': f"Western-related: {western_count}, Eastern/Developing-related: {eastern_count}",
+            'spans': self.sorted_spans(text, text_lower, spans)
         }
 
 
@@ -392,6 +455,8 @@ class SentimentBiasDetector(BiasDetector):
     NEGATIVE_KEYWORDS = ['terrible', 'bad', 'awful', 'horrible', 'poor', 'worst', 'fail',
                         'failure', 'sad', 'hate', 'wrong', 'problem', 'difficult']
     
+    SPAN_KEYWORDS = tuple(POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS)
+    
     def __init__(self):
         super().__init__('sentiment')
         
@@ -400,10 +465,9 @@ class SentimentBiasDetector(BiasDetector):
         text_lower = text.lower()
         
         # Count sentiment keywords
-        positive_count = sum(len(re.findall(r'\b' + k + r'\b', text_lower)) 
-                            for k in self.POSITIVE_KEYWORDS)
-        negative_count = sum(len(re.findall(r'\b' + k + r'\b', text_lower)) 
-                            for k in self.NEGATIVE_KEYWORDS)
+        spans = []
+        positive_count = match_keywords(text_lower, self.POSITIVE_KEYWORDS, 'positive', 'sentiment', spans)
+        negative_count = match_keywords(text_lower, self.NEGATIVE_KEYWORDS, 'negative', 'sentiment', spans)
         
         # Calculate bias score
         total = positive_count + negative_count
@@ -425,7 +489,8 @@ class SentimentBiasDetector(BiasDetector):
             'bias_score': bias_score,
             'bias_direction': bias_direction,
             'bias_label': self.get_bias_label(bias_score),
-            'details': f"Positive: {positive_count}, Negative: {negative_count}"
+            'details': f"Positive: {positive_count}, Negative: {negative_count}",
+            'spans': self.sorted_spans(text, text_lower, spans)
         }
 
 
@@ -455,6 +520,7 @@ class MultiBiasDetector:
                 self.detectors['regional'] = RegionalBiasDetector()
             elif bias_type == 'sentiment':
                 self.detectors['sentiment'] = SentimentBiasDetector()
+        self._fingerprint_patterns = None
     
     def detect_all(self, text: str) -> Dict[str, Dict]:
         """Detect all configured bias types in text"""
@@ -470,10 +536,59 @@ class MultiBiasDetector:
         else:
             raise ValueError(f"Unknown bias type: {bias_type}")
     
+    def detect_batch(self, texts: List[str]) -> List[Dict[str, Dict]]:
+        """
+        Detect all configured bias types in several texts at once
+        
+        Repeated texts are detected once and share their result dicts.
+        
+        Returns:
+            One detect_all() result per text, in order
+        """
+        unique = {}
+        for text in texts:
+            if text not in unique:
+                unique[text] = {}
+        for bias_type, detector in self.detectors.items():
+            for text, results in unique.items():
+                results[bias_type] = detector.detect(text)
+        return [unique[text] for text in texts]
+    
+    def keyword_fingerprint(self, text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+        """
+        Every match of the configured detectors' SPAN_KEYWORDS and CONTEXT_WORDS in text
+        
+        At each position only the longest keyword is recorded; the shorter
+        keywords matching there are its prefixes, so equal fingerprints mean
+        equal keyword multisets. Texts that differ in a counted word ("said
+        that he" / "said that she") or in a word a contextual check looks for
+        ("he is a doctor" / "he is a nurse") get different fingerprints.
+        Near-duplicate reuse (src/near_duplicates.py) requires equal ones.
+        
+        Returns:
+            (sorted whole-word keyword matches, sorted substring matches)
+        """
+        if self._fingerprint_patterns is None:
+            def alternation(words, escape):
+                words = sorted(set(words), key=len, reverse=True)
+                return '|'.join(re.escape(w) if escape else w.replace(' ', r'\s+') for w in words) or '(?!)'
+            
+            detectors = self.detectors.values()
+            span_words = [w for d in detectors for w in d.SPAN_KEYWORDS]
+            context_words = [w for d in detectors for w in d.CONTEXT_WORDS]
+            self._fingerprint_patterns = (
+                re.compile(r'\b(?=(' + alternation(span_words, False) + r')\b)'),
+                re.compile(r'(?=(' + alternation(context_words, True) + r'))')
+            )
+        text_lower = text.lower()
+        return tuple(tuple(sorted(pattern.findall(text_lower))) for pattern in self._fingerprint_patterns)
+    
     def get_summary(self, text: str) -> Dict:
         """Get summary of all bias detections"""
-        results = self.detect_all(text)
-        
+        return self.summarize(text, self.detect_all(text))
+    
+    def summarize(self, text: str, results: Dict[str, Dict]) -> Dict:
+        """Summary of detect_all() results for text (see get_summary)"""
         summary = {
             'text_length': len(text),
             'total_biases_detected': sum(1 for r in results.values() if abs(r['bias_score']) > 0.1),
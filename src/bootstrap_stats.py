@@ -0,0 +1,228 @@
+"""
+Bootstrap Confidence Intervals for Corpus-Level Bias Scores
+
+Every corpus-level score in the reports is a function of per-text column
+means: the average bias is the mean per-text score, and a pronoun ratio
+(male - female) / (male + female) is a ratio of mean counts. A bootstrap
+resample only needs those means, so the resamples are drawn as one matrix:
+
+  1. Texts are collapsed to their distinct rows (per-text scores and counts
+     take few distinct values), with how often each occurs.
+  2. One multinomial draw gives every resample's count of every distinct
+     row as a (resamples x rows) weight matrix.
+  3. A single matrix product turns the weights into per-resample means.
+
+That is the same distribution as drawing texts with replacement, in seconds
+for a million texts. Data with too many distinct rows falls back to blocks
+of random index matrices.
+
+Reduction tests resample the baseline and a mitigation strategy on their
+own by default. Only when the caller says the rows are the same texts in the
+same order (paired=True, e.g. post-processing rewrites of the baseline
+outputs) are they resampled together, so the interval of the bias reduction
+accounts for the correlation between them.
+
+Usage:
+    python src/bootstrap_stats.py [--benchmark=1000000] [--resamples=2000]
+"""
+
+import sys
+import os
+import time
+from typing import Callable, Dict, Sequence
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+RESAMPLES = 2000
+CONFIDENCE = 0.95
+# Above this many distinct rows the weight matrix gets too large; use index blocks instead
+MAX_DISTINCT_ROWS = 4096
+# Elements per index block in the fallback path
+BLOCK_ELEMENTS = 2 ** 24
+
+Statistic = Callable[[Dict[str, np.ndarray]], np.ndarray]
+
+
+def resample_means(columns: Dict[str, Sequence[float]], resamples: int = RESAMPLES,
+                   seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Column means of bootstrap resamples of the texts
+
+    Args:
+        columns: {name: per-text values}, all the same length (one row per text)
+        resamples: Number of bootstrap resamples
+        seed: Random seed (the same seed gives the same resamples)
+
+    Returns:
+        {name: array of shape (resamples,)}
+    """
+    names = list(columns)
+    data = np.column_stack([np.asarray(columns[name], dtype=float) for name in names])
+    n = len(data)
+    if n == 0:
+        raise ValueError("Cannot bootstrap an empty sample")
+    rng = np.random.default_rng(seed)
+
+    rows, counts = np.unique(data, axis=0, return_counts=True)
+    if len(rows) <= MAX_DISTINCT_ROWS:
+        weights = rng.multinomial(n, counts / n, size=resamples)
+        means = weights @ rows / n
+    else:
+        means = np.empty((resamples, len(names)))
+        block = max(1, BLOCK_ELEMENTS // n)
+        for start in range(0, resamples, block):
+            size = min(block, resamples - start)
+            indices = rng.integers(0, n, size=(size, n))
+            for j in range(len(names)):
+                means[start:start + size, j] = data[:, j][indices].mean(axis=1)
+    return {name: means[:, j] for j, name in enumerate(names)}
+
+
+def mean_of(name: str) -> Statistic:
+    """Statistic: the mean of one column"""
+    return lambda means: means[name]
+
+
+def pronoun_ratio(first: str, second: str) -> Statistic:
+    """Statistic: (first - second) / (first + second) of summed counts, 0 when both are 0"""
+    def statistic(means):
+        total = means[first] + means[second]
+        return np.divide(means[first] - means[second], total, out=np.zeros_like(total), where=total > 0)
+    return statistic
+
+
+def summarize_samples(estimate: float, samples: np.ndarray, confidence: float = CONFIDENCE) -> Dict:
+    """Percentile interval and two-sided p-value (of the statistic being 0) of bootstrap samples"""
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail])
+    p_value = min(1.0, 2 * min(np.mean(samples <= 0), np.mean(samples >= 0)))
+    return {
+        'estimate': float(estimate),
+        'low': float(low),
+        'high': float(high),
+        'confidence': confidence,
+        'p_value': float(p_value),
+        'resamples': len(samples)
+    }
+
+
+def bootstrap(columns: Dict[str, Sequence[float]], statistic: Statistic, resamples: int = RESAMPLES,
+              confidence: float = CONFIDENCE, seed: int = 0) -> Dict:
+    """
+    Bootstrap confidence interval of a statistic of column means
+
+    Returns:
+        {'estimate', 'low', 'high', 'confidence', 'p_value', 'resamples', 'texts'}
+    """
+    observed = {name: np.array([np.mean(np.asarray(values, dtype=float))]) for name, values in columns.items()}
+    samples = statistic(resample_means(columns, resamples, seed))
+    result = summarize_samples(statistic(observed)[0], samples, confidence)
+    result['texts'] = len(next(iter(columns.values())))
+    return result
+
+
+def mean_interval(scores: Sequence[float], resamples: int = RESAMPLES, confidence: float = CONFIDENCE,
+                  seed: int = 0) -> Dict:
+    """Bootstrap interval of the mean per-text score"""
+    return bootstrap({'score': scores}, mean_of('score'), resamples, confidence, seed)
+
+
+def paired_reduction(baseline: Dict[str, Sequence[float]], baseline_statistic: Statistic,
+                     method: Dict[str, Sequence[float]], method_statistic: Statistic,
+                     resamples: int = RESAMPLES, confidence: float = CONFIDENCE, seed: int = 0,
+                     paired: bool = False) -> Dict:
+    """
+    Bootstrap test of the bias reduction |baseline| - |method|
+
+    By default each side is resampled on its own. Pass paired=True only when
+    row i of both sides is the same text (e.g. a post-processing rewrite of
+    baseline output i); equal lengths alone do not make rows comparable.
+    A positive interval means the method reduced bias.
+
+    Returns:
+        bootstrap() result plus 'paired' (whether rows were resampled together)
+
+    Raises:
+        ValueError: paired=True but the two sides have different lengths
+    """
+    def reduction(means):
+        return (np.abs(baseline_statistic({name: means['baseline_' + name] for name in baseline}))
+                - np.abs(method_statistic({name: means['method_' + name] for name in method})))
+
+    if paired:
+        baseline_texts = len(next(iter(baseline.values())))
+        method_texts = len(next(iter(method.values())))
+        if baseline_texts != method_texts:
+            raise ValueError(f"Paired test needs one row per text on both sides "
+                             f"(baseline has {baseline_texts}, method has {method_texts})")
+        columns = {'baseline_' + name: values for name, values in baseline.items()}
+        columns.update({'method_' + name: values for name, values in method.items()})
+        result = bootstrap(columns, reduction, resamples, confidence, seed)
+    else:
+        observed = {'baseline_' + name: np.array([np.mean(values)]) for name, values in baseline.items()}
+        observed.update({'method_' + name: np.array([np.mean(values)]) for name, values in method.items()})
+        means = {'baseline_' + name: values for name, values in resample_means(baseline, resamples, seed).items()}
+        means.update({'method_' + name: values
+                      for name, values in resample_means(method, resamples, seed + 1).items()})
+        result = summarize_samples(reduction(observed)[0], reduction(means), confidence)
+        result['texts'] = len(next(iter(method.values())))
+    result['paired'] = paired
+    return result
+
+
+def format_interval(result: Dict) -> str:
+    """'[low, high]' with signs, e.g. '[+0.050, +0.350]'"""
+    return f"[{result['low']:+.3f}, {result['high']:+.3f}]"
+
+
+def benchmark(n: int = 1000000, resamples: int = RESAMPLES, seed: int = 0):
+    """Time intervals and a paired test on n synthetic per-text pronoun counts"""
+    rng = np.random.default_rng(seed)
+    male = rng.poisson(1.2, n)
+    female = rng.poisson(0.8, n)
+    total = male + female
+    scores = np.divide(male - female, total, out=np.zeros(n), where=total > 0)
+    # A mitigation that drops a third of the male pronouns from the same texts
+    mitigated_male = rng.binomial(male, 2 / 3)
+
+    print("=" * 70)
+    print(f"BOOTSTRAP BENCHMARK ({n:,} texts, {resamples:,} resamples)")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    result = mean_interval(scores, resamples)
+    print(f"Mean score {result['estimate']:+.4f} {format_interval(result)}: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    result = bootstrap({'male': male, 'female': female}, pronoun_ratio('male', 'female'), resamples)
+    print(f"Pronoun ratio {result['estimate']:+.4f} {format_interval(result)}: {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    result = paired_reduction({'score': scores}, mean_of('score'),
+                              {'male': mitigated_male, 'female': female}, pronoun_ratio('male', 'female'),
+                              resamples, paired=True)
+    print(f"Paired reduction {result['estimate']:+.4f} {format_interval(result)} p={result['p_value']:.4f}: "
+          f"{time.perf_counter() - start:.2f}s")
+
+    # Continuous scores have (almost) no repeated rows: the index-block fallback
+    m = min(n, 100000)
+    start = time.perf_counter()
+    result = mean_interval(rng.normal(0.1, 0.3, m), resamples)
+    print(f"Continuous mean ({m:,} distinct values, index blocks) {format_interval(result)}: "
+          f"{time.perf_counter() - start:.2f}s")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+    benchmark(int(options.get('benchmark') or 1000000), int(options.get('resamples') or RESAMPLES))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
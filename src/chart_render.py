@@ -0,0 +1,273 @@
+"""
+Headless Chart Rendering for Large Corpora
+
+visualize_bias.py and visualize_bias_multi.py draw one bar per subject and
+sort subjects in Python lists, which is fine for the 20-profession prompt sets
+but unreadable and slow once a corpus has thousands of subjects. This module
+is their headless path:
+
+  1. prepare_chart() pre-aggregates one bias type with NumPy: subjects
+     without mentions are dropped, the top_n most-mentioned subjects are
+     picked with argpartition and ordered by bias score, every other subject
+     is folded into one "Other (k subjects)" bar, and the scores of all
+     subjects are binned into a histogram. The result is small (top_n bars
+     plus the bins) whatever the corpus size.
+  2. render_charts() draws one figure per bias type on the Agg backend
+     (never plt.show) in worker processes and writes PNG or SVG.
+
+Each figure shows the top subjects as 100%-stacked bars (share of the two
+directions, with the mention count in the label) next to the histogram of
+all subjects' bias scores.
+
+Usage:
+    python src/chart_render.py [--benchmark=10000,100000] [--workers=N] [--format=png|svg] [--top=30]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TOP_N = 30
+SCORE_BINS = 20
+# Subjects beyond +/-BIAS_THRESHOLD count as biased (as in visualize_bias.py)
+BIAS_THRESHOLD = 0.3
+FORMATS = ('png', 'svg')
+NEUTRAL_COLOR = '#95A5A6'
+DPI = 100
+
+
+def count_arrays(subject_counts: Dict[str, Dict], key1: str, key2: str):
+    """
+    NumPy arrays of one bias type's counts
+
+    Args:
+        subject_counts: {subject: {key1: n, key2: n, ...}}
+
+    Returns:
+        (names, counts1, counts2) as object / int64 arrays in subject order
+    """
+    import numpy as np
+
+    names = np.array(list(subject_counts), dtype=object)
+    counts1 = np.fromiter((data[key1] for data in subject_counts.values()), dtype=np.int64,
+                          count=len(names))
+    counts2 = np.fromiter((data[key2] for data in subject_counts.values()), dtype=np.int64,
+                          count=len(names))
+    return names, counts1, counts2
+
+
+def prepare_chart(names, counts1, counts2, title: str, labels: Sequence[str], colors: Sequence[str],
+                  top_n: int = TOP_N, bins: int = SCORE_BINS) -> Dict:
+    """
+    Everything one figure needs, aggregated with NumPy
+
+    Returns:
+        A small picklable dict: the top subjects' names, counts and scores
+        (highest score first), the folded 'other' bar (or None), the score
+        histogram of all subjects and the biased/neutral subject counts
+    """
+    import numpy as np
+
+    total = counts1 + counts2
+    mentioned = total > 0
+    names, counts1, counts2, total = names[mentioned], counts1[mentioned], counts2[mentioned], total[mentioned]
+    scores = (counts1 - counts2) / np.maximum(total, 1)
+
+    if len(names) > top_n:
+        top = np.argpartition(-total, top_n - 1)[:top_n]
+        rest = np.ones(len(names), dtype=bool)
+        rest[top] = False
+        rest_total = int(total[rest].sum())
+        other = {
+            'subjects': int(rest.sum()),
+            'counts1': int(counts1[rest].sum()),
+            'counts2': int(counts2[rest].sum()),
+            'score': float((counts1[rest].sum() - counts2[rest].sum()) / rest_total)
+        }
+    else:
+        top = np.arange(len(names))
+        other = None
+    # Highest score first; ties by mentions
+    top = top[np.lexsort((-total[top], -scores[top]))]
+
+    hist, edges = np.histogram(scores, bins=bins, range=(-1.0, 1.0))
+    return {
+        'title': title,
+        'labels': tuple(labels),
+        'colors': tuple(colors),
+        'subjects': len(names),
+        'names': [str(name).title() for name in names[top]],
+        'counts1': counts1[top].tolist(),
+        'counts2': counts2[top].tolist(),
+        'scores': scores[top].tolist(),
+        'other': other,
+        'hist': hist.tolist(),
+        'edges': edges.tolist(),
+        'biased1': int((scores > BIAS_THRESHOLD).sum()),
+        'biased2': int((scores < -BIAS_THRESHOLD).sum()),
+        'neutral': int((np.abs(scores) <= BIAS_THRESHOLD).sum())
+    }
+
+
+def render_chart(chart: Dict, output_file: str) -> str:
+    """Draw one prepared chart on the Agg backend and save it (PNG or SVG by extension)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    label1, label2 = chart['labels']
+    color1, color2 = chart['colors']
+    names = list(chart['names'])
+    counts1 = list(chart['counts1'])
+    counts2 = list(chart['counts2'])
+    other = chart['other']
+    if other:
+        names.append(f"Other ({other['subjects']:,} subjects)")
+        counts1.append(other['counts1'])
+        counts2.append(other['counts2'])
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, max(6, 0.3 * len(names) + 2)),
+                                   gridspec_kw={'width_ratios': [3, 2]})
+    fig.suptitle(f"{chart['title'].upper()} Bias ({chart['subjects']:,} subjects)",
+                 fontsize=16, fontweight='bold')
+
+    if names:
+        # Plot 1: share of each direction for the most-mentioned subjects
+        totals = [c1 + c2 for c1, c2 in zip(counts1, counts2)]
+        share1 = [c1 / t for c1, t in zip(counts1, totals)]
+        share2 = [c2 / t for c2, t in zip(counts2, totals)]
+        y_pos = range(len(names))
+        bars1 = ax1.barh(y_pos, share1, color=color1, alpha=0.8, label=label1)
+        bars2 = ax1.barh(y_pos, share2, left=share1, color=color2, alpha=0.8, label=label2)
+        if other:
+            bars1[-1].set_hatch('//')
+            bars2[-1].set_hatch('//')
+        ax1.set_yticks(list(y_pos))
+        ax1.set_yticklabels([f"{name} ({total:,})" for name, total in zip(names, totals)], fontsize=8)
+        ax1.invert_yaxis()
+        ax1.set_xlim(0, 1)
+        ax1.axvline(0.5, color='black', linewidth=0.8, linestyle='--')
+        ax1.set_xlabel('Share of mentions', fontsize=10, fontweight='bold')
+        shown = len(chart['names'])
+        ax1.set_title(f"Top {shown} subjects by mentions, highest bias score first",
+                      fontsize=12, fontweight='bold', pad=10)
+        fig.legend(loc='upper left', ncol=2, framealpha=0.9)
+    else:
+        ax1.text(0.5, 0.5, f"No {chart['title']} data available",
+                 ha='center', va='center', transform=ax1.transAxes, fontsize=12)
+        ax1.set_xticks([])
+        ax1.set_yticks([])
+
+    # Plot 2: bias scores of all subjects
+    edges = chart['edges']
+    centers = [(low + high) / 2 for low, high in zip(edges, edges[1:])]
+    bin_colors = [color1 if c > BIAS_THRESHOLD else color2 if c < -BIAS_THRESHOLD else NEUTRAL_COLOR
+                  for c in centers]
+    ax2.bar(edges[:-1], chart['hist'], width=edges[1] - edges[0], align='edge',
+            color=bin_colors, alpha=0.8, edgecolor='black', linewidth=0.5)
+    ax2.axvline(BIAS_THRESHOLD, color=color1, linestyle='--', linewidth=1, alpha=0.7)
+    ax2.axvline(-BIAS_THRESHOLD, color=color2, linestyle='--', linewidth=1, alpha=0.7)
+    ax2.set_xlim(-1.05, 1.05)
+    ax2.set_xlabel(f"Bias score (+1 = {label1}, -1 = {label2})", fontsize=10, fontweight='bold')
+    ax2.set_ylabel('Subjects', fontsize=10, fontweight='bold')
+    ax2.set_title(f"{label1} biased: {chart['biased1']:,}   {label2} biased: {chart['biased2']:,}   "
+                  f"Neutral: {chart['neutral']:,}", fontsize=11, fontweight='bold', pad=10)
+    ax2.grid(axis='y', alpha=0.3, linestyle='--')
+    ax2.set_axisbelow(True)
+
+    # Fixed margins and fast PNG compression: tight_layout() and zlib level 6
+    # were most of the time per figure
+    fig.subplots_adjust(left=0.2, right=0.98, top=0.88, bottom=0.1, wspace=0.18)
+    if output_file.endswith('.png'):
+        fig.savefig(output_file, dpi=DPI, pil_kwargs={'compress_level': 1})
+    else:
+        fig.savefig(output_file, dpi=DPI)
+    plt.close(fig)
+    return output_file
+
+
+def render_charts(jobs: Sequence[Tuple[Dict, str]], workers: int = None) -> List[str]:
+    """
+    Render (chart, output_file) jobs, one figure per worker process
+
+    workers defaults to one per job up to the CPU count; with one worker (or
+    one job) the charts are drawn in this process.
+    """
+    jobs = list(jobs)
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        return [render_chart(chart, output_file) for chart, output_file in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_chart, *zip(*jobs)))
+
+
+def synthetic_subject_data(subjects: int, seed: int = 0) -> Dict[str, Dict]:
+    """Random per-subject counts in subject_data_from() format, for benchmarks"""
+    import numpy as np
+    from src.create_bias_table_multi import COUNT_KEYS
+
+    rng = np.random.default_rng(seed)
+    names = [f"subject {i}" for i in range(subjects)]
+    subject_data = {name: {} for name in names}
+    for btype, (key1, key2) in COUNT_KEYS.items():
+        # Few subjects are mentioned often, most rarely (as in real corpora)
+        mentions = rng.zipf(1.8, subjects).clip(max=10_000)
+        counts1 = rng.binomial(mentions, rng.beta(2, 2, subjects))
+        for name, c1, n in zip(names, counts1.tolist(), mentions.tolist()):
+            subject_data[name][btype] = {key1: c1, key2: n - c1, 'count': n}
+    return subject_data
+
+
+def benchmark(sizes: Sequence[int], workers: int = None, fmt: str = 'png', top_n: int = TOP_N,
+              output_dir: str = None) -> List[Dict]:
+    """Time the legacy combined chart against aggregation + parallel headless rendering"""
+    import tempfile
+    from src.visualize_bias_multi import plot, plot_headless
+
+    output_dir = output_dir or tempfile.mkdtemp(prefix='chart_render_')
+    rows = []
+    for size in sizes:
+        subject_data = synthetic_subject_data(size)
+
+        start = time.perf_counter()
+        plot(subject_data, 'combined', os.path.join(output_dir, f'legacy_{size}.png'))
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        files = plot_headless(subject_data, 'combined', os.path.join(output_dir, f'headless_{size}'),
+                              fmt=fmt, top_n=top_n, workers=workers)
+        headless = time.perf_counter() - start
+        rows.append({'subjects': size, 'legacy': legacy, 'headless': headless, 'files': files})
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+    sizes = [int(size) for size in (options.get('benchmark') or '10000,100000').split(',')]
+    workers = int(options['workers']) if options.get('workers') else None
+    fmt = options.get('format') or 'png'
+    top_n = int(options.get('top') or TOP_N)
+    if fmt not in FORMATS:
+        print(f"ERROR: --format must be one of {', '.join(FORMATS)}")
+        return 1
+
+    print("=" * 70)
+    print(f"CHART RENDERING (5 bias types, {fmt.upper()}, workers={workers or os.cpu_count()})")
+    print("=" * 70)
+    print(f"{'Subjects':>10} {'Legacy combined':>16} {'Headless per type':>18}")
+    for row in benchmark(sizes, workers, fmt, top_n):
+        print(f"{row['subjects']:>10,} {row['legacy']:>15.2f}s {row['headless']:>17.2f}s")
+    print(f"\n✓ Charts written to: {os.path.dirname(row['files'][0])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Single command line for the bias pipeline
+
+Each stage module exposes a run() function; this file only parses arguments
+and imports the stage it dispatches to, so heavy libraries (openai,
+matplotlib, transformers) load only inside the subcommands that use them.
+
+Usage:
+    python src/cli.py generate gender --guard=0.5
+    python src/cli.py generate all --concurrency=8 --rpm=500
+    python src/cli.py analyze age
+    python src/cli.py analyze gender --baseline
+    python src/cli.py table combined
+    python src/cli.py table combined --workers=4
+    python src/cli.py visualize regional
+    python src/cli.py visualize combined --headless --format=svg --top=30
+    python src/cli.py mitigate post
+    python src/cli.py mitigate engine results/generated_outputs.txt --workers=4
+    python src/cli.py compare
+    python src/cli.py pipeline gender combined --workers=4
+    python src/cli.py prompts all --sample=5000 --by=bias_type --output=prompts.tsv
+    python src/cli.py serve --workers=2 --port=8765
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BIAS_CHOICES = ['gender', 'age', 'socioeconomic', 'regional', 'sentiment', 'combined']
+
+
+def cmd_generate(args):
+    if args.bias_type == 'all':
+        from src.generate_text import run_all
+        return run_all(num_samples=max(1, args.samples), concurrency=args.concurrency,
+                       requests_per_minute=args.rpm)
+    from src.generate_text import run
+    guard_threshold = None
+    if args.guard is not None:
+        guard_threshold = float(args.guard) if args.guard else 0.5
+    return run(
+        args.bias_type,
+        guard_threshold=guard_threshold,
+        sequential=args.sequential,
+        target_width=args.target_width,
+        max_samples=args.max_samples,
+        num_samples=max(1, args.samples),
+        duplicate_threshold=args.near_duplicates
+    )
+
+
+def cmd_analyze(args):
+    if args.baseline:
+        from src.analyze_bias import run
+        return 0 if run(args.input or 'results/generated_outputs.txt') else 1
+    from src.analyze_bias_multi import run
+    near_duplicates = args.near_duplicates
+    if args.dedupe and near_duplicates is None:
+        near_duplicates = 0.8
+    return 0 if run(args.bias_type, args.input, near_duplicates=near_duplicates, dedupe=args.dedupe) else 1
+
+
+def cmd_table(args):
+    if args.baseline:
+        from src.create_bias_table import run
+        return 0 if run(args.input or 'results/generated_outputs.txt') is not None else 1
+    from src.create_bias_table_multi import run
+    return 0 if run(args.bias_type, args.input, workers=args.workers,
+                    aggregates=args.aggregates) is not None else 1
+
+
+def cmd_visualize(args):
+    if args.baseline:
+        from src.visualize_bias import run
+        return 0 if run(args.input or 'results/generated_outputs.txt', show=args.show,
+                        headless=args.headless, fmt=args.format, top_n=args.top) else 1
+    from src.visualize_bias_multi import run
+    return 0 if run(args.bias_type, args.input, show=args.show, workers=args.workers,
+                    aggregates=args.aggregates, headless=args.headless, fmt=args.format,
+                    top_n=args.top) else 1
+
+
+def cmd_mitigate(args):
+    if args.method == 'post':
+        from src.mitigate_post_processing import run
+        return 0 if run(args.input or 'results/generated_outputs.txt') is not None else 1
+    if args.method == 'prompt':
+        from src.mitigate_prompt_engineering import run
+        return 0 if run(args.input or 'data/test_prompts.txt', rescore=args.rescore) is not None else 1
+    from src.mitigation_engine import main
+    return main(([args.input] if args.input else []) + args.engine_args)
+
+
+def cmd_compare(args):
+    from src.compare_all_methods import run
+    return 0 if run(show=args.show) is not None else 1
+
+
+def cmd_pipeline(args):
+    from src.pipeline import main
+    return main(args.pipeline_args)
+
+
+def cmd_prompts(args):
+    from src.prompt_templates import main
+    return main(args.prompt_args)
+
+
+def cmd_serve(args):
+    from src.detection_service import main
+    return main(args.serve_args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python src/cli.py',
+        description='Multi-bias detection and mitigation pipeline'
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+    subparsers.required = True
+
+    p = subparsers.add_parser('generate', help='generate texts with GPT-4o-mini')
+    p.add_argument('bias_type', nargs='?', default='combined', choices=BIAS_CHOICES + ['all'],
+                   help='"all" generates every prompt set concurrently with shared prompts deduplicated')
+    p.add_argument('--guard', nargs='?', const='', default=None, metavar='THRESHOLD',
+                   help='stream completions and stop early above THRESHOLD (default 0.5)')
+    p.add_argument('--sequential', action='store_true',
+                   help='sample each prompt until its bias score is known to --target-width')
+    p.add_argument('--target-width', type=float, default=0.2)
+    p.add_argument('--max-samples', type=int, default=20)
+    p.add_argument('--samples', type=int, default=1, help='completions per prompt')
+    p.add_argument('--near-duplicates', type=float, nargs='?', const=0.8, default=None, metavar='THRESHOLD',
+                   help='with --sequential: reuse detection for near-duplicate samples and stop '
+                        'prompts that keep repeating one completion (default 0.8)')
+    p.add_argument('--concurrency', type=int, default=8, help='all: requests in flight at once')
+    p.add_argument('--rpm', type=float, default=500, help='all: shared requests-per-minute budget')
+    p.set_defaults(func=cmd_generate)
+
+    for name, helptext, func in [
+        ('analyze', 'detect bias in generated texts and write summaries', cmd_analyze),
+        ('table', 'write per-subject bias tables', cmd_table),
+        ('visualize', 'save bias charts', cmd_visualize),
+    ]:
+        p = subparsers.add_parser(name, help=helptext)
+        p.add_argument('bias_type', nargs='?', default='combined', choices=BIAS_CHOICES)
+        p.add_argument('--input', help='generated-output file (default depends on bias type)')
+        p.add_argument('--baseline', action='store_true',
+                       help='run the original gender-pronoun version of this stage')
+        if name == 'analyze':
+            p.add_argument('--near-duplicates', type=float, nargs='?', const=0.8, default=None,
+                           metavar='THRESHOLD',
+                           help='reuse detection for near-duplicate texts and flag them (default 0.8)')
+            p.add_argument('--dedupe', action='store_true',
+                           help='leave near-duplicate texts out of the statistics')
+        if name in ('table', 'visualize'):
+            p.add_argument('--workers', type=int, default=None,
+                           help='aggregate per-subject counts in N worker processes (map-reduce)')
+            p.add_argument('--aggregates', nargs='+', metavar='FILE',
+                           help='merge saved subject aggregates (subject_aggregates.py map) '
+                                'instead of running detection')
+        if name == 'visualize':
+            p.add_argument('--show', action='store_true', help='open the chart window')
+            p.add_argument('--headless', action='store_true',
+                           help='one top-N chart per bias type, rendered in parallel without a display '
+                                '(for corpora with many subjects)')
+            p.add_argument('--format', choices=['png', 'svg'], default='png', help='--headless output format')
+            p.add_argument('--top', type=int, default=30,
+                           help='--headless: subjects shown; the rest are folded into "Other"')
+        p.set_defaults(func=func)
+
+    p = subparsers.add_parser('mitigate', help='apply and evaluate mitigation strategies')
+    p.add_argument('method', choices=['post', 'prompt', 'engine'],
+                   help='post-processing rewrites, GPT-2 prompt engineering, or the parallel engine')
+    p.add_argument('--input', help='input file (generated outputs, or prompts for "prompt")')
+    p.add_argument('--rescore', action='store_true',
+                   help='prompt: re-analyze the saved mitigated_*.txt outputs instead of generating')
+    p.add_argument('engine_args', nargs=argparse.REMAINDER,
+                   help='extra mitigation_engine.py options, e.g. --workers=4')
+    p.set_defaults(func=cmd_mitigate)
+
+    p = subparsers.add_parser('compare', help='rank every mitigation method against the baseline')
+    p.add_argument('--show', action='store_true', help='open the chart window')
+    p.set_defaults(func=cmd_compare)
+
+    p = subparsers.add_parser('pipeline', help='run every stage as a cached DAG')
+    p.add_argument('pipeline_args', nargs=argparse.REMAINDER, metavar='...',
+                   help='bias types (default: gender) and pipeline.py options: '
+                        '--generate --prompt-mitigation --workers=N --force')
+    p.set_defaults(func=cmd_pipeline)
+
+    p = subparsers.add_parser('prompts', help='expand or sample templated prompts')
+    p.add_argument('prompt_args', nargs=argparse.REMAINDER, metavar='...',
+                   help='bias types (default: all) and prompt_templates.py options: '
+                        '--sample=N --by=template|bias_type --seed=S --output=FILE --generate')
+    p.set_defaults(func=cmd_prompts)
+
+    p = subparsers.add_parser('serve', help='serve bias detection over HTTP')
+    p.add_argument('serve_args', nargs=argparse.REMAINDER, metavar='...',
+                   help='detection_service.py options: --host=H --port=P --workers=N '
+                        '--max-batch=N --max-wait-ms=MS --bias-types=a,b --backend=openai|gpt2|stub')
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
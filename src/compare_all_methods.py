@@ -1,200 +1,374 @@
-import matplotlib.pyplot as plt
-
-print("=" * 70)
-print("COMPREHENSIVE MITIGATION COMPARISON")
-print("=" * 70)
-
-# Read bias summary for original baseline
-try:
-    with open('results/bias_summary.txt', 'r', encoding='utf-8') as f:
-        content = f.read()
-        for line in content.split('\n'):
-            if 'Total male pronouns:' in line:
-                baseline_male = int(line.split(':')[1].strip())
-            elif 'Total female pronouns:' in line:
-                baseline_female = int(line.split(':')[1].strip())
-            elif 'Average bias score:' in line:
-                baseline_bias = float(line.split(':')[1].strip())
-except:
-    print("ERROR: Could not load baseline results")
-    exit()
-
-print(f"\nBASELINE (No mitigation):")
-print(f"  Male pronouns: {baseline_male}")
-print(f"  Female pronouns: {baseline_female}")
-print(f"  Bias score: {baseline_bias:+.3f}")
-
-# Collect results from all methods
-methods = {
-    'Baseline (No mitigation)': {
-        'bias_score': baseline_bias,
-        'male': baseline_male,
-        'female': baseline_female
-    }
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline_io import load_arrays, load_metrics, metrics_path, strategy_slug, write_metrics
+
+# Post-processing strategy name -> method label in the comparison
+POST_PROCESS_LABELS = {
+    'Replace with They/Them': 'Post-process: Replace with They/Them',
+    'Remove Pronouns': 'Post-process: Remove Pronouns',
+    'Alternating Gender': 'Post-process: Alternating'
 }
+BASELINE_LABEL = 'Baseline (No mitigation)'
+
+
+def prompt_label(strategy_name):
+    return f'Prompt: {strategy_name}'
+
+
+def post_label(strategy_name):
+    return POST_PROCESS_LABELS.get(strategy_name, f'Post-process: {strategy_name}')
+
+
+def build_methods(baseline, prompt_scores=None, post_scores=None):
+    """
+    Collect every method's bias score for the comparison
+
+    Args:
+        baseline: {'male', 'female', 'bias'} from the gender baseline summary
+        prompt_scores: {strategy_name: average bias} from prompt engineering
+        post_scores: {strategy_name: debiased bias} from post-processing
+
+    Returns:
+        {method_label: {'bias_score', 'male', 'female'}}
+    """
+    methods = {
+        BASELINE_LABEL: {
+            'bias_score': baseline['bias'],
+            'male': baseline['male'],
+            'female': baseline['female']
+        }
+    }
+    for strategy_name, bias in (prompt_scores or {}).items():
+        methods[prompt_label(strategy_name)] = {'bias_score': bias, 'male': 0, 'female': 0}
+    for strategy_name, bias in (post_scores or {}).items():
+        methods[post_label(strategy_name)] = {'bias_score': bias, 'male': 0, 'female': 0}
+    return methods
+
+
+def method_arrays_from(baseline_arrays=None, prompt=None, post=None):
+    """
+    Per-text arrays behind each method's score, and what its reduction is tested against
+
+    Args:
+        baseline_arrays: bias_summary arrays ('bias_score' per generated text), or None
+        prompt: (strategies, arrays) of the prompt engineering stage, or None
+        post: (strategies, arrays) of the post-processing stage, or None
+
+    Returns:
+        {method_label: (columns, statistic, reference)}; the statistic of the
+        columns' means reproduces the method's bias score. reference is
+        (columns, statistic, paired) for the reduction test, on the same
+        statistic as the method: prompt engineering generates new texts, so it
+        is tested unpaired against the baseline's mean per-text score;
+        post-processing rewrites the baseline outputs in order, so it is tested
+        paired against the pronoun ratio of the original counts of the same
+        texts. The baseline itself has no reference.
+    """
+    from src.bootstrap_stats import mean_of, pronoun_ratio
+
+    method_arrays = {}
+    baseline = None
+    if baseline_arrays is not None and len(baseline_arrays.get('bias_score', ())):
+        baseline = ({'score': baseline_arrays['bias_score']}, mean_of('score'))
+        method_arrays[BASELINE_LABEL] = baseline + (None,)
+
+    if prompt is not None:
+        strategies, arrays = prompt
+        reference = baseline + (False,) if baseline else None
+        for strategy_name in strategies:
+            scores = arrays.get(f'{strategy_slug(strategy_name)}_score')
+            if scores is not None and len(scores):
+                method_arrays[prompt_label(strategy_name)] = ({'score': scores}, mean_of('score'), reference)
+
+    if post is not None:
+        strategies, arrays = post
+        ratio = pronoun_ratio('male', 'female')
+        reference = None
+        if 'original_male' in arrays and 'original_female' in arrays:
+            reference = ({'male': arrays['original_male'], 'female': arrays['original_female']}, ratio, True)
+        for strategy_name in strategies:
+            slug = strategy_slug(strategy_name)
+            if f'{slug}_male' in arrays and f'{slug}_female' in arrays and len(arrays[f'{slug}_male']):
+                columns = {'male': arrays[f'{slug}_male'], 'female': arrays[f'{slug}_female']}
+                method_arrays[post_label(strategy_name)] = (columns, ratio, reference)
+    return method_arrays
+
+
+def load_method_arrays():
+    """method_arrays_from() the stages' metrics JSON and NPZ artifacts (missing stages are skipped)"""
+    try:
+        baseline_arrays = load_arrays('bias_summary')
+    except FileNotFoundError:
+        baseline_arrays = None
+    stages = {}
+    for name in ('mitigation_prompt_engineering', 'mitigation_post_processing'):
+        try:
+            stages[name] = (load_metrics(name)['strategies'], load_arrays(name))
+        except (FileNotFoundError, ValueError, KeyError):
+            stages[name] = None
+    return method_arrays_from(baseline_arrays, stages['mitigation_prompt_engineering'],
+                              stages['mitigation_post_processing'])
+
+
+def add_intervals(methods, method_arrays):
+    """
+    Add bootstrap uncertainty to the methods that have per-text arrays
+
+    Each such method gets 'ci' (interval of its bias score) and, when it has
+    a reference (see method_arrays_from), 'vs_baseline' (test of its bias
+    reduction on the same statistic as its score).
+    """
+    from src.bootstrap_stats import bootstrap, paired_reduction
+
+    for label, data in methods.items():
+        if label not in method_arrays:
+            continue
+        columns, statistic, reference = method_arrays[label]
+        data['ci'] = bootstrap(columns, statistic)
+        if reference:
+            reference_columns, reference_statistic, paired = reference
+            data['vs_baseline'] = paired_reduction(reference_columns, reference_statistic, columns, statistic,
+                                                   paired=paired)
+    return methods
+
+
+def describe_test(test):
+    """One-line reading of a paired_reduction() result"""
+    from src.bootstrap_stats import format_interval
+
+    if test['low'] > 0:
+        verdict = "significant reduction"
+    elif test['high'] < 0:
+        verdict = "significant increase"
+    else:
+        verdict = "not significant"
+    return (f"{test['estimate']:+.3f} {test['confidence']:.0%} CI {format_interval(test)}, "
+            f"p={test['p_value']:.3f} ({'paired with the original texts' if test['paired'] else 'unpaired'}) "
+            f"- {verdict}")
+
+
+def load_methods():
+    """Baseline plus every mitigation method's bias score, from the stages' metrics artifacts"""
+    try:
+        baseline_summary = load_metrics('bias_summary')
+    except FileNotFoundError:
+        print(f"ERROR: Could not find {metrics_path('bias_summary')}")
+        print("Please run: python src/cli.py analyze gender --baseline")
+        return None
+    except ValueError as e:
+        print(f"ERROR: Could not parse {metrics_path('bias_summary')}: {e}")
+        return None
+    baseline = {
+        'male': baseline_summary['total_male'],
+        'female': baseline_summary['total_female'],
+        'bias': baseline_summary['average_bias']
+    }
+
+    print(f"\nBASELINE (No mitigation):")
+    print(f"  Male pronouns: {baseline['male']}")
+    print(f"  Female pronouns: {baseline['female']}")
+    print(f"  Bias score: {baseline['bias']:+.3f}")
+
+    prompt_scores = {}
+    post_scores = {}
+    for name, label, scores, key in [
+        ('mitigation_prompt_engineering', 'prompt engineering', prompt_scores, 'average_bias'),
+        ('mitigation_post_processing', 'post-processing', post_scores, 'bias_debiased'),
+    ]:
+        try:
+            strategies = load_metrics(name)['strategies']
+        except FileNotFoundError:
+            print(f"\nWarning: No {label} metrics ({metrics_path(name)}); skipping that method")
+            continue
+        except (ValueError, KeyError) as e:
+            print(f"\nWarning: Could not parse {metrics_path(name)}: {e}")
+            continue
+        for strategy_name, analysis in strategies.items():
+            scores[strategy_name] = analysis[key]
 
-# Try to load prompt engineering results
-try:
-    with open('results/mitigation_comparison_prompt_engineering.txt', 'r', encoding='utf-8') as f:
-        content = f.read()
-        # Parse each strategy (this is simplified parsing)
-        current_strategy = None
-        for line in content.split('\n'):
-            if line.strip() and line.strip().endswith(':') and 'Strategy' in line:
-                current_strategy = line.strip()[:-1]
-            elif current_strategy and 'Average bias score:' in line:
-                bias = float(line.split(':')[1].strip())
-                methods[f'Prompt: {current_strategy}'] = {'bias_score': bias, 'male': 0, 'female': 0}
-except:
-    print("\nWarning: Could not load prompt engineering results")
-
-# Try to load post-processing results
-try:
-    with open('results/mitigation_analysis_post_processing.txt', 'r', encoding='utf-8') as f:
-        content = f.read()
-        sections = content.split('=' * 70)
-        for section in sections:
-            if 'Replace with They/Them:' in section:
-                for line in section.split('\n'):
-                    if 'Bias score:' in line and 'DEBIASED' in section[:section.index(line)]:
-                        bias = float(line.split(':')[1].strip())
-                        methods['Post-process: Replace with They/Them'] = {'bias_score': bias, 'male': 0, 'female': 0}
-            elif 'Remove Pronouns:' in section:
-                for line in section.split('\n'):
-                    if 'Bias score:' in line and 'DEBIASED' in section[:section.index(line)]:
-                        bias = float(line.split(':')[1].strip())
-                        methods['Post-process: Remove Pronouns'] = {'bias_score': bias, 'male': 0, 'female': 0}
-            elif 'Alternating Gender:' in section:
-                for line in section.split('\n'):
-                    if 'Bias score:' in line and 'DEBIASED' in section[:section.index(line)]:
-                        bias = float(line.split(':')[1].strip())
-                        methods['Post-process: Alternating'] = {'bias_score': bias, 'male': 0, 'female': 0}
-except:
-    print("Warning: Could not load post-processing results")
-
-# Display comparison
-print("\n" + "=" * 70)
-print("METHOD COMPARISON")
-print("=" * 70)
-
-for method_name, data in methods.items():
-    bias_reduction = abs(baseline_bias) - abs(data['bias_score'])
-    reduction_percent = (bias_reduction / abs(baseline_bias) * 100) if baseline_bias != 0 else 0
-    
-    print(f"\n{method_name}:")
-    print(f"  Bias score: {data['bias_score']:+.3f}")
-    print(f"  Reduction from baseline: {bias_reduction:+.3f} ({reduction_percent:.1f}%)")
-
-# Create visualization
-method_names = list(methods.keys())
-bias_scores = [methods[m]['bias_score'] for m in method_names]
-
-# Create figure with two subplots
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
-
-# Plot 1: Bias scores comparison
-colors = ['#E74C3C' if abs(score) > 0.3 else '#F39C12' if abs(score) > 0.1 else '#2ECC71' 
-          for score in bias_scores]
-bars = ax1.bar(range(len(method_names)), bias_scores, color=colors, alpha=0.8, edgecolor='black')
-ax1.axhline(y=0, color='black', linestyle='-', linewidth=1)
-ax1.axhline(y=0.3, color='red', linestyle='--', linewidth=1, alpha=0.3, label='High bias threshold')
-ax1.axhline(y=-0.3, color='red', linestyle='--', linewidth=1, alpha=0.3)
-ax1.set_xlabel('Mitigation Method', fontsize=12, fontweight='bold')
-ax1.set_ylabel('Bias Score', fontsize=12, fontweight='bold')
-ax1.set_title('Bias Score by Mitigation Method\n(Lower absolute value = Better)', 
-              fontsize=14, fontweight='bold', pad=20)
-ax1.set_xticks(range(len(method_names)))
-ax1.set_xticklabels(method_names, rotation=45, ha='right', fontsize=9)
-ax1.set_ylim(-1, 1)
-ax1.grid(axis='y', alpha=0.3)
-ax1.legend()
-
-# Add value labels on bars
-for i, (bar, score) in enumerate(zip(bars, bias_scores)):
-    height = bar.get_height()
-    ax1.text(bar.get_x() + bar.get_width()/2., height,
-            f'{score:.3f}',
-            ha='center', va='bottom' if height > 0 else 'top',
-            fontsize=9, fontweight='bold')
-
-# Plot 2: Bias reduction comparison
-baseline_abs_bias = abs(baseline_bias)
-bias_reductions = [baseline_abs_bias - abs(score) for score in bias_scores]
-colors2 = ['#2ECC71' if red > 0 else '#E74C3C' for red in bias_reductions]
-bars2 = ax2.bar(range(len(method_names)), bias_reductions, color=colors2, alpha=0.8, edgecolor='black')
-ax2.axhline(y=0, color='black', linestyle='-', linewidth=1)
-ax2.set_xlabel('Mitigation Method', fontsize=12, fontweight='bold')
-ax2.set_ylabel('Bias Reduction', fontsize=12, fontweight='bold')
-ax2.set_title('Bias Reduction by Method\n(Positive = Good, Negative = Bad)', 
-              fontsize=14, fontweight='bold', pad=20)
-ax2.set_xticks(range(len(method_names)))
-ax2.set_xticklabels(method_names, rotation=45, ha='right', fontsize=9)
-ax2.grid(axis='y', alpha=0.3)
-
-# Add value labels
-for bar, reduction in zip(bars2, bias_reductions):
-    height = bar.get_height()
-    ax2.text(bar.get_x() + bar.get_width()/2., height,
-            f'{reduction:.3f}',
-            ha='center', va='bottom' if height > 0 else 'top',
-            fontsize=9, fontweight='bold')
-
-plt.tight_layout()
-plt.savefig('results/mitigation_comparison_all_methods.png', dpi=300, bbox_inches='tight')
-print("\n✓ Comparison chart saved to: results/mitigation_comparison_all_methods.png")
-
-# Create summary report
-summary_file = 'results/final_mitigation_summary.txt'
-
-with open(summary_file, 'w', encoding='utf-8') as f:
-    f.write("FINAL MITIGATION SUMMARY - ALL METHODS\n")
-    f.write("=" * 70 + "\n\n")
-    
-    f.write(f"BASELINE (No mitigation):\n")
-    f.write(f"  Bias score: {baseline_bias:+.3f}\n\n")
-    
-    f.write("RESULTS BY METHOD:\n")
-    f.write("-" * 70 + "\n\n")
-    
-    # Sort by best performance
-    sorted_methods = sorted(methods.items(), key=lambda x: abs(x[1]['bias_score']))
-    
-    for rank, (method_name, data) in enumerate(sorted_methods, 1):
+    return build_methods(baseline, prompt_scores, post_scores)
+
+
+def write_comparison_metrics(methods, baseline_bias):
+    """Save the ranking as results/metrics/final_mitigation_summary.json"""
+    ranked = sorted(methods.items(), key=lambda x: abs(x[1]['bias_score']))
+    return write_metrics('final_mitigation_summary', {
+        'stage': 'compare',
+        'baseline_bias': baseline_bias,
+        'methods': [
+            {'method': name, 'bias_score': data['bias_score'],
+             'bias_reduction': abs(baseline_bias) - abs(data['bias_score']),
+             **{key: data[key] for key in ('ci', 'vs_baseline') if key in data}}
+            for name, data in ranked
+        ]
+    })
+
+
+def plot(methods, baseline_bias, output_file, show=False):
+    """Save the bias score and bias reduction bar charts"""
+    import matplotlib.pyplot as plt
+
+    # Create visualization
+    method_names = list(methods.keys())
+    bias_scores = [methods[m]['bias_score'] for m in method_names]
+
+    # Create figure with two subplots
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
+
+    # Plot 1: Bias scores comparison
+    colors = ['#E74C3C' if abs(score) > 0.3 else '#F39C12' if abs(score) > 0.1 else '#2ECC71' 
+              for score in bias_scores]
+    # Bootstrap intervals as error bars where the stages saved per-text arrays
+    intervals = [methods[m].get('ci', {'low': score, 'high': score}) for m, score in zip(method_names, bias_scores)]
+    errors = [[max(0, score - ci['low']) for score, ci in zip(bias_scores, intervals)],
+              [max(0, ci['high'] - score) for score, ci in zip(bias_scores, intervals)]]
+    bars = ax1.bar(range(len(method_names)), bias_scores, color=colors, alpha=0.8, edgecolor='black',
+                   yerr=errors if any(map(any, errors)) else None, capsize=4)
+    ax1.axhline(y=0, color='black', linestyle='-', linewidth=1)
+    ax1.axhline(y=0.3, color='red', linestyle='--', linewidth=1, alpha=0.3, label='High bias threshold')
+    ax1.axhline(y=-0.3, color='red', linestyle='--', linewidth=1, alpha=0.3)
+    ax1.set_xlabel('Mitigation Method', fontsize=12, fontweight='bold')
+    ax1.set_ylabel('Bias Score', fontsize=12, fontweight='bold')
+    ax1.set_title('Bias Score by Mitigation Method\n(Lower absolute value = Better)', 
+                  fontsize=14, fontweight='bold', pad=20)
+    ax1.set_xticks(range(len(method_names)))
+    ax1.set_xticklabels(method_names, rotation=45, ha='right', fontsize=9)
+    ax1.set_ylim(-1, 1)
+    ax1.grid(axis='y', alpha=0.3)
+    ax1.legend()
+
+    # Add value labels on bars
+    for i, (bar, score) in enumerate(zip(bars, bias_scores)):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height,
+                f'{score:.3f}',
+                ha='center', va='bottom' if height > 0 else 'top',
+                fontsize=9, fontweight='bold')
+
+    # Plot 2: Bias reduction comparison
+    baseline_abs_bias = abs(baseline_bias)
+    bias_reductions = [baseline_abs_bias - abs(score) for score in bias_scores]
+    colors2 = ['#2ECC71' if red > 0 else '#E74C3C' for red in bias_reductions]
+    bars2 = ax2.bar(range(len(method_names)), bias_reductions, color=colors2, alpha=0.8, edgecolor='black')
+    ax2.axhline(y=0, color='black', linestyle='-', linewidth=1)
+    ax2.set_xlabel('Mitigation Method', fontsize=12, fontweight='bold')
+    ax2.set_ylabel('Bias Reduction', fontsize=12, fontweight='bold')
+    ax2.set_title('Bias Reduction by Method\n(Positive = Good, Negative = Bad)', 
+                  fontsize=14, fontweight='bold', pad=20)
+    ax2.set_xticks(range(len(method_names)))
+    ax2.set_xticklabels(method_names, rotation=45, ha='right', fontsize=9)
+    ax2.grid(axis='y', alpha=0.3)
+
+    # Add value labels
+    for bar, reduction in zip(bars2, bias_reductions):
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height,
+                f'{reduction:.3f}',
+                ha='center', va='bottom' if height > 0 else 'top',
+                fontsize=9, fontweight='bold')
+
+    plt.tight_layout()
+    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    print(f"\n✓ Comparison chart saved to: {output_file}")
+
+    if show:
+        plt.show()
+    plt.close(fig)
+
+
+def write_summary(path, methods, baseline_bias):
+    # Create summary report
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("FINAL MITIGATION SUMMARY - ALL METHODS\n")
+        f.write("=" * 70 + "\n\n")
+
+        f.write(f"BASELINE (No mitigation):\n")
+        f.write(f"  Bias score: {baseline_bias:+.3f}\n\n")
+
+        f.write("RESULTS BY METHOD:\n")
+        f.write("-" * 70 + "\n\n")
+
+        # Sort by best performance
+        sorted_methods = sorted(methods.items(), key=lambda x: abs(x[1]['bias_score']))
+
+        for rank, (method_name, data) in enumerate(sorted_methods, 1):
+            bias_reduction = abs(baseline_bias) - abs(data['bias_score'])
+            reduction_percent = (bias_reduction / abs(baseline_bias) * 100) if baseline_bias != 0 else 100
+
+            f.write(f"{rank}. {method_name}\n")
+            f.write(f"   Bias score: {data['bias_score']:+.3f}\n")
+            f.write(f"   Bias reduction: {bias_reduction:+.3f}\n")
+            f.write(f"   Reduction percentage: {reduction_percent:.1f}%\n")
+            if 'ci' in data:
+                f.write(f"   {data['ci']['confidence']:.0%} confidence interval: "
+                        f"[{data['ci']['low']:+.3f}, {data['ci']['high']:+.3f}]\n")
+            if 'vs_baseline' in data:
+                f.write(f"   Reduction vs baseline: {describe_test(data['vs_baseline'])}\n")
+
+            if abs(data['bias_score']) < 0.1:
+                f.write(f"   Rating: ★★★★★ Excellent - Near zero bias\n")
+            elif abs(data['bias_score']) < 0.2:
+                f.write(f"   Rating: ★★★★☆ Very Good - Low bias\n")
+            elif abs(data['bias_score']) < 0.3:
+                f.write(f"   Rating: ★★★☆☆ Good - Moderate bias\n")
+            else:
+                f.write(f"   Rating: ★★☆☆☆ Fair - Still significant bias\n")
+
+            f.write("\n")
+
+        f.write("=" * 70 + "\n")
+        f.write("RECOMMENDATION:\n")
+        best_method = sorted_methods[0][0]
+        f.write(f"Best performing method: {best_method}\n")
+        f.write(f"This method achieved the lowest bias score and should be used\n")
+        f.write(f"for your final implementation.\n")
+
+
+def run(show=False):
+    """Rank every mitigation method against the baseline (the CLI 'compare' stage)"""
+    print("=" * 70)
+    print("COMPREHENSIVE MITIGATION COMPARISON")
+    print("=" * 70)
+
+    methods = load_methods()
+    if methods is None:
+        return None
+    add_intervals(methods, load_method_arrays())
+    baseline_bias = methods[BASELINE_LABEL]['bias_score']
+
+    # Display comparison
+    print("\n" + "=" * 70)
+    print("METHOD COMPARISON")
+    print("=" * 70)
+
+    for method_name, data in methods.items():
         bias_reduction = abs(baseline_bias) - abs(data['bias_score'])
-        reduction_percent = (bias_reduction / abs(baseline_bias) * 100) if baseline_bias != 0 else 100
-        
-        f.write(f"{rank}. {method_name}\n")
-        f.write(f"   Bias score: {data['bias_score']:+.3f}\n")
-        f.write(f"   Bias reduction: {bias_reduction:+.3f}\n")
-        f.write(f"   Reduction percentage: {reduction_percent:.1f}%\n")
-        
-        if abs(data['bias_score']) < 0.1:
-            f.write(f"   Rating: ★★★★★ Excellent - Near zero bias\n")
-        elif abs(data['bias_score']) < 0.2:
-            f.write(f"   Rating: ★★★★☆ Very Good - Low bias\n")
-        elif abs(data['bias_score']) < 0.3:
-            f.write(f"   Rating: ★★★☆☆ Good - Moderate bias\n")
-        else:
-            f.write(f"   Rating: ★★☆☆☆ Fair - Still significant bias\n")
-        
-        f.write("\n")
-    
-    f.write("=" * 70 + "\n")
-    f.write("RECOMMENDATION:\n")
-    best_method = sorted_methods[0][0]
-    f.write(f"Best performing method: {best_method}\n")
-    f.write(f"This method achieved the lowest bias score and should be used\n")
-    f.write(f"for your final implementation.\n")
-
-print(f"✓ Summary report saved to: {summary_file}")
-
-print("\n" + "=" * 70)
-print("COMPARISON COMPLETE!")
-print("=" * 70)
-print("\nYou now have:")
-print("  ✓ Comparison chart showing all methods")
-print("  ✓ Summary report ranking the methods")
-print("  ✓ Recommendation for best method")
-
-# Show the plot
-plt.show()
\ No newline at end of file
+        reduction_percent = (bias_reduction / abs(baseline_bias) * 100) if baseline_bias != 0 else 0
+
+        print(f"\n{method_name}:")
+        print(f"  Bias score: {data['bias_score']:+.3f}")
+        print(f"  Reduction from baseline: {bias_reduction:+.3f} ({reduction_percent:.1f}%)")
+        if 'vs_baseline' in data:
+            print(f"  Bootstrap test: {describe_test(data['vs_baseline'])}")
+
+    plot(methods, baseline_bias, 'results/mitigation_comparison_all_methods.png', show=show)
+
+    summary_file = 'results/final_mitigation_summary.txt'
+    write_summary(summary_file, methods, baseline_bias)
+    metrics_file = write_comparison_metrics(methods, baseline_bias)
+    print(f"✓ Summary report saved to: {summary_file} (metrics: {metrics_file})")
+
+    print("\n" + "=" * 70)
+    print("COMPARISON COMPLETE!")
+    print("=" * 70)
+    print("\nYou now have:")
+    print("  ✓ Comparison chart showing all methods")
+    print("  ✓ Summary report ranking the methods")
+    print("  ✓ Recommendation for best method")
+    return methods
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run(show=True) is not None else 1)
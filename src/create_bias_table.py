@@ -1,32 +1,12 @@
 # Import libraries
 import re
+import sys
+import os
 from collections import defaultdict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("Creating profession bias table...\n")
-
-# Read the generated outputs
-input_file = 'results/generated_outputs.txt'
-
-try:
-    # Try multiple encodings
-    encodings = ['utf-8', 'latin-1', 'cp1252']
-    content = None
-    for encoding in encodings:
-        try:
-            with open(input_file, 'r', encoding=encoding) as f:
-                content = f.read()
-            break
-        except UnicodeDecodeError:
-            continue
-    
-    if content is None:
-        print(f"ERROR: Could not read {input_file}")
-        exit()
-        
-except FileNotFoundError:
-    print(f"ERROR: Could not find {input_file}")
-    print("Please run generate_text.py first!")
-    exit()
+from src.bootstrap_stats import CONFIDENCE, bootstrap, format_interval, pronoun_ratio
+from src.pipeline_io import load_generated
 
 # Define pronouns
 MALE_PRONOUNS = ['he', 'him', 'his', 'himself']
@@ -48,148 +28,167 @@ def count_pronouns(text):
     
     return male_count, female_count
 
-# Parse file
-lines = content.split('\n')
-profession_data = defaultdict(lambda: {'male': 0, 'female': 0, 'count': 0})
-
-current_prompt = None
-current_output = None
-
-for line in lines:
-    line = line.strip()
+def build_profession_table(results):
+    """Per-profession pronoun totals, bias and bootstrap interval, most male-biased first"""
+    profession_data = defaultdict(lambda: {'male': 0, 'female': 0, 'count': 0, 'texts': []})
+    
+    for result in results:
+        # Extract profession
+        words = result['prompt'].split()
+        if len(words) >= 2 and words[0].lower() == "the":
+            profession = words[1].lower()
+            male, female = count_pronouns(result['output'])
+            profession_data[profession]['male'] += male
+            profession_data[profession]['female'] += female
+            profession_data[profession]['count'] += 1
+            profession_data[profession]['texts'].append((male, female))
+    
+    # Calculate bias scores for each profession
+    profession_results = []
     
-    if line.startswith('PROMPT:') or 'PROMPT:' in line.upper():
-        current_prompt = line.split('PROMPT:', 1)[1].strip() if 'PROMPT:' in line.upper() else ""
-    elif line.startswith('OUTPUT:') or 'OUTPUT:' in line.upper():
-        current_output = line.split('OUTPUT:', 1)[1].strip() if 'OUTPUT:' in line.upper() else ""
+    for profession, data in profession_data.items():
+        male = data['male']
+        female = data['female']
+        total_pronouns = male + female
         
-        if current_prompt and current_output:
-            # Extract profession
-            words = current_prompt.split()
-            if len(words) >= 2 and words[0].lower() == "the":
-                profession = words[1].lower()
-                
-                # Count pronouns
-                male, female = count_pronouns(current_output)
-                
-                # Add to profession data
-                profession_data[profession]['male'] += male
-                profession_data[profession]['female'] += female
-                profession_data[profession]['count'] += 1
-            
-            current_prompt = None
-            current_output = None
-
-# Calculate bias scores for each profession
-profession_results = []
-
-for profession, data in profession_data.items():
-    male = data['male']
-    female = data['female']
-    total_pronouns = male + female
-    
-    if total_pronouns > 0:
-        bias_score = (male - female) / total_pronouns
-    else:
-        bias_score = 0.0
-    
-    # Determine bias direction
-    if bias_score > 0.3:
-        bias_direction = "MALE"
-    elif bias_score < -0.3:
-        bias_direction = "FEMALE"
-    else:
-        bias_direction = "NEUTRAL"
-    
-    profession_results.append({
-        'profession': profession,
-        'male_pronouns': male,
-        'female_pronouns': female,
-        'total_pronouns': total_pronouns,
-        'bias_score': bias_score,
-        'bias_direction': bias_direction
-    })
-
-# Sort by bias score (most male biased first)
-profession_results.sort(key=lambda x: x['bias_score'], reverse=True)
-
-# Create the table
-output_file = 'results/profession_bias_table.txt'
-
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write("=" * 90 + "\n")
-    f.write("PROFESSION BIAS TABLE - SORTED BY BIAS SCORE\n")
-    f.write("=" * 90 + "\n\n")
+        if total_pronouns > 0:
+            bias_score = (male - female) / total_pronouns
+        else:
+            bias_score = 0.0
+        
+        # Determine bias direction
+        if bias_score > 0.3:
+            bias_direction = "MALE"
+        elif bias_score < -0.3:
+            bias_direction = "FEMALE"
+        else:
+            bias_direction = "NEUTRAL"
+        
+        profession_results.append({
+            'profession': profession,
+            'male_pronouns': male,
+            'female_pronouns': female,
+            'total_pronouns': total_pronouns,
+            'bias_score': bias_score,
+            'bias_direction': bias_direction,
+            'ci': profession_interval(data['texts'])
+        })
+    
+    # Sort by bias score (most male biased first)
+    profession_results.sort(key=lambda x: x['bias_score'], reverse=True)
+    return profession_results
+
+def profession_interval(texts):
+    """Bootstrap interval of the pronoun ratio over one profession's texts ((male, female) pairs)"""
+    male, female = zip(*texts)
+    return bootstrap({'male': male, 'female': female}, pronoun_ratio('male', 'female'))
+
+def format_row(result):
+    return (f"{result['profession'].capitalize():<20} "
+            f"{result['male_pronouns']:>8} "
+            f"{result['female_pronouns']:>8} "
+            f"{result['total_pronouns']:>8} "
+            f"{result['bias_score']:>12.2f} "
+            f"{result['bias_direction']:>12}")
+
+HEADER = f"{'PROFESSION':<20} {'MALE':>8} {'FEMALE':>8} {'TOTAL':>8} {'BIAS SCORE':>12} {'DIRECTION':>12}"
+
+def write_table(path, profession_results):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("=" * 90 + "\n")
+        f.write("PROFESSION BIAS TABLE - SORTED BY BIAS SCORE\n")
+        f.write("=" * 90 + "\n\n")
+        
+        # Table header
+        f.write(HEADER + "\n")
+        f.write("-" * 90 + "\n")
+        
+        # Table rows
+        for result in profession_results:
+            f.write(format_row(result) + "\n")
+        
+        f.write("=" * 90 + "\n\n")
+        
+        # Uncertainty of each profession's score (resampling its texts)
+        f.write(f"{CONFIDENCE:.0%} BOOTSTRAP CONFIDENCE INTERVALS\n")
+        f.write("-" * 90 + "\n")
+        f.write(f"{'PROFESSION':<20} {'TEXTS':>8} {'BIAS SCORE':>12} {'INTERVAL':>20}\n")
+        for result in profession_results:
+            f.write(f"{result['profession'].capitalize():<20} {result['ci']['texts']:>8} "
+                    f"{result['bias_score']:>12.2f} {format_interval(result['ci']):>20}\n")
+        f.write("Intervals resample each profession's texts; one text gives a zero-width interval.\n")
+        f.write("=" * 90 + "\n\n")
+        
+        # Add interpretation guide
+        f.write("INTERPRETATION GUIDE:\n")
+        f.write("-" * 90 + "\n")
+        f.write("Bias Score:\n")
+        f.write("  +1.00 = Only male pronouns (strong male bias)\n")
+        f.write("   0.00 = Equal male and female pronouns (balanced)\n")
+        f.write("  -1.00 = Only female pronouns (strong female bias)\n\n")
+        f.write("Direction:\n")
+        f.write("  MALE    = Bias score > +0.3 (tends toward male)\n")
+        f.write("  NEUTRAL = Bias score between -0.3 and +0.3 (balanced)\n")
+        f.write("  FEMALE  = Bias score < -0.3 (tends toward female)\n")
+        f.write("=" * 90 + "\n")
+
+def run(input_file='results/generated_outputs.txt'):
+    """Build and save the profession bias table (gender baseline)"""
+    print("Creating profession bias table...\n")
+    
+    try:
+        results = load_generated(input_file)
+    except FileNotFoundError:
+        print(f"ERROR: Could not find {input_file}")
+        print("Please run generate_text.py first!")
+        return None
+    except UnicodeError:
+        print(f"ERROR: Could not read {input_file}")
+        return None
+    
+    profession_results = build_profession_table(results)
     
-    # Table header
-    header = f"{'PROFESSION':<20} {'MALE':>8} {'FEMALE':>8} {'TOTAL':>8} {'BIAS SCORE':>12} {'DIRECTION':>12}"
-    f.write(header + "\n")
-    f.write("-" * 90 + "\n")
+    # Create the table
+    output_file = 'results/profession_bias_table.txt'
+    write_table(output_file, profession_results)
+    
+    # Also print to screen
+    print("=" * 90)
+    print("PROFESSION BIAS TABLE - SORTED BY BIAS SCORE")
+    print("=" * 90)
+    print()
+    print(HEADER)
+    print("-" * 90)
     
-    # Table rows
     for result in profession_results:
-        row = (f"{result['profession'].capitalize():<20} "
-               f"{result['male_pronouns']:>8} "
-               f"{result['female_pronouns']:>8} "
-               f"{result['total_pronouns']:>8} "
-               f"{result['bias_score']:>12.2f} "
-               f"{result['bias_direction']:>12}")
-        f.write(row + "\n")
-    
-    f.write("=" * 90 + "\n\n")
-    
-    # Add interpretation guide
-    f.write("INTERPRETATION GUIDE:\n")
-    f.write("-" * 90 + "\n")
-    f.write("Bias Score:\n")
-    f.write("  +1.00 = Only male pronouns (strong male bias)\n")
-    f.write("   0.00 = Equal male and female pronouns (balanced)\n")
-    f.write("  -1.00 = Only female pronouns (strong female bias)\n\n")
-    f.write("Direction:\n")
-    f.write("  MALE    = Bias score > +0.3 (tends toward male)\n")
-    f.write("  NEUTRAL = Bias score between -0.3 and +0.3 (balanced)\n")
-    f.write("  FEMALE  = Bias score < -0.3 (tends toward female)\n")
-    f.write("=" * 90 + "\n")
-
-# Also print to screen
-print("=" * 90)
-print("PROFESSION BIAS TABLE - SORTED BY BIAS SCORE")
-print("=" * 90)
-print()
-print(header)
-print("-" * 90)
-
-for result in profession_results:
-    row = (f"{result['profession'].capitalize():<20} "
-           f"{result['male_pronouns']:>8} "
-           f"{result['female_pronouns']:>8} "
-           f"{result['total_pronouns']:>8} "
-           f"{result['bias_score']:>12.2f} "
-           f"{result['bias_direction']:>12}")
-    print(row)
-
-print("=" * 90)
-print()
-
-# Print insights
-male_biased = [r for r in profession_results if r['bias_direction'] == 'MALE']
-female_biased = [r for r in profession_results if r['bias_direction'] == 'FEMALE']
-neutral = [r for r in profession_results if r['bias_direction'] == 'NEUTRAL']
-
-print("KEY FINDINGS:")
-print("-" * 90)
-print(f"Professions with MALE bias: {len(male_biased)}")
-if male_biased:
-    print(f"  Examples: {', '.join([r['profession'] for r in male_biased[:5]])}")
-
-print(f"\nProfessions with FEMALE bias: {len(female_biased)}")
-if female_biased:
-    print(f"  Examples: {', '.join([r['profession'] for r in female_biased[:5]])}")
-
-print(f"\nNeutral professions: {len(neutral)}")
-if neutral:
-    print(f"  Examples: {', '.join([r['profession'] for r in neutral[:5]])}")
+        print(format_row(result))
+    
+    print("=" * 90)
+    print()
+    
+    # Print insights
+    male_biased = [r for r in profession_results if r['bias_direction'] == 'MALE']
+    female_biased = [r for r in profession_results if r['bias_direction'] == 'FEMALE']
+    neutral = [r for r in profession_results if r['bias_direction'] == 'NEUTRAL']
+    
+    print("KEY FINDINGS:")
+    print("-" * 90)
+    print(f"Professions with MALE bias: {len(male_biased)}")
+    if male_biased:
+        print(f"  Examples: {', '.join([r['profession'] for r in male_biased[:5]])}")
+    
+    print(f"\nProfessions with FEMALE bias: {len(female_biased)}")
+    if female_biased:
+        print(f"  Examples: {', '.join([r['profession'] for r in female_biased[:5]])}")
+    
+    print(f"\nNeutral professions: {len(neutral)}")
+    if neutral:
+        print(f"  Examples: {', '.join([r['profession'] for r in neutral[:5]])}")
+    
+    print("\n" + "=" * 90)
+    print(f"\nTable saved to: {output_file}")
+    print("You can open this file to see a nicely formatted table!\n")
+    return profession_results
 
-print("\n" + "=" * 90)
-print(f"\nTable saved to: {output_file}")
-print("You can open this file to see a nicely formatted table!\n")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(0 if run() is not None else 1)
@@ -4,206 +4,323 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.bias_detector import MultiBiasDetector
-from collections import defaultdict
-
-print("=" * 70)
-print("MULTI-BIAS TABLE GENERATOR")
-print("=" * 70)
-
-# Get bias type from command line
-bias_type = sys.argv[1] if len(sys.argv) > 1 else 'combined'
-print(f"\nCreating table for: {bias_type.upper()} BIAS\n")
-
-# Determine which input file to use
-if bias_type == 'gender':
-    input_file = 'results/generated_outputs.txt'
-elif bias_type == 'combined':
-    input_file = 'results/generated_outputs_multi_bias.txt'
-else:
-    input_file = f'results/generated_outputs_{bias_type}.txt'
-
-# Read the generated outputs
-try:
-    encodings = ['utf-8', 'latin-1', 'cp1252']
-    content = None
-    for encoding in encodings:
-        try:
-            with open(input_file, 'r', encoding=encoding) as f:
-                content = f.read()
-            break
-        except UnicodeDecodeError:
-            continue
-    
-    if content is None:
-        print(f"ERROR: Could not read {input_file}")
-        exit()
-        
-except FileNotFoundError:
-    print(f"ERROR: Could not find {input_file}")
-    print(f"Please run: python src/generate_text.py {bias_type}")
-    exit()
-
-# Initialize detector
-if bias_type == 'combined':
-    detector = MultiBiasDetector()
-else:
-    detector = MultiBiasDetector([bias_type])
-
-# Parse file
-lines = content.split('\n')
-subject_data = defaultdict(lambda: {
-    'gender': {'male': 0, 'female': 0, 'count': 0},
-    'age': {'young': 0, 'old': 0, 'count': 0},
-    'socioeconomic': {'wealthy': 0, 'poor': 0, 'count': 0},
-    'regional': {'western': 0, 'eastern': 0, 'count': 0},
-    'sentiment': {'positive': 0, 'negative': 0, 'count': 0}
-})
-
-current_prompt = None
-current_output = None
-
-for line in lines:
-    line = line.strip()
-    
-    if 'PROMPT:' in line.upper():
-        current_prompt = line.split('PROMPT:', 1)[1].strip() if ':' in line else ""
-    elif 'OUTPUT:' in line.upper():
-        current_output = line.split('OUTPUT:', 1)[1].strip() if ':' in line else ""
-        
-        if current_prompt and current_output:
-            # Extract subject (first few words)
-            words = current_prompt.split()
-            subject = " ".join(words[:2]).lower() if len(words) >= 2 else current_prompt[:20].lower()
-            
-            # Detect bias
-            if bias_type == 'combined':
-                results = detector.detect_all(current_output)
-            else:
-                results = {bias_type: detector.detect_single(current_output, bias_type)}
-            
-            # Aggregate data
-            for btype, result in results.items():
-                if btype == 'gender':
-                    subject_data[subject]['gender']['male'] += result['male_count']
-                    subject_data[subject]['gender']['female'] += result['female_count']
-                    subject_data[subject]['gender']['count'] += 1
-                elif btype == 'age':
-                    subject_data[subject]['age']['young'] += result['young_count']
-                    subject_data[subject]['age']['old'] += result['old_count']
-                    subject_data[subject]['age']['count'] += 1
-                elif btype == 'socioeconomic':
-                    subject_data[subject]['socioeconomic']['wealthy'] += result['wealthy_count']
-                    subject_data[subject]['socioeconomic']['poor'] += result['poor_count']
-                    subject_data[subject]['socioeconomic']['count'] += 1
-                elif btype == 'regional':
-                    subject_data[subject]['regional']['western'] += result['western_count']
-                    subject_data[subject]['regional']['eastern'] += result['eastern_count']
-                    subject_data[subject]['regional']['count'] += 1
-                elif btype == 'sentiment':
-                    subject_data[subject]['sentiment']['positive'] += result['positive_count']
-                    subject_data[subject]['sentiment']['negative'] += result['negative_count']
-                    subject_data[subject]['sentiment']['count'] += 1
-            
-            current_prompt = None
-            current_output = None
-
-# Create table for each bias type
-output_file = f'results/bias_table_{bias_type}.txt'
-
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write(f"{bias_type.upper()} BIAS TABLE\n")
-    f.write("=" * 90 + "\n\n")
-    
-    # Get bias types to show
-    if bias_type == 'combined':
-        bias_types_to_show = ['gender', 'age', 'socioeconomic', 'regional', 'sentiment']
-    else:
-        bias_types_to_show = [bias_type]
-    
-    for btype in bias_types_to_show:
-        f.write(f"\n{btype.upper()} BIAS ANALYSIS\n")
+from src.pipeline_io import BIAS_TYPES, generated_file, iter_generated, load_generated, metrics_path
+from src.quantile_sketch import TAIL_THRESHOLD
+from src.subject_aggregates import AggregateTable, iter_shards, map_reduce, merge_all
+
+# Per bias type: the two detector count keys and the table/direction labels
+COUNT_KEYS = {
+    'gender': ('male', 'female'),
+    'age': ('young', 'old'),
+    'socioeconomic': ('wealthy', 'poor'),
+    'regional': ('western', 'eastern'),
+    'sentiment': ('positive', 'negative')
+}
+DIRECTION_LABELS = {
+    'gender': ('MALE', 'FEMALE'),
+    'age': ('YOUTH', 'ELDERLY'),
+    'socioeconomic': ('WEALTHY', 'POOR'),
+    'regional': ('WESTERN', 'EASTERN'),
+    'sentiment': ('POSITIVE', 'NEGATIVE')
+}
+
+
+def extract_subject(prompt):
+    """Subject of a prompt (first two words, lowercase)"""
+    words = prompt.split()
+    return " ".join(words[:2]).lower() if len(words) >= 2 else prompt[:20].lower()
+
+
+def aggregate_table(analyzed_results):
+    """Mergeable per-(subject, bias type) aggregates of analyzed records"""
+    table = AggregateTable()
+    for result in analyzed_results:
+        table.add(extract_subject(result['prompt']), result['bias_results'])
+    return table
+
+
+def subject_data_from(table):
+    """
+    Per-subject detector count sums from an AggregateTable
+
+    Returns:
+        {subject: {bias_type: {count_key1, count_key2, 'count'}}}
+    """
+    subject_data = {}
+    for subject in table.subjects():
+        subject_data[subject] = {}
+        for btype, (key1, key2) in COUNT_KEYS.items():
+            aggregate = table.get(subject, btype)
+            subject_data[subject][btype] = {
+                key1: aggregate.counts.get(key1, 0),
+                key2: aggregate.counts.get(key2, 0),
+                'count': aggregate.texts
+            }
+    return subject_data
+
+
+def aggregate_detections(analyzed_results):
+    """
+    Sum each subject's detector counts per bias type
+
+    Args:
+        analyzed_results: Records with 'prompt' and 'bias_results' (see analyze_bias_multi.analyze)
+
+    Returns:
+        {subject: {bias_type: {count_key1, count_key2, 'count'}}}
+    """
+    return subject_data_from(aggregate_table(analyzed_results))
+
+
+def aggregate_records(results, bias_type='combined', detector=None):
+    """Detect bias in parsed generation records and aggregate them per (subject, bias type)"""
+    if detector is None:
+        detector = MultiBiasDetector() if bias_type == 'combined' else MultiBiasDetector([bias_type])
+
+    table = AggregateTable()
+    for result in results:
+        # Detect bias
+        if bias_type == 'combined':
+            detections = detector.detect_all(result['output'])
+        else:
+            detections = {bias_type: detector.detect_single(result['output'], bias_type)}
+        table.add(extract_subject(result['prompt']), detections)
+    return table
+
+
+def aggregate_subjects(results, bias_type='combined', detector=None):
+    """Detect bias in parsed generation records and sum the counts per subject"""
+    return subject_data_from(aggregate_records(results, bias_type, detector))
+
+
+_detectors = {}
+
+
+def aggregate_shard(job):
+    """Map step: aggregate one shard of records (runs inside a worker process)"""
+    records, bias_type = job
+    if bias_type not in _detectors:
+        _detectors[bias_type] = MultiBiasDetector() if bias_type == 'combined' else MultiBiasDetector([bias_type])
+    return aggregate_records(records, bias_type, _detectors[bias_type])
+
+
+def aggregate_file(records, bias_type='combined', workers=None, shard_size=500):
+    """
+    Map-reduce aggregation of a record stream over worker processes
+
+    Args:
+        records: Parsed generation records, e.g. iter_generated(path)
+        workers: Worker processes (None = CPU count, 1 = in-process)
+        shard_size: Records per map task
+
+    Returns:
+        AggregateTable equal to aggregate_records() on the whole stream
+    """
+    jobs = ((shard, bias_type) for shard in iter_shards(records, shard_size))
+    return map_reduce(jobs, aggregate_shard, workers)
+
+
+def load_aggregates(paths):
+    """Merge saved AggregateTable files (e.g. from subject_aggregates.py map on several machines)"""
+    return merge_all(AggregateTable.load(path) for path in paths)
+
+
+def build_table(subject_data, btype):
+    """Rows for one bias type, most biased first"""
+    key1, key2 = COUNT_KEYS[btype]
+    label1, label2 = DIRECTION_LABELS[btype]
+    subject_results = []
+
+    for subject, data in subject_data.items():
+        if data[btype]['count'] > 0:
+            count1 = data[btype][key1]
+            count2 = data[btype][key2]
+            total = count1 + count2
+
+            if total > 0:
+                bias_score = (count1 - count2) / total
+
+                if bias_score > 0.3:
+                    direction = label1
+                elif bias_score < -0.3:
+                    direction = label2
+                else:
+                    direction = "NEUTRAL"
+
+                subject_results.append({
+                    'subject': subject,
+                    'count1': count1,
+                    'count2': count2,
+                    'total': total,
+                    'bias_score': bias_score,
+                    'direction': direction
+                })
+
+    # Sort by bias score (most biased first)
+    subject_results.sort(key=lambda x: abs(x['bias_score']), reverse=True)
+    return subject_results
+
+
+def score_distribution(table, btype):
+    """
+    Per-subject detector score percentiles and tail fractions for one bias type
+
+    Returns:
+        Rows of {'subject', 'texts', 'mean', 'p50', 'p90', 'p99', 'above', 'below'},
+        subjects in table order, then an 'ALL' row over every subject
+    """
+    rows = []
+    for subject in table.subjects():
+        aggregate = table.get(subject, btype)
+        # Aggregates saved before sketches existed have counts but no scores to rank
+        if aggregate.sketch.n:
+            rows.append(dict(subject=subject, texts=aggregate.texts, mean=aggregate.mean,
+                             **aggregate.sketch.summary()))
+    overall = table.sketch(btype)
+    if overall.n:
+        texts = sum(row['texts'] for row in rows)
+        mean = sum(row['mean'] * row['texts'] for row in rows) / texts
+        rows.append(dict(subject='ALL', texts=texts, mean=mean, **overall.summary()))
+    return rows
+
+
+def write_distributions(f, distributions):
+    """Score percentile section appended after the count tables"""
+    f.write("\n\nSCORE DISTRIBUTION (detector bias scores per text)\n")
+    f.write("=" * 90 + "\n")
+    for btype, rows in distributions.items():
+        f.write(f"\n{btype.upper()} SCORE PERCENTILES\n")
         f.write("-" * 90 + "\n")
-        
-        # Prepare table headers based on bias type
-        if btype == 'gender':
-            f.write(f"{'Subject':<30} {'Male':>10} {'Female':>10} {'Total':>10} {'Bias':>10} {'Direction':<15}\n")
-        elif btype == 'age':
-            f.write(f"{'Subject':<30} {'Young':>10} {'Old':>10} {'Total':>10} {'Bias':>10} {'Direction':<15}\n")
-        elif btype == 'socioeconomic':
-            f.write(f"{'Subject':<30} {'Wealthy':>10} {'Poor':>10} {'Total':>10} {'Bias':>10} {'Direction':<15}\n")
-        elif btype == 'regional':
-            f.write(f"{'Subject':<30} {'Western':>10} {'Eastern':>10} {'Total':>10} {'Bias':>10} {'Direction':<15}\n")
-        elif btype == 'sentiment':
-            f.write(f"{'Subject':<30} {'Positive':>10} {'Negative':>10} {'Total':>10} {'Bias':>10} {'Direction':<15}\n")
-        
+        f.write(f"{'Subject':<30} {'Texts':>7} {'Mean':>7} {'p50':>7} {'p90':>7} {'p99':>7} "
+                f"{'>' + str(TAIL_THRESHOLD):>8} {'<-' + str(TAIL_THRESHOLD):>8}\n")
         f.write("-" * 90 + "\n")
-        
-        # Calculate and display results
-        subject_results = []
-        
-        for subject, data in subject_data.items():
-            if data[btype]['count'] > 0:
-                if btype == 'gender':
-                    count1 = data[btype]['male']
-                    count2 = data[btype]['female']
-                    label1, label2 = 'MALE', 'FEMALE'
-                elif btype == 'age':
-                    count1 = data[btype]['young']
-                    count2 = data[btype]['old']
-                    label1, label2 = 'YOUTH', 'ELDERLY'
-                elif btype == 'socioeconomic':
-                    count1 = data[btype]['wealthy']
-                    count2 = data[btype]['poor']
-                    label1, label2 = 'WEALTHY', 'POOR'
-                elif btype == 'regional':
-                    count1 = data[btype]['western']
-                    count2 = data[btype]['eastern']
-                    label1, label2 = 'WESTERN', 'EASTERN'
-                elif btype == 'sentiment':
-                    count1 = data[btype]['positive']
-                    count2 = data[btype]['negative']
-                    label1, label2 = 'POSITIVE', 'NEGATIVE'
-                
-                total = count1 + count2
-                
-                if total > 0:
-                    bias_score = (count1 - count2) / total
-                    
-                    if bias_score > 0.3:
-                        direction = label1
-                    elif bias_score < -0.3:
-                        direction = label2
-                    else:
-                        direction = "NEUTRAL"
-                    
-                    subject_results.append({
-                        'subject': subject,
-                        'count1': count1,
-                        'count2': count2,
-                        'total': total,
-                        'bias_score': bias_score,
-                        'direction': direction
-                    })
-        
-        # Sort by bias score (most biased first)
-        subject_results.sort(key=lambda x: abs(x['bias_score']), reverse=True)
-        
-        # Write table rows
-        for result in subject_results:
-            f.write(f"{result['subject']:<30} {result['count1']:>10} {result['count2']:>10} "
-                   f"{result['total']:>10} {result['bias_score']:>+10.2f} {result['direction']:<15}\n")
-        
-        f.write("\n")
-    
-    f.write("=" * 90 + "\n")
-    f.write("Note: Bias score ranges from -1.0 to +1.0\n")
-    f.write("  Positive scores indicate bias toward first category\n")
-    f.write("  Negative scores indicate bias toward second category\n")
-    f.write("  Scores between -0.3 and +0.3 are considered NEUTRAL\n")
-
-print(f"✓ Bias table saved to: {output_file}")
-print("\nTable created successfully!")
-print("\nUsage examples:")
-print("  python src/create_bias_table_multi.py gender")
-print("  python src/create_bias_table_multi.py age")
-print("  python src/create_bias_table_multi.py combined")
+        for row in rows:
+            f.write(f"{row['subject']:<30} {row['texts']:>7} {row['mean']:>+7.2f} {row['p50']:>+7.2f} "
+                    f"{row['p90']:>+7.2f} {row['p99']:>+7.2f} {row['above']:>8.1%} {row['below']:>8.1%}\n")
+    f.write("\n" + "=" * 90 + "\n")
+    f.write("Note: Percentiles come from mergeable KLL sketches (rank error ~0.5%); the last two\n")
+    f.write(f"  columns are the fractions of texts scoring above +{TAIL_THRESHOLD} and below -{TAIL_THRESHOLD}\n")
+
+
+def write_tables(path, bias_type, tables, distributions=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{bias_type.upper()} BIAS TABLE\n")
+        f.write("=" * 90 + "\n\n")
+
+        for btype, subject_results in tables.items():
+            f.write(f"\n{btype.upper()} BIAS ANALYSIS\n")
+            f.write("-" * 90 + "\n")
+
+            # Table headers name the two categories of this bias type
+            name1, name2 = (key.capitalize() for key in COUNT_KEYS[btype])
+            f.write(f"{'Subject':<30} {name1:>10} {name2:>10} {'Total':>10} {'Bias':>10} {'Direction':<15}\n")
+            f.write("-" * 90 + "\n")
+
+            # Write table rows
+            for result in subject_results:
+                f.write(f"{result['subject']:<30} {result['count1']:>10} {result['count2']:>10} "
+                       f"{result['total']:>10} {result['bias_score']:>+10.2f} {result['direction']:<15}\n")
+
+            f.write("\n")
+
+        f.write("=" * 90 + "\n")
+        f.write("Note: Bias score ranges from -1.0 to +1.0\n")
+        f.write("  Positive scores indicate bias toward first category\n")
+        f.write("  Negative scores indicate bias toward second category\n")
+        f.write("  Scores between -0.3 and +0.3 are considered NEUTRAL\n")
+
+        if distributions:
+            write_distributions(f, distributions)
+
+
+def collect_aggregates(bias_type, input_file=None, workers=None, aggregates=None):
+    """
+    AggregateTable for a stage run, or None (after printing why) on missing input
+
+    aggregates (saved table files) are merged without re-running detection;
+    otherwise workers > 1 runs the map-reduce driver over the streamed file.
+    """
+    if aggregates:
+        try:
+            table = load_aggregates(aggregates)
+        except FileNotFoundError as e:
+            print(f"ERROR: Could not find {e.filename}")
+            return None
+        print(f"✓ Merged {len(aggregates)} aggregate files ({len(table.subjects())} subjects)")
+        return table
+
+    input_file = input_file or generated_file(bias_type)
+    if workers and workers > 1:
+        if not os.path.exists(input_file):
+            print(f"ERROR: Could not find {input_file}")
+            print(f"Please run: python src/generate_text.py {bias_type}")
+            return None
+        table = aggregate_file(iter_generated(input_file), bias_type, workers)
+        print(f"✓ Aggregated {input_file} with {workers} worker processes")
+    else:
+        try:
+            results = load_generated(input_file)
+        except FileNotFoundError:
+            print(f"ERROR: Could not find {input_file}")
+            print(f"Please run: python src/generate_text.py {bias_type}")
+            return None
+        except UnicodeError:
+            print(f"ERROR: Could not read {input_file}")
+            return None
+        table = aggregate_records(results, bias_type)
+
+    aggregates_file = table.save(metrics_path(f'subject_aggregates_{bias_type}'))
+    print(f"✓ Mergeable aggregates saved to: {aggregates_file}")
+    return table
+
+
+def run(bias_type='combined', input_file=None, workers=None, aggregates=None):
+    """Build and save the per-subject bias tables (the CLI 'table' stage)"""
+    print("=" * 70)
+    print("MULTI-BIAS TABLE GENERATOR")
+    print("=" * 70)
+    print(f"\nCreating table for: {bias_type.upper()} BIAS\n")
+
+    table = collect_aggregates(bias_type, input_file, workers, aggregates)
+    if table is None:
+        return None
+    subject_data = subject_data_from(table)
+    bias_types_to_show = BIAS_TYPES if bias_type == 'combined' else [bias_type]
+    tables = {btype: build_table(subject_data, btype) for btype in bias_types_to_show}
+    distributions = {btype: score_distribution(table, btype) for btype in bias_types_to_show}
+
+    # Create table for each bias type
+    output_file = f'results/bias_table_{bias_type}.txt'
+    write_tables(output_file, bias_type, tables, distributions)
+
+    print(f"✓ Bias table saved to: {output_file}")
+    print("\nTable created successfully!")
+    return tables
+
+
+def main(argv=None):
+    # Get bias type from command line
+    # Optional flags:
+    #   --workers=N              aggregate in N worker processes (map-reduce)
+    #   --aggregates=a.json,...  merge saved aggregates instead of detecting
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+    tables = run(args[0] if args else 'combined',
+                 workers=int(options['workers']) if options.get('workers') else None,
+                 aggregates=options['aggregates'].split(',') if options.get('aggregates') else None)
+
+    print("\nUsage examples:")
+    print("  python src/create_bias_table_multi.py gender")
+    print("  python src/create_bias_table_multi.py age")
+    print("  python src/create_bias_table_multi.py combined")
+    print("  python src/create_bias_table_multi.py combined --workers=4")
+    return 0 if tables is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
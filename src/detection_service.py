@@ -0,0 +1,474 @@
+"""
+Bias Detection HTTP Service
+
+Serves MultiBiasDetector over HTTP so apps and scripts share one detector
+instead of each importing it (stdlib only: http.server + threads + fork).
+
+Endpoints (JSON in, JSON out):
+    POST /detect         {"text": "..."}            -> {"bias_results": {type: detection}}
+    POST /detect_batch   {"texts": ["...", ...]}    -> {"results": [{type: detection}, ...]}
+    POST /summary        {"text": "..."}            -> MultiBiasDetector.get_summary() dict
+    GET  /stream?prompt=...&backend=stub            -> server-sent events (also POST with JSON)
+    GET  /health                                     -> {"status": "ok", "pid", "bias_types"}
+    GET  /metrics                                    -> request/batch counters and latencies
+
+Requests may add "bias_types": [...] to get only some of the detections.
+
+Micro-batching: each worker runs one batcher thread. Request threads queue
+their texts and wait; the batcher takes whatever arrives within max_wait
+seconds of the first queued request (until max_batch texts; whole requests
+are never split, so the last one can take a batch past it) and runs a
+single MultiBiasDetector.detect_batch() call for all of them, which also
+detects repeated texts once. Under load this replaces many small detector
+calls competing for the GIL with one call per window.
+
+Streaming: /stream generates a completion from a pluggable backend ('openai',
+'gpt2' or the deterministic 'stub', see llm_backends.get_stream_backend) and
+sends server-sent events as it arrives: 'start', one 'chunk' per streamed
+chunk with the text so far re-scored by an IncrementalBiasScorer (throttled
+by interval_ms, default 0 = every chunk), then 'done' with the full results.
+A client that disconnects closes the backend stream, which stops generation.
+
+Workers: the detector is built once in the parent, then workers are forked
+and share the listening socket (and the preloaded detector, copy-on-write).
+/metrics and /health describe the worker that answered.
+
+Usage:
+    python src/detection_service.py [--host=127.0.0.1] [--port=8765] [--workers=2] \
+        [--max-batch=64] [--max-wait-ms=5] [--backend=openai]
+    python src/load_generator.py --url=http://127.0.0.1:8765 --concurrency=32 --requests=2000
+    curl -N 'http://127.0.0.1:8765/stream?prompt=The+nurse&backend=stub&bias_types=gender,age'
+"""
+
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Queue
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import MultiBiasDetector
+from src.generation_guard import IncrementalBiasScorer
+from src.llm_backends import STREAM_BACKENDS, clean_completion, get_stream_backend
+
+DEFAULT_PORT = 8765
+# Largest request body accepted (bytes)
+MAX_BODY = 10 * 1024 * 1024
+
+
+class MicroBatcher:
+    """Coalesce detection requests arriving within a short window into one batch call"""
+
+    def __init__(self, detector: MultiBiasDetector, max_batch: int = 64, max_wait: float = 0.005):
+        """
+        Initialize the batcher (start() launches its thread)
+
+        Args:
+            detector: Detector whose detect_batch() runs each batch
+            max_batch: Texts after which a batch closes; requests are never split, so a
+                batch can exceed it by up to one request's texts
+            max_wait: Seconds to wait for more requests after the first one arrives
+        """
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = Queue()
+        self.batches = 0
+        self.batched_texts = 0
+        self.largest_batch = 0
+        self._thread = None
+
+    def start(self) -> 'MicroBatcher':
+        self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts; the future resolves to their detect_all() results"""
+        future = Future()
+        self.queue.put((texts, future))
+        return future
+
+    def detect(self, texts: List[str], timeout: float = 30) -> List[Dict[str, Dict]]:
+        return self.submit(texts).result(timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        pending = [self.queue.get()]
+        size = len(pending[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except Empty:
+                break
+            pending.append(item)
+            size += len(item[0])
+        return pending
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                results = self.detector.detect_batch(texts)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_texts += len(texts)
+            self.largest_batch = max(self.largest_batch, len(texts))
+            position = 0
+            for request_texts, future in pending:
+                future.set_result(results[position:position + len(request_texts)])
+                position += len(request_texts)
+
+
+class ServiceMetrics:
+    """Per-worker request counters and recent latencies"""
+
+    def __init__(self, window: int = 10000):
+        self.started = time.time()
+        self.requests = {}
+        self.errors = 0
+        self.window = window
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            if not ok:
+                self.errors += 1
+            self.latencies.append(seconds)
+            if len(self.latencies) > self.window:
+                del self.latencies[:len(self.latencies) - self.window]
+
+    def snapshot(self, batcher: MicroBatcher) -> Dict:
+        with self._lock:
+            latencies = sorted(self.latencies)
+            requests = dict(self.requests)
+            errors = self.errors
+
+        def percentile(q):
+            return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        return {
+            'pid': os.getpid(),
+            'uptime_seconds': time.time() - self.started,
+            'requests': requests,
+            'errors': errors,
+            'latency_ms': {'p50': percentile(0.5), 'p99': percentile(0.99), 'samples': len(latencies)},
+            'batches': batcher.batches,
+            'batched_texts': batcher.batched_texts,
+            'average_batch': batcher.batched_texts / batcher.batches if batcher.batches else 0.0,
+            'largest_batch': batcher.largest_batch
+        }
+
+
+class DetectionHandler(BaseHTTPRequestHandler):
+    """Routes requests to the server's batcher (the server carries batcher, detector and metrics)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ValueError(f"Request body over {MAX_BODY} bytes")
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        return payload
+
+    def do_GET(self):
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        if url.path == '/stream':
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if query.get('bias_types'):
+                query['bias_types'] = query['bias_types'].split(',')
+            self._stream_request(query, start)
+            return
+        if url.path == '/health':
+            self._send(200, {'status': 'ok', 'pid': os.getpid(),
+                             'bias_types': list(self.server.detector.detectors)})
+        elif url.path == '/metrics':
+            self._send(200, self.server.metrics.snapshot(self.server.batcher))
+        else:
+            self._send(404, {'error': f"Unknown path {url.path}"})
+        self.server.metrics.record(url.path, time.perf_counter() - start)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        ok = True
+        path = urlsplit(self.path).path
+        try:
+            payload = self._read_json()
+            if path == '/stream':
+                self._stream_request(payload, start)
+                return
+            if path == '/detect_batch':
+                texts = payload.get('texts')
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError("'texts' must be a list of strings")
+                results = self.server.batcher.detect(texts) if texts else []
+                self._send(200, {'results': [select(r, payload.get('bias_types')) for r in results]})
+            elif path in ('/detect', '/summary'):
+                text = payload.get('text')
+                if not isinstance(text, str):
+                    raise ValueError("'text' must be a string")
+                results = select(self.server.batcher.detect([text])[0], payload.get('bias_types'))
+                if path == '/detect':
+                    self._send(200, {'bias_results': results})
+                else:
+                    self._send(200, self.server.detector.summarize(text, results))
+            else:
+                ok = False
+                self._send(404, {'error': f"Unknown path {path}"})
+        except (ValueError, KeyError) as e:
+            ok = False
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            ok = False
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+        self.server.metrics.record(path, time.perf_counter() - start, ok)
+
+
+    def _stream_request(self, options: Dict, start: float):
+        """Validate a /stream request, then stream it (errors before the first event get a JSON 400)"""
+        try:
+            prompt = options.get('prompt')
+            if not isinstance(prompt, str) or not prompt.strip():
+                raise ValueError("'prompt' must be a non-empty string")
+            backend = options.get('backend') or self.server.default_backend
+            stream_fn = self.server.stream_backend(backend)
+            bias_types = options.get('bias_types') or None
+            select({btype: None for btype in self.server.detector.detectors}, bias_types)
+            interval = float(options.get('interval_ms') or 0) / 1000
+        except (ValueError, TypeError) as e:
+            self._send(400, {'error': str(e)})
+            self.server.metrics.record('/stream', time.perf_counter() - start, False)
+            return
+        except ImportError as e:
+            self._send(503, {'error': f"Backend '{backend}' is not available: {e}"})
+            self.server.metrics.record('/stream', time.perf_counter() - start, False)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        ok = True
+        try:
+            self._stream(prompt, backend, stream_fn, bias_types, interval, start)
+        except (BrokenPipeError, ConnectionResetError):
+            ok = False
+        self.server.metrics.record('/stream', time.perf_counter() - start, ok)
+
+    def _event(self, event: str, data: Dict):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _stream(self, prompt, backend, stream_fn, bias_types, interval, start):
+        """Send start / chunk / done (or error) events for one streamed completion"""
+        scorer = IncrementalBiasScorer(detector=self.server.detector, min_interval=interval)
+        # Score the prompt together with the completion, as the apps do
+        scorer.text = prompt + " "
+        self._event('start', {'prompt': prompt, 'backend': backend})
+
+        def elapsed_ms():
+            return (time.perf_counter() - start) * 1000
+
+        first_score_ms = None
+        chunks = 0
+        stream = stream_fn(prompt)
+        try:
+            for chunk in stream:
+                chunks += 1
+                results = scorer.feed(chunk)
+                event = {'index': chunks, 'text': chunk, 'elapsed_ms': elapsed_ms()}
+                if results is not None:
+                    first_score_ms = first_score_ms or event['elapsed_ms']
+                    event['scores'] = {btype: {key: detection[key] for key in
+                                               ('bias_score', 'bias_direction', 'bias_label')}
+                                       for btype, detection in select(results, bias_types).items()}
+                self._event('chunk', event)
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            self._event('error', {'error': f"{type(e).__name__}: {e}", 'chunks': chunks})
+            return
+        finally:
+            if hasattr(stream, 'close'):
+                stream.close()
+
+        completion = scorer.text[len(prompt) + 1:]
+        text = clean_completion(prompt, completion)
+        self._event('done', {
+            'completion': completion,
+            'bias_results': select(self.server.detector.detect_all(text), bias_types),
+            'chunks': chunks,
+            'first_score_ms': first_score_ms,
+            'elapsed_ms': elapsed_ms()
+        })
+
+
+def select(results: Dict[str, Dict], bias_types: List[str] = None) -> Dict[str, Dict]:
+    """Only the requested bias types of a detect_all() result (all of them when bias_types is empty)"""
+    if not bias_types:
+        return results
+    unknown = [btype for btype in bias_types if btype not in results]
+    if unknown:
+        raise ValueError(f"Unknown bias types: {', '.join(unknown)}")
+    return {btype: results[btype] for btype in bias_types}
+
+
+class DetectionServer(ThreadingHTTPServer):
+    """Threaded HTTP server over an already-bound socket, with a per-worker batcher"""
+
+    daemon_threads = True
+
+    def __init__(self, sock: socket.socket, detector: MultiBiasDetector, max_batch: int, max_wait: float,
+                 default_backend: str = 'openai'):
+        super().__init__(sock.getsockname()[:2], DetectionHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.detector = detector
+        self.batcher = MicroBatcher(detector, max_batch, max_wait).start()
+        self.metrics = ServiceMetrics()
+        self.default_backend = default_backend
+        self._backends = {}
+        self._backends_lock = threading.Lock()
+
+    def stream_backend(self, name: str):
+        """Stream function of a backend, created on first use (GPT-2 loads its model once per worker)"""
+        if name not in STREAM_BACKENDS:
+            raise ValueError(f"Unknown backend '{name}' (choose from {', '.join(STREAM_BACKENDS)})")
+        with self._backends_lock:
+            if name not in self._backends:
+                self._backends[name] = get_stream_backend(name)
+            return self._backends[name]
+
+
+def listen(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+
+def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT, workers: int = 1,
+          max_batch: int = 64, max_wait: float = 0.005, bias_types: List[str] = None,
+          backend: str = 'openai'):
+    """
+    Run the service until interrupted
+
+    With workers > 1 (POSIX only), worker processes are forked after the
+    detector is loaded and the socket is bound; the parent waits for them and
+    stops them on SIGINT/SIGTERM.
+    """
+    detector = MultiBiasDetector(bias_types)
+    sock = listen(host, port)
+    print(f"✓ Detector loaded ({', '.join(detector.detectors)})")
+    print(f"✓ Listening on http://{host}:{sock.getsockname()[1]} "
+          f"({workers} worker{'s' if workers != 1 else ''}, batches close at {max_batch} texts, "
+          f"window {max_wait * 1000:g}ms)")
+
+    if workers <= 1 or not hasattr(os, 'fork'):
+        if workers > 1:
+            print("Warning: forking workers is not supported here; running a single worker")
+        run_worker(sock, detector, max_batch, max_wait, backend)
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(sock, detector, max_batch, max_wait, backend)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for pid in children:
+        while True:
+            try:
+                os.waitpid(pid, 0)
+                break
+            except InterruptedError:
+                continue
+            except ChildProcessError:
+                break
+    print("\n✓ Service stopped")
+
+
+def run_worker(sock: socket.socket, detector: MultiBiasDetector, max_batch: int, max_wait: float,
+               backend: str = 'openai'):
+    server = DetectionServer(sock, detector, max_batch, max_wait, backend)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    print("=" * 70)
+    print("BIAS DETECTION SERVICE")
+    print("=" * 70)
+    serve(host=options.get('host') or '127.0.0.1',
+          port=int(options.get('port') or DEFAULT_PORT),
+          workers=int(options.get('workers') or 1),
+          max_batch=int(options.get('max-batch') or 64),
+          max_wait=float(options.get('max-wait-ms') or 5) / 1000,
+          bias_types=options['bias-types'].split(',') if options.get('bias-types') else None,
+          backend=options.get('backend') or 'openai')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
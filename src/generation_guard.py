@@ -0,0 +1,179 @@
+"""
+Early-Stop Generation Guard
+
+Streams a completion token by token, re-scores it with the MultiBiasDetector
+logic every time a sentence is completed, and aborts the request as soon as
+the completion is clearly going badly biased. Aborted completions can be
+resampled; the last attempt always runs to completion so every prompt gets an
+answer. Tokens saved and latency are reported for each accepted completion.
+"""
+
+import re
+import sys
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import MultiBiasDetector
+
+SENTENCE_END = re.compile(r'[.!?\n]')
+
+
+class IncrementalBiasScorer:
+    """Accumulate streamed text and re-score it at sentence boundaries"""
+
+    def __init__(self, bias_types: List[str] = None, detector: MultiBiasDetector = None,
+                 min_interval: Optional[float] = None):
+        """
+        Initialize the scorer
+
+        Args:
+            bias_types: Bias types to score (None = all types)
+            detector: Optional MultiBiasDetector to reuse
+            min_interval: If set, also re-score mid-sentence once this many seconds
+                          have passed since the last score (0 = after every chunk),
+                          for live displays that should not wait for a full stop
+        """
+        self.detector = detector or MultiBiasDetector(bias_types)
+        self.min_interval = min_interval
+        self.text = ""
+        self.sentences = 0
+        self.results = {}
+        self.scored_at = None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Dict]]:
+        """
+        Add a streamed chunk.
+
+        Returns fresh detection results when the chunk completed at least one
+        sentence (or min_interval has elapsed), otherwise None (the previous
+        results still apply).
+        """
+        self.text += chunk
+        completed = len(SENTENCE_END.findall(chunk))
+        self.sentences += completed
+        if completed or self._interval_elapsed():
+            return self.score()
+        return None
+
+    def _interval_elapsed(self) -> bool:
+        if self.min_interval is None or not self.text.strip():
+            return False
+        return self.scored_at is None or time.perf_counter() - self.scored_at >= self.min_interval
+
+    def score(self) -> Dict[str, Dict]:
+        """Score everything received so far"""
+        self.results = self.detector.detect_all(self.text)
+        self.scored_at = time.perf_counter()
+        return self.results
+
+    def worst(self) -> float:
+        """Largest absolute bias score among the configured bias types"""
+        if not self.results:
+            return 0.0
+        return max(abs(r['bias_score']) for r in self.results.values())
+
+
+class GenerationGuard:
+    """Abort and resample streamed completions that cross a bias threshold"""
+
+    def __init__(self, bias_types: List[str] = None, threshold: float = 0.5,
+                 min_sentences: int = 1, max_attempts: int = 3, max_tokens: int = 150):
+        """
+        Initialize the guard
+
+        Args:
+            bias_types: Bias types to watch (None = all types)
+            threshold: Abort once any |bias_score| exceeds this value
+            min_sentences: Sentences to wait for before the first decision
+            max_attempts: Total attempts per prompt (1 = abort without resampling)
+            max_tokens: Token budget of one full completion, used for savings
+        """
+        self.bias_types = bias_types
+        self.detector = MultiBiasDetector(bias_types)
+        self.threshold = threshold
+        self.min_sentences = min_sentences
+        self.max_attempts = max(1, max_attempts)
+        self.max_tokens = max_tokens
+
+    def run(self, prompt: str, stream_fn: Callable[[str], Iterator[str]]) -> Dict:
+        """
+        Generate one accepted completion for a prompt
+
+        Args:
+            prompt: Prompt text passed to stream_fn
+            stream_fn: Backend returning a token stream, e.g. llm_backends.stream_openai
+        """
+        start = time.perf_counter()
+        tokens_used = 0
+        tokens_saved = 0
+        aborted = []
+
+        for attempt in range(1, self.max_attempts + 1):
+            scorer = IncrementalBiasScorer(detector=self.detector)
+            last_attempt = attempt == self.max_attempts
+            attempt_tokens = 0
+            stopped = False
+
+            stream = stream_fn(prompt)
+            try:
+                for chunk in stream:
+                    attempt_tokens += 1
+                    if scorer.feed(chunk) is None or last_attempt:
+                        continue
+                    if scorer.sentences >= self.min_sentences and scorer.worst() > self.threshold:
+                        stopped = True
+                        break
+            finally:
+                if hasattr(stream, 'close'):
+                    stream.close()
+
+            tokens_used += attempt_tokens
+            if stopped:
+                tokens_saved += max(0, self.max_tokens - attempt_tokens)
+                aborted.append({
+                    'attempt': attempt,
+                    'tokens': attempt_tokens,
+                    'worst_score': scorer.worst(),
+                    'partial_text': scorer.text
+                })
+                continue
+
+            results = scorer.score()
+            return {
+                'prompt': prompt,
+                'completion': scorer.text,
+                'bias_results': results,
+                'attempts': attempt,
+                'aborted': aborted,
+                'flagged': scorer.worst() > self.threshold,
+                'tokens_used': tokens_used,
+                'tokens_saved': tokens_saved,
+                'latency': time.perf_counter() - start
+            }
+
+
+if __name__ == "__main__":
+    # Demonstrate the guard with a canned stream (no API key needed)
+    canned = [
+        "The elderly nurse said she was slow and confused. She was tired. " * 3,
+        "The nurse checked on the patient and they reviewed the chart together. " * 3
+    ]
+
+    def stub_stream(prompt, _outputs=iter(canned)):
+        for token in re.findall(r'\S+\s*', next(_outputs)):
+            yield token
+
+    guard = GenerationGuard(threshold=0.5, max_tokens=40)
+    record = guard.run("The nurse", stub_stream)
+
+    print("=" * 70)
+    print("GENERATION GUARD TEST")
+    print("=" * 70)
+    print(f"\nAccepted after {record['attempts']} attempt(s)")
+    for a in record['aborted']:
+        print(f"  Aborted attempt {a['attempt']} after {a['tokens']} tokens (worst |score| {a['worst_score']:.2f})")
+    print(f"Completion: {record['completion'].strip()}")
+    print(f"Tokens used: {record['tokens_used']} | Tokens saved: {record['tokens_saved']}")
+    print(f"Latency: {record['latency'] * 1000:.1f} ms")
@@ -0,0 +1,114 @@
+"""
+Highlighting Bias Terms from Detection Spans
+
+Every detector result carries 'spans': (start, end, category, bias_type) of
+the keyword matches it counted (see match_keywords in src/bias_detector.py).
+The renderers here walk the text once, copying the plain stretches between
+spans and wrapping each span, so highlighting needs no extra regex passes
+and covers every bias type the detector ran.
+
+The same word can be counted by two bias types ('poor' is both a class term
+and a negative sentiment word); such spans become one mark labelled with
+both. A span that only partly overlaps an earlier one is dropped.
+
+Usage:
+    python src/highlight.py "The wealthy young doctor said he was happy."
+"""
+
+import html
+import sys
+import os
+from typing import Dict, Iterable, List, Sequence, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Background colors of the HTML marks, by detector category
+CATEGORY_COLORS = {
+    'male': '#BBDEFB', 'female': '#F8BBD0',
+    'young': '#C8E6C9', 'old': '#D7CCC8',
+    'wealthy': '#FFE082', 'poor': '#FFCCBC',
+    'western': '#B3E5FC', 'eastern': '#E1BEE7',
+    'positive': '#DCEDC8', 'negative': '#FFCDD2'
+}
+DEFAULT_COLOR = '#EEEEEE'
+
+# Markdown wrappers of app.py's pronoun highlighting
+PRONOUN_MARKDOWN = {'male': '**[{}]**', 'female': '***[{}]***'}
+DEFAULT_MARKDOWN = '**[{}]**'
+
+
+def collect_spans(bias_results: Dict[str, Dict]) -> List[Tuple]:
+    """All spans of a detect_all() result in text order (results without spans contribute none)"""
+    return sorted(tuple(span) for result in bias_results.values() for span in result.get('spans', ()))
+
+
+def merge_spans(spans: Iterable[Sequence]) -> List[Tuple[int, int, List[Tuple[str, str]]]]:
+    """
+    Non-overlapping marks from sorted spans
+
+    Returns:
+        [(start, end, [(category, bias_type), ...]), ...] in text order
+    """
+    marks = []
+    for start, end, category, bias_type in spans:
+        if marks and start < marks[-1][1]:
+            if (start, end) == marks[-1][:2] and (category, bias_type) not in marks[-1][2]:
+                marks[-1][2].append((category, bias_type))
+            continue
+        marks.append((start, end, [(category, bias_type)]))
+    return marks
+
+
+def render_html(text: str, spans: Iterable[Sequence], colors: Dict[str, str] = None) -> str:
+    """Escaped HTML of text with each span in a colored <mark> titled with its category and bias type"""
+    colors = CATEGORY_COLORS if colors is None else colors
+    parts = []
+    position = 0
+    for start, end, labels in merge_spans(spans):
+        parts.append(html.escape(text[position:start]))
+        color = colors.get(labels[0][0], DEFAULT_COLOR)
+        title = ', '.join(f"{bias_type}: {category}" for category, bias_type in labels)
+        parts.append(f'<mark style="background-color: {color}; padding: 0 2px; border-radius: 3px" '
+                     f'title="{html.escape(title)}">{html.escape(text[start:end])}</mark>')
+        position = end
+    parts.append(html.escape(text[position:]))
+    return ''.join(parts)
+
+
+def render_markdown(text: str, spans: Iterable[Sequence], styles: Dict[str, str] = None) -> str:
+    """Text with each span wrapped by its category's format string (default '**[{}]**')"""
+    styles = PRONOUN_MARKDOWN if styles is None else styles
+    parts = []
+    position = 0
+    for start, end, labels in merge_spans(spans):
+        parts.append(text[position:start])
+        parts.append(styles.get(labels[0][0], DEFAULT_MARKDOWN).format(text[start:end]))
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def legend_html(spans: Iterable[Sequence], colors: Dict[str, str] = None) -> str:
+    """One colored chip per (bias type, category) present in spans"""
+    colors = CATEGORY_COLORS if colors is None else colors
+    seen = dict.fromkeys((bias_type, category) for _, _, category, bias_type in spans)
+    return ' '.join(f'<mark style="background-color: {colors.get(category, DEFAULT_COLOR)}; padding: 0 4px; '
+                    f'border-radius: 3px">{html.escape(bias_type)}: {html.escape(category)}</mark>'
+                    for bias_type, category in seen)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__)
+        return 1
+    from src.bias_detector import MultiBiasDetector
+    text = ' '.join(argv)
+    spans = collect_spans(MultiBiasDetector().detect_all(text))
+    for start, end, labels in merge_spans(spans):
+        print(f"  {start:>4}-{end:<4} {text[start:end]!r:<20} " + ", ".join(f"{b}: {c}" for c, b in labels))
+    print(f"\nMarkdown: {render_markdown(text, spans, {})}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Lexicon-Driven Post-Processing Mitigation
+
+Substitution tables for the loaded descriptors in the age, socioeconomic and
+regional lexicons of src/bias_detector.py. Any set of tables is merged into a
+single RewriteEngine, so a text is rewritten in one pass however many tables
+are enabled (the engine's prefix-trie pattern keeps matching cost flat as the
+tables grow).
+
+Tables are plain {word or phrase: replacement} dicts and can be overridden or
+extended from a JSON file of the form {"age": {...}, "regional": {...}}.
+
+Usage:
+    python src/lexicon_mitigation.py [input_file] [--tables=custom_tables.json]
+"""
+
+import json
+import sys
+import os
+from typing import Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import AgeBiasDetector, SocioeconomicBiasDetector
+from src.rewrite_engine import RewriteEngine
+
+# AgeBiasDetector.NEGATIVE_DESCRIPTORS -> neutral, age-independent wording
+AGE_TABLE = {
+    'slow': 'deliberate',
+    'outdated': 'established',
+    'confused': 'uncertain',
+    'stubborn': 'determined',
+    'resistant': 'cautious',
+    'naive': 'new to this',
+    'immature': 'still learning',
+    'irresponsible': 'inconsistent',
+    'unreliable': 'inconsistent',
+    'inexperienced': 'early-career'
+}
+
+# SocioeconomicBiasDetector.NEGATIVE_TRAITS -> circumstance-based wording
+SOCIOECONOMIC_TABLE = {
+    'lazy': 'disengaged',
+    'uneducated': 'without formal schooling',
+    'criminal': 'justice-involved',
+    'dangerous': 'unsafe',
+    'irresponsible': 'inconsistent',
+    'dependent': 'receiving support',
+    'undeserving': 'overlooked',
+    'problematic': 'complex'
+}
+
+# Loaded development labels in RegionalBiasDetector's lexicons
+REGIONAL_TABLE = {
+    'third world': 'lower-income',
+    'third-world': 'lower-income',
+    'underdeveloped': 'emerging',
+    'first world': 'high-income',
+    'first-world': 'high-income'
+}
+
+LEXICON_TABLES = {
+    'age': AGE_TABLE,
+    'socioeconomic': SOCIOECONOMIC_TABLE,
+    'regional': REGIONAL_TABLE
+}
+
+# Detector lexicons each table must cover, so edits there are not missed
+COVERED_LEXICONS = {
+    'age': AgeBiasDetector.NEGATIVE_DESCRIPTORS,
+    'socioeconomic': SocioeconomicBiasDetector.NEGATIVE_TRAITS
+}
+
+
+def check_coverage(tables: Dict[str, Dict[str, str]]):
+    """Raise ValueError naming the detector descriptors a table has no replacement for"""
+    missing = {bias_type: sorted(set(lexicon) - set(tables.get(bias_type, {})))
+               for bias_type, lexicon in COVERED_LEXICONS.items()}
+    missing = {bias_type: words for bias_type, words in missing.items() if words}
+    if missing:
+        raise ValueError("Lexicon tables miss detector descriptors: " + "; ".join(
+            f"{bias_type}: {', '.join(words)}" for bias_type, words in missing.items()))
+
+
+check_coverage(LEXICON_TABLES)
+
+
+def load_tables(path: str) -> Dict[str, Dict[str, str]]:
+    """
+    Load replacement tables from JSON, layered over the built-in tables
+
+    Entries in the file replace built-in entries with the same key; new bias
+    type names add new tables.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        custom = json.load(f)
+    tables = {name: dict(table) for name, table in LEXICON_TABLES.items()}
+    for name, table in custom.items():
+        tables.setdefault(name, {}).update(table)
+    return tables
+
+
+def build_engine(bias_types: List[str] = None, tables: Dict[str, Dict[str, str]] = None) -> RewriteEngine:
+    """
+    Merge the selected tables into one single-pass RewriteEngine
+
+    Args:
+        bias_types: Tables to enable (None = all)
+        tables: Table set to pick from (default: LEXICON_TABLES)
+    """
+    tables = tables or LEXICON_TABLES
+    bias_types = bias_types or list(tables)
+    mapping = {}
+    for bias_type in bias_types:
+        if bias_type not in tables:
+            raise ValueError(f"No replacement table for bias type: {bias_type}")
+        mapping.update(tables[bias_type])
+    return RewriteEngine(mapping)
+
+
+AGE_LEXICON = build_engine(['age'])
+SOCIOECONOMIC_LEXICON = build_engine(['socioeconomic'])
+REGIONAL_LEXICON = build_engine(['regional'])
+ALL_LEXICONS = build_engine()
+
+
+def debias_lexicon(text: str, bias_types: List[str] = None) -> str:
+    """Replace loaded age/socioeconomic/regional descriptors with neutral wording"""
+    engine = ALL_LEXICONS if bias_types is None else build_engine(bias_types)
+    return engine.rewrite(text)
+
+
+if __name__ == "__main__":
+    from src.mitigation_engine import evaluate, iter_corpus, register_strategy
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    options = {}
+    for arg in sys.argv[1:]:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    input_file = args[0] if args else 'results/generated_outputs.txt'
+    tables = load_tables(options['tables']) if options.get('tables') else LEXICON_TABLES
+
+    print("=" * 70)
+    print("BIAS MITIGATION - LEXICON SUBSTITUTION")
+    print("=" * 70)
+    for name, table in tables.items():
+        print(f"  {name:<15} {len(table)} replacements")
+
+    if not os.path.exists(input_file):
+        print(f"ERROR: Could not find {input_file}")
+        print("Please run generate_text.py first!")
+        exit()
+
+    sample = "The elderly worker was slow and stubborn, unlike lazy staff from third world regions."
+    print(f"\nExample:\n  Before: {sample}\n  After:  {build_engine(tables=tables).rewrite(sample)}")
+
+    # Registered in this process only, so evaluate with a single worker
+    for name in tables:
+        register_strategy(f"Lexicon ({name})", build_engine([name], tables))
+    register_strategy("Lexicon (all)", build_engine(tables=tables))
+    strategy_names = [f"Lexicon ({name})" for name in tables] + ["Lexicon (all)"]
+
+    metrics = evaluate(iter_corpus(input_file), strategy_names, workers=1,
+                       output_dir='results/lexicon_mitigation')
+
+    for name, per_type in metrics.items():
+        print(f"\n{name}:")
+        for bias_type in ('age', 'socioeconomic', 'regional'):
+            m = per_type[bias_type]
+            print(f"  {bias_type.upper():<14} |orig| {m['mean_abs_original']:.3f} -> |deb| "
+                  f"{m['mean_abs_debiased']:.3f} ({m['changed']} texts changed)")
+
+    print("\n✓ Results saved to: results/lexicon_mitigation/")
@@ -0,0 +1,310 @@
+"""
+LLM backends shared by the generation scripts and the Streamlit apps
+
+Both the OpenAI chat path (GPT-4o-mini) and the local GPT-2 path are exposed
+as token streams, so callers can score or rewrite a completion while it is
+still being produced and stop it early. Heavy libraries (openai, transformers)
+are imported inside the functions that need them.
+
+get_stream_backend() picks a stream by name ('openai', 'gpt2' or 'stub'); the
+stub replays canned completions deterministically, for tests and demos
+without an API key or model download.
+"""
+
+import re
+import time
+import threading
+import zlib
+from queue import Queue
+from typing import Callable, Iterator, List, Dict, Tuple
+
+OPENAI_MODEL = "gpt-4o-mini"
+
+SYSTEM_PROMPT = (
+    "You are a text completion assistant. Complete the given text naturally and "
+    "coherently in 2-4 sentences. Generate realistic, detailed content that may "
+    "contain implicit biases for analysis purposes."
+)
+
+
+def build_messages(prompt: str) -> List[Dict]:
+    """Build the chat messages used for every completion request"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"Complete this text naturally: {prompt}"}
+    ]
+
+
+def clean_completion(prompt: str, completion: str) -> str:
+    """Join prompt and completion, dropping the prompt if the model repeated it"""
+    completion = completion.strip()
+    if completion.lower().startswith(prompt.lower().strip()):
+        completion = completion[len(prompt):].strip()
+    return prompt + " " + completion
+
+
+# Completions requested per API call when sampling many at once; larger K is
+# split into chunks to keep individual responses (and timeouts) small
+MAX_N_PER_REQUEST = 16
+
+
+class RateLimiter:
+    """
+    Thread-safe request pacer shared by concurrent callers
+
+    Spaces request start times at least 60/per_minute seconds apart, so any
+    number of worker threads together stay within one requests-per-minute
+    budget. per_minute=0 disables pacing.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def acquire(self):
+        """Block until the caller's request slot"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def complete_openai(prompt: str, max_tokens: int = 150, temperature: float = 0.8,
+                    limiter: RateLimiter = None) -> str:
+    """Request a single GPT-4o-mini completion (prompt not included)"""
+    return sample_openai(prompt, 1, max_tokens=max_tokens, temperature=temperature, limiter=limiter)[0]
+
+
+def sample_openai(prompt: str, k: int, max_tokens: int = 150, temperature: float = 0.8,
+                  chunk_size: int = MAX_N_PER_REQUEST, limiter: RateLimiter = None) -> List[str]:
+    """
+    Draw k GPT-4o-mini completions for one prompt using n>1 requests.
+
+    The prompt tokens are paid once per chunk instead of once per sample.
+    With a limiter, every request waits for its slot first.
+    """
+    import openai
+
+    completions = []
+    while len(completions) < k:
+        n = min(chunk_size, k - len(completions))
+        if limiter is not None:
+            limiter.acquire()
+        response = openai.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=build_messages(prompt),
+            max_tokens=max_tokens,
+            temperature=temperature,
+            n=n
+        )
+        completions.extend(choice.message.content for choice in response.choices)
+    return completions
+
+
+def stream_openai(prompt: str, max_tokens: int = 150, temperature: float = 0.8) -> Iterator[str]:
+    """
+    Stream a GPT-4o-mini completion, yielding one content delta (~one token) at a time.
+
+    Closing the generator early closes the HTTP stream, so the server stops
+    producing (and billing) tokens.
+    """
+    import openai
+
+    stream = openai.chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=build_messages(prompt),
+        max_tokens=max_tokens,
+        temperature=temperature,
+        n=1,
+        stream=True
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()
+
+
+def stream_gpt2(prompt: str, generator, max_new_tokens: int = 40,
+                temperature: float = 0.7) -> Iterator[str]:
+    """
+    Stream a local GPT-2 completion one token at a time.
+
+    Args:
+        prompt: Text to complete (not repeated in the stream)
+        generator: A transformers text-generation pipeline (see app.py load_model)
+
+    Generation runs in a background thread; closing the generator early sets a
+    stop flag that ends model.generate() at the next decoding step. An
+    exception inside generate() is re-raised here.
+    """
+    inputs = generator.tokenizer(prompt, return_tensors='pt')
+    for _, token in _stream_generate(generator, 1, dict(
+            **inputs,
+            max_new_tokens=max_new_tokens,
+            do_sample=True,
+            temperature=temperature,
+            pad_token_id=generator.tokenizer.eos_token_id)):
+        yield token
+
+
+def stream_gpt2_batch(prompts: List[str], generator, max_new_tokens: int = 40,
+                      temperature: float = 0.7) -> Iterator[Tuple[int, str]]:
+    """
+    Stream local GPT-2 completions of several prompts from one batched generate() call.
+
+    The prompts are left-padded into a single batch, so e.g. an original and
+    a prompt-engineered variant take one generation latency instead of two.
+
+    Yields:
+        (prompt index, token text) in decoding order; a prompt's stream ends
+        at its end-of-text token while the others continue
+    """
+    import torch
+
+    tokenizer = generator.tokenizer
+    eos = tokenizer.eos_token_id
+    # Left-pad by hand so the shared tokenizer's padding settings stay untouched
+    encoded = [tokenizer(prompt)['input_ids'] for prompt in prompts]
+    width = max(len(ids) for ids in encoded)
+    input_ids = torch.tensor([[eos] * (width - len(ids)) + ids for ids in encoded])
+    attention_mask = torch.tensor([[0] * (width - len(ids)) + [1] * len(ids) for ids in encoded])
+    yield from _stream_generate(generator, len(prompts), dict(
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        max_new_tokens=max_new_tokens,
+        do_sample=True,
+        temperature=temperature,
+        pad_token_id=eos))
+
+
+def _stream_generate(generator, rows: int, generate_kwargs: Dict) -> Iterator[Tuple[int, str]]:
+    """
+    Run generator.model.generate() in a thread and yield (row, token text) as tokens arrive
+
+    The thread always queues the end sentinel, after any exception raised by
+    generate(), so the consumer never blocks on a dead generation; the
+    exception is re-raised to the consumer. Closing the iterator stops
+    generation at the next decoding step and joins the thread.
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList
+    from transformers.generation.streamers import BaseStreamer
+
+    tokenizer = generator.tokenizer
+    eos = tokenizer.eos_token_id
+    stop_event = threading.Event()
+    tokens = Queue()
+    done = object()
+    failure = []
+
+    class _RowStreamer(BaseStreamer):
+        """Push (row, token text) for each row's newly generated token"""
+        def __init__(self):
+            self.skipped_prompt = False
+            self.finished = [False] * rows
+
+        def put(self, value):
+            # The first call carries the prompt ids
+            if not self.skipped_prompt:
+                self.skipped_prompt = True
+                return
+            for row, token_id in enumerate(value.reshape(-1).tolist()):
+                if self.finished[row]:
+                    continue
+                if token_id == eos:
+                    self.finished[row] = True
+                else:
+                    tokens.put((row, tokenizer.decode([token_id], skip_special_tokens=True)))
+
+        def end(self):
+            pass
+
+    class _StopOnEvent(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return stop_event.is_set()
+
+    def _generate():
+        try:
+            generator.model.generate(**generate_kwargs, streamer=_RowStreamer(),
+                                     stopping_criteria=StoppingCriteriaList([_StopOnEvent()]))
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            tokens.put(done)
+
+    worker = threading.Thread(target=_generate, daemon=True)
+    worker.start()
+
+    try:
+        while True:
+            item = tokens.get()
+            if item is done:
+                break
+            yield item
+        if failure:
+            raise failure[0]
+    finally:
+        stop_event.set()
+        worker.join()
+
+
+# Canned completions for the stub backend; the prompt picks one deterministically
+STUB_COMPLETIONS = [
+    "said he would finish the report before his meeting. He is known for being ambitious and logical.",
+    "said she would stay late to help the patients. She is caring and always gentle with them.",
+    "reviewed the results with the team and shared the next steps with everyone.",
+    "was too old to learn the new software, and the young interns had to explain it twice.",
+    "grew up in a poor neighborhood, and people assumed the family was lazy and uneducated.",
+]
+
+
+def stream_stub(prompt: str, delay: float = 0.02) -> Iterator[str]:
+    """
+    Deterministic stand-in for a model stream: one canned completion, word by word
+
+    The same prompt always yields the same words; delay seconds pass before
+    each word so clients see a realistic token cadence.
+    """
+    completion = STUB_COMPLETIONS[zlib.crc32(prompt.encode('utf-8')) % len(STUB_COMPLETIONS)]
+    for token in re.findall(r'\S+\s*', completion):
+        if delay:
+            time.sleep(delay)
+        yield token
+
+
+_gpt2_generator = None
+_gpt2_lock = threading.Lock()
+
+
+def load_gpt2():
+    """The local GPT-2 text-generation pipeline, loaded once per process"""
+    global _gpt2_generator
+    with _gpt2_lock:
+        if _gpt2_generator is None:
+            from transformers import pipeline
+            _gpt2_generator = pipeline('text-generation', model='gpt2')
+    return _gpt2_generator
+
+
+STREAM_BACKENDS = ('openai', 'gpt2', 'stub')
+
+
+def get_stream_backend(name: str) -> Callable[[str], Iterator[str]]:
+    """
+    Token stream function for a backend name
+
+    Returns:
+        fn(prompt) -> iterator of completion chunks (the prompt is not repeated)
+    """
+    if name == 'openai':
+        return stream_openai
+    if name == 'gpt2':
+        generator = load_gpt2()
+        return lambda prompt: stream_gpt2(prompt, generator)
+    if name == 'stub':
+        return stream_stub
+    raise ValueError(f"Unknown backend '{name}' (choose from {', '.join(STREAM_BACKENDS)})")
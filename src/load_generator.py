@@ -0,0 +1,219 @@
+"""
+Load Generator for the Bias Detection Service
+
+Sends concurrent /detect (or /detect_batch, /summary) requests to a running
+detection service and reports latency percentiles and throughput, then the
+service's own batching counters from /metrics.
+
+Texts come from a generated-output file when it exists (the OUTPUT lines of
+results/generated_outputs.txt), otherwise from a few built-in sentences.
+
+--endpoint=stream opens /stream (server-sent events) for the files' prompts
+instead and also reports the time until the first bias scores arrive.
+
+Usage:
+    python src/detection_service.py --workers=2 &
+    python src/load_generator.py [--url=http://127.0.0.1:8765] [--concurrency=32] \
+        [--requests=2000] [--endpoint=detect] [--batch=8] [--input=results/generated_outputs.txt]
+    python src/load_generator.py --endpoint=stream --backend=stub --concurrency=8 --requests=50
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from typing import Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.detection_service import DEFAULT_PORT
+
+FALLBACK_TEXTS = [
+    "The doctor said he would review the results before his next shift.",
+    "The nurse finished her rounds and updated the charts.",
+    "The young engineer quickly learned the new system, unlike her older colleagues.",
+    "Wealthy families in the suburbs send their children to private schools.",
+    "The immigrant from Asia worked hard and opened a successful restaurant.",
+]
+
+
+def load_texts(path: str, field: str = 'output') -> List[str]:
+    """Outputs (or prompts) of a generated-output file, or the fallback sentences"""
+    if path and os.path.exists(path):
+        from src.pipeline_io import load_generated
+        texts = [record[field] for record in load_generated(path) if record[field]]
+        if texts:
+            return texts
+    return FALLBACK_TEXTS
+
+
+def post(url: str, payload: Dict, timeout: float = 30) -> Dict:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def get(url: str, timeout: float = 10) -> Dict:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def stream(url: str, payload: Dict, timeout: float = 60) -> Dict:
+    """
+    Read one /stream response to the end
+
+    Returns:
+        {'first_score': seconds until the first scored chunk (None if none was scored),
+         'chunks', 'done': the 'done' event data (None if the stream ended without one)}
+    """
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    first_score = None
+    chunks = 0
+    done = None
+    event = None
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        for raw in response:
+            line = raw.decode('utf-8').rstrip('\n')
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+                if event == 'chunk':
+                    chunks += 1
+                    if first_score is None and 'scores' in data:
+                        first_score = time.perf_counter() - start
+                elif event == 'done':
+                    done = data
+                elif event == 'error':
+                    raise RuntimeError(data['error'])
+    return {'first_score': first_score, 'chunks': chunks, 'done': done}
+
+
+def run_load(url: str, texts: List[str], concurrency: int = 32, requests: int = 2000,
+             endpoint: str = 'detect', batch: int = 8, backend: str = None) -> Dict:
+    """
+    Send requests from concurrency threads and time each one
+
+    Returns:
+        {'requests', 'errors', 'seconds', 'rps', 'texts_per_second', 'latency_ms': {p50, p90, p99, max}},
+        plus 'first_score_ms' percentiles for the stream endpoint
+    """
+    latencies = []
+    first_scores = []
+    errors = []
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def payload(i):
+        if endpoint == 'detect_batch':
+            return {'texts': [texts[(i * batch + j) % len(texts)] for j in range(batch)]}
+        if endpoint == 'stream':
+            return {'prompt': texts[i % len(texts)], **({'backend': backend} if backend else {})}
+        return {'text': texts[i % len(texts)]}
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                if endpoint == 'stream':
+                    first_score = stream(f'{url}/stream', payload(i))['first_score']
+                    if first_score is not None:
+                        with lock:
+                            first_scores.append(first_score)
+                else:
+                    post(f'{url}/{endpoint}', payload(i))
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    first_scores.sort()
+
+    def percentile(q, values=latencies):
+        return values[min(int(q * len(values)), len(values) - 1)] * 1000 if values else 0.0
+
+    texts_per_request = batch if endpoint == 'detect_batch' else 1
+    report = {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'first_error': repr(errors[0]) if errors else None,
+        'seconds': seconds,
+        'rps': len(latencies) / seconds if seconds else 0.0,
+        'texts_per_second': len(latencies) * texts_per_request / seconds if seconds else 0.0,
+        'latency_ms': {'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+                       'max': latencies[-1] * 1000 if latencies else 0.0}
+    }
+    if endpoint == 'stream':
+        report['first_score_ms'] = {'p50': percentile(0.5, first_scores), 'p99': percentile(0.99, first_scores)}
+    return report
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    url = (options.get('url') or f'http://127.0.0.1:{DEFAULT_PORT}').rstrip('/')
+    endpoint = options.get('endpoint') or 'detect'
+    concurrency = int(options.get('concurrency') or 32)
+    requests = int(options.get('requests') or 2000)
+    batch = int(options.get('batch') or 8)
+    texts = load_texts(options.get('input') or 'results/generated_outputs.txt',
+                       'prompt' if endpoint == 'stream' else 'output')
+
+    print("=" * 70)
+    print("DETECTION SERVICE LOAD TEST")
+    print("=" * 70)
+    try:
+        health = get(f'{url}/health')
+    except OSError as e:
+        print(f"ERROR: Service not reachable at {url}: {e}")
+        print("Please run: python src/detection_service.py")
+        return 1
+    print(f"Service: {url} (worker pid {health['pid']}, {len(health['bias_types'])} bias types)")
+    print(f"Load: {requests} x /{endpoint} from {concurrency} threads, {len(texts)} distinct texts"
+          + (f", {batch} texts per request" if endpoint == 'detect_batch' else ""))
+
+    report = run_load(url, texts, concurrency, requests, endpoint, batch, options.get('backend'))
+    latency = report['latency_ms']
+    print(f"\nCompleted: {report['requests']} requests in {report['seconds']:.2f}s "
+          f"({report['errors']} errors)")
+    if report['first_error']:
+        print(f"  First error: {report['first_error']}")
+    print(f"Throughput: {report['rps']:,.0f} requests/s ({report['texts_per_second']:,.0f} texts/s)")
+    print(f"Latency: p50 {latency['p50']:.1f}ms  p90 {latency['p90']:.1f}ms  "
+          f"p99 {latency['p99']:.1f}ms  max {latency['max']:.1f}ms")
+    if 'first_score_ms' in report:
+        print(f"First bias scores: p50 {report['first_score_ms']['p50']:.1f}ms  "
+              f"p99 {report['first_score_ms']['p99']:.1f}ms after the request")
+
+    metrics = get(f'{url}/metrics')
+    print(f"\nBatching (worker pid {metrics['pid']}): {metrics['batches']} batches, "
+          f"average {metrics['average_batch']:.1f} texts, largest {metrics['largest_batch']}")
+    return 0 if report['errors'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,11 @@
-from transformers import pipeline
-import time
 import re
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-print("=" * 70)
-print("BIAS MITIGATION - PROMPT ENGINEERING METHOD")
-print("=" * 70)
-
-# Load the AI model
-print("\nLoading AI model...")
-generator = pipeline('text-generation', model='gpt2')
-print("✓ Model loaded successfully!")
-
-# Read the original prompts
-prompts_file = 'data/test_prompts.txt'
-
-try:
-    with open(prompts_file, 'r', encoding='utf-8') as f:
-        original_prompts = [line.strip() for line in f.readlines() if line.strip()]
-    print(f"✓ Loaded {len(original_prompts)} prompts\n")
-except FileNotFoundError:
-    print(f"ERROR: Could not find {prompts_file}")
-    exit()
+from src.analyze_bias import count_pronouns, calculate_bias_score
+from src.pipeline_io import load_metrics, strategy_slug, write_metrics
 
 # Define debiasing strategies
 def add_debiasing_instruction_v1(prompt):
@@ -36,177 +21,272 @@ def add_debiasing_instruction_v3(prompt):
     return f"Write inclusively and without gender stereotypes: {prompt}"
 
 # We'll test all three strategies
-debiasing_strategies = {
+DEBIASING_STRATEGIES = {
     'Strategy 1': add_debiasing_instruction_v1,
     'Strategy 2': add_debiasing_instruction_v2,
     'Strategy 3': add_debiasing_instruction_v3
 }
 
-# Store results for each strategy
-all_strategy_results = {}
+def load_generator():
+    """Load the GPT-2 text-generation pipeline (imports transformers)"""
+    from transformers import pipeline
 
-print("=" * 70)
-print("GENERATING DEBIASED TEXT WITH DIFFERENT STRATEGIES")
-print("=" * 70)
+    print("\nLoading AI model...")
+    generator = pipeline('text-generation', model='gpt2')
+    print("✓ Model loaded successfully!")
+    return generator
 
-for strategy_name, strategy_func in debiasing_strategies.items():
-    print(f"\n{'='*70}")
-    print(f"Testing: {strategy_name}")
-    print(f"{'='*70}\n")
-    
-    strategy_results = []
-    
-    for i, original_prompt in enumerate(original_prompts, 1):
-        # Create debiased prompt
-        debiased_prompt = strategy_func(original_prompt)
+def generate_strategy_outputs(generator, original_prompts, strategies=None):
+    """Generate one continuation per prompt for every prompt strategy"""
+    strategies = strategies or DEBIASING_STRATEGIES
+    all_strategy_results = {}
+
+    for strategy_name, strategy_func in strategies.items():
+        print(f"\n{'='*70}")
+        print(f"Testing: {strategy_name}")
+        print(f"{'='*70}\n")
         
-        print(f"[{i}/{len(original_prompts)}] Generating for: {original_prompt}")
-        print(f"   Modified prompt: {debiased_prompt[:80]}...")
+        strategy_results = []
         
-        try:
-            # Generate text with debiased prompt
-            output = generator(
-                debiased_prompt,
-                max_length=40,
-                num_return_sequences=1,
-                temperature=0.7,
-                do_sample=True
-            )
-            
-            generated = output[0]['generated_text']
-            
-            # Remove the instruction part from output for cleaner results
-            # Try to extract just the completion after the original prompt
-            if original_prompt in generated:
-                generated = generated.replace(original_prompt, original_prompt)
-            
-            print(f"   Result: {generated[:100]}...")
+        for i, original_prompt in enumerate(original_prompts, 1):
+            # Create debiased prompt
+            debiased_prompt = strategy_func(original_prompt)
             
-            strategy_results.append({
-                'original_prompt': original_prompt,
-                'debiased_prompt': debiased_prompt,
-                'generated_text': generated
-            })
+            print(f"[{i}/{len(original_prompts)}] Generating for: {original_prompt}")
+            print(f"   Modified prompt: {debiased_prompt[:80]}...")
             
-            time.sleep(0.5)
+            try:
+                # Generate text with debiased prompt
+                output = generator(
+                    debiased_prompt,
+                    max_length=40,
+                    num_return_sequences=1,
+                    temperature=0.7,
+                    do_sample=True
+                )
+                
+                generated = output[0]['generated_text']
+                print(f"   Result: {generated[:100]}...")
+                
+                strategy_results.append({
+                    'original_prompt': original_prompt,
+                    'debiased_prompt': debiased_prompt,
+                    'generated_text': generated
+                })
+                
+                time.sleep(0.5)
+                
+            except Exception as e:
+                print(f"   ERROR: {e}")
+                continue
+        
+        all_strategy_results[strategy_name] = strategy_results
+        print(f"\n✓ {strategy_name} complete: Generated {len(strategy_results)} texts")
+
+    return all_strategy_results
+
+def write_strategy_outputs(all_strategy_results):
+    for strategy_name, results in all_strategy_results.items():
+        # Create filename
+        filename = strategy_name.lower().replace(' ', '_')
+        output_file = f'results/mitigated_{filename}.txt'
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(f"BIAS MITIGATION - {strategy_name.upper()}\n")
+            f.write("=" * 70 + "\n\n")
             
-        except Exception as e:
-            print(f"   ERROR: {e}")
-            continue
-    
-    all_strategy_results[strategy_name] = strategy_results
-    print(f"\n✓ {strategy_name} complete: Generated {len(strategy_results)} texts")
-
-print("\n" + "=" * 70)
-print("ALL STRATEGIES COMPLETED")
-print("=" * 70)
-
-# Save results for each strategy
-for strategy_name, results in all_strategy_results.items():
-    # Create filename
-    filename = strategy_name.lower().replace(' ', '_')
-    output_file = f'results/mitigated_{filename}.txt'
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"BIAS MITIGATION - {strategy_name.upper()}\n")
-        f.write("=" * 70 + "\n\n")
+            for i, result in enumerate(results, 1):
+                f.write(f"{i}. ORIGINAL PROMPT: {result['original_prompt']}\n")
+                f.write(f"   DEBIASED PROMPT: {result['debiased_prompt']}\n")
+                f.write(f"   OUTPUT: {result['generated_text']}\n\n")
         
-        for i, result in enumerate(results, 1):
-            f.write(f"{i}. ORIGINAL PROMPT: {result['original_prompt']}\n")
-            f.write(f"   DEBIASED PROMPT: {result['debiased_prompt']}\n")
-            f.write(f"   OUTPUT: {result['generated_text']}\n\n")
-    
-    print(f"✓ {strategy_name} results saved to: {output_file}")
+        print(f"✓ {strategy_name} results saved to: {output_file}")
 
-# Function to count pronouns (reused from analyze_bias.py)
-MALE_PRONOUNS = ['he', 'him', 'his', 'himself']
-FEMALE_PRONOUNS = ['she', 'her', 'hers', 'herself']
+def load_strategy_outputs(strategies=None):
+    """Read back the results/mitigated_*.txt files written by write_strategy_outputs"""
+    strategies = strategies or DEBIASING_STRATEGIES
+    entry = re.compile(r'^\d+\. ORIGINAL PROMPT: (.*)\n   DEBIASED PROMPT: (.*)\n   OUTPUT: ', re.M)
+    all_strategy_results = {}
 
-def count_pronouns(text):
-    text_lower = text.lower()
-    male_count = 0
-    female_count = 0
-    
-    for pronoun in MALE_PRONOUNS:
-        pattern = r'\b' + pronoun + r'\b'
-        male_count += len(re.findall(pattern, text_lower))
-    
-    for pronoun in FEMALE_PRONOUNS:
-        pattern = r'\b' + pronoun + r'\b'
-        female_count += len(re.findall(pattern, text_lower))
-    
-    return male_count, female_count
+    for strategy_name in strategies:
+        filename = strategy_name.lower().replace(' ', '_')
+        with open(f'results/mitigated_{filename}.txt', 'r', encoding='utf-8') as f:
+            content = f.read()
 
-def calculate_bias_score(male_count, female_count):
-    total = male_count + female_count
-    if total == 0:
-        return 0.0
-    return (male_count - female_count) / total
+        # Outputs can span several lines, so each one runs up to the next entry
+        matches = list(entry.finditer(content))
+        results = []
+        for match, following in zip(matches, matches[1:] + [None]):
+            end = following.start() if following else len(content)
+            results.append({
+                'original_prompt': match.group(1),
+                'debiased_prompt': match.group(2),
+                'generated_text': content[match.end():end][:-2]
+            })
+        all_strategy_results[strategy_name] = results
 
-# Analyze bias in mitigated outputs
-print("\n" + "=" * 70)
-print("ANALYZING BIAS IN MITIGATED OUTPUTS")
-print("=" * 70)
+    return all_strategy_results
 
-strategy_analysis = {}
+def analyze_strategies(all_strategy_results):
+    """Pronoun totals and average per-text bias for each strategy"""
+    strategy_analysis = {}
 
-for strategy_name, results in all_strategy_results.items():
-    total_male = 0
-    total_female = 0
-    bias_scores = []
-    
-    for result in results:
-        male, female = count_pronouns(result['generated_text'])
-        total_male += male
-        total_female += female
+    for strategy_name, results in all_strategy_results.items():
+        total_male = 0
+        total_female = 0
+        bias_scores = []
         
-        bias = calculate_bias_score(male, female)
-        bias_scores.append(bias)
-    
-    avg_bias = sum(bias_scores) / len(bias_scores) if bias_scores else 0
-    
-    strategy_analysis[strategy_name] = {
-        'total_male': total_male,
-        'total_female': total_female,
-        'average_bias': avg_bias,
-        'texts_generated': len(results)
+        for result in results:
+            male, female = count_pronouns(result['generated_text'])
+            total_male += male
+            total_female += female
+            bias_scores.append(calculate_bias_score(male, female))
+        
+        strategy_analysis[strategy_name] = {
+            'total_male': total_male,
+            'total_female': total_female,
+            'average_bias': sum(bias_scores) / len(bias_scores) if bias_scores else 0,
+            'texts_generated': len(results)
+        }
+
+    return strategy_analysis
+
+def load_baseline():
+    """Baseline totals from the gender analysis metrics (None if they are missing)"""
+    try:
+        summary = load_metrics('bias_summary')
+    except FileNotFoundError:
+        return None
+    return {'male': summary['total_male'], 'female': summary['total_female'], 'bias': summary['average_bias']}
+
+def prompt_arrays(all_strategy_results):
+    """Per-text bias scores of every strategy's generations"""
+    return {
+        f'{strategy_slug(strategy_name)}_score': [
+            calculate_bias_score(*count_pronouns(r['generated_text'])) for r in results
+        ]
+        for strategy_name, results in all_strategy_results.items()
     }
-    
-    print(f"\n{strategy_name}:")
-    print(f"  Total male pronouns: {total_male}")
-    print(f"  Total female pronouns: {total_female}")
-    print(f"  Average bias score: {avg_bias:+.3f}")
-    print(f"  Texts generated: {len(results)}")
-
-# Load original results for comparison
-print("\n" + "=" * 70)
-print("COMPARING WITH ORIGINAL (BASELINE) RESULTS")
-print("=" * 70)
-
-try:
-    with open('results/bias_summary.txt', 'r', encoding='utf-8') as f:
-        content = f.read()
-        # Extract original stats (this is a simple parsing)
-        for line in content.split('\n'):
-            if 'Total male pronouns:' in line:
-                original_male = int(line.split(':')[1].strip())
-            elif 'Total female pronouns:' in line:
-                original_female = int(line.split(':')[1].strip())
-            elif 'Average bias score:' in line:
-                original_bias = float(line.split(':')[1].strip())
-    
+
+def write_prompt_metrics(all_strategy_results, strategy_analysis, baseline):
+    """Save results/metrics/mitigation_prompt_engineering.json and per-text bias scores"""
+    return write_metrics('mitigation_prompt_engineering', {
+        'stage': 'mitigate_prompt',
+        'baseline': baseline,
+        'strategies': strategy_analysis
+    }, prompt_arrays(all_strategy_results))
+
+def write_comparison(path, baseline, strategy_analysis):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("BIAS MITIGATION COMPARISON - PROMPT ENGINEERING\n")
+        f.write("=" * 70 + "\n\n")
+        
+        f.write("ORIGINAL (BASELINE) RESULTS:\n")
+        f.write(f"  Total male pronouns: {baseline['male']}\n")
+        f.write(f"  Total female pronouns: {baseline['female']}\n")
+        f.write(f"  Average bias score: {baseline['bias']:+.3f}\n\n")
+        
+        f.write("MITIGATION RESULTS:\n")
+        f.write("-" * 70 + "\n")
+        
+        for strategy_name, analysis in strategy_analysis.items():
+            bias_reduction = abs(baseline['bias']) - abs(analysis['average_bias'])
+            reduction_percent = (bias_reduction / abs(baseline['bias']) * 100) if baseline['bias'] != 0 else 0
+            
+            f.write(f"\n{strategy_name}:\n")
+            f.write(f"  Total male pronouns: {analysis['total_male']}\n")
+            f.write(f"  Total female pronouns: {analysis['total_female']}\n")
+            f.write(f"  Average bias score: {analysis['average_bias']:+.3f}\n")
+            f.write(f"  Bias reduction: {bias_reduction:+.3f}\n")
+            f.write(f"  Reduction percentage: {reduction_percent:.1f}%\n")
+
+def run(prompts_file='data/test_prompts.txt', generator=None, rescore=False):
+    """
+    Regenerate with debiasing prompts and compare to the baseline (the CLI 'mitigate prompt' stage)
+
+    With rescore=True the saved mitigated_*.txt outputs are analyzed again
+    instead of generating new ones (no transformers needed).
+    """
+    print("=" * 70)
+    print("BIAS MITIGATION - PROMPT ENGINEERING METHOD")
+    print("=" * 70)
+
+    if rescore:
+        try:
+            all_strategy_results = load_strategy_outputs()
+        except FileNotFoundError as e:
+            print(f"ERROR: Could not find {e.filename}")
+            return None
+        print(f"✓ Loaded saved outputs for {len(all_strategy_results)} strategies")
+        return report(all_strategy_results)
+
+    # Read the original prompts
+    try:
+        with open(prompts_file, 'r', encoding='utf-8') as f:
+            original_prompts = [line.strip() for line in f.readlines() if line.strip()]
+    except FileNotFoundError:
+        print(f"ERROR: Could not find {prompts_file}")
+        return None
+
+    # Load the AI model
+    generator = generator or load_generator()
+    print(f"✓ Loaded {len(original_prompts)} prompts\n")
+
+    print("=" * 70)
+    print("GENERATING DEBIASED TEXT WITH DIFFERENT STRATEGIES")
+    print("=" * 70)
+
+    all_strategy_results = generate_strategy_outputs(generator, original_prompts)
+
+    print("\n" + "=" * 70)
+    print("ALL STRATEGIES COMPLETED")
+    print("=" * 70)
+
+    # Save results for each strategy
+    write_strategy_outputs(all_strategy_results)
+    return report(all_strategy_results)
+
+def report(all_strategy_results):
+    """Analyze strategy outputs, save metrics and compare them to the baseline"""
+    # Analyze bias in mitigated outputs
+    print("\n" + "=" * 70)
+    print("ANALYZING BIAS IN MITIGATED OUTPUTS")
+    print("=" * 70)
+
+    strategy_analysis = analyze_strategies(all_strategy_results)
+
+    for strategy_name, analysis in strategy_analysis.items():
+        print(f"\n{strategy_name}:")
+        print(f"  Total male pronouns: {analysis['total_male']}")
+        print(f"  Total female pronouns: {analysis['total_female']}")
+        print(f"  Average bias score: {analysis['average_bias']:+.3f}")
+        print(f"  Texts generated: {analysis['texts_generated']}")
+
+    # Load original results for comparison
+    print("\n" + "=" * 70)
+    print("COMPARING WITH ORIGINAL (BASELINE) RESULTS")
+    print("=" * 70)
+
+    baseline = load_baseline()
+    metrics_file = write_prompt_metrics(all_strategy_results, strategy_analysis, baseline)
+    print(f"✓ Metrics saved to: {metrics_file}")
+    if baseline is None:
+        print("Could not find the baseline metrics (results/metrics/bias_summary.json) for comparison")
+        print("Run the gender analysis first: python src/cli.py analyze gender --baseline")
+        return strategy_analysis
+
     print(f"\nORIGINAL (Before mitigation):")
-    print(f"  Total male pronouns: {original_male}")
-    print(f"  Total female pronouns: {original_female}")
-    print(f"  Average bias score: {original_bias:+.3f}")
+    print(f"  Total male pronouns: {baseline['male']}")
+    print(f"  Total female pronouns: {baseline['female']}")
+    print(f"  Average bias score: {baseline['bias']:+.3f}")
     
     print("\n" + "-" * 70)
     print("BIAS REDUCTION COMPARISON")
     print("-" * 70)
     
     for strategy_name, analysis in strategy_analysis.items():
-        bias_reduction = abs(original_bias) - abs(analysis['average_bias'])
-        reduction_percent = (bias_reduction / abs(original_bias) * 100) if original_bias != 0 else 0
+        bias_reduction = abs(baseline['bias']) - abs(analysis['average_bias'])
+        reduction_percent = (bias_reduction / abs(baseline['bias']) * 100) if baseline['bias'] != 0 else 0
         
         print(f"\n{strategy_name}:")
         print(f"  Bias reduction: {bias_reduction:+.3f}")
@@ -218,40 +298,18 @@ try:
             print(f"  ✗ This strategy INCREASED bias (not good)")
         else:
             print(f"  → No change in bias")
-    
-except FileNotFoundError:
-    print("Could not find original bias_summary.txt for comparison")
 
-# Save comparison report
-comparison_file = 'results/mitigation_comparison_prompt_engineering.txt'
+    # Save comparison report
+    comparison_file = 'results/mitigation_comparison_prompt_engineering.txt'
+    write_comparison(comparison_file, baseline, strategy_analysis)
+    print(f"\n✓ Comparison report saved to: {comparison_file}")
 
-with open(comparison_file, 'w', encoding='utf-8') as f:
-    f.write("BIAS MITIGATION COMPARISON - PROMPT ENGINEERING\n")
-    f.write("=" * 70 + "\n\n")
-    
-    f.write("ORIGINAL (BASELINE) RESULTS:\n")
-    f.write(f"  Total male pronouns: {original_male}\n")
-    f.write(f"  Total female pronouns: {original_female}\n")
-    f.write(f"  Average bias score: {original_bias:+.3f}\n\n")
-    
-    f.write("MITIGATION RESULTS:\n")
-    f.write("-" * 70 + "\n")
-    
-    for strategy_name, analysis in strategy_analysis.items():
-        bias_reduction = abs(original_bias) - abs(analysis['average_bias'])
-        reduction_percent = (bias_reduction / abs(original_bias) * 100) if original_bias != 0 else 0
-        
-        f.write(f"\n{strategy_name}:\n")
-        f.write(f"  Total male pronouns: {analysis['total_male']}\n")
-        f.write(f"  Total female pronouns: {analysis['total_female']}\n")
-        f.write(f"  Average bias score: {analysis['average_bias']:+.3f}\n")
-        f.write(f"  Bias reduction: {bias_reduction:+.3f}\n")
-        f.write(f"  Reduction percentage: {reduction_percent:.1f}%\n")
-
-print(f"\n✓ Comparison report saved to: {comparison_file}")
-
-print("\n" + "=" * 70)
-print("PROMPT ENGINEERING MITIGATION COMPLETE!")
-print("=" * 70)
-print("\nNext step: Run post-processing mitigation (mitigate_post_processing.py)")
-print("This will give you a second mitigation method to compare!")
\ No newline at end of file
+    print("\n" + "=" * 70)
+    print("PROMPT ENGINEERING MITIGATION COMPLETE!")
+    print("=" * 70)
+    print("\nNext step: Run post-processing mitigation (mitigate_post_processing.py)")
+    print("This will give you a second mitigation method to compare!")
+    return strategy_analysis
+
+if __name__ == "__main__":
+    sys.exit(0 if run(rescore='--rescore' in sys.argv[1:]) is not None else 1)
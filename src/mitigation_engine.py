@@ -0,0 +1,318 @@
+"""
+Parallel Multi-Strategy Mitigation Evaluation
+
+Applies any set of registered post-processing strategies to a streamed corpus
+in parallel worker processes, scores every original and rewritten text with
+MultiBiasDetector for all supported bias types, and writes one compact result
+file per strategy plus a summary report.
+
+Usage:
+    python src/mitigation_engine.py [input_file] [--workers=N] [--chunk-size=N]
+                                    [--strategies=name1,name2] [--output-dir=DIR]
+"""
+
+import os
+import sys
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import MultiBiasDetector
+from src.rewrite_engine import THEY_THEM, REMOVE_PRONOUNS, ALTERNATING
+from src.pipeline_io import BIAS_TYPES, strategy_slug, write_metrics
+from src.lexicon_mitigation import AGE_LEXICON, SOCIOECONOMIC_LEXICON, REGIONAL_LEXICON, ALL_LEXICONS
+
+# Registered strategies: name -> object with rewrite_corpus(texts) -> texts.
+# Workers look strategies up by name, so anything registered at import time
+# of this module (or a module it imports) is available in every process.
+STRATEGIES = {}
+
+
+def register_strategy(name: str, engine):
+    """Register a post-processing strategy under a display name"""
+    if not hasattr(engine, 'rewrite_corpus'):
+        raise TypeError(f"Strategy '{name}' must provide rewrite_corpus(texts)")
+    STRATEGIES[name] = engine
+
+
+register_strategy('Replace with They/Them', THEY_THEM)
+register_strategy('Remove Pronouns', REMOVE_PRONOUNS)
+# Alternating depends on the text index; chunks always start at an even index
+register_strategy('Alternating Gender', ALTERNATING)
+register_strategy('Lexicon (age)', AGE_LEXICON)
+register_strategy('Lexicon (socioeconomic)', SOCIOECONOMIC_LEXICON)
+register_strategy('Lexicon (regional)', REGIONAL_LEXICON)
+register_strategy('Lexicon (all)', ALL_LEXICONS)
+
+
+def iter_corpus(path: str) -> Iterator[str]:
+    """
+    Stream texts from a corpus file without loading it whole
+
+    Supports the project's PROMPT/OUTPUT result files, JSON lines with a
+    'text' or 'output' field, and plain text with one text per line.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        first = f.readline()
+        f.seek(0)
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record.get('text') or record.get('output') or ''
+        elif 'GENERATED TEXTS' in first.upper() or 'PROMPT:' in first.upper():
+            for line in f:
+                line = line.strip()
+                if 'OUTPUT:' in line.upper():
+                    yield line.split('OUTPUT:', 1)[1].strip()
+        else:
+            for line in f:
+                if line.strip():
+                    yield line.strip()
+
+
+def iter_chunks(texts: Iterator[str], chunk_size: int) -> Iterator[tuple]:
+    """Group a text stream into (start_index, texts) chunks of even size"""
+    chunk_size += chunk_size % 2
+    chunk = []
+    start = 0
+    for text in texts:
+        chunk.append(text)
+        if len(chunk) == chunk_size:
+            yield start, chunk
+            start += len(chunk)
+            chunk = []
+    if chunk:
+        yield start, chunk
+
+
+def _new_stats() -> Dict:
+    return {
+        'texts': 0, 'changed': 0,
+        'sum_original': 0.0, 'sum_debiased': 0.0,
+        'sum_abs_original': 0.0, 'sum_abs_debiased': 0.0,
+        'labels_original': defaultdict(int), 'labels_debiased': defaultdict(int)
+    }
+
+
+_detector = None
+
+
+def _init_worker():
+    global _detector
+    _detector = MultiBiasDetector(BIAS_TYPES)
+
+
+def evaluate_chunk(job: tuple) -> tuple:
+    """
+    Evaluate every strategy on one chunk (runs inside a worker process)
+
+    Returns (start, per-strategy stats, per-strategy score rows). Detection
+    results are memoized per distinct text, so unchanged or identical
+    rewrites are only scored once.
+    """
+    start, texts, strategy_names = job
+    if _detector is None:
+        _init_worker()
+
+    memo = {}
+
+    def detect(text):
+        if text not in memo:
+            results = _detector.detect_all(text)
+            memo[text] = ({b: r['bias_score'] for b, r in results.items()},
+                          {b: r['bias_label'] for b, r in results.items()})
+        return memo[text]
+
+    originals = [detect(t) for t in texts]
+    stats = {}
+    rows = {}
+
+    for name in strategy_names:
+        rewritten = STRATEGIES[name].rewrite_corpus(texts)
+        strategy_stats = {b: _new_stats() for b in BIAS_TYPES}
+        strategy_rows = []
+
+        for i, (text, new_text) in enumerate(zip(texts, rewritten)):
+            orig_scores, orig_labels = originals[i]
+            new_scores, new_labels = detect(new_text) if new_text != text else originals[i]
+            for b in BIAS_TYPES:
+                s = strategy_stats[b]
+                s['texts'] += 1
+                s['changed'] += new_text != text
+                s['sum_original'] += orig_scores[b]
+                s['sum_debiased'] += new_scores[b]
+                s['sum_abs_original'] += abs(orig_scores[b])
+                s['sum_abs_debiased'] += abs(new_scores[b])
+                s['labels_original'][orig_labels[b]] += 1
+                s['labels_debiased'][new_labels[b]] += 1
+            strategy_rows.append((start + i, [orig_scores[b] for b in BIAS_TYPES],
+                                  [new_scores[b] for b in BIAS_TYPES]))
+
+        stats[name] = strategy_stats
+        rows[name] = strategy_rows
+
+    return start, stats, rows
+
+
+def _merge_stats(total: Dict, part: Dict):
+    for key, value in part.items():
+        if isinstance(value, dict):
+            for label, count in value.items():
+                total[key][label] += count
+        else:
+            total[key] += value
+
+
+def evaluate(texts: Iterator[str], strategy_names: List[str] = None, workers: int = None,
+             chunk_size: int = 500, output_dir: str = 'results/mitigation_eval') -> Dict:
+    """
+    Evaluate strategies over a text stream in parallel
+
+    Args:
+        texts: Iterable of texts (streamed; never materialized)
+        strategy_names: Registered strategies to run (None = all)
+        workers: Worker processes (None = CPU count)
+        chunk_size: Texts per task
+        output_dir: Where per-strategy score files and the summary go
+
+    Returns:
+        Per-strategy, per-bias-type aggregate metrics
+    """
+    strategy_names = strategy_names or list(STRATEGIES)
+    for name in strategy_names:
+        if name not in STRATEGIES:
+            raise ValueError(f"Unknown strategy: {name}")
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    totals = {name: {b: _new_stats() for b in BIAS_TYPES} for name in strategy_names}
+    files = {}
+    for name in strategy_names:
+        f = open(os.path.join(output_dir, f"{strategy_slug(name)}.tsv"), 'w', encoding='utf-8')
+        f.write("index\t" + "\t".join(f"{b}_original\t{b}_debiased" for b in BIAS_TYPES) + "\n")
+        files[name] = f
+
+    jobs = ((start, chunk, strategy_names) for start, chunk in iter_chunks(texts, chunk_size))
+    try:
+        if workers == 1:
+            parts = map(evaluate_chunk, jobs)
+            _consume(parts, totals, files)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                # Bounded window of in-flight chunks keeps memory flat on huge corpora
+                _consume(_bounded_map(pool, jobs, workers * 4), totals, files)
+    finally:
+        for f in files.values():
+            f.close()
+
+    metrics = {name: {b: _finalize(s) for b, s in per_type.items()}
+               for name, per_type in totals.items()}
+    _write_summary(metrics, os.path.join(output_dir, 'summary.txt'))
+    write_metrics('metrics', {'stage': 'mitigation_engine', 'strategies': metrics}, directory=output_dir)
+    return metrics
+
+
+def _bounded_map(pool, jobs, window: int):
+    """Like pool.map, but with at most `window` tasks submitted at a time"""
+    pending = []
+    for job in jobs:
+        pending.append(pool.submit(evaluate_chunk, job))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+def _consume(parts, totals: Dict, files: Dict):
+    for start, stats, rows in parts:
+        for name, per_type in stats.items():
+            for b, part in per_type.items():
+                _merge_stats(totals[name][b], part)
+            files[name].write("".join(
+                f"{index}\t" + "\t".join(f"{o:.3f}\t{d:.3f}" for o, d in zip(orig, new)) + "\n"
+                for index, orig, new in rows[name]
+            ))
+
+
+def _finalize(s: Dict) -> Dict:
+    n = s['texts'] or 1
+    mean_abs_original = s['sum_abs_original'] / n
+    mean_abs_debiased = s['sum_abs_debiased'] / n
+    return {
+        'texts': s['texts'],
+        'changed': s['changed'],
+        'mean_original': s['sum_original'] / n,
+        'mean_debiased': s['sum_debiased'] / n,
+        'mean_abs_original': mean_abs_original,
+        'mean_abs_debiased': mean_abs_debiased,
+        'bias_reduction': mean_abs_original - mean_abs_debiased,
+        'labels_original': dict(s['labels_original']),
+        'labels_debiased': dict(s['labels_debiased'])
+    }
+
+
+def _write_summary(metrics: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("MITIGATION STRATEGY EVALUATION\n")
+        f.write("=" * 90 + "\n\n")
+        for name, per_type in metrics.items():
+            f.write(f"{name}:\n")
+            f.write("-" * 90 + "\n")
+            f.write(f"{'Bias Type':<15} {'Texts':>8} {'Changed':>8} {'Mean|orig|':>11} "
+                    f"{'Mean|deb|':>10} {'Reduction':>10}\n")
+            for b, m in per_type.items():
+                f.write(f"{b:<15} {m['texts']:>8} {m['changed']:>8} {m['mean_abs_original']:>11.3f} "
+                        f"{m['mean_abs_debiased']:>10.3f} {m['bias_reduction']:>+10.3f}\n")
+            f.write("\n")
+
+
+def main(argv=None):
+    """Evaluate strategies on a corpus file (python src/mitigation_engine.py / CLI 'mitigate engine')"""
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    input_file = args[0] if args else 'results/generated_outputs.txt'
+    names = options['strategies'].split(',') if options.get('strategies') else None
+    workers = int(options['workers']) if options.get('workers') else None
+    chunk_size = int(options.get('chunk-size') or 500)
+    output_dir = options.get('output-dir') or 'results/mitigation_eval'
+
+    print("=" * 70)
+    print("MITIGATION STRATEGY EVALUATION ENGINE")
+    print("=" * 70)
+    print(f"\nInput: {input_file}")
+    print(f"Strategies: {', '.join(names or STRATEGIES)}")
+    print(f"Workers: {workers or os.cpu_count()}")
+
+    if not os.path.exists(input_file):
+        print(f"ERROR: Could not find {input_file}")
+        return 1
+
+    start_time = time.perf_counter()
+    metrics = evaluate(iter_corpus(input_file), names, workers, chunk_size, output_dir)
+    elapsed = time.perf_counter() - start_time
+
+    for name, per_type in metrics.items():
+        print(f"\n{name}:")
+        for b, m in per_type.items():
+            print(f"  {b.upper():<14} |orig| {m['mean_abs_original']:.3f} -> |deb| "
+                  f"{m['mean_abs_debiased']:.3f} (reduction {m['bias_reduction']:+.3f}, "
+                  f"{m['changed']} texts changed)")
+
+    texts = next(iter(next(iter(metrics.values())).values()))['texts'] if metrics else 0
+    print(f"\n✓ Evaluated {texts} texts x {len(metrics)} strategies in {elapsed:.2f}s")
+    print(f"✓ Per-strategy results saved to: {output_dir}/")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
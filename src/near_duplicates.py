@@ -0,0 +1,312 @@
+"""
+Near-Duplicate Completion Index (MinHash + LSH)
+
+Generated outputs are highly repetitive: GPT-2 loops on sentences like "They
+said they did not know...", and repeated prompts give near-identical
+completions. Running the detectors again on a near-copy of an earlier text
+wastes time and, in reports, counts the same completion several times.
+
+Each text is reduced to a MinHash signature of its word shingles, whose
+agreement rate estimates the Jaccard similarity of two texts. Signatures are
+split into bands and bucketed (locality-sensitive hashing), so a lookup only
+compares against texts that share at least one band instead of every text
+seen so far. Candidates are kept if their estimated similarity reaches the
+threshold.
+
+Similarity alone is not enough to reuse detection results: "...said that he
+would..." and "...said that she would..." are 0.81 similar but score in
+opposite directions. Callers that reuse results pass each text's detector
+keyword fingerprint (MultiBiasDetector.keyword_fingerprint), and a match must
+also have an equal fingerprint. Texts without any words ("", ".") have no
+shingles to compare and never match.
+
+Used by:
+    - analyze_bias_multi.analyze(near_duplicates=...) to reuse detection results
+      and flag (or drop) near-duplicates in the reports
+    - SequentialSampler(duplicate_threshold=...) to reuse detection results and
+      stop re-requesting prompts whose samples keep coming back the same
+
+Usage:
+    python src/near_duplicates.py [input_file] [--threshold=0.8]
+    python src/near_duplicates.py --benchmark=1000000
+"""
+
+import random
+import re
+import sys
+import os
+import time
+import zlib
+from typing import Hashable, List, Optional, Sequence, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index mapping texts to earlier texts with a similar word-shingle set"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize the index
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity to count as a near-duplicate
+            num_perm: MinHash signature length
+            bands: LSH bands (num_perm / bands rows each); more bands catch
+                   less similar pairs as candidates
+            shingle_size: Words per shingle
+            seed: Seed of the hash permutations (indexes only match with equal seeds)
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # Multiply-shift hash family: (a * x + b) mod 2^64, top 32 bits
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self._band_coef = rng.integers(1, 2 ** 63, self.rows, dtype=np.uint64)
+
+        self._word_hashes = {}
+        self._buckets = [{} for _ in range(bands)]
+        self.keys = []
+        self._signatures = []
+        self._fingerprints = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _word_ids(self, text: str) -> List[int]:
+        """32-bit hashes of the text's lowercase words, padded to at least one shingle"""
+        cache = self._word_hashes
+        words = WORD_PATTERN.findall(text.lower())
+        try:
+            ids = list(map(cache.__getitem__, words))
+        except KeyError:
+            for word in set(words).difference(cache):
+                cache[word] = zlib.crc32(word.encode('utf-8'))
+            ids = list(map(cache.__getitem__, words))
+        if len(ids) < self.shingle_size:
+            ids.extend([0] * (self.shingle_size - len(ids)))
+        return ids
+
+    def signatures(self, texts: Sequence[str], batch_size: int = 1024) -> np.ndarray:
+        """MinHash signatures of many texts, shape (len(texts), num_perm)"""
+        size = self.shingle_size
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), batch_size):
+            words, lengths = [], []
+            for text in texts[start:start + batch_size]:
+                ids = self._word_ids(text)
+                words.extend(ids)
+                lengths.append(len(ids))
+            words = np.asarray(words, dtype=np.uint64)
+            lengths = np.asarray(lengths)
+
+            # Shingle i of a text combines words i .. i+size-1 of that text;
+            # positions are computed for the whole batch at once
+            counts = lengths - size + 1
+            shingle_offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            word_offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            positions = np.repeat(word_offsets - shingle_offsets, counts) + np.arange(counts.sum())
+            shingles = np.zeros(len(positions), dtype=np.uint64)
+            for j in range(size):
+                shingles = shingles * np.uint64(0x100000001B3) + words[positions + j]
+            shingles ^= shingles >> np.uint64(29)
+
+            permuted = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> np.uint64(32)
+            out[start:start + len(lengths)] = np.minimum.reduceat(permuted, shingle_offsets, axis=1).T
+        return out
+
+    def signature(self, text: str) -> np.ndarray:
+        return self.signatures([text])[0]
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """LSH bucket key of every band, shape (len(signatures), bands)"""
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (rows * self._band_coef).sum(axis=2)
+
+    def query(self, signature: np.ndarray, band_keys: List[int] = None,
+              fingerprint: Hashable = None) -> Optional[Tuple[Hashable, float]]:
+        """
+        Most similar indexed key at or above the threshold, as (key, similarity), or None
+
+        With a fingerprint, only keys indexed with an equal fingerprint can match.
+        """
+        if band_keys is None:
+            band_keys = self.band_keys(signature[None, :])[0].tolist()
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, band_keys):
+            candidates.update(buckets.get(band_key, ()))
+        best = None
+        for position in candidates:
+            if fingerprint is not None and self._fingerprints[position] != fingerprint:
+                continue
+            similarity = float(np.count_nonzero(self._signatures[position] == signature)) / self.num_perm
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (position, similarity)
+        if best is None:
+            return None
+        return self.keys[best[0]], best[1]
+
+    def add(self, key: Hashable, signature: np.ndarray, band_keys: List[int] = None, fingerprint: Hashable = None):
+        """Index a signature (and its fingerprint) under key"""
+        if band_keys is None:
+            band_keys = self.band_keys(signature[None, :])[0].tolist()
+        position = len(self.keys)
+        self.keys.append(key)
+        self._signatures.append(signature)
+        self._fingerprints.append(fingerprint)
+        for buckets, band_key in zip(self._buckets, band_keys):
+            buckets.setdefault(band_key, []).append(position)
+
+    def find_or_add(self, key: Hashable, text: str = None, signature: np.ndarray = None,
+                    band_keys: List[int] = None, fingerprint: Hashable = None) -> Optional[Tuple[Hashable, float]]:
+        """
+        Return (earlier key, similarity) if text is a near-duplicate, else index it under key
+
+        Near-duplicates are not indexed themselves, so every match points at
+        the first text of its group. Pass signature (and band_keys) computed in
+        bulk with signatures() / band_keys() to skip per-text hashing; pass the
+        text too so that texts without words are recognized. With a
+        fingerprint, a match also needs an equal fingerprint (see query()).
+        """
+        if text is not None and not WORD_PATTERN.search(text):
+            return None
+        signature = self.signature(text) if signature is None else signature
+        if band_keys is None:
+            band_keys = self.band_keys(signature[None, :])[0].tolist()
+        match = self.query(signature, band_keys, fingerprint)
+        if match is None:
+            self.add(key, signature, band_keys, fingerprint)
+        return match
+
+    def find_or_add_all(self, keys: Sequence[Hashable], texts: Sequence[str], batch_size: int = 1024,
+                        fingerprints: Sequence[Hashable] = None) -> List[Optional[Tuple[Hashable, float]]]:
+        """find_or_add() for many texts (with optional fingerprints) in order, hashing them in batches"""
+        keys = list(keys)
+        fingerprints = [None] * len(texts) if fingerprints is None else list(fingerprints)
+        matches = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            signatures = self.signatures(batch, batch_size)
+            for key, text, fingerprint, signature, band_keys in zip(
+                    keys[start:start + batch_size], batch, fingerprints[start:start + batch_size],
+                    signatures, self.band_keys(signatures).tolist()):
+                matches.append(self.find_or_add(key, text, signature, band_keys, fingerprint))
+        return matches
+
+
+def synthetic_corpus(n: int, duplicate_rate: float = 0.3, seed: int = 0) -> Tuple[List[str], int]:
+    """n template-like texts, duplicate_rate of them one-word edits of an earlier text; returns (texts, copies)"""
+    rng = random.Random(seed)
+    subjects = ['The doctor', 'The nurse', 'The engineer', 'The teacher', 'The young intern',
+                'The wealthy investor', 'The rural family', 'The senior manager']
+    verbs = ['said', 'explained', 'thought', 'announced', 'wrote', 'argued', 'noticed', 'asked']
+    words = ('they he she we the team people work project hospital money city village result plan '
+             'problem school market report meeting patient family future policy data').split()
+    texts = []
+    copies = 0
+    for i in range(n):
+        if texts and rng.random() < duplicate_rate:
+            copies += 1
+            tokens = rng.choice(texts).split()
+            tokens[rng.randrange(len(tokens))] = rng.choice(words)
+            texts.append(' '.join(tokens))
+        else:
+            body = ' '.join(rng.choice(words) for _ in range(rng.randint(20, 40)))
+            texts.append(f"{rng.choice(subjects)} {rng.choice(verbs)} that {body} (case {i}).")
+    return texts, copies
+
+
+def benchmark(n: int = 1000000, threshold: float = 0.8, duplicate_rate: float = 0.3, batch_size: int = 1024):
+    """Print index throughput on a synthetic corpus and the detection time it saves"""
+    from src.bias_detector import MultiBiasDetector
+
+    print("=" * 70)
+    print(f"NEAR-DUPLICATE INDEX BENCHMARK ({n:,} synthetic texts, {duplicate_rate:.0%} edited copies)")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    texts, copies = synthetic_corpus(n, duplicate_rate)
+    print(f"Corpus built in {time.perf_counter() - start:.1f}s")
+
+    index = NearDuplicateIndex(threshold)
+    signature_time = lookup_time = 0.0
+    duplicates = 0
+    for offset in range(0, n, batch_size):
+        start = time.perf_counter()
+        signatures = index.signatures(texts[offset:offset + batch_size])
+        band_keys = index.band_keys(signatures).tolist()
+        signature_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i, (signature, keys) in enumerate(zip(signatures, band_keys)):
+            if index.find_or_add(offset + i, signature=signature, band_keys=keys) is not None:
+                duplicates += 1
+        lookup_time += time.perf_counter() - start
+
+    total = signature_time + lookup_time
+    print(f"\nSignatures:      {signature_time:7.1f}s  ({n / signature_time:,.0f} texts/s)")
+    print(f"Index lookups:   {lookup_time:7.1f}s  ({n / lookup_time:,.0f} texts/s)")
+    print(f"Total:           {total:7.1f}s  ({n / total:,.0f} texts/s)")
+    print(f"Near-duplicates: {duplicates:,} ({duplicates / n:.1%}) of {copies:,} edited copies; "
+          f"{len(index):,} texts indexed")
+
+    # Detection cost per text, measured on a sample
+    detector = MultiBiasDetector()
+    sample = texts[:2000]
+    start = time.perf_counter()
+    for text in sample:
+        detector.detect_all(text)
+    per_text = (time.perf_counter() - start) / len(sample)
+    print(f"\nDetection (all types): {per_text * 1e6:,.0f}us/text -> {per_text * n:,.0f}s for the corpus")
+    print(f"With reuse: {per_text * len(index) + total:,.0f}s "
+          f"({per_text * len(index):,.0f}s detection + {total:.0f}s index)")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    threshold = float(options.get('threshold') or 0.8)
+    if 'benchmark' in options:
+        benchmark(int(options['benchmark'] or 1000000), threshold)
+        return 0
+
+    from src.pipeline_io import load_generated
+    input_file = args[0] if args else 'results/generated_outputs.txt'
+    try:
+        records = load_generated(input_file)
+    except FileNotFoundError:
+        print(f"ERROR: Could not find {input_file}")
+        return 1
+
+    index = NearDuplicateIndex(threshold)
+    matches = index.find_or_add_all(range(1, len(records) + 1), [r['output'] for r in records])
+    print(f"NEAR-DUPLICATES IN {input_file} (threshold {threshold})")
+    print("=" * 70)
+    duplicates = 0
+    for i, (record, match) in enumerate(zip(records, matches), 1):
+        if match:
+            duplicates += 1
+            print(f"#{i} ≈ #{match[0]} (similarity {match[1]:.2f}): {record['output'][:60]}...")
+    print(f"\n{duplicates} of {len(records)} texts are near-duplicates of an earlier text")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""
+In-Process Pipeline Orchestrator
+
+Runs the study as a DAG of stages:
+
+    generate/load[type] -> analyze[type] -> table[type] -> visualize[type]
+    generate/load[gender] -> baseline -> mitigate_post / mitigate_prompt -> compare
+
+Stages pass their outputs to each other in memory. Every output is cached
+under results/.pipeline_cache, keyed by a hash of the stage config, the
+source of the modules that implement it and the content digests of its
+inputs. The code part covers the stage's modules and every src module they
+import, directly or through each other, so editing any helper a stage uses
+invalidates it. A stage whose key is already cached is skipped. Stages whose
+inputs are ready run concurrently, so per-bias-type branches and the two
+mitigation methods overlap.
+
+Usage:
+    python src/pipeline.py [bias_type ...] [--generate] [--prompt-mitigation]
+                           [--workers=N] [--force] [--cache-dir=DIR]
+"""
+
+import os
+import sys
+import ast
+import json
+import time
+import pickle
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline_io import BIAS_TYPES, generated_file, load_arrays, load_generated, load_metrics, metrics_path
+from src.pipeline_io import prompts_file
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = 'results/.pipeline_cache'
+
+# pyplot keeps global state, so charts are drawn one at a time
+PLOT_LOCK = threading.Lock()
+
+
+class Stage:
+    """One pipeline step: func(inputs, **config) -> picklable output"""
+
+    def __init__(self, name: str, func: Callable, deps: Tuple[str, ...] = (),
+                 config: dict = None, modules: Tuple[str, ...] = ()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.config = config or {}
+        # Entry src/ modules; their source and that of every src module they
+        # import (see module_closure) is part of the cache key
+        self.modules = tuple(modules)
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's bytes ('missing' if it does not exist)"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return 'missing'
+
+
+def src_imports(module: str, src_dir: str = SRC_DIR) -> List[str]:
+    """src modules imported anywhere in a module (top level or inside functions)"""
+    try:
+        with open(os.path.join(src_dir, f'{module}.py'), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+    except FileNotFoundError:
+        return []
+    imported = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module == 'src':
+            imported.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.module.startswith('src.'):
+            imported.append(node.module.split('.')[1])
+        elif isinstance(node, ast.Import):
+            imported.extend(alias.name.split('.')[1] for alias in node.names
+                            if alias.name.startswith('src.'))
+    return imported
+
+
+def module_closure(modules, src_dir: str = SRC_DIR) -> List[str]:
+    """The given src modules plus everything they import transitively, sorted"""
+    seen = set()
+    todo = list(modules)
+    while todo:
+        module = todo.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        todo.extend(src_imports(module, src_dir))
+    return sorted(seen)
+
+
+def stage_key(stage: Stage, input_digests: Dict[str, str], src_dir: str = SRC_DIR) -> str:
+    """Cache key from the stage's config, code and input digests"""
+    h = hashlib.sha256()
+    h.update(stage.name.encode('utf-8'))
+    h.update(json.dumps(stage.config, sort_keys=True, default=str).encode('utf-8'))
+    # pipeline.py itself imports every stage lazily, so it is hashed alone
+    h.update(file_digest(os.path.join(src_dir, 'pipeline.py')).encode('utf-8'))
+    for module in module_closure(stage.modules, src_dir):
+        h.update(module.encode('utf-8'))
+        h.update(file_digest(os.path.join(src_dir, f'{module}.py')).encode('utf-8'))
+    for dep in stage.deps:
+        h.update(input_digests[dep].encode('utf-8'))
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Stage functions
+# ---------------------------------------------------------------------------
+
+def load_stage(inputs, bias_type, path, content_hash):
+    """Parsed records from an existing generated-output file"""
+    return load_generated(path)
+
+
+def generate_stage(inputs, bias_type, prompts_hash, guard_threshold=None, num_samples=1):
+    """Generate fresh completions and save them like generate_text.py does"""
+    from src.generate_text import configure_openai, generate, output_file_for
+    from src.pipeline_io import write_generated
+
+    if not configure_openai():
+        raise RuntimeError("OpenAI API key not found (set OPENAI_API_KEY)")
+
+    records, _, _, _ = generate(bias_type, guard_threshold=guard_threshold, num_samples=num_samples)
+    write_generated(output_file_for(bias_type), bias_type, records)
+    return [{'prompt': r['prompt'], 'output': r['generated_text'], 'sample': r.get('sample', 1)}
+            for r in records]
+
+
+def analyze_stage(inputs, bias_type, source):
+    from src.analyze_bias_multi import analyze, summarize, prompt_sample_stats
+    from src.analyze_bias_multi import write_detailed_report, write_summary, write_analysis_metrics
+
+    analyzed = analyze(inputs[source], bias_type)
+    summary = summarize(analyzed)
+    prompt_stats = prompt_sample_stats(analyzed)
+    write_detailed_report(f'results/bias_analysis_{bias_type}_detailed.txt', bias_type, analyzed)
+    write_summary(f'results/bias_summary_{bias_type}.txt', bias_type, summary, prompt_stats, len(analyzed))
+    write_analysis_metrics(bias_type, analyzed, summary, prompt_stats)
+    return {'analyzed': analyzed, 'summary': summary}
+
+
+def table_stage(inputs, bias_type, source):
+    from src.create_bias_table_multi import aggregate_table, build_table, score_distribution
+    from src.create_bias_table_multi import subject_data_from, write_tables
+
+    # Tables reuse the analyze stage's detections instead of detecting again;
+    # the output matches create_bias_table_multi.run (cli.py table)
+    table = aggregate_table(inputs[source]['analyzed'])
+    table.save(metrics_path(f'subject_aggregates_{bias_type}'))
+    subject_data = subject_data_from(table)
+    bias_types_to_show = BIAS_TYPES if bias_type == 'combined' else [bias_type]
+    tables = {btype: build_table(subject_data, btype) for btype in bias_types_to_show}
+    distributions = {btype: score_distribution(table, btype) for btype in bias_types_to_show}
+    write_tables(f'results/bias_table_{bias_type}.txt', bias_type, tables, distributions)
+    return {'subject_data': subject_data, 'tables': tables}
+
+
+def visualize_stage(inputs, bias_type, source):
+    from src.visualize_bias_multi import plot
+
+    output_file = f'results/bias_visualization_{bias_type}.png'
+    with PLOT_LOCK:
+        plot(inputs[source]['subject_data'], bias_type, output_file)
+    return output_file
+
+
+def baseline_stage(inputs, source):
+    """Gender pronoun baseline (the bias_summary.txt numbers and their per-text arrays)"""
+    from src.analyze_bias import analyze, summarize, write_summary, write_baseline_metrics, baseline_arrays
+
+    analyzed = analyze(inputs[source])
+    summary = summarize(analyzed)
+    write_summary('results/bias_summary.txt', summary)
+    write_baseline_metrics(analyzed, summary)
+    return {'male': summary['total_male'], 'female': summary['total_female'], 'bias': summary['average_bias'],
+            'arrays': baseline_arrays(analyzed)}
+
+
+def mitigate_post_stage(inputs, source):
+    from src.mitigate_post_processing import apply_strategies, analyze_strategies
+    from src.mitigate_post_processing import write_strategy_outputs, write_analysis, write_post_metrics, post_arrays
+
+    all_strategy_results = apply_strategies(inputs[source], verbose=False)
+    strategy_analysis = analyze_strategies(all_strategy_results)
+    write_strategy_outputs(all_strategy_results)
+    write_analysis('results/mitigation_analysis_post_processing.txt', strategy_analysis)
+    write_post_metrics(all_strategy_results, strategy_analysis)
+    return {'strategies': strategy_analysis, 'arrays': post_arrays(all_strategy_results)}
+
+
+def mitigate_prompt_stage(inputs, prompts_path, prompts_hash):
+    from src.mitigate_prompt_engineering import load_generator, generate_strategy_outputs
+    from src.mitigate_prompt_engineering import analyze_strategies, write_strategy_outputs
+    from src.mitigate_prompt_engineering import write_comparison, write_prompt_metrics, prompt_arrays
+
+    with open(prompts_path, 'r', encoding='utf-8') as f:
+        original_prompts = [line.strip() for line in f if line.strip()]
+
+    baseline = {key: inputs['baseline'][key] for key in ('male', 'female', 'bias')}
+    all_strategy_results = generate_strategy_outputs(load_generator(), original_prompts)
+    strategy_analysis = analyze_strategies(all_strategy_results)
+    write_strategy_outputs(all_strategy_results)
+    write_comparison('results/mitigation_comparison_prompt_engineering.txt', baseline, strategy_analysis)
+    write_prompt_metrics(all_strategy_results, strategy_analysis, baseline)
+    return {'strategies': strategy_analysis, 'arrays': prompt_arrays(all_strategy_results)}
+
+
+def prompt_metrics_stage(inputs, name, content_hash, arrays_hash):
+    """Prompt engineering scores and per-text arrays from an earlier run's metrics (empty if there are none)"""
+    try:
+        strategies = load_metrics(name)['strategies']
+    except FileNotFoundError:
+        return {'strategies': {}, 'arrays': {}}
+    try:
+        arrays = load_arrays(name)
+    except FileNotFoundError:
+        arrays = {}
+    return {'strategies': strategies, 'arrays': arrays}
+
+
+def compare_stage(inputs):
+    from src.compare_all_methods import add_intervals, build_methods, method_arrays_from
+    from src.compare_all_methods import plot, write_summary, write_comparison_metrics
+
+    baseline, prompt, post = inputs['baseline'], inputs['mitigate_prompt'], inputs['mitigate_post']
+    prompt_scores = {name: a['average_bias'] for name, a in prompt['strategies'].items()}
+    post_scores = {name: a['bias_debiased'] for name, a in post['strategies'].items()}
+    methods = build_methods(baseline, prompt_scores, post_scores)
+    # Per-text arrays come with the upstream outputs, so they are covered by this stage's key
+    add_intervals(methods, method_arrays_from(baseline['arrays'], (prompt['strategies'], prompt['arrays']),
+                                              (post['strategies'], post['arrays'])))
+
+    with PLOT_LOCK:
+        plot(methods, baseline['bias'], 'results/mitigation_comparison_all_methods.png')
+    write_summary('results/final_mitigation_summary.txt', methods, baseline['bias'])
+    write_comparison_metrics(methods, baseline['bias'])
+    return methods
+
+
+# ---------------------------------------------------------------------------
+# DAG construction and execution
+# ---------------------------------------------------------------------------
+
+def build_stages(bias_types: List[str], generate: bool = False, prompt_mitigation: bool = False,
+                 guard_threshold: float = None, num_samples: int = 1) -> Dict[str, Stage]:
+    """Stages for a study over the given bias types (gender is always loaded for mitigation)"""
+    stages = {}
+
+    for btype in list(dict.fromkeys(bias_types + ['gender'])):
+        source = f'generate:{btype}' if generate else f'load:{btype}'
+        if generate:
+            stages[source] = Stage(source, generate_stage, config={
+                'bias_type': btype,
+                'prompts_hash': file_digest(prompts_file(btype)),
+                'guard_threshold': guard_threshold,
+                'num_samples': num_samples
+            }, modules=('generate_text', 'pipeline_io'))
+        else:
+            path = generated_file(btype)
+            stages[source] = Stage(source, load_stage, config={
+                'bias_type': btype, 'path': path, 'content_hash': file_digest(path)
+            }, modules=('pipeline_io',))
+
+        if btype not in bias_types:
+            continue
+        stages[f'analyze:{btype}'] = Stage(
+            f'analyze:{btype}', analyze_stage, deps=(source,),
+            config={'bias_type': btype, 'source': source},
+            modules=('analyze_bias_multi', 'bias_detector'))
+        stages[f'table:{btype}'] = Stage(
+            f'table:{btype}', table_stage, deps=(f'analyze:{btype}',),
+            config={'bias_type': btype, 'source': f'analyze:{btype}'},
+            modules=('create_bias_table_multi', 'subject_aggregates', 'quantile_sketch', 'pipeline_io'))
+        stages[f'visualize:{btype}'] = Stage(
+            f'visualize:{btype}', visualize_stage, deps=(f'table:{btype}',),
+            config={'bias_type': btype, 'source': f'table:{btype}'},
+            modules=('visualize_bias_multi',))
+
+    gender_source = 'generate:gender' if generate else 'load:gender'
+    stages['baseline'] = Stage('baseline', baseline_stage, deps=(gender_source,),
+                               config={'source': gender_source}, modules=('analyze_bias',))
+    stages['mitigate_post'] = Stage('mitigate_post', mitigate_post_stage, deps=(gender_source,),
+                                    config={'source': gender_source},
+                                    modules=('mitigate_post_processing', 'rewrite_engine'))
+    if prompt_mitigation:
+        gender_prompts = prompts_file('gender')
+        stages['mitigate_prompt'] = Stage('mitigate_prompt', mitigate_prompt_stage, deps=('baseline',),
+                                          config={'prompts_path': gender_prompts,
+                                                  'prompts_hash': file_digest(gender_prompts)},
+                                          modules=('mitigate_prompt_engineering',))
+    else:
+        # Without transformers, compare against the last prompt engineering run
+        stages['mitigate_prompt'] = Stage('mitigate_prompt', prompt_metrics_stage,
+                                          config={'name': 'mitigation_prompt_engineering',
+                                                  'content_hash': file_digest(
+                                                      metrics_path('mitigation_prompt_engineering')),
+                                                  'arrays_hash': file_digest(
+                                                      metrics_path('mitigation_prompt_engineering', 'npz'))},
+                                          modules=('pipeline_io',))
+    stages['compare'] = Stage('compare', compare_stage, deps=('baseline', 'mitigate_post', 'mitigate_prompt'),
+                              modules=('compare_all_methods',))
+    return stages
+
+
+def run_stages(stages: Dict[str, Stage], workers: int = 4, force: bool = False,
+               cache_dir: str = CACHE_DIR) -> Dict[str, dict]:
+    """
+    Execute the DAG, reusing cached outputs whose keys match
+
+    Returns:
+        {stage_name: {'output', 'status' ('cached' | 'ran' | 'failed' | 'blocked'), 'seconds'}}
+    """
+    for stage in stages.values():
+        for dep in stage.deps:
+            if dep not in stages:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    outputs = {}
+    digests = {}
+    report = {}
+    pending = dict(stages)
+    running = {}
+
+    def execute(stage, key):
+        start = time.perf_counter()
+        path = os.path.join(cache_dir, f"{stage.name.replace(':', '_')}-{key[:16]}.pkl")
+        if not force and os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = f.read()
+            return pickle.loads(data), hashlib.sha256(data).hexdigest(), 'cached', time.perf_counter() - start
+
+        inputs = {dep: outputs[dep] for dep in stage.deps}
+        output = stage.func(inputs, **stage.config)
+        data = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        return output, hashlib.sha256(data).hexdigest(), 'ran', time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            # Submit every stage whose inputs are all available
+            for name, stage in list(pending.items()):
+                if any(report.get(dep, {}).get('status') in ('failed', 'blocked') for dep in stage.deps):
+                    report[name] = {'output': None, 'status': 'blocked', 'seconds': 0.0}
+                    print(f"  [blocked] {name}")
+                    del pending[name]
+                elif all(dep in digests for dep in stage.deps):
+                    key = stage_key(stage, digests)
+                    running[executor.submit(execute, stage, key)] = name
+                    del pending[name]
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle among stages: {', '.join(sorted(pending))}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    output, digest, status, seconds = future.result()
+                except Exception as e:
+                    report[name] = {'output': None, 'status': 'failed', 'seconds': 0.0}
+                    print(f"  [failed]  {name}: {e}")
+                    continue
+                outputs[name] = output
+                digests[name] = digest
+                report[name] = {'output': output, 'status': status, 'seconds': seconds}
+                print(f"  [{status}]{' ' * (7 - len(status))} {name} ({seconds:.2f}s)")
+
+    return report
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    bias_types = args or ['gender']
+    for btype in bias_types:
+        if btype not in BIAS_TYPES + ['combined']:
+            print(f"ERROR: Unknown bias type '{btype}'")
+            return 1
+
+    stages = build_stages(
+        bias_types,
+        generate='generate' in options,
+        prompt_mitigation='prompt-mitigation' in options,
+        guard_threshold=float(options['guard']) if options.get('guard') else None,
+        num_samples=max(1, int(options.get('samples') or 1))
+    )
+
+    print("=" * 70)
+    print("BIAS PIPELINE")
+    print("=" * 70)
+    print(f"\nBias types: {', '.join(bias_types)}")
+    print(f"Stages: {len(stages)}\n")
+
+    start_time = time.perf_counter()
+    report = run_stages(stages, workers=int(options.get('workers') or 4),
+                        force='force' in options, cache_dir=options.get('cache-dir') or CACHE_DIR)
+    elapsed = time.perf_counter() - start_time
+
+    counts = {}
+    for entry in report.values():
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    print(f"\n✓ Pipeline finished in {elapsed:.2f}s "
+          f"({', '.join(f'{n} {s}' for s, n in sorted(counts.items()))})")
+    return 1 if counts.get('failed') or counts.get('blocked') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Shared file locations and readers for the pipeline stages
+
+Every stage reads the generated-output files written by generate_text.py
+("N. PROMPT: ..." / optional "SAMPLE: j" / "OUTPUT: ..." blocks). The
+encoding fallbacks and the parser live here so the stages (and the CLI) can
+load them in-process instead of each script re-implementing them.
+
+Stages also save their numbers as metrics artifacts (results/metrics/NAME.json,
+plus NAME.npz with per-text arrays) so later stages and comparisons load them
+directly instead of parsing the human-readable reports.
+"""
+
+import os
+import re
+import json
+from typing import Dict, Iterable, Iterator, List
+
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
+
+BIAS_TYPES = ['gender', 'age', 'socioeconomic', 'regional', 'sentiment']
+
+PROMPT_FILES = {
+    'gender': 'data/test_prompts.txt',
+    'age': 'data/test_prompts_age.txt',
+    'socioeconomic': 'data/test_prompts_socioeconomic.txt',
+    'regional': 'data/test_prompts_regional.txt',
+    'sentiment': 'data/test_prompts_sentiment.txt',
+    'combined': 'data/test_prompts_combined.txt'
+}
+
+
+METRICS_DIR = 'results/metrics'
+
+
+def prompts_file(bias_type: str) -> str:
+    """Prompt file for a bias type"""
+    if bias_type not in PROMPT_FILES:
+        raise ValueError(f"Unknown bias type '{bias_type}'. "
+                         f"Valid types: {', '.join(PROMPT_FILES)}")
+    return PROMPT_FILES[bias_type]
+
+
+def generated_file(bias_type: str) -> str:
+    """Generated-output file the analysis stages read for a bias type"""
+    if bias_type == 'gender':
+        return 'results/generated_outputs.txt'
+    if bias_type == 'combined':
+        return 'results/generated_outputs_multi_bias.txt'
+    return f'results/generated_outputs_{bias_type}.txt'
+
+
+def read_text(path: str) -> str:
+    """Read a text file, trying the encodings older result files were saved with"""
+    for encoding in ENCODINGS:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    raise UnicodeError(f"Could not read {path} with any encoding")
+
+
+def load_prompts(bias_type: str) -> List[str]:
+    """Non-empty prompt lines for a bias type"""
+    with open(prompts_file(bias_type), 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def iter_records(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+    Parse PROMPT/SAMPLE/OUTPUT blocks from lines into {'prompt', 'output', 'sample'} records
+
+    Templated prompts also carry an "ID:" line, kept as the record's 'id'.
+    Works on any line iterable, so a file can be parsed while it is read.
+    """
+    lines = iter(lines)
+    for line in lines:
+        line = line.strip()
+
+        if 'PROMPT:' in line.upper():
+            prompt = line.split('PROMPT:', 1)[1].strip() if ':' in line else ""
+
+            # Look for the OUTPUT on next line(s); multi-sample runs add a SAMPLE line
+            output = ""
+            sample = 1
+            prompt_id = None
+            for next_line in lines:
+                next_line = next_line.strip()
+                if next_line.upper().startswith('SAMPLE:'):
+                    sample = int(next_line.split(':', 1)[1].strip())
+                elif next_line.upper().startswith('ID:'):
+                    prompt_id = next_line.split(':', 1)[1].strip()
+                elif 'OUTPUT:' in next_line.upper():
+                    output = next_line.split('OUTPUT:', 1)[1].strip() if ':' in next_line else ""
+                    break
+
+            if prompt and output:
+                record = {'prompt': prompt, 'output': output, 'sample': sample}
+                if prompt_id:
+                    record['id'] = prompt_id
+                yield record
+
+
+def parse_generated(content: str) -> List[Dict]:
+    """Parse PROMPT/SAMPLE/OUTPUT blocks into {'prompt', 'output', 'sample'} records"""
+    return list(iter_records(content.split('\n')))
+
+
+def load_generated(path: str) -> List[Dict]:
+    """Read and parse a generated-output file"""
+    return parse_generated(read_text(path))
+
+
+def iter_generated(path: str, encoding: str = 'utf-8') -> Iterator[Dict]:
+    """Parse a generated-output file one record at a time (for files too big to load)"""
+    with open(path, 'r', encoding=encoding) as f:
+        yield from iter_records(f)
+
+
+def write_generated(path: str, bias_type: str, results: Iterable[Dict]) -> int:
+    """
+    Write generation records in the format parse_generated() reads
+
+    results may be a generator; records are written as they arrive.
+    Returns the number of records written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"BIAS DETECTION PROJECT - GENERATED TEXTS ({bias_type.upper()})\n")
+        f.write("=" * 70 + "\n\n")
+
+        for count, result in enumerate(results, 1):
+            f.write(f"{count}. PROMPT: {result['prompt']}\n")
+            if 'id' in result:
+                f.write(f"   ID: {result['id']}\n")
+            if 'sample' in result:
+                f.write(f"   SAMPLE: {result['sample']}\n")
+            f.write(f"   OUTPUT: {result['generated_text']}\n\n")
+    return count
+
+
+def metrics_path(name: str, ext: str = 'json', directory: str = METRICS_DIR) -> str:
+    return os.path.join(directory, f'{name}.{ext}')
+
+
+def write_metrics(name: str, metrics: Dict, arrays: Dict = None, directory: str = METRICS_DIR) -> str:
+    """
+    Save a stage's metrics as JSON, and per-text arrays as a compressed NPZ
+
+    Args:
+        name: Artifact name (results/metrics/{name}.json)
+        metrics: JSON-serializable summary numbers
+        arrays: Optional {key: sequence of numbers} saved to {name}.npz
+
+    Returns:
+        Path of the JSON file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = metrics_path(name, 'json', directory)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+    if arrays:
+        import numpy as np
+        np.savez_compressed(metrics_path(name, 'npz', directory),
+                            **{key: np.asarray(values) for key, values in arrays.items()})
+    return path
+
+
+def load_metrics(name: str, directory: str = METRICS_DIR) -> Dict:
+    """Load a metrics JSON written by write_metrics (FileNotFoundError if absent)"""
+    with open(metrics_path(name, 'json', directory), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_arrays(name: str, directory: str = METRICS_DIR) -> Dict:
+    """Load the per-text arrays written by write_metrics as {key: ndarray}"""
+    import numpy as np
+    with np.load(metrics_path(name, 'npz', directory)) as data:
+        return {key: data[key] for key in data.files}
+
+
+def strategy_slug(name: str) -> str:
+    """File-name form of a strategy name ('Replace with They/Them' -> 'replace_with_they_them')"""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
@@ -0,0 +1,245 @@
+"""
+Streaming Quantile Sketch (KLL)
+
+Percentiles of bias scores normally need every score in memory. A KLL sketch
+keeps a small hierarchy of sorted buffers ("compactors"): when a buffer fills
+up, it is sorted and every other item is promoted to the next level with
+twice the weight. Memory stays at a few hundred items however many scores
+are added, and the rank error is about 1/k of the count.
+
+Sketches merge by concatenating their levels and compacting again, so
+per-shard sketches (see src/subject_aggregates.py) combine into a sketch of
+the whole corpus. Compaction alternates which half it keeps instead of
+flipping a coin, so the same inputs always give the same sketch.
+
+Usage:
+    python src/quantile_sketch.py [--n=1000000] [--k=200]    # accuracy and memory check
+"""
+
+import bisect
+import math
+import random
+import sys
+import os
+import time
+from typing import Dict, Iterable, List, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Percentiles shown in reports, and the score thresholds for tail fractions
+REPORT_QUANTILES = (0.5, 0.9, 0.99)
+TAIL_THRESHOLD = 0.5
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch of a stream of floats"""
+
+    def __init__(self, k: int = 200, c: float = 2 / 3):
+        """
+        Initialize the sketch
+
+        Args:
+            k: Capacity of the top level (accuracy ~ 1/k, memory ~ 3k items)
+            c: Capacity ratio between consecutive levels
+        """
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.compactors = [[]]
+        self._flips = [False]
+        self._size = 0
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self._flips.append(False)
+        self._max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, value: float):
+        """Add one value"""
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.compactors[0].append(value)
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.update(value)
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) >= self._capacity(level):
+                if level + 1 >= len(self.compactors):
+                    self._grow()
+                compactor.sort()
+                # Odd-length buffers keep their largest item at this level
+                keep = compactor.pop() if len(compactor) % 2 else None
+                offset = int(self._flips[level])
+                self._flips[level] = not self._flips[level]
+                self.compactors[level + 1].extend(compactor[offset::2])
+                compactor.clear()
+                if keep is not None:
+                    compactor.append(keep)
+                self._size = sum(len(c) for c in self.compactors)
+                if self._size < self._max_size:
+                    break
+
+    def update_sketch(self, other: 'KLLSketch') -> 'KLLSketch':
+        """Merge other into this sketch in place"""
+        if other.n == 0:
+            return self
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self._size = sum(len(c) for c in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        """New sketch combining this one and other"""
+        return KLLSketch(self.k, self.c).update_sketch(self).update_sketch(other)
+
+    def _weighted(self) -> Tuple[List[float], List[int]]:
+        """Sorted items and their cumulative weights"""
+        pairs = sorted((item, 2 ** level) for level, items in enumerate(self.compactors) for item in items)
+        values, cumulative, total = [], [], 0
+        for value, weight in pairs:
+            total += weight
+            values.append(value)
+            cumulative.append(total)
+        return values, cumulative
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (0 <= q <= 1); 0.0 for an empty sketch"""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: Iterable[float]) -> List[float]:
+        values, cumulative = self._weighted()
+        if not values:
+            return [0.0 for _ in qs]
+        total = cumulative[-1]
+        result = []
+        for q in qs:
+            if q <= 0:
+                result.append(self.min)
+            elif q >= 1:
+                result.append(self.max)
+            else:
+                result.append(values[min(bisect.bisect_left(cumulative, q * total), len(values) - 1)])
+        return result
+
+    def rank(self, value: float) -> float:
+        """Approximate fraction of values <= value"""
+        values, cumulative = self._weighted()
+        if not values:
+            return 0.0
+        position = bisect.bisect_right(values, value)
+        return cumulative[position - 1] / cumulative[-1] if position else 0.0
+
+    def fraction_above(self, threshold: float) -> float:
+        """Approximate fraction of values > threshold"""
+        return 1.0 - self.rank(threshold) if self.n else 0.0
+
+    def fraction_below(self, threshold: float) -> float:
+        """Approximate fraction of values < threshold"""
+        values, cumulative = self._weighted()
+        if not values:
+            return 0.0
+        position = bisect.bisect_left(values, threshold)
+        return cumulative[position - 1] / cumulative[-1] if position else 0.0
+
+    def summary(self) -> Dict:
+        """p50/p90/p99 and the tail fractions shown in reports"""
+        p50, p90, p99 = self.quantiles(REPORT_QUANTILES)
+        return {
+            'p50': p50, 'p90': p90, 'p99': p99,
+            'above': self.fraction_above(TAIL_THRESHOLD),
+            'below': self.fraction_below(-TAIL_THRESHOLD)
+        }
+
+    def __len__(self) -> int:
+        """Items retained (the memory footprint), not the number of values added"""
+        return self._size
+
+    def to_dict(self) -> Dict:
+        return {'k': self.k, 'c': self.c, 'n': self.n, 'min': self.min, 'max': self.max,
+                'compactors': self.compactors, 'flips': self._flips}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'KLLSketch':
+        sketch = cls(data['k'], data['c'])
+        sketch.n = data['n']
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.compactors = [list(items) for items in data['compactors']]
+        sketch._flips = list(data['flips'])
+        sketch._size = sum(len(c) for c in sketch.compactors)
+        sketch._max_size = sum(sketch._capacity(level) for level in range(len(sketch.compactors)))
+        return sketch
+
+
+def check(n: int = 1000000, k: int = 200, shards: int = 8, seed: int = 0):
+    """Compare sketch quantiles with exact ones on a skewed synthetic score stream"""
+    rng = random.Random(seed)
+    # Bias-score-like data: a spike at 0, clipped tails, a few exact +/-1
+    scores = [max(-1.0, min(1.0, rng.gauss(0.1, 0.35))) if rng.random() < 0.7
+              else rng.choice([0.0, 0.0, 1.0, -1.0]) for _ in range(n)]
+
+    start = time.perf_counter()
+    sketch = KLLSketch(k)
+    sketch.extend(scores)
+    elapsed = time.perf_counter() - start
+
+    parts = [KLLSketch(k) for _ in range(shards)]
+    for i, score in enumerate(scores):
+        parts[i % shards].update(score)
+    merged = KLLSketch(k)
+    for part in parts:
+        merged.update_sketch(part)
+
+    exact = sorted(scores)
+    print("=" * 70)
+    print(f"KLL SKETCH CHECK ({n:,} scores, k={k})")
+    print("=" * 70)
+    print(f"Update: {elapsed:.2f}s ({n / elapsed:,.0f} values/s); retained {len(sketch)} items "
+          f"(merged from {shards} shards: {len(merged)})")
+    print(f"\n{'Quantile':<10} {'Exact':>8} {'Sketch':>8} {'Merged':>8} {'Rank error':>11}")
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        true = exact[min(int(q * n), n - 1)]
+        estimate = sketch.quantile(q)
+        # Ties (the spikes at 0 and +/-1) span a rank range; q anywhere in it is exact
+        low, high = bisect.bisect_left(exact, estimate) / n, bisect.bisect_right(exact, estimate) / n
+        rank_error = max(low - q, q - high, 0.0)
+        print(f"{q:<10} {true:>+8.3f} {estimate:>+8.3f} {merged.quantile(q):>+8.3f} {rank_error:>11.4f}")
+    true_above = sum(1 for s in scores if s > TAIL_THRESHOLD) / n
+    print(f"\nP(score > {TAIL_THRESHOLD}): exact {true_above:.4f}, sketch {sketch.fraction_above(TAIL_THRESHOLD):.4f}, "
+          f"merged {merged.fraction_above(TAIL_THRESHOLD):.4f}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+    check(int(options.get('n') or 1000000), int(options.get('k') or 200))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Persistent Analysis History for the Streamlit Apps
+
+Every analysis in app_multi_bias.py is appended to a small SQLite database
+instead of a list in st.session_state, so the history survives reruns,
+browser reloads and restarts.
+
+Entries belong to an owner: the app passes a random per-visitor token kept
+in the page URL (?history=...), and count(), page() and get() only see that
+owner's entries. One user's prompts are therefore never listed to another;
+sharing the URL is the explicit way to share a history. owner=None (the
+command line's default) reads every entry.
+
+Pages are read with LIMIT/OFFSET and only carry the prompt and the bias
+scores; the full record (generated text, every sample's detection results,
+guard statistics) is loaded by get() when one entry is opened.
+
+Streamlit runs each session's script in its own thread, so every thread
+gets its own connection. WAL mode lets readers page through the history
+while another session is writing.
+
+Usage:
+    python src/results_history.py [--path=results/history.sqlite] [--owner=TOKEN] [--page=1] [--per-page=20]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HISTORY_PATH = 'results/history.sqlite'
+PER_PAGE = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    owner TEXT NOT NULL DEFAULT '',
+    prompt TEXT NOT NULL,
+    bias_types TEXT NOT NULL,
+    scores TEXT NOT NULL,
+    record TEXT NOT NULL
+)
+"""
+OWNER_INDEX = "CREATE INDEX IF NOT EXISTS history_owner ON history (owner, id)"
+
+
+class ResultsHistory:
+    """Append-only analysis history in a SQLite file, safe to share between threads"""
+
+    def __init__(self, path: str = HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(SCHEMA)
+            # Histories written before entries had owners
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(history)')]
+            if 'owner' not in columns:
+                connection.execute("ALTER TABLE history ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+            connection.execute(OWNER_INDEX)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def add(self, record: Dict, owner: str = '') -> int:
+        """
+        Store one analysis
+
+        Args:
+            record: {'prompt', 'bias_results': {bias_type: detect() result}, ...};
+                    the whole dict must be JSON serializable
+            owner: Whose history the entry belongs to
+
+        Returns:
+            The new entry's id
+        """
+        scores = {bias_type: result['bias_score'] for bias_type, result in record['bias_results'].items()}
+        with self._connection() as connection:
+            cursor = connection.execute(
+                'INSERT INTO history (created, owner, prompt, bias_types, scores, record) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (time.time(), owner, record['prompt'], ','.join(scores), json.dumps(scores), json.dumps(record)))
+        return cursor.lastrowid
+
+    @staticmethod
+    def _where(owner: Optional[str], condition: str = '') -> tuple:
+        """WHERE clause and parameters limiting a query to one owner (None = every owner)"""
+        conditions = [condition] if condition else []
+        params = []
+        if owner is not None:
+            conditions.append('owner = ?')
+            params.append(owner)
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def count(self, owner: str = None) -> int:
+        where, params = self._where(owner)
+        return self._connection().execute(f'SELECT COUNT(*) FROM history{where}', params).fetchone()[0]
+
+    def pages(self, per_page: int = PER_PAGE, owner: str = None) -> int:
+        """Number of pages (at least 1, so an empty history still has a page to show)"""
+        return max(1, -(-self.count(owner) // per_page))
+
+    def page(self, page: int = 1, per_page: int = PER_PAGE, owner: str = None) -> List[Dict]:
+        """
+        One page of an owner's entries, newest first, without their full records
+
+        Returns:
+            [{'id', 'created', 'prompt', 'scores': {bias_type: score}}, ...]
+        """
+        where, params = self._where(owner)
+        rows = self._connection().execute(
+            f'SELECT id, created, prompt, scores FROM history{where} ORDER BY id DESC LIMIT ? OFFSET ?',
+            params + [per_page, (max(page, 1) - 1) * per_page]).fetchall()
+        return [{'id': row[0], 'created': row[1], 'prompt': row[2], 'scores': json.loads(row[3])}
+                for row in rows]
+
+    def get(self, entry_id: int, owner: str = None) -> Optional[Dict]:
+        """The full record stored by add(), or None for an unknown id or another owner's entry"""
+        where, params = self._where(owner, 'id = ?')
+        row = self._connection().execute(f'SELECT record FROM history{where}', [entry_id] + params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear(self, owner: str = None):
+        where, params = self._where(owner)
+        with self._connection() as connection:
+            connection.execute(f'DELETE FROM history{where}', params)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    path = options.get('path') or HISTORY_PATH
+    if not os.path.exists(path):
+        print(f"No history at {path} yet. Analyses from app_multi_bias.py are stored there.")
+        return 0
+    history = ResultsHistory(path)
+    owner = options.get('owner')
+    page = int(options.get('page') or 1)
+    per_page = int(options.get('per-page') or PER_PAGE)
+    print(f"{history.count(owner)} analyses in {path} (page {page} of {history.pages(per_page, owner)})")
+    for entry in history.page(page, per_page, owner):
+        created = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['created']))
+        scores = ", ".join(f"{bias_type}: {score:+.2f}" for bias_type, score in entry['scores'].items())
+        print(f"  #{entry['id']:<5} {created}  {entry['prompt'][:50]:<50}  {scores}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+Single-Pass Rewrite Engine for Post-Processing Mitigation
+
+Compiles a word/phrase mapping into one alternation regex with a dictionary
+lookup callback, so a text is rewritten in a single pass instead of one
+re.sub call per pronoun. The case of each matched word is carried over to
+its replacement ("He" -> "They", "HIS" -> "THEIR").
+
+The gender debiasing strategies are plain mapping tables on top of the engine.
+When built with word categories (e.g. male/female pronouns) the engine also
+reports the per-category count deltas it applied, so debiased counts can be
+derived from the original counts without scanning the rewritten text again.
+"""
+
+import re
+import sys
+import os
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import GenderBiasDetector
+
+# Separator used to rewrite a whole corpus in one regex pass; it is a non-word
+# character, so word boundaries at text edges are unchanged
+_CORPUS_SEPARATOR = '\x00'
+
+
+def _normalize(phrase: str) -> str:
+    """Lowercase and collapse whitespace so multi-word matches find their key"""
+    return ' '.join(phrase.lower().split())
+
+
+def match_case(source: str, replacement: str) -> str:
+    """Give the replacement the capitalization pattern of the matched text"""
+    if len(source) > 1 and source.isupper():
+        return replacement.upper()
+    if source[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+def _trie_regex(trie: Dict) -> str:
+    """Regex for a character trie; the end marker '' makes the rest optional"""
+    branches = []
+    for char in sorted(k for k in trie if k):
+        token = r'\s+' if char == ' ' else re.escape(char)
+        branches.append(token + _trie_regex(trie[char]))
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in trie:
+        # Greedy optional: the longer key is tried first, as in a longest-first alternation
+        return '(?:' + body + ')?' if len(branches) == 1 else body + '?'
+    return body
+
+
+def _compile(keys) -> re.Pattern:
+    """
+    One case-insensitive pattern over words/phrases, longest match first
+
+    Keys are merged into a prefix trie, so the regex follows a single branch
+    per character instead of trying every key in turn, and matching cost stays
+    flat as tables grow.
+    """
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in ' '.join(key.lower().split()):
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return re.compile(r'\b(?:' + _trie_regex(trie) + r')\b', re.IGNORECASE)
+
+
+class RewriteEngine:
+    """Rewrite every mapped word or phrase in one case-insensitive pass"""
+
+    def __init__(self, mapping: Dict[str, str], categories: Dict[str, str] = None):
+        """
+        Compile a rewrite table
+
+        Args:
+            mapping: Lowercase word or phrase -> replacement (phrases may span
+                     any whitespace in the text)
+            categories: Optional word -> category (e.g. 'he' -> 'male') used to
+                        report count deltas and count original texts
+        """
+        self.mapping = {_normalize(k): v for k, v in mapping.items()}
+        self.pattern = _compile(self.mapping)
+        self.categories = {_normalize(k): v for k, v in (categories or {}).items()}
+        self.category_pattern = _compile(self.categories) if self.categories else None
+
+        # Net category change of every rewrite, computed once up front
+        self.deltas = {}
+        for key, replacement in self.mapping.items():
+            delta = defaultdict(int)
+            if key in self.categories:
+                delta[self.categories[key]] -= 1
+            for word in re.findall(r"[\w']+", replacement.lower()):
+                if word in self.categories:
+                    delta[self.categories[word]] += 1
+            self.deltas[key] = {c: d for c, d in delta.items() if d}
+
+    def _replace(self, match) -> str:
+        word = match.group(0)
+        return match_case(word, self.mapping[_normalize(word)])
+
+    def rewrite(self, text: str) -> str:
+        """Rewrite a single text"""
+        return self.pattern.sub(self._replace, text)
+
+    def rewrite_corpus(self, texts: List[str]) -> List[str]:
+        """Rewrite many texts with a single regex pass over the joined corpus"""
+        texts = list(texts)
+        if not texts:
+            return []
+        if any(_CORPUS_SEPARATOR in t for t in texts):
+            return [self.rewrite(t) for t in texts]
+        return self.rewrite(_CORPUS_SEPARATOR.join(texts)).split(_CORPUS_SEPARATOR)
+
+    def rewrite_with_deltas(self, text: str) -> Tuple[str, Dict[str, int]]:
+        """Rewrite a text and return the per-category count changes applied"""
+        texts, deltas = self.rewrite_corpus_with_deltas([text])
+        return texts[0], deltas[0]
+
+    def rewrite_corpus_with_deltas(self, texts: List[str]) -> Tuple[List[str], List[Dict[str, int]]]:
+        """
+        Rewrite a corpus in one pass, also returning each text's category deltas
+
+        Debiased counts are then original counts + deltas; no rescan needed.
+        """
+        texts = list(texts)
+        if not texts:
+            return [], []
+        if any(_CORPUS_SEPARATOR in t for t in texts):
+            pairs = [self.rewrite_corpus_with_deltas([t]) for t in texts]
+            return [p[0][0] for p in pairs], [p[1][0] for p in pairs]
+
+        starts = []
+        position = 0
+        for t in texts:
+            starts.append(position)
+            position += len(t) + 1
+        deltas = [defaultdict(int) for _ in texts]
+
+        def replace(match):
+            word = match.group(0)
+            key = _normalize(word)
+            text_deltas = deltas[bisect_right(starts, match.start()) - 1]
+            for category, change in self.deltas[key].items():
+                text_deltas[category] += change
+            return match_case(word, self.mapping[key])
+
+        joined = self.pattern.sub(replace, _CORPUS_SEPARATOR.join(texts))
+        return joined.split(_CORPUS_SEPARATOR), [dict(d) for d in deltas]
+
+    def count_categories(self, text: str) -> Dict[str, int]:
+        """Count category words in a text with a single regex pass"""
+        counts = {category: 0 for category in set(self.categories.values())}
+        if self.category_pattern is None:
+            return counts
+        for match in self.category_pattern.finditer(text):
+            counts[self.categories[_normalize(match.group(0))]] += 1
+        return counts
+
+
+class StreamingRewriter:
+    """
+    Rewrite a token stream incrementally with a RewriteEngine
+
+    Chunks may split words anywhere. Only the trailing whitespace-delimited
+    run(s) that a match could still extend into are held back (one partial
+    word for single-word tables, one more per extra word of the longest
+    phrase), so the concatenated output always equals engine.rewrite() of the
+    concatenated input.
+    """
+
+    def __init__(self, engine: RewriteEngine):
+        self.engine = engine
+        self.max_words = max((len(k.split()) for k in engine.mapping), default=1)
+        self.buffer = ''
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the rewritten text that is now final"""
+        self.buffer += chunk
+        runs = [m.start() for m in re.finditer(r'\S+', self.buffer)]
+        complete = len(runs) if self.buffer[-1:].isspace() else len(runs) - 1
+        # Matches starting in runs before `decided` can no longer change
+        decided = complete - self.max_words + 1
+        if decided <= 0:
+            return ''
+        boundary = runs[decided] if decided < len(runs) else len(self.buffer)
+
+        output = []
+        position = 0
+        for match in self.engine.pattern.finditer(self.buffer):
+            if match.start() >= boundary:
+                break
+            output.append(self.buffer[position:match.start()])
+            output.append(self.engine._replace(match))
+            position = match.end()
+        if position < boundary:
+            output.append(self.buffer[position:boundary])
+            position = boundary
+        self.buffer = self.buffer[position:]
+        return ''.join(output)
+
+    def flush(self) -> str:
+        """Rewrite and return whatever is still held back"""
+        text = self.engine.rewrite(self.buffer)
+        self.buffer = ''
+        return text
+
+
+class AlternatingEngine:
+    """Rewrite even-indexed texts with one engine and odd-indexed texts with another"""
+
+    def __init__(self, even: RewriteEngine, odd: RewriteEngine):
+        self.even = even
+        self.odd = odd
+
+    def rewrite_corpus(self, texts: List[str]) -> List[str]:
+        texts = list(texts)
+        rewritten = list(texts)
+        rewritten[0::2] = self.even.rewrite_corpus(texts[0::2])
+        rewritten[1::2] = self.odd.rewrite_corpus(texts[1::2])
+        return rewritten
+
+    def rewrite_corpus_with_deltas(self, texts: List[str]) -> Tuple[List[str], List[Dict[str, int]]]:
+        texts = list(texts)
+        rewritten = list(texts)
+        deltas = [{} for _ in texts]
+        rewritten[0::2], deltas[0::2] = self.even.rewrite_corpus_with_deltas(texts[0::2])
+        rewritten[1::2], deltas[1::2] = self.odd.rewrite_corpus_with_deltas(texts[1::2])
+        return rewritten, deltas
+
+
+# Pronoun categories shared with the gender detector
+PRONOUN_CATEGORIES = {p: 'male' for p in GenderBiasDetector.MALE_PRONOUNS}
+PRONOUN_CATEGORIES.update({p: 'female' for p in GenderBiasDetector.FEMALE_PRONOUNS})
+
+# Strategy mapping tables
+THEY_THEM_TABLE = {
+    'he': 'they', 'she': 'they',
+    'him': 'them', 'her': 'them',
+    'his': 'their', 'hers': 'theirs',
+    'himself': 'themselves', 'herself': 'themselves'
+}
+
+REMOVE_PRONOUNS_TABLE = {
+    'he': 'the person', 'she': 'the person',
+    'him': 'them', 'her': 'them',
+    'his': 'their', 'hers': 'theirs'
+}
+
+# Alternating strategy: even-indexed texts keep male pronouns, odd keep female
+TO_MALE_TABLE = {'she': 'he', 'her': 'his', 'hers': 'his', 'herself': 'himself'}
+TO_FEMALE_TABLE = {'he': 'she', 'him': 'her', 'his': 'her', 'himself': 'herself'}
+
+THEY_THEM = RewriteEngine(THEY_THEM_TABLE, PRONOUN_CATEGORIES)
+REMOVE_PRONOUNS = RewriteEngine(REMOVE_PRONOUNS_TABLE, PRONOUN_CATEGORIES)
+TO_MALE = RewriteEngine(TO_MALE_TABLE, PRONOUN_CATEGORIES)
+TO_FEMALE = RewriteEngine(TO_FEMALE_TABLE, PRONOUN_CATEGORIES)
+ALTERNATING = AlternatingEngine(TO_MALE, TO_FEMALE)
+
+
+def debias_replace_they(text: str) -> str:
+    """Replace all gendered pronouns with 'they/them/their'"""
+    return THEY_THEM.rewrite(text)
+
+
+def debias_remove_pronouns(text: str) -> str:
+    """Replace subject pronouns with 'the person' and the rest with they/them forms"""
+    return REMOVE_PRONOUNS.rewrite(text)
+
+
+def debias_alternating(text: str, index: int) -> str:
+    """Alternate between using 'he' and 'she' to balance"""
+    return (TO_MALE if index % 2 == 0 else TO_FEMALE).rewrite(text)
+
+
+def debias_alternating_corpus(texts: List[str]) -> List[str]:
+    """Alternating strategy for a whole corpus (text index decides the direction)"""
+    return ALTERNATING.rewrite_corpus(texts)
+
+
+def debias_stream(chunks: Iterable[str], engine: RewriteEngine = THEY_THEM) -> Iterator[str]:
+    """Rewrite a token stream on the fly, yielding text as soon as it is final"""
+    rewriter = StreamingRewriter(engine)
+    for chunk in chunks:
+        text = rewriter.feed(chunk)
+        if text:
+            yield text
+    text = rewriter.flush()
+    if text:
+        yield text
+
+
+if __name__ == "__main__":
+    sample = "He said his sister would call him. She told HER boss herself."
+
+    print("=" * 70)
+    print("REWRITE ENGINE TEST")
+    print("=" * 70)
+    print(f"\nOriginal:        {sample}")
+    print(f"They/Them:       {debias_replace_they(sample)}")
+    print(f"Remove pronouns: {debias_remove_pronouns(sample)}")
+    print(f"Alternating (0): {debias_alternating(sample, 0)}")
+    print(f"Alternating (1): {debias_alternating(sample, 1)}")
+    print(f"\nCorpus: {THEY_THEM.rewrite_corpus([sample, 'she left.', 'He stayed.'])}")
+
+    counts = THEY_THEM.count_categories(sample)
+    rewritten, deltas = TO_MALE.rewrite_with_deltas(sample)
+    print(f"\nOriginal counts: {counts}")
+    print(f"To-male deltas:  {deltas}")
+
+    tokens = [sample[i:i + 3] for i in range(0, len(sample), 3)]
+    print(f"\nStreamed:        {'|'.join(debias_stream(tokens))}")
@@ -0,0 +1,285 @@
+"""
+Sequential-Sampling Bias Estimator
+
+Instead of drawing a fixed number of completions for every prompt, keep a
+running mean and confidence interval of each prompt's bias score and stop
+sampling a prompt once the interval is narrower than a target width. The
+remaining budget goes to the prompts whose scores vary the most, so the same
+statistical precision costs far fewer API calls.
+"""
+
+import math
+import random
+import sys
+import os
+from typing import Callable, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import MultiBiasDetector
+
+Z_SCORES = {0.90: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+# Two-sided Student t critical values by degrees of freedom; a df between
+# listed rows uses the next smaller one (a slightly wider interval), and df
+# above 30 uses the normal value
+T_SCORES = {
+    0.90: {1: 6.314, 2: 2.920, 3: 2.353, 4: 2.132, 5: 2.015, 6: 1.943, 7: 1.895, 8: 1.860,
+           9: 1.833, 10: 1.812, 12: 1.782, 15: 1.753, 20: 1.725, 25: 1.708, 30: 1.697},
+    0.95: {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306,
+           9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042},
+    0.99: {1: 63.657, 2: 9.925, 3: 5.841, 4: 4.604, 5: 4.032, 6: 3.707, 7: 3.499, 8: 3.355,
+           9: 3.250, 10: 3.169, 12: 3.055, 15: 2.947, 20: 2.845, 25: 2.787, 30: 2.750}
+}
+
+# Why a prompt stopped being sampled
+STOP_REASONS = {
+    'converged': 'converged (CI narrower than target)',
+    'max_samples': 'max samples reached',
+    'repeated': 'repeated completion',
+    'budget': 'budget exhausted'
+}
+
+
+def t_critical(df: int, confidence: float = 0.95) -> float:
+    """Two-sided t critical value for df degrees of freedom"""
+    table = T_SCORES.get(confidence, T_SCORES[0.95])
+    if df > 30:
+        return Z_SCORES.get(confidence, 1.96)
+    return table[max(d for d in table if d <= df)]
+
+
+def t_interval(mean: float, variance: float, n: int, confidence: float = 0.95) -> tuple:
+    """
+    Student t interval for a mean bias score from its sample variance
+
+    The width follows the observed spread: identical scores give a zero-width
+    interval, noisy ones a wide one. Fewer than two samples carry no spread
+    estimate, so the interval is the whole score range [-1, 1].
+    """
+    if n < 2:
+        return -1.0, 1.0
+    half = t_critical(n - 1, confidence) * math.sqrt(variance / n)
+    return max(-1.0, mean - half), min(1.0, mean + half)
+
+
+def bootstrap_interval(scores: List[float], confidence: float = 0.95,
+                       resamples: int = 1000, rng: random.Random = None) -> tuple:
+    """Percentile bootstrap interval for the mean of a small score sample"""
+    if not scores:
+        return -1.0, 1.0
+    rng = rng or random.Random(0)
+    n = len(scores)
+    means = sorted(sum(rng.choices(scores, k=n)) / n for _ in range(resamples))
+    alpha = (1 - confidence) / 2
+    return means[int(alpha * (resamples - 1))], means[int((1 - alpha) * (resamples - 1))]
+
+
+class RunningScore:
+    """Running mean/variance (Welford) of one prompt's scores for one bias type"""
+
+    def __init__(self):
+        self.scores = []
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, score: float):
+        self.scores.append(score)
+        delta = score - self.mean
+        self.mean += delta / len(self.scores)
+        self._m2 += delta * (score - self.mean)
+
+    @property
+    def n(self) -> int:
+        return len(self.scores)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+
+class PromptEstimate:
+    """Sampling state of one prompt across all tracked bias types"""
+
+    def __init__(self, prompt: str, bias_types: List[str]):
+        self.prompt = prompt
+        self.samples = []
+        self.stats = {btype: RunningScore() for btype in bias_types}
+        self.intervals = {btype: (-1.0, 1.0) for btype in bias_types}
+        self.stop_reason = None
+        self.duplicates = None
+
+    @property
+    def n(self) -> int:
+        return len(self.samples)
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_reason is not None
+
+    @property
+    def converged(self) -> bool:
+        """True only if the interval reached the target width"""
+        return self.stop_reason == 'converged'
+
+    @property
+    def repeated(self) -> bool:
+        return self.stop_reason == 'repeated'
+
+    def width(self) -> float:
+        """Widest confidence interval among the tracked bias types"""
+        return max(high - low for low, high in self.intervals.values())
+
+    def variance(self) -> float:
+        """Largest score variance among the tracked bias types"""
+        return max(stat.variance for stat in self.stats.values())
+
+
+class SequentialSampler:
+    """Draw completions until every prompt's bias score is known to a target precision"""
+
+    def __init__(self, bias_types: List[str] = None, target_width: float = 0.2,
+                 confidence: float = 0.95, min_samples: int = 3, max_samples: int = 20,
+                 budget: int = None, interval: str = 'bootstrap', seed: int = 0,
+                 duplicate_threshold: float = None, duplicate_patience: int = 3):
+        """
+        Initialize the sampler
+
+        Args:
+            bias_types: Bias types to estimate (None = all types)
+            target_width: Stop a prompt once its CI is narrower than this
+            confidence: Confidence level of the interval (0.90, 0.95 or 0.99)
+            min_samples: Samples drawn for every prompt before stopping is allowed
+            max_samples: Hard cap on samples per prompt
+            budget: Total generation calls allowed (None = prompts * max_samples)
+            interval: 'bootstrap' or 't' (Student t from the running variance)
+            duplicate_threshold: If set, a sample that is a near-duplicate (MinHash
+                                 similarity >= this) of an earlier sample of the same
+                                 prompt with the same detector keywords reuses its
+                                 detection results
+            duplicate_patience: Stop sampling a prompt once this many samples are all
+                                near-duplicates of one text (it keeps returning the
+                                same completion, so more calls add nothing)
+        """
+        if interval not in ('bootstrap', 't'):
+            raise ValueError(f"Unknown interval method: {interval}")
+        self.detector = MultiBiasDetector(bias_types)
+        self.bias_types = list(self.detector.detectors.keys())
+        self.target_width = target_width
+        self.confidence = confidence
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.budget = budget
+        self.interval = interval
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.duplicate_threshold = duplicate_threshold
+        self.duplicate_patience = duplicate_patience
+        self.reused = 0
+
+    def _update(self, estimate: PromptEstimate, text: str):
+        match = None
+        if self.duplicate_threshold is not None:
+            if estimate.duplicates is None:
+                from src.near_duplicates import NearDuplicateIndex
+                estimate.duplicates = NearDuplicateIndex(self.duplicate_threshold)
+            match = estimate.duplicates.find_or_add(estimate.n, text,
+                                                    fingerprint=self.detector.keyword_fingerprint(text))
+
+        if match is not None:
+            results = estimate.samples[match[0]]['bias_results']
+            self.reused += 1
+        else:
+            results = self.detector.detect_all(text)
+        estimate.samples.append({'generated_text': text, 'bias_results': results})
+        for btype, stat in estimate.stats.items():
+            stat.add(results[btype]['bias_score'])
+            if self.interval == 't':
+                estimate.intervals[btype] = t_interval(stat.mean, stat.variance, stat.n, self.confidence)
+            else:
+                estimate.intervals[btype] = bootstrap_interval(stat.scores, self.confidence, rng=self.rng)
+
+        if estimate.n >= self.min_samples and estimate.width() <= self.target_width:
+            estimate.stop_reason = 'converged'
+        elif estimate.n >= self.max_samples:
+            estimate.stop_reason = 'max_samples'
+        elif (estimate.duplicates is not None and len(estimate.duplicates) == 1
+              and estimate.n >= self.duplicate_patience):
+            estimate.stop_reason = 'repeated'
+
+    def _draw(self, estimate: PromptEstimate, generate_fn: Callable[[str], str]) -> bool:
+        self.calls += 1
+        try:
+            text = generate_fn(estimate.prompt)
+        except Exception as e:
+            print(f"   ERROR: {e}")
+            return False
+        self._update(estimate, text)
+        return True
+
+    def run(self, prompts: List[str], generate_fn: Callable[[str], str],
+            progress: Callable[[PromptEstimate], None] = None) -> List[PromptEstimate]:
+        """
+        Sample prompts until converged or out of budget
+
+        Args:
+            prompts: Prompts to estimate
+            generate_fn: Returns one generated text for a prompt
+            progress: Optional callback after every accepted sample
+        """
+        estimates = [PromptEstimate(p, self.bias_types) for p in prompts]
+        budget = self.budget if self.budget is not None else len(prompts) * self.max_samples
+
+        # Warm-up: every prompt gets min_samples draws
+        for estimate in estimates:
+            while estimate.n < self.min_samples and not estimate.stopped and self.calls < budget:
+                if self._draw(estimate, generate_fn) and progress:
+                    progress(estimate)
+
+        # Spend the rest of the budget on the noisiest unconverged prompts
+        while self.calls < budget:
+            open_estimates = [e for e in estimates if not e.stopped]
+            if not open_estimates:
+                break
+            estimate = max(open_estimates, key=lambda e: (e.variance(), e.width()))
+            if self._draw(estimate, generate_fn) and progress:
+                progress(estimate)
+
+        for estimate in estimates:
+            if not estimate.stopped:
+                estimate.stop_reason = 'budget'
+        return estimates
+
+
+if __name__ == "__main__":
+    # Simulate a generator where some prompts are far noisier than others
+    rng = random.Random(42)
+    canned = {
+        "The doctor said": ["The doctor said he would help.", "The doctor said they would help."],
+        "The nurse said": ["The nurse said she would help."],
+        "The teacher said": ["The teacher said the class was ready."]
+    }
+
+    sampler = SequentialSampler(['gender'], target_width=0.3, max_samples=30)
+    estimates = sampler.run(list(canned), lambda p: rng.choice(canned[p]))
+
+    print("=" * 70)
+    print("SEQUENTIAL SAMPLING TEST")
+    print("=" * 70)
+    for e in estimates:
+        low, high = e.intervals['gender']
+        print(f"\n{e.prompt}")
+        print(f"  Samples: {e.n} | Mean: {e.stats['gender'].mean:+.3f} | CI: [{low:+.3f}, {high:+.3f}] "
+              f"| Stopped: {STOP_REASONS[e.stop_reason]}")
+    fixed = len(canned) * sampler.max_samples
+    print(f"\nAPI calls: {sampler.calls} (fixed design: {fixed})")
+
+    # t intervals follow the observed spread: constant prompts stop after
+    # min_samples, noisy ones keep sampling
+    for threshold in (None, 0.8):
+        rng = random.Random(42)
+        t_sampler = SequentialSampler(['gender'], target_width=0.3, max_samples=30, interval='t',
+                                      duplicate_threshold=threshold)
+        estimates = t_sampler.run(list(canned), lambda p: rng.choice(canned[p]))
+        repeated = sum(1 for e in estimates if e.repeated)
+        print(f"t interval, near-duplicate threshold {threshold}: {t_sampler.calls} API calls, "
+              f"{t_sampler.reused} detections reused, {repeated} prompts stopped as repeated")
@@ -0,0 +1,199 @@
+"""
+Startup Timing and Background Warm-Up for the Streamlit Apps
+
+The apps used to import transformers / openai / plotly and load GPT-2 before
+drawing anything, so the first page waited for all of it. Now they draw the
+page first and hand slow work to warm_up(), which runs a loader once per
+process in a background thread; the page shows a "model loading" state until
+it is ready, and the first click that needs the result waits for it. A loader
+that failed is started again by the next warm_up() call.
+
+ScriptTimer records named points of a script run (imports done, first paint,
+script done). startup_rows() turns the first (cold) run, the current run and
+the warm-up tasks into rows for the apps' debug panel (open an app with
+?debug=1).
+
+measure_first_paint() runs an app headless in a fresh interpreter (Streamlit
+itself already imported, as in a running server) and times the first element
+it sends, which is how the before/after numbers were taken.
+
+Usage:
+    python src/startup_timing.py [--apps=app.py,app_enhanced.py,app_multi_bias.py] [--runs=3]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APPS = ('app.py', 'app_enhanced.py', 'app_multi_bias.py')
+
+_lock = threading.Lock()
+_warm_ups = {}
+_first_timer = None
+
+
+class WarmUp:
+    """A loader running in a background thread; its result is shared by every session"""
+
+    def __init__(self, name: str, loader: Callable):
+        self.name = name
+        self.loader = loader
+        self.state = 'loading'
+        self.result = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self._done = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            self.result = self.loader()
+            self.state = 'ready'
+        except Exception as e:
+            self.error = e
+            self.state = 'failed'
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def wait(self, timeout: float = None):
+        """The loader's result once it has finished (re-raises its exception)"""
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def warm_up(name: str, loader: Callable) -> WarmUp:
+    """
+    Start loader in the background, once per process; later calls return the same WarmUp
+
+    A WarmUp that failed is replaced, so a transient error (a network blip
+    while downloading a model) is retried by the next caller.
+    """
+    with _lock:
+        if name not in _warm_ups or _warm_ups[name].state == 'failed':
+            _warm_ups[name] = WarmUp(name, loader)
+        return _warm_ups[name]
+
+
+class ScriptTimer:
+    """Seconds from the start of one script run to named points in it"""
+
+    def __init__(self):
+        global _first_timer
+        self.start = time.perf_counter()
+        self.marks = {}
+        with _lock:
+            if _first_timer is None:
+                _first_timer = self
+
+    def mark(self, name: str) -> float:
+        self.marks[name] = time.perf_counter() - self.start
+        return self.marks[name]
+
+
+def startup_rows(timer: ScriptTimer) -> List[Dict]:
+    """Debug-panel rows: the first run's and this run's marks, then every warm-up task"""
+    rows = []
+    first = _first_timer
+    for name in (first.marks if first else timer.marks):
+        rows.append({
+            'Phase': name,
+            'First run (s)': f"{first.marks[name]:.3f}" if first and name in first.marks else '',
+            'This run (s)': f"{timer.marks[name]:.3f}" if name in timer.marks else ''
+        })
+    for task in list(_warm_ups.values()):
+        rows.append({
+            'Phase': f"warm-up: {task.name} ({task.state})",
+            'First run (s)': f"{task.elapsed:.3f}",
+            'This run (s)': ''
+        })
+    return rows
+
+
+# Runs in a fresh interpreter: Streamlit is imported first (the server has it
+# loaded already), then the time until the app's first element is measured
+MEASURE_SCRIPT = r'''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+
+first = []
+enqueue = ScriptRunContext.enqueue
+def timed_enqueue(self, msg):
+    if not first and msg.WhichOneof('type') == 'delta':
+        first.append(time.perf_counter())
+    return enqueue(self, msg)
+ScriptRunContext.enqueue = timed_enqueue
+
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=300).run()
+end = time.perf_counter()
+print(json.dumps({
+    'first_paint': first[0] - start if first else None,
+    'script': end - start,
+    'error': at.exception[0].message if len(at.exception) else None
+}))
+'''
+
+
+def measure_first_paint(app: str, runs: int = 3) -> Dict:
+    """
+    Cold time to first paint of an app, each run in a new interpreter
+
+    Returns:
+        {'first_paint': [seconds per run], 'script': [seconds per run], 'error': first error or None}
+    """
+    first_paint, script, error = [], [], None
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT, app],
+                                   capture_output=True, text=True)
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode or not lines:
+            error = error or completed.stderr.strip().splitlines()[-1:]
+            continue
+        result = json.loads(lines[-1])
+        error = error or result['error']
+        if result['first_paint'] is not None:
+            first_paint.append(result['first_paint'])
+        script.append(result['script'])
+    return {'first_paint': first_paint, 'script': script, 'error': error}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+    apps = options['apps'].split(',') if options.get('apps') else APPS
+    runs = int(options.get('runs') or 3)
+
+    print("=" * 70)
+    print(f"TIME TO FIRST PAINT (cold, {runs} runs each)")
+    print("=" * 70)
+    print(f"{'App':<40} {'First paint':>12} {'Full script':>12}")
+    for app in apps:
+        result = measure_first_paint(app, runs)
+        paint = f"{min(result['first_paint']):.3f}s" if result['first_paint'] else 'n/a'
+        script = f"{min(result['script']):.3f}s" if result['script'] else 'n/a'
+        print(f"{app:<40} {paint:>12} {script:>12}")
+        if result['error']:
+            print(f"  error: {result['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
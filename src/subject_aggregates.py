@@ -0,0 +1,317 @@
+"""
+Mergeable Per-Subject Bias Aggregates
+
+The table and chart stages summarize detections per (subject, bias type).
+A SubjectAggregate holds everything those summaries need: the text count,
+the summed detector category counts (e.g. male/female), the sum and sum of
+squares of the bias scores, their min/max, a bias-label histogram and a
+KLL quantile sketch of the scores (src/quantile_sketch.py) for percentiles
+and tail fractions in bounded memory.
+
+Merging two aggregates is associative and commutative, and score sums are
+kept as exact fractions, so a corpus can be split into shards, each shard
+aggregated in its own process (or on its own machine, via the JSON form),
+and the parts combined in any grouping to exactly the single-process result
+(the sketch merges too; its percentiles are approximate by design).
+Live dashboards that only read the mean can pass exact=False for plain
+float sums instead, which makes add() several times cheaper.
+An AggregateTable holds one SubjectAggregate per (subject, bias type) and
+keeps subjects in first-seen order, so merging shards in corpus order also
+reproduces the single-process table order.
+
+Usage:
+    python src/subject_aggregates.py map results/generated_outputs.txt --bias-type=combined \
+        --shard=0/4 --output=part0.json
+    python src/subject_aggregates.py merge part0.json part1.json part2.json part3.json --output=merged.json
+    python src/cli.py table combined --aggregates merged.json
+"""
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.quantile_sketch import KLLSketch
+
+
+class SubjectAggregate:
+    """Counts, score moments, min/max, label histogram and score sketch of one (subject, bias type)"""
+
+    def __init__(self, exact: bool = True):
+        """
+        Args:
+            exact: Keep the score sums as exact Fractions (False: floats, for
+                running summaries that are never merged or compared)
+        """
+        self.exact = exact
+        self.texts = 0
+        self.counts = {}            # detector '{key}_count' sums, e.g. {'male': 3, 'female': 1}
+        self.score_sum = Fraction(0) if exact else 0.0
+        self.score_sq_sum = Fraction(0) if exact else 0.0
+        self.score_min = None
+        self.score_max = None
+        self.labels = {}
+        self.sketch = KLLSketch()
+
+    def add(self, detection: Dict):
+        """Add one detector result (a MultiBiasDetector per-type dict)"""
+        self.texts += 1
+        for key, value in detection.items():
+            if key.endswith('_count'):
+                name = key[:-len('_count')]
+                self.counts[name] = self.counts.get(name, 0) + value
+        score = detection['bias_score']
+        value = Fraction(score) if self.exact else score
+        self.score_sum += value
+        self.score_sq_sum += value * value
+        self.score_min = score if self.score_min is None else min(self.score_min, score)
+        self.score_max = score if self.score_max is None else max(self.score_max, score)
+        label = detection['bias_label']
+        self.labels[label] = self.labels.get(label, 0) + 1
+        self.sketch.update(score)
+
+    def update(self, other: 'SubjectAggregate') -> 'SubjectAggregate':
+        """Merge other into this aggregate in place"""
+        self.texts += other.texts
+        for name, value in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + value
+        self.score_sum += other.score_sum
+        self.score_sq_sum += other.score_sq_sum
+        if other.score_min is not None:
+            self.score_min = other.score_min if self.score_min is None else min(self.score_min, other.score_min)
+            self.score_max = other.score_max if self.score_max is None else max(self.score_max, other.score_max)
+        for label, value in other.labels.items():
+            self.labels[label] = self.labels.get(label, 0) + value
+        self.sketch.update_sketch(other.sketch)
+        return self
+
+    def merge(self, other: 'SubjectAggregate') -> 'SubjectAggregate':
+        """New aggregate combining this one and other"""
+        return SubjectAggregate(self.exact and other.exact).update(self).update(other)
+
+    @property
+    def mean(self) -> float:
+        return float(self.score_sum / self.texts) if self.texts else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the bias scores (exact until the final division when exact)"""
+        if self.texts < 2:
+            return 0.0
+        return float((self.score_sq_sum - self.score_sum * self.score_sum / self.texts) / (self.texts - 1))
+
+    def to_dict(self) -> Dict:
+        score_sum, score_sq_sum = Fraction(self.score_sum), Fraction(self.score_sq_sum)
+        return {
+            'texts': self.texts,
+            'counts': self.counts,
+            'score_sum': [score_sum.numerator, score_sum.denominator],
+            'score_sq_sum': [score_sq_sum.numerator, score_sq_sum.denominator],
+            'score_min': self.score_min,
+            'score_max': self.score_max,
+            'labels': self.labels,
+            'sketch': self.sketch.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SubjectAggregate':
+        aggregate = cls()
+        aggregate.texts = data['texts']
+        aggregate.counts = dict(data['counts'])
+        aggregate.score_sum = Fraction(*data['score_sum'])
+        aggregate.score_sq_sum = Fraction(*data['score_sq_sum'])
+        aggregate.score_min = data['score_min']
+        aggregate.score_max = data['score_max']
+        aggregate.labels = dict(data['labels'])
+        if 'sketch' in data:
+            aggregate.sketch = KLLSketch.from_dict(data['sketch'])
+        return aggregate
+
+    def __eq__(self, other) -> bool:
+        """Equal exact statistics (the sketch depends on merge order, so it is not compared)"""
+        if not isinstance(other, SubjectAggregate):
+            return False
+        mine, theirs = self.to_dict(), other.to_dict()
+        mine.pop('sketch')
+        theirs.pop('sketch')
+        return mine == theirs
+
+
+class AggregateTable:
+    """One SubjectAggregate per (subject, bias type), subjects in first-seen order"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, subject: str, bias_results: Dict[str, Dict]):
+        """Add one text's detections ({bias_type: detection}) under its subject"""
+        for btype, detection in bias_results.items():
+            key = (subject, btype)
+            if key not in self.entries:
+                self.entries[key] = SubjectAggregate()
+            self.entries[key].add(detection)
+
+    def update(self, other: 'AggregateTable') -> 'AggregateTable':
+        """Merge other into this table in place (its new subjects go last)"""
+        for key, aggregate in other.entries.items():
+            if key in self.entries:
+                self.entries[key].update(aggregate)
+            else:
+                self.entries[key] = SubjectAggregate().update(aggregate)
+        return self
+
+    def merge(self, other: 'AggregateTable') -> 'AggregateTable':
+        return AggregateTable().update(self).update(other)
+
+    def subjects(self) -> List[str]:
+        return list(dict.fromkeys(subject for subject, _ in self.entries))
+
+    def get(self, subject: str, bias_type: str) -> SubjectAggregate:
+        """Aggregate of a (subject, bias type); empty if the subject had no such detections"""
+        return self.entries.get((subject, bias_type)) or SubjectAggregate()
+
+    def sketch(self, bias_type: str) -> KLLSketch:
+        """Score sketch of a bias type over all subjects"""
+        total = KLLSketch()
+        for (_, btype), aggregate in self.entries.items():
+            if btype == bias_type:
+                total.update_sketch(aggregate.sketch)
+        return total
+
+    def to_dict(self) -> Dict:
+        return {'entries': [dict(subject=subject, bias_type=btype, **aggregate.to_dict())
+                            for (subject, btype), aggregate in self.entries.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AggregateTable':
+        table = cls()
+        for entry in data['entries']:
+            entry = dict(entry)
+            key = (entry.pop('subject'), entry.pop('bias_type'))
+            table.entries[key] = SubjectAggregate.from_dict(entry)
+        return table
+
+    def save(self, path: str) -> str:
+        """Write the table as JSON (atomically, like the metrics artifacts)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(path + '.tmp', path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'AggregateTable':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, AggregateTable) and self.entries == other.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+def merge_all(tables: Iterable[AggregateTable]) -> AggregateTable:
+    """Merge tables left to right"""
+    total = AggregateTable()
+    for table in tables:
+        total.update(table)
+    return total
+
+
+def iter_shards(records: Iterable, shard_size: int) -> Iterator[List]:
+    """Group a record stream into lists of shard_size"""
+    shard = []
+    for record in records:
+        shard.append(record)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def map_reduce(jobs: Iterable, mapper: Callable[..., AggregateTable], workers: int = None,
+               initializer: Callable = None) -> AggregateTable:
+    """
+    Run mapper over jobs in worker processes and merge the results in job order
+
+    At most 4 x workers jobs are in flight, so a streamed corpus is never held
+    in memory whole. mapper (and initializer) must be importable module-level
+    functions so worker processes can unpickle them.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        if initializer:
+            initializer()
+        return merge_all(map(mapper, jobs))
+
+    total = AggregateTable()
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        pending = []
+        for job in jobs:
+            pending.append(pool.submit(mapper, job))
+            if len(pending) >= workers * 4:
+                total.update(pending.pop(0).result())
+        for future in pending:
+            total.update(future.result())
+    return total
+
+
+def shard_range(total: int, shard: str) -> Tuple[int, int]:
+    """Record range [start, end) of shard 'i/N' among total records"""
+    index, count = (int(part) for part in shard.split('/'))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{shard}' (use i/N with 0 <= i < N)")
+    return total * index // count, total * (index + 1) // count
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = [arg for arg in argv if not arg.startswith('--')]
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+
+    command = args[0] if args else None
+    if command == 'map' and len(args) == 2:
+        from itertools import islice
+        from src.create_bias_table_multi import aggregate_file
+        from src.pipeline_io import iter_generated
+
+        input_file = args[1]
+        bias_type = options.get('bias-type') or 'combined'
+        output_file = options.get('output') or 'subject_aggregates.json'
+        records = iter_generated(input_file)
+        if options.get('shard'):
+            # Contiguous ranges, so merging parts 0..N-1 in order keeps the corpus order
+            start, end = shard_range(sum(1 for _ in iter_generated(input_file)), options['shard'])
+            records = islice(iter_generated(input_file), start, end)
+        table = aggregate_file(records, bias_type, workers=int(options.get('workers') or 0) or None)
+        table.save(output_file)
+        print(f"✓ {len(table)} (subject, bias type) aggregates saved to: {output_file}")
+        return 0
+
+    if command == 'merge' and len(args) > 1:
+        output_file = options.get('output') or 'subject_aggregates.json'
+        table = merge_all(AggregateTable.load(path) for path in args[1:])
+        table.save(output_file)
+        print(f"✓ Merged {len(args) - 1} files into {len(table)} aggregates: {output_file}")
+        return 0
+
+    print("Usage:")
+    print("  python src/subject_aggregates.py map INPUT_FILE [--bias-type=combined] [--shard=i/N] "
+          "[--workers=N] [--output=FILE]")
+    print("  python src/subject_aggregates.py merge FILE1 FILE2 ... [--output=FILE]")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
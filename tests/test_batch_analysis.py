@@ -0,0 +1,103 @@
+import csv
+import gzip
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.batch_analysis import BatchJob, chunked, detect_format, evict_finished, iter_texts
+from src.bias_detector import MultiBiasDetector
+
+
+def test_detect_format():
+    assert detect_format('corpus.CSV') == 'csv'
+    assert detect_format('corpus.ndjson') == 'jsonl'
+    assert detect_format('corpus.txt') == 'text'
+
+
+def test_iter_texts_keeps_source_rows():
+    lines = ['id,text\n', '1,He said hi\n', '2,\n', '3,She said hi\n']
+    assert list(iter_texts(lines, 'csv')) == [(1, 'He said hi'), (3, 'She said hi')]
+
+    lines = ['{"output": "first"}\n', '\n', '"plain string"\n', '{"other": 1}\n', '{"output": "last"}\n']
+    assert list(iter_texts(lines, 'jsonl')) == [(1, 'first'), (3, 'plain string'), (5, 'last')]
+
+    assert list(iter_texts(['a\n', '  \n', 'b\n'], 'text')) == [(1, 'a'), (3, 'b')]
+
+
+def test_iter_texts_column_choice():
+    lines = ['\ufeffText,note\n', 'hello,x\n']
+    assert list(iter_texts(lines, 'csv')) == [(1, 'hello')]
+    assert list(iter_texts(lines, 'csv', column='note')) == [(1, 'x')]
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_batch_job_reads_bom_csv_and_writes_source_rows(tmp_path):
+    source = tmp_path / 'export.csv'
+    source.write_bytes('\ufeffid,text\n1,He said he was ready.\n2,\n3,She said she was tired.\n'
+                       .encode('utf-8'))
+    output = str(tmp_path / 'results.csv.gz')
+    job = BatchJob(str(source), MultiBiasDetector(['gender']), output, chunk_size=1).start()
+    job.wait()
+
+    status = job.status()
+    assert status['state'] == 'done'
+    assert status['texts'] == 2
+    with gzip.open(output, 'rt', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['row'] for row in rows] == ['1', '3']
+    assert float(rows[0]['gender_score']) > 0 > float(rows[1]['gender_score'])
+
+
+def test_evict_finished_drops_old_jobs_and_their_files(tmp_path):
+    detector = MultiBiasDetector(['gender'])
+    jobs = {}
+    for name in ('a', 'b', 'c'):
+        source = tmp_path / f'{name}.txt'
+        source.write_text('He said hi.\n', encoding='utf-8')
+        jobs[name] = BatchJob(str(source), detector, str(tmp_path / f'{name}.csv.gz')).start()
+        jobs[name].wait()
+    jobs['a'].finished -= 7200
+    jobs['b'].finished -= 10
+
+    assert evict_finished(jobs, ttl=3600, keep=5) == ['a']
+    assert not os.path.exists(tmp_path / 'a.csv.gz')
+    assert evict_finished(jobs, ttl=3600, keep=1) == ['b']
+    assert list(jobs) == ['c']
+    assert os.path.exists(tmp_path / 'c.csv.gz')
+
+
+def test_malformed_jsonl_lines_are_skipped_and_counted(tmp_path):
+    lines = ['{"text": "He left."}\n', '{"text": "cut off\n', '[1, 2]\n', '42\n', 'null\n',
+             '{"text": 7}\n', '"She stayed."\n']
+    skipped = []
+    assert list(iter_texts(lines, 'jsonl', on_skip=skipped.append)) == [(1, 'He left.'), (7, 'She stayed.')]
+    assert skipped == [2, 3, 4, 5]
+
+    source = tmp_path / 'corpus.jsonl'
+    source.write_text(''.join(lines), encoding='utf-8')
+    job = BatchJob(str(source), MultiBiasDetector(['gender']), str(tmp_path / 'out.csv.gz'))
+    job.run()
+    status = job.status()
+    assert (status['state'], status['texts'], status['skipped']) == ('done', 2, 4)
+
+
+def test_running_aggregates_match_the_written_scores(tmp_path):
+    texts = ["He said his plan worked.", "She led her team.", "The old man was slow.", "They left early."] * 30
+    source = tmp_path / 'corpus.txt'
+    source.write_text('\n'.join(texts), encoding='utf-8')
+    output = str(tmp_path / 'out.csv.gz')
+    job = BatchJob(str(source), MultiBiasDetector(['gender', 'age']), output, chunk_size=7)
+    job.run()
+
+    with gzip.open(output, 'rt', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    detector = MultiBiasDetector(['gender', 'age'])
+    for bias_type, summary in job.status()['bias_types'].items():
+        scores = [detector.detect_all(text)[bias_type]['bias_score'] for text in texts]
+        assert summary['mean'] == pytest.approx(sum(scores) / len(scores))
+        assert sum(summary['labels'].values()) == len(rows) == len(texts)
@@ -0,0 +1,67 @@
+import os
+import re
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.bias_detector import (AgeBiasDetector, BiasDetector, GenderBiasDetector, MultiBiasDetector,
+                               RegionalBiasDetector, SentimentBiasDetector, SocioeconomicBiasDetector,
+                               match_keywords)
+
+# (keywords, category, bias_type, multiword) as each detector calls match_keywords
+KEYWORD_SETS = [
+    (GenderBiasDetector.MALE_PRONOUNS, 'male', 'gender', False),
+    (GenderBiasDetector.FEMALE_PRONOUNS, 'female', 'gender', False),
+    (AgeBiasDetector.YOUNG_KEYWORDS, 'young', 'age', False),
+    (AgeBiasDetector.OLD_KEYWORDS, 'old', 'age', False),
+    (SocioeconomicBiasDetector.WEALTHY_KEYWORDS, 'wealthy', 'socioeconomic', True),
+    (SocioeconomicBiasDetector.POOR_KEYWORDS, 'poor', 'socioeconomic', True),
+    (RegionalBiasDetector.WESTERN_KEYWORDS, 'western', 'regional', True),
+    (RegionalBiasDetector.EASTERN_KEYWORDS, 'eastern', 'regional', True),
+    (SentimentBiasDetector.POSITIVE_KEYWORDS, 'positive', 'sentiment', False),
+    (SentimentBiasDetector.NEGATIVE_KEYWORDS, 'negative', 'sentiment', False),
+]
+
+TEXTS = [
+    "He said his sister told HER boss herself; she's sure he'll call him.",
+    "The theme of history: hermit crabs and the shepherd's heroes.",
+    "The old, elderly senior and the young teen met the upper  class\nfamily from the third world.",
+    "A working class family with low income; a well-off, wealthy, rich investor. Poor service, poor food!",
+    "İstanbul's oﬃcer said he was happy; the İNCE young man was poor but great.",
+    "",
+]
+
+
+def test_counts_equal_the_findall_totals():
+    for text in TEXTS:
+        text_lower = text.lower()
+        for keywords, category, bias_type, multiword in KEYWORD_SETS:
+            spans = []
+            count = match_keywords(text_lower, keywords, category, bias_type, spans, multiword=multiword)
+            expected = sum(len(re.findall(r'\b' + (k.replace(' ', r'\s+') if multiword else k) + r'\b', text_lower))
+                           for k in keywords)
+            assert count == expected == len(spans)
+            assert all(span[2:] == (category, bias_type) for span in spans)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_spans_point_at_the_keywords_in_the_original_text(text):
+    keywords = {(category, bias_type): {k.lower() for k in words} for words, category, bias_type, _ in KEYWORD_SETS}
+    for result in MultiBiasDetector().detect_all(text).values():
+        assert result['spans'] == sorted(result['spans'])
+        for start, end, category, bias_type in result['spans']:
+            assert re.sub(r'\s+', ' ', text[start:end].lower()) in keywords[category, bias_type]
+
+
+def test_sorted_spans_maps_offsets_when_lowercasing_changes_length():
+    text = "İİ He met ﬃ HER"
+    text_lower = text.lower()
+    assert len(text_lower) == len(text) + 2
+    spans = []
+    match_keywords(text_lower, ['he', 'her'], 'x', 'gender', spans)
+    mapped = BiasDetector.sorted_spans(text, text_lower, spans)
+    assert [text[start:end] for start, end, _, _ in mapped] == ['He', 'HER']
+    # Unchanged length: offsets are already right and only get sorted
+    assert BiasDetector.sorted_spans('b a', 'b a', [(2, 3, 'x', 'y'), (0, 1, 'x', 'y')]) == \
+        [(0, 1, 'x', 'y'), (2, 3, 'x', 'y')]
@@ -0,0 +1,75 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from src import bootstrap_stats
+from src.bootstrap_stats import mean_interval, mean_of, paired_reduction, pronoun_ratio, resample_means
+
+
+def test_resample_means_matches_the_sampling_distribution_of_the_mean():
+    rng = np.random.default_rng(1)
+    scores = rng.choice([-1.0, 0.0, 0.5, 1.0], size=2000)
+    means = resample_means({'score': scores}, resamples=4000, seed=3)['score']
+    assert means.shape == (4000,)
+    assert means.mean() == pytest.approx(scores.mean(), abs=0.005)
+    assert means.std() == pytest.approx(scores.std() / np.sqrt(len(scores)), rel=0.1)
+    np.testing.assert_array_equal(means, resample_means({'score': scores}, resamples=4000, seed=3)['score'])
+
+
+def test_index_block_fallback_agrees_with_weight_matrix(monkeypatch):
+    rng = np.random.default_rng(2)
+    columns = {'male': rng.poisson(1.2, 500), 'female': rng.poisson(0.8, 500)}
+    weighted = resample_means(columns, resamples=3000, seed=0)
+    monkeypatch.setattr(bootstrap_stats, 'MAX_DISTINCT_ROWS', 0)
+    monkeypatch.setattr(bootstrap_stats, 'BLOCK_ELEMENTS', 500 * 7)
+    blocked = resample_means(columns, resamples=3000, seed=0)
+    for name in columns:
+        assert blocked[name].mean() == pytest.approx(weighted[name].mean(), abs=0.01)
+        assert blocked[name].std() == pytest.approx(weighted[name].std(), rel=0.15)
+
+
+def test_resample_means_rejects_empty_sample():
+    with pytest.raises(ValueError):
+        resample_means({'score': []})
+
+
+def test_mean_interval_covers_the_mean():
+    scores = np.repeat([-1.0, 1.0, 0.0], [300, 500, 200])
+    result = mean_interval(scores, resamples=1000)
+    assert result['estimate'] == pytest.approx(0.2)
+    assert result['low'] < 0.2 < result['high']
+    assert result['texts'] == 1000
+    assert result['p_value'] < 0.01
+
+
+def test_reduction_is_unpaired_unless_the_caller_says_so():
+    rng = np.random.default_rng(4)
+    baseline = {'score': rng.choice([-1.0, 1.0], size=400, p=[0.3, 0.7])}
+    other_corpus = {'score': rng.choice([-1.0, 1.0], size=400, p=[0.45, 0.55])}
+    result = paired_reduction(baseline, mean_of('score'), other_corpus, mean_of('score'), resamples=500)
+    assert result['paired'] is False
+
+
+def test_paired_reduction_uses_the_correlation_of_rewrites():
+    rng = np.random.default_rng(5)
+    male = rng.poisson(1.5, 1000)
+    female = rng.poisson(0.8, 1000)
+    total = male + female
+    baseline = {'score': np.divide(male - female, total, out=np.zeros(len(total)), where=total > 0)}
+    rewritten = {'male': rng.binomial(male, 0.9), 'female': female}
+    args = (baseline, mean_of('score'), rewritten, pronoun_ratio('male', 'female'))
+
+    paired = paired_reduction(*args, resamples=1000, paired=True)
+    unpaired = paired_reduction(*args, resamples=1000)
+    assert paired['paired'] and not unpaired['paired']
+    assert paired['estimate'] == pytest.approx(unpaired['estimate'])
+    assert paired['high'] - paired['low'] < unpaired['high'] - unpaired['low']
+
+
+def test_paired_reduction_requires_one_row_per_text():
+    with pytest.raises(ValueError, match="baseline has 3, method has 2"):
+        paired_reduction({'score': [1.0, 0.0, -1.0]}, mean_of('score'),
+                         {'score': [1.0, 0.0]}, mean_of('score'), paired=True)
@@ -0,0 +1,56 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from src.compare_all_methods import (BASELINE_LABEL, add_intervals, build_methods, method_arrays_from,
+                                     post_label, prompt_label)
+
+MALE = np.array([2, 1, 0, 3, 1, 0, 2, 1])
+FEMALE = np.array([0, 1, 2, 0, 1, 0, 1, 0])
+
+
+def stage_arrays():
+    total = MALE + FEMALE
+    scores = np.divide(MALE - FEMALE, total, out=np.zeros(len(total)), where=total > 0)
+    baseline = {'bias_score': scores, 'male_count': MALE, 'female_count': FEMALE}
+    prompt = ({'Strategy 1': {}}, {'strategy_1_score': np.array([0.0, -1.0, 1.0, 0.0, 0.5])})
+    post = ({'Replace with They/Them': {}}, {
+        'original_male': MALE, 'original_female': FEMALE,
+        'replace_with_they_them_male': np.zeros(8, dtype=int), 'replace_with_they_them_female': np.zeros(8, dtype=int)
+    })
+    return baseline, prompt, post
+
+
+def test_reductions_are_tested_on_the_methods_own_statistic():
+    baseline, prompt, post = stage_arrays()
+    method_arrays = method_arrays_from(baseline, prompt, post)
+
+    assert method_arrays[BASELINE_LABEL][2] is None
+    reference_columns, _, paired = method_arrays[prompt_label('Strategy 1')][2]
+    assert not paired and reference_columns['score'] is baseline['bias_score']
+    reference_columns, reference_statistic, paired = method_arrays[post_label('Replace with They/Them')][2]
+    assert paired and reference_columns == {'male': MALE, 'female': FEMALE}
+    # The reference scores the original counts like the strategy's bias score: the pronoun ratio
+    ratio = (MALE.sum() - FEMALE.sum()) / (MALE.sum() + FEMALE.sum())
+    assert reference_statistic({'male': np.array([MALE.mean()]), 'female': np.array([FEMALE.mean()])})[0] == \
+        pytest.approx(ratio)
+
+    baseline_summary = {'male': int(MALE.sum()), 'female': int(FEMALE.sum()),
+                        'bias': float(baseline['bias_score'].mean())}
+    methods = build_methods(baseline_summary, {'Strategy 1': 0.1}, {'Replace with They/Them': 0.0})
+    add_intervals(methods, method_arrays)
+    test = methods[post_label('Replace with They/Them')]['vs_baseline']
+    assert test['paired'] and test['estimate'] == pytest.approx(abs(ratio))
+    assert not methods[prompt_label('Strategy 1')]['vs_baseline']['paired']
+    assert 'vs_baseline' not in methods[BASELINE_LABEL]
+
+
+def test_missing_stages_are_skipped():
+    baseline, prompt, post = stage_arrays()
+    assert list(method_arrays_from(baseline)) == [BASELINE_LABEL]
+    method_arrays = method_arrays_from(None, prompt, post)
+    assert method_arrays[prompt_label('Strategy 1')][2] is None
+    assert method_arrays[post_label('Replace with They/Them')][2] is not None
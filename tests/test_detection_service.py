@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+import threading
+import urllib.error
+import urllib.request
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.bias_detector import MultiBiasDetector
+from src.detection_service import DetectionServer, MicroBatcher, listen
+
+
+class RecordingDetector:
+    """detect_batch() stand-in that records each batch it is given"""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def detect_batch(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("detector failed")
+        return [{'text': text} for text in texts]
+
+
+def test_queued_requests_share_batches_and_get_their_own_results():
+    detector = RecordingDetector()
+    batcher = MicroBatcher(detector, max_batch=5, max_wait=0.05)
+    requests = [[f"r{i} t{j}" for j in range(size)] for i, size in enumerate([2, 1, 3, 1, 4, 2])]
+    # Queue everything before the thread starts, so batching is deterministic
+    futures = [batcher.submit(texts) for texts in requests]
+    batcher.start()
+
+    for texts, future in zip(requests, futures):
+        assert future.result(5) == [{'text': text} for text in texts]
+    # A batch closes once it reaches max_batch texts; requests are never split
+    assert [len(batch) for batch in detector.batches] == [6, 5, 2]
+    assert [text for batch in detector.batches for text in batch] == [t for texts in requests for t in texts]
+    assert (batcher.batches, batcher.batched_texts, batcher.largest_batch) == (3, 13, 6)
+
+
+def test_detector_errors_reach_every_request_in_the_batch():
+    batcher = MicroBatcher(RecordingDetector(fail=True), max_batch=10, max_wait=0.05)
+    futures = [batcher.submit(["a"]), batcher.submit(["b", "c"])]
+    batcher.start()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="detector failed"):
+            future.result(5)
+    assert batcher.batches == 0
+
+
+def test_batched_results_equal_direct_detection():
+    detector = MultiBiasDetector()
+    batcher = MicroBatcher(detector, max_batch=64, max_wait=0.01).start()
+    texts = ["He said his plan worked.", "The old man was slow.", "She led her team.", "He said his plan worked."]
+    assert batcher.detect(texts) == [detector.detect_all(text) for text in texts]
+
+
+def test_paths_match_without_their_query_string():
+    server = DetectionServer(listen('127.0.0.1', 0), MultiBiasDetector(['gender']), max_batch=8, max_wait=0.001)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/health?probe=1", timeout=5) as response:
+            assert json.load(response)['bias_types'] == ['gender']
+        request = urllib.request.Request(f"{base}/detect?trace=1", data=json.dumps({'text': "He left."}).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            assert json.load(response)['bias_results']['gender']['male_count'] == 1
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{base}/nothing?x=1", timeout=5)
+        assert error.value.code == 404
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            metrics = json.load(response)
+        assert {'/health', '/detect', '/nothing'} <= set(metrics['requests'])
+    finally:
+        server.shutdown()
+        server.server_close()
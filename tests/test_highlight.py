@@ -0,0 +1,34 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bias_detector import MultiBiasDetector
+from src.highlight import collect_spans, merge_spans, render_html, render_markdown
+
+
+def test_spans_of_the_same_word_merge_and_partial_overlaps_are_dropped():
+    spans = [(0, 4, 'poor', 'socioeconomic'), (0, 4, 'negative', 'sentiment'), (0, 4, 'poor', 'socioeconomic'),
+             (2, 8, 'old', 'age'), (9, 11, 'male', 'gender')]
+    assert merge_spans(spans) == [(0, 4, [('poor', 'socioeconomic'), ('negative', 'sentiment')]),
+                                  (9, 11, [('male', 'gender')])]
+
+    text = "The poor man said he was poor."
+    marks = merge_spans(collect_spans(MultiBiasDetector(['socioeconomic', 'sentiment', 'gender']).detect_all(text)))
+    assert [(text[start:end], sorted(b for _, b in labels)) for start, end, labels in marks] == [
+        ('poor', ['sentiment', 'socioeconomic']), ('he', ['gender']), ('poor', ['sentiment', 'socioeconomic'])]
+
+
+def test_render_html_escapes_text_and_titles():
+    text = '<b>"He" & she</b>'
+    rendered = render_html(text, [(4, 6, 'male', 'gen<der>'), (10, 13, 'female', 'gender')])
+    assert '<b>' not in rendered and '&lt;b&gt;&quot;' in rendered
+    assert '>He</mark>&quot; &amp; <mark' in rendered
+    assert 'title="gen&lt;der&gt;: male"' in rendered
+    assert rendered.endswith('>she</mark>&lt;/b&gt;')
+    assert render_html(text, []) == '&lt;b&gt;&quot;He&quot; &amp; she&lt;/b&gt;'
+
+
+def test_render_markdown_wraps_each_mark_once():
+    text = "He told her."
+    spans = [(0, 2, 'male', 'gender'), (8, 11, 'female', 'gender'), (8, 11, 'negative', 'sentiment')]
+    assert render_markdown(text, spans) == "**[He]** told ***[her]***."
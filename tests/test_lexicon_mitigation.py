@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.bias_detector import AgeBiasDetector, SocioeconomicBiasDetector
+from src.lexicon_mitigation import LEXICON_TABLES, build_engine, check_coverage, debias_lexicon, load_tables
+
+
+def test_built_in_tables_cover_detector_lexicons():
+    check_coverage(LEXICON_TABLES)
+    for word in AgeBiasDetector.NEGATIVE_DESCRIPTORS:
+        assert word in LEXICON_TABLES['age']
+    for word in SocioeconomicBiasDetector.NEGATIVE_TRAITS:
+        assert word in LEXICON_TABLES['socioeconomic']
+
+
+def test_check_coverage_names_missing_descriptors():
+    tables = {name: dict(table) for name, table in LEXICON_TABLES.items()}
+    del tables['age']['slow']
+    del tables['socioeconomic']
+    with pytest.raises(ValueError, match="age: slow") as excinfo:
+        check_coverage(tables)
+    assert "socioeconomic: " + ", ".join(sorted(SocioeconomicBiasDetector.NEGATIVE_TRAITS)) in str(excinfo.value)
+
+
+def test_load_tables_layers_over_built_ins(tmp_path):
+    path = tmp_path / 'tables.json'
+    path.write_text(json.dumps({'age': {'slow': 'careful'}, 'ability': {'crippled': 'disabled'}}),
+                    encoding='utf-8')
+    tables = load_tables(str(path))
+    assert tables['age']['slow'] == 'careful'
+    assert tables['age']['outdated'] == LEXICON_TABLES['age']['outdated']
+    assert tables['ability'] == {'crippled': 'disabled'}
+    assert LEXICON_TABLES['age']['slow'] == 'deliberate'
+    assert build_engine(['ability'], tables).rewrite("a crippled system") == "a disabled system"
+
+
+def test_debias_lexicon_selects_tables():
+    text = "The slow worker was outdated."
+    assert debias_lexicon(text) == "The deliberate worker was established."
+    assert debias_lexicon(text, ['regional']) == text
+    with pytest.raises(ValueError):
+        build_engine(['unknown'])
@@ -0,0 +1,66 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.mitigation_engine import BIAS_TYPES, _merge_stats, _new_stats, evaluate, evaluate_chunk, iter_chunks
+from src.rewrite_engine import ALTERNATING
+
+TEXTS = [
+    "He said his plan worked.",
+    "She led her team to the final.",
+    "The old man was slow but the young intern was quick.",
+    "They left early.",
+    "He told her that she was right.",
+    "The poor family from the rural village struggled.",
+    "Herself, she fixed it; himself, he watched.",
+] * 5
+
+
+def result_files(output_dir):
+    return {name: open(os.path.join(output_dir, name), encoding='utf-8').read()
+            for name in sorted(os.listdir(output_dir)) if name.endswith('.tsv')}
+
+
+def test_worker_count_does_not_change_results(tmp_path):
+    single = evaluate(iter(TEXTS), workers=1, chunk_size=4, output_dir=str(tmp_path / 'one'))
+    parallel = evaluate(iter(TEXTS), workers=3, chunk_size=4, output_dir=str(tmp_path / 'many'))
+    assert parallel == single
+    assert result_files(str(tmp_path / 'many')) == result_files(str(tmp_path / 'one'))
+    assert single['Alternating Gender']['gender']['texts'] == len(TEXTS)
+
+
+def test_alternating_strategy_is_independent_of_chunk_boundaries(tmp_path):
+    # Odd chunk sizes are rounded up, so every chunk starts at an even text index
+    assert [start for start, _ in iter_chunks(iter(TEXTS), 3)] == list(range(0, len(TEXTS), 4))
+    chunks = [ALTERNATING.rewrite_corpus(chunk) for _, chunk in iter_chunks(iter(TEXTS), 3)]
+    assert [text for chunk in chunks for text in chunk] == ALTERNATING.rewrite_corpus(TEXTS)
+
+    outputs = {}
+    for size in (1, 3, 8, len(TEXTS)):
+        output_dir = str(tmp_path / str(size))
+        evaluate(iter(TEXTS), ['Alternating Gender'], workers=1, chunk_size=size, output_dir=output_dir)
+        outputs[size] = result_files(output_dir)
+    assert all(files == outputs[len(TEXTS)] for files in outputs.values())
+
+
+def test_merged_chunk_stats_equal_the_whole_corpus():
+    names = ['Replace with They/Them', 'Alternating Gender']
+    _, whole, whole_rows = evaluate_chunk((0, TEXTS, names))
+    totals = {name: {b: _new_stats() for b in BIAS_TYPES} for name in names}
+    rows = {name: [] for name in names}
+    for start, chunk in iter_chunks(iter(TEXTS), 6):
+        _, stats, chunk_rows = evaluate_chunk((start, chunk, names))
+        for name in names:
+            for b in BIAS_TYPES:
+                _merge_stats(totals[name][b], stats[name][b])
+            rows[name] += chunk_rows[name]
+
+    assert rows == whole_rows
+    for name in names:
+        for b in BIAS_TYPES:
+            merged, expected = totals[name][b], whole[name][b]
+            assert merged == {key: pytest.approx(value) if isinstance(value, float) else value
+                              for key, value in expected.items()}
+    assert totals['Replace with They/Them']['gender']['changed'] > 0
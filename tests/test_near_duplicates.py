@@ -0,0 +1,68 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyze_bias_multi import analyze
+from src.bias_detector import MultiBiasDetector
+from src.near_duplicates import NearDuplicateIndex, synthetic_corpus
+from src.sequential_sampling import SequentialSampler
+
+HE = ("The doctor said that he would review the results of the clinical trial with the whole research team "
+      "before the board meeting on Friday morning and then publish a short summary of the findings for the "
+      "hospital staff.")
+SHE = HE.replace(" he ", " she ")
+
+
+def test_index_finds_copies_and_edited_copies():
+    texts, _ = synthetic_corpus(200, duplicate_rate=0.0, seed=3)
+    index = NearDuplicateIndex(0.8)
+    assert index.find_or_add_all(range(200), texts) == [None] * 200
+    assert len(index) == 200
+
+    key, similarity = index.find_or_add('copy', texts[17])
+    assert (key, similarity) == (17, 1.0)
+    edited = texts[42].split()
+    edited[len(edited) // 2] = 'village'
+    assert index.find_or_add('edit', ' '.join(edited))[0] == 42
+    # Matches are not indexed, so later matches still point at the first text
+    assert len(index) == 200
+
+
+def test_fingerprints_keep_biased_word_edits_apart():
+    detector = MultiBiasDetector()
+    index = NearDuplicateIndex(0.8)
+    assert index.signatures([HE, SHE]).shape == (2, index.num_perm)
+    assert index.find_or_add(0, HE, fingerprint=detector.keyword_fingerprint(HE)) is None
+    # Similar enough to count as a near-duplicate on the text alone ...
+    assert index.query(index.signature(SHE))[0] == 0
+    # ... but the keyword fingerprints differ, so it is indexed as a new text
+    assert index.find_or_add(1, SHE, fingerprint=detector.keyword_fingerprint(SHE)) is None
+    assert index.find_or_add(2, HE + " ", fingerprint=detector.keyword_fingerprint(HE + " "))[0] == 0
+    nurse = HE.replace('doctor', 'nurse')
+    assert detector.keyword_fingerprint(nurse) != detector.keyword_fingerprint(HE)
+
+
+def test_texts_without_words_never_match():
+    index = NearDuplicateIndex(0.8)
+    assert index.find_or_add_all(['a', 'b', 'c', 'd'], ["", ".", "", "!?"]) == [None] * 4
+    assert len(index) == 0
+
+
+def test_analyze_reuses_only_matching_keyword_results():
+    records = [{'prompt': 'The doctor said', 'output': text} for text in (HE, SHE, HE + " Thanks.", ".", "")]
+    analyzed = analyze(records, 'gender', near_duplicates=NearDuplicateIndex(0.8))
+    direct = analyze(records, 'gender')
+
+    assert [r.get('duplicate_of') for r in analyzed] == [None, None, 0, None, None]
+    for reused, fresh in zip(analyzed, direct):
+        assert reused['bias_results']['gender']['bias_score'] == fresh['bias_results']['gender']['bias_score']
+    assert analyzed[1]['bias_results']['gender']['female_count'] > 0
+
+
+def test_sequential_sampler_redetects_changed_keywords():
+    outputs = iter([HE, SHE, HE, SHE])
+    sampler = SequentialSampler(['gender'], min_samples=4, max_samples=4, duplicate_threshold=0.8)
+    estimate, = sampler.run(["The doctor said"], lambda prompt: next(outputs))
+    assert sampler.reused == 2
+    scores = [s['bias_results']['gender']['bias_score'] for s in estimate.samples]
+    assert scores[0] == scores[2] > 0 > scores[1] == scores[3]
@@ -0,0 +1,132 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pipeline import Stage, build_stages, compare_stage, module_closure, run_stages, stage_key, table_stage
+
+
+def write_module(src_dir, name, source):
+    with open(os.path.join(src_dir, f'{name}.py'), 'w', encoding='utf-8') as f:
+        f.write(source)
+
+
+def make_tree(tmp_path):
+    src_dir = str(tmp_path)
+    write_module(src_dir, 'pipeline', '')
+    write_module(src_dir, 'stage', 'from src.helper import value\n')
+    write_module(src_dir, 'helper', 'def value():\n    from src.deep import VALUE\n    return VALUE\n')
+    write_module(src_dir, 'deep', 'VALUE = 1\n')
+    write_module(src_dir, 'unrelated', 'VALUE = 2\n')
+    return src_dir
+
+
+def test_closure_follows_nested_and_lazy_imports(tmp_path):
+    src_dir = make_tree(tmp_path)
+    assert module_closure(('stage',), src_dir) == ['deep', 'helper', 'stage']
+
+
+def test_key_changes_when_transitive_import_changes(tmp_path):
+    src_dir = make_tree(tmp_path)
+    stage = Stage('s', lambda inputs: None, modules=('stage',))
+    before = stage_key(stage, {}, src_dir)
+
+    write_module(src_dir, 'unrelated', 'VALUE = 3\n')
+    assert stage_key(stage, {}, src_dir) == before
+
+    write_module(src_dir, 'deep', 'VALUE = 4\n')
+    assert stage_key(stage, {}, src_dir) != before
+
+
+def test_real_stages_cover_their_helpers():
+    stages = build_stages(['gender'])
+    assert 'bootstrap_stats' in module_closure(stages['compare'].modules)
+    assert 'near_duplicates' in module_closure(stages['analyze:gender'].modules)
+    table_modules = module_closure(stages['table:gender'].modules)
+    assert {'subject_aggregates', 'quantile_sketch', 'pipeline_io'} <= set(table_modules)
+    assert 'chart_render' in module_closure(stages['visualize:gender'].modules)
+
+
+def test_run_stages_reuses_cache(tmp_path):
+    calls = []
+
+    def produce(inputs, value):
+        calls.append(value)
+        return value * 2
+
+    def consume(inputs):
+        return inputs['produce'] + 1
+
+    def stages(value):
+        return {
+            'produce': Stage('produce', produce, config={'value': value}),
+            'consume': Stage('consume', consume, deps=('produce',))
+        }
+
+    cache_dir = str(tmp_path / 'cache')
+    first = run_stages(stages(1), workers=1, cache_dir=cache_dir)
+    assert first['consume']['output'] == 3
+    second = run_stages(stages(1), workers=1, cache_dir=cache_dir)
+    assert [second[name]['status'] for name in ('produce', 'consume')] == ['cached', 'cached']
+    third = run_stages(stages(2), workers=1, cache_dir=cache_dir)
+    assert third['consume'] == {'output': 5, 'status': 'ran', 'seconds': third['consume']['seconds']}
+    assert calls == [1, 2]
+
+
+def test_table_stage_matches_cli_table(tmp_path, monkeypatch):
+    from src.analyze_bias_multi import analyze
+    from src.create_bias_table_multi import run
+    from src.pipeline_io import write_generated
+
+    records = [
+        {'prompt': 'The doctor said', 'output': 'The doctor said he was busy.', 'sample': 1},
+        {'prompt': 'The nurse said', 'output': 'The nurse said she was tired.', 'sample': 1},
+        {'prompt': 'The doctor said', 'output': 'The doctor said his shift was long.', 'sample': 2},
+    ]
+    monkeypatch.chdir(tmp_path)
+    write_generated('generated.txt', 'gender',
+                    [dict(record, generated_text=record['output']) for record in records])
+    os.makedirs('results')
+
+    table_stage({'analyze': {'analyzed': analyze(records, 'gender')}}, 'gender', 'analyze')
+    with open('results/bias_table_gender.txt', encoding='utf-8') as f:
+        pipeline_table = f.read()
+    assert run('gender', 'generated.txt') is not None
+    with open('results/bias_table_gender.txt', encoding='utf-8') as f:
+        assert f.read() == pipeline_table
+    assert 'SCORE DISTRIBUTION' in pipeline_table
+
+
+def test_compare_uses_upstream_arrays_not_disk(tmp_path, monkeypatch):
+    import numpy as np
+    from src.pipeline_io import metrics_path, write_generated
+
+    texts = ['The doctor said he was busy.', 'The nurse said she was tired.',
+             'The pilot said his flight was late and he was tired.', 'The teacher said they were ready.']
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('results')
+    write_generated('results/generated_outputs.txt', 'gender',
+                    [{'prompt': text[:15], 'generated_text': text} for text in texts])
+
+    stages = build_stages(['gender'])
+    assert 'load:gender' in stages and not any(name.startswith('generate:') for name in stages)
+    assert stages['baseline'].deps == ('load:gender',)
+    report = run_stages({name: stage for name, stage in stages.items() if not name.startswith('visualize')},
+                        workers=1, cache_dir='cache')
+    assert {entry['status'] for entry in report.values()} == {'ran'}
+    methods = report['compare']['output']
+    assert methods['Post-process: Replace with They/Them']['vs_baseline']['paired']
+
+    # Stale or foreign arrays on disk must not change the comparison
+    np.savez(metrics_path('mitigation_post_processing', 'npz'), original_male=np.zeros(9), original_female=np.ones(9))
+    os.remove(metrics_path('bias_summary', 'npz'))
+    inputs = {name: report[name]['output'] for name in ('baseline', 'mitigate_post', 'mitigate_prompt')}
+    assert compare_stage(inputs) == methods
+
+
+def test_missing_input_is_reported_as_load_stage(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    stages = build_stages(['gender'])
+    report = run_stages(stages, workers=1, cache_dir='cache')
+    assert report['load:gender']['status'] == 'failed'
+    assert report['compare']['status'] == 'blocked'
+    assert '[failed]  load:gender' in capsys.readouterr().out
@@ -0,0 +1,72 @@
+import os
+import sys
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.prompt_templates import TEMPLATES, PromptTemplate, expand, prompt_id, stratified_sample
+
+SMALL = PromptTemplate('small', 'gender', 'The {a} {b} {c}', {'a': ['x', 'y'], 'b': ['1', '2', '3'], 'c': ['p', 'q']})
+PAIR = PromptTemplate('pair', 'gender', 'The {first} told the {second}',
+                      {'first': ['nurse', 'pilot', 'chef'], 'second': ['nurse', 'pilot', 'chef']},
+                      distinct=('first', 'second'))
+TINY = PromptTemplate('tiny', 'age', 'The {x}', {'x': ['a', 'b']})
+
+
+def test_index_decodes_mixed_radix_in_iteration_order():
+    assert len(SMALL) == 12
+    records = list(SMALL)
+    assert [SMALL[i] for i in range(len(SMALL))] == records
+    # The last slot varies fastest
+    assert [r['prompt'] for r in records[:4]] == ['The x 1 p', 'The x 1 q', 'The x 2 p', 'The x 2 q']
+    assert SMALL[11]['slots'] == {'a': 'y', 'b': '3', 'c': 'q'}
+    with pytest.raises(IndexError):
+        SMALL[12]
+
+
+def test_distinct_fields_never_pair_a_value_with_itself():
+    assert len(PAIR) == 6
+    records = list(PAIR)
+    assert [PAIR[i] for i in range(len(PAIR))] == records
+    assert all(r['slots']['first'] != r['slots']['second'] for r in records)
+    assert len({r['prompt'] for r in records}) == 6
+
+    gender_pair = next(t for t in TEMPLATES if t.name == 'gender_pair')
+    professions = len(gender_pair.slots['profession'])
+    assert len(gender_pair) == professions * (professions - 1)
+    assert all(gender_pair[i]['slots']['profession'] != gender_pair[i]['slots']['colleague']
+               for i in range(0, len(gender_pair), 7))
+    with pytest.raises(ValueError):
+        PromptTemplate('bad', 'gender', '{a} {b}', {'a': ['x'], 'b': ['y']}, distinct=('a', 'b'))
+
+
+def test_ids_are_stable_when_lexicons_grow():
+    record = SMALL[5]
+    assert record['id'] == prompt_id('small', record['slots'])
+    assert record['id'].startswith('small-')
+    grown = PromptTemplate('small', 'gender', 'The {a} {b} {c}',
+                           {'a': ['w', 'x', 'y'], 'b': ['0', '1', '2', '3'], 'c': ['p', 'q']})
+    ids = {r['prompt']: r['id'] for r in grown}
+    assert all(ids[r['prompt']] == r['id'] for r in SMALL)
+    assert len({r['id'] for r in expand([SMALL, PAIR, TINY])}) == len(SMALL) + len(PAIR) + len(TINY)
+
+
+def test_stratified_quotas_are_even_and_small_strata_give_everything():
+    templates = [SMALL, PAIR, TINY]
+    records = list(stratified_sample(14, templates, seed=3))
+    counts = Counter(r['template'] for r in records)
+    # TINY has 2 prompts; the other strata share the rest equally
+    assert counts == {'small': 6, 'pair': 6, 'tiny': 2}
+    assert len({r['id'] for r in records}) == 14
+    # Round-robin order: every prefix is balanced
+    assert [r['template'] for r in records[:3]] == ['small', 'pair', 'tiny']
+
+    assert records == list(stratified_sample(14, templates, seed=3))
+    assert records != list(stratified_sample(14, templates, seed=4))
+    assert len(list(stratified_sample(100, templates))) == len(SMALL) + len(PAIR) + len(TINY)
+
+    by_type = Counter(r['bias_type'] for r in stratified_sample(4, templates, by='bias_type'))
+    assert by_type == {'gender': 2, 'age': 2}
+    with pytest.raises(ValueError):
+        list(stratified_sample(5, templates, by='subject'))
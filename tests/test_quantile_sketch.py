@@ -0,0 +1,81 @@
+import bisect
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.quantile_sketch import KLLSketch
+
+
+def bias_scores(n, seed=0):
+    rng = random.Random(seed)
+    return [max(-1.0, min(1.0, rng.gauss(0.1, 0.35))) if rng.random() < 0.7
+            else rng.choice([0.0, 1.0, -1.0]) for _ in range(n)]
+
+
+def rank_error(exact, estimate, q):
+    """Distance of q from the rank range the estimate occupies in the sorted data"""
+    n = len(exact)
+    low, high = bisect.bisect_left(exact, estimate) / n, bisect.bisect_right(exact, estimate) / n
+    return max(low - q, q - high, 0.0)
+
+
+def test_small_streams_are_exact():
+    sketch = KLLSketch()
+    sketch.extend([0.5, -0.5, 0.0, 1.0])
+    assert sketch.n == 4 and len(sketch) == 4
+    assert sketch.quantile(0.5) == 0.0
+    assert (sketch.quantile(0), sketch.quantile(1)) == (-0.5, 1.0)
+    assert sketch.fraction_above(0.5) == 0.25
+    assert sketch.fraction_below(-0.5) == 0.0
+    assert KLLSketch().quantile(0.5) == 0.0 and KLLSketch().rank(0.0) == 0.0
+
+
+def test_memory_stays_bounded_and_ranks_stay_accurate():
+    scores = bias_scores(100000)
+    exact = sorted(scores)
+    sketch = KLLSketch(k=200)
+    sketch.extend(scores)
+    assert sketch.n == len(scores)
+    assert len(sketch) < 3 * 200
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert rank_error(exact, sketch.quantile(q), q) < 0.02
+    true_above = sum(1 for s in scores if s > 0.5) / len(scores)
+    assert sketch.fraction_above(0.5) == pytest.approx(true_above, abs=0.02)
+
+
+def test_merged_shards_match_the_whole_stream():
+    scores = bias_scores(50000, seed=1)
+    exact = sorted(scores)
+    parts = [KLLSketch() for _ in range(7)]
+    for i, score in enumerate(scores):
+        parts[i % 7].update(score)
+    merged = KLLSketch()
+    for part in parts:
+        merged.update_sketch(part)
+    nested = parts[0].merge(parts[1]).merge(parts[2].merge(parts[3])).merge(parts[4]).merge(
+        parts[5].merge(parts[6]))
+
+    for sketch in (merged, nested):
+        assert sketch.n == len(scores)
+        assert (sketch.min, sketch.max) == (exact[0], exact[-1])
+        assert len(sketch) < 3 * 200
+        for q in (0.1, 0.5, 0.9):
+            assert rank_error(exact, sketch.quantile(q), q) < 0.02
+    assert parts[0].n == len(scores[0::7])
+
+
+def test_same_inputs_give_the_same_sketch_and_round_trip():
+    scores = bias_scores(20000, seed=2)
+    first, second = KLLSketch(), KLLSketch()
+    first.extend(scores)
+    second.extend(scores)
+    assert first.to_dict() == second.to_dict()
+
+    restored = KLLSketch.from_dict(first.to_dict())
+    assert restored.summary() == first.summary()
+    restored.extend(scores)
+    first.extend(scores)
+    assert restored.to_dict() == first.to_dict()
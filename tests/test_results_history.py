@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.results_history import ResultsHistory
+
+
+def record(prompt, score=0.5):
+    return {'prompt': prompt, 'generated_text': prompt + ' he said.',
+            'bias_results': {'gender': {'bias_score': score}}}
+
+
+def test_entries_are_scoped_to_their_owner(tmp_path):
+    history = ResultsHistory(str(tmp_path / 'history.sqlite'))
+    mine = history.add(record('The doctor'), owner='alice')
+    history.add(record('The nurse', -0.5), owner='bob')
+    history.add(record('The pilot'), owner='alice')
+
+    assert history.count('alice') == 2
+    assert history.count('bob') == 1
+    assert history.count() == 3
+    assert [entry['prompt'] for entry in history.page(owner='alice')] == ['The pilot', 'The doctor']
+    assert history.get(mine, owner='alice')['prompt'] == 'The doctor'
+    assert history.get(mine, owner='bob') is None
+
+    history.clear('bob')
+    assert history.count() == 2
+
+
+def test_pages(tmp_path):
+    history = ResultsHistory(str(tmp_path / 'history.sqlite'))
+    assert history.pages(owner='alice') == 1
+    for i in range(5):
+        history.add(record(f'Prompt {i}'), owner='alice')
+    assert history.pages(per_page=2, owner='alice') == 3
+    assert [entry['prompt'] for entry in history.page(3, per_page=2, owner='alice')] == ['Prompt 0']
+    assert history.page(1, per_page=2, owner='bob') == []
+
+
+def test_history_without_owner_column_is_migrated(tmp_path):
+    path = str(tmp_path / 'history.sqlite')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE history (id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, '
+                       'prompt TEXT NOT NULL, bias_types TEXT NOT NULL, scores TEXT NOT NULL, '
+                       'record TEXT NOT NULL)')
+    connection.execute("INSERT INTO history (created, prompt, bias_types, scores, record) "
+                       "VALUES (0, 'old', 'gender', '{}', '{}')")
+    connection.commit()
+    connection.close()
+
+    history = ResultsHistory(path)
+    assert history.count('') == 1
+    assert history.count('alice') == 0
+    history.add(record('new'), owner='alice')
+    assert history.count('alice') == 1
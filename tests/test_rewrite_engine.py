@@ -0,0 +1,85 @@
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.rewrite_engine import (ALTERNATING, REMOVE_PRONOUNS, THEY_THEM, TO_FEMALE, TO_MALE, RewriteEngine,
+                                StreamingRewriter, debias_alternating, debias_stream, match_case)
+
+SAMPLES = [
+    "He said his sister would call him. She told HER boss herself.",
+    "The theme of history: hermit crabs shed their shells.",
+    "",
+    "HIS\tand\nhers; himself, Herself!",
+    "he",
+]
+
+
+def test_match_case():
+    assert match_case('he', 'they') == 'they'
+    assert match_case('He', 'they') == 'They'
+    assert match_case('HIS', 'their') == 'THEIR'
+    assert match_case('I', 'we') == 'We'
+
+
+def test_rewrite_preserves_case_and_word_boundaries():
+    assert THEY_THEM.rewrite(SAMPLES[0]) == "They said their sister would call them. They told THEM boss themselves."
+    assert THEY_THEM.rewrite(SAMPLES[1]) == SAMPLES[1]
+    assert REMOVE_PRONOUNS.rewrite("She left; he stayed.") == "The person left; the person stayed."
+
+
+def test_longest_key_wins_and_phrases_span_whitespace():
+    engine = RewriteEngine({'old': 'senior', 'old man': 'person', 'old manager': 'manager'})
+    assert engine.rewrite("An old man, an Old  manager and an OLD\nMAN.") == \
+        "An person, an Manager and an PERSON."
+    assert engine.rewrite("the old mansion") == "the senior mansion"
+
+
+@pytest.mark.parametrize('engine', [THEY_THEM, REMOVE_PRONOUNS, TO_MALE, TO_FEMALE])
+def test_corpus_pass_matches_per_text_rewrite(engine):
+    assert engine.rewrite_corpus(SAMPLES) == [engine.rewrite(text) for text in SAMPLES]
+    assert engine.rewrite_corpus([]) == []
+    texts = ["he\x00she", "his"]
+    assert engine.rewrite_corpus(texts) == [engine.rewrite(text) for text in texts]
+
+
+@pytest.mark.parametrize('engine', [THEY_THEM, REMOVE_PRONOUNS, TO_MALE, TO_FEMALE])
+def test_deltas_equal_recounting_the_rewritten_text(engine):
+    rewritten, deltas = engine.rewrite_corpus_with_deltas(SAMPLES)
+    for text, new_text, delta in zip(SAMPLES, rewritten, deltas):
+        before = engine.count_categories(text)
+        after = engine.count_categories(new_text)
+        assert {c: after[c] - before[c] for c in before if after[c] != before[c]} == delta
+
+
+def test_alternating_corpus_uses_text_index():
+    texts = ["She and her dog.", "He and his dog.", "She left.", "He left."]
+    assert ALTERNATING.rewrite_corpus(texts) == [debias_alternating(t, i) for i, t in enumerate(texts)]
+    assert ALTERNATING.rewrite_corpus(texts) == ["He and his dog.", "She and her dog.", "He left.", "She left."]
+
+
+@pytest.mark.parametrize('engine', [THEY_THEM, REMOVE_PRONOUNS,
+                                    RewriteEngine({'old': 'senior', 'old man': 'person', 'the old man': 'them'})])
+def test_streaming_output_equals_rewrite_for_any_split(engine):
+    text = "He met the old man; THE OLD\nMAN said his hermit friend saw HER himself.  the old"
+    expected = engine.rewrite(text)
+    rng = random.Random(0)
+    for _ in range(200):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(0, 20)))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert ''.join(debias_stream(chunks, engine)) == expected
+    for size in (1, 2, 3, 7):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert ''.join(debias_stream(chunks, engine)) == expected
+
+
+def test_streaming_releases_text_once_it_is_final():
+    rewriter = StreamingRewriter(THEY_THEM)
+    assert rewriter.feed("H") == ''
+    assert rewriter.feed("e said ") == 'They said '
+    assert rewriter.feed("hi") == ''
+    assert rewriter.feed("s") == ''
+    assert rewriter.flush() == 'their'
+    assert list(debias_stream([])) == []
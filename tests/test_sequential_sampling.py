@@ -0,0 +1,57 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.sequential_sampling import RunningScore, SequentialSampler, t_critical, t_interval
+
+
+def test_t_interval_follows_observed_spread():
+    assert t_interval(0.0, 0.0, 5) == (0.0, 0.0)
+    assert t_interval(0.5, 0.0, 1) == (-1.0, 1.0)
+    low, high = t_interval(0.0, 0.25, 9)
+    assert high - low == pytest.approx(2 * 2.306 * 0.5 / 3)
+    assert t_interval(0.9, 1.0, 4) == (pytest.approx(0.9 - 3.182 * 0.5), 1.0)
+
+
+def test_t_critical_is_conservative_between_rows_and_normal_beyond():
+    assert t_critical(11) == t_critical(10)
+    assert t_critical(100) == 1.96
+    assert t_critical(4, 0.99) == 4.604
+
+
+def test_running_score_matches_sample_variance():
+    stat = RunningScore()
+    for score in (1.0, -1.0, 0.5, 0.0):
+        stat.add(score)
+    assert stat.mean == pytest.approx(0.125)
+    assert stat.variance == pytest.approx(sum((s - 0.125) ** 2 for s in (1.0, -1.0, 0.5, 0.0)) / 3)
+
+
+def test_constant_prompt_converges_after_min_samples():
+    sampler = SequentialSampler(['gender'], target_width=0.2, min_samples=3, max_samples=50, interval='t')
+    [estimate] = sampler.run(["The teacher said"], lambda p: "The teacher said the class was ready.")
+    assert estimate.n == 3
+    assert estimate.stop_reason == 'converged'
+    assert estimate.converged
+
+
+def test_stop_reasons_distinguish_budget_and_max_samples():
+    texts = iter(["He said hi.", "She said hi."] * 50)
+    sampler = SequentialSampler(['gender'], target_width=0.01, min_samples=2, max_samples=4, interval='t')
+    [estimate] = sampler.run(["The doctor said"], lambda p: next(texts))
+    assert estimate.stop_reason == 'max_samples'
+    assert not estimate.converged
+
+    texts = iter(["He said hi.", "She said hi."] * 50)
+    sampler = SequentialSampler(['gender'], target_width=0.01, min_samples=2, max_samples=10,
+                                budget=5, interval='t')
+    [estimate] = sampler.run(["The doctor said"], lambda p: next(texts))
+    assert estimate.n == 5
+    assert estimate.stop_reason == 'budget'
+
+
+def test_unknown_interval_is_rejected():
+    with pytest.raises(ValueError):
+        SequentialSampler(['gender'], interval='wilson')
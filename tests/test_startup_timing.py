@@ -0,0 +1,28 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.startup_timing import warm_up
+
+
+def test_warm_up_runs_once_and_retries_after_a_failure():
+    calls = []
+
+    def flaky():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise ConnectionError("download failed")
+        return 'model'
+
+    failed = warm_up('test-flaky', flaky)
+    with pytest.raises(ConnectionError):
+        failed.wait(5)
+    assert failed.state == 'failed'
+
+    retried = warm_up('test-flaky', flaky)
+    assert retried is not failed
+    assert retried.wait(5) == 'model'
+    assert warm_up('test-flaky', flaky) is retried
+    assert calls == [0, 1]
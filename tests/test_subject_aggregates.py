@@ -0,0 +1,103 @@
+import json
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from src.create_bias_table_multi import aggregate_file, aggregate_records
+from src.subject_aggregates import AggregateTable, SubjectAggregate, iter_shards, merge_all, shard_range
+
+SUBJECTS = ['the nurse', 'the engineer', 'the teacher', 'the pilot']
+LABELS = ['male', 'female', 'neutral']
+
+
+def random_detections(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        male, female = rng.randint(0, 4), rng.randint(0, 4)
+        score = (male - female) / (male + female) if male + female else 0.0
+        rows.append((rng.choice(SUBJECTS), {
+            'gender': {'male_count': male, 'female_count': female, 'bias_score': score,
+                       'bias_label': rng.choice(LABELS)},
+            'age': {'positive_count': rng.randint(0, 2), 'negative_count': 0, 'bias_score': rng.uniform(-1, 1),
+                    'bias_label': 'neutral'}
+        }))
+    return rows
+
+
+def table_of(rows):
+    table = AggregateTable()
+    for subject, detections in rows:
+        table.add(subject, detections)
+    return table
+
+
+def test_subject_aggregate_statistics():
+    aggregate = SubjectAggregate()
+    for score in (0.1, 0.2, 0.3):
+        aggregate.add({'male_count': 1, 'female_count': 2, 'bias_score': score, 'bias_label': 'neutral'})
+    assert aggregate.texts == 3
+    assert aggregate.counts == {'male': 3, 'female': 6}
+    assert aggregate.mean == pytest.approx(0.2)
+    assert aggregate.variance == pytest.approx(0.01)
+    assert (aggregate.score_min, aggregate.score_max) == (0.1, 0.3)
+    assert aggregate.labels == {'neutral': 3}
+    assert SubjectAggregate().mean == 0.0 and SubjectAggregate().variance == 0.0
+
+    fast = SubjectAggregate(exact=False)
+    for score in (0.1, 0.2, 0.3):
+        fast.add({'male_count': 1, 'female_count': 2, 'bias_score': score, 'bias_label': 'neutral'})
+    assert isinstance(fast.score_sum, float)
+    assert (fast.mean, fast.variance) == (pytest.approx(0.2), pytest.approx(0.01))
+    assert fast.labels == aggregate.labels and fast.counts == aggregate.counts
+
+
+def test_shards_merge_to_the_single_pass_table_in_any_grouping():
+    rows = random_detections(300)
+    whole = table_of(rows)
+    parts = [table_of(rows[start:start + 37]) for start in range(0, len(rows), 37)]
+
+    in_order = merge_all(parts)
+    assert in_order == whole
+    assert list(in_order.entries) == list(whole.entries)
+    nested = parts[0].merge(parts[1].merge(merge_all(parts[2:])))
+    assert nested == whole
+    assert merge_all(reversed(parts)) == whole
+    assert parts[0] == table_of(rows[:37])
+
+    for key, aggregate in whole.entries.items():
+        assert in_order.entries[key].sketch.n == aggregate.sketch.n
+        assert in_order.entries[key].sketch.quantile(0.5) == pytest.approx(aggregate.sketch.quantile(0.5))
+
+
+def test_json_round_trip(tmp_path):
+    table = table_of(random_detections(50))
+    path = table.save(str(tmp_path / 'parts' / 'aggregates.json'))
+    loaded = AggregateTable.load(path)
+    assert loaded == table
+    assert list(loaded.entries) == list(table.entries)
+    assert json.loads(json.dumps(loaded.to_dict())) == table.to_dict()
+    assert table.get('nobody', 'gender').texts == 0
+
+
+def test_shard_helpers():
+    assert [len(shard) for shard in iter_shards(range(10), 4)] == [4, 4, 2]
+    assert [shard_range(10, f'{i}/3') for i in range(3)] == [(0, 3), (3, 6), (6, 10)]
+    with pytest.raises(ValueError):
+        shard_range(10, '3/3')
+
+
+def test_map_reduce_over_processes_matches_in_process():
+    rng = random.Random(1)
+    records = [{'prompt': f"{rng.choice(SUBJECTS).title()} said", 'output': rng.choice([
+        "He fixed the engine and his team cheered.",
+        "She led the ward; her patients trusted her.",
+        "The old man was slow but wise.",
+        "They finished the work."
+    ])} for _ in range(120)]
+    expected = aggregate_records(records)
+    assert aggregate_file(iter(records), workers=1, shard_size=25) == expected
+    assert aggregate_file(iter(records), workers=2, shard_size=25) == expected